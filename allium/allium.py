@@ -13,9 +13,14 @@ import argparse
 import os
 import sys
 import time
+from lib.compiled_templates import COMPILED_TEMPLATES_DIR, compile_templates
 from lib.coordinator import create_relay_set_with_coordinator
+from lib.page_writer import ENV
+from lib.precompress import DEFAULT_LEVEL, parse_formats
 from lib.progress_logger import create_progress_logger
-from lib.site_generator import generate_site
+from lib.relay_snapshot import DEFAULT_SNAPSHOT_PATH, SnapshotError, load_snapshot, save_snapshot
+from lib.render_shards import ShardError, parse_shard
+from lib.site_generator import create_early_page_renderer, generate_site, merge_site
 
 ABS_PATH = os.path.dirname(os.path.abspath(__file__))
 
@@ -70,7 +75,201 @@ def check_dependencies(show_progress=False):
 
 
 
+def _shard_argument(text):
+    """argparse type for --shard I/N"""
+    try:
+        return parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _precompress_argument(text):
+    """argparse type for --precompress gz|br|gz,br"""
+    try:
+        return parse_formats(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def load_snapshot_for_rendering(snapshot, args, progress_logger):
+    """Load a relay snapshot and apply this run's output settings; exits on an unusable snapshot."""
+    progress_logger.log(f"Loading relay snapshot {snapshot}...")
+    start = time.perf_counter()
+    try:
+        relay_set = load_snapshot(snapshot, progress_logger)
+    except (OSError, SnapshotError) as e:
+        print(f"❌ Error: Failed to load relay snapshot: {e}")
+        if isinstance(e, FileNotFoundError):
+            print("💡 Write one first with: python3 allium.py --save-snapshot")
+        sys.exit(1)
+    relay_set.output_dir = args.output_dir
+    relay_set.mp_workers = args.mp_workers
+    relay_set.progress = args.progress
+    progress_logger.log_without_increment(
+        f"Loaded {len(relay_set.json.get('relays', []))} relays from the snapshot "
+        f"in {time.perf_counter() - start:.2f}s (processed {relay_set.timestamp})")
+    return relay_set
+
+
+def compile_templates_command(argv):
+    """
+    `allium.py compile-templates`: compile all templates into Python modules.
+
+    Later runs load them instead of parsing and compiling the templates; a
+    template edited after the build is loaded from source until the next build.
+    """
+    parser = argparse.ArgumentParser(
+        prog="allium.py compile-templates",
+        description="allium: compile the page templates ahead of time (see lib/compiled_templates.py)",
+    )
+    parser.add_argument(
+        "--out",
+        dest="compiled_dir",
+        type=str,
+        default=COMPILED_TEMPLATES_DIR,
+        help="directory of the compiled modules, read by later runs through "
+        "ALLIUM_COMPILED_TEMPLATES_DIR when not the default (default: %(default)s)",
+    )
+    args = parser.parse_args(argv)
+    if not args.compiled_dir:
+        parser.error("--out is empty (ALLIUM_COMPILED_TEMPLATES_DIR disables compiled templates)")
+
+    try:
+        stats = compile_templates(ENV, args.compiled_dir)
+    except Exception as e:
+        print(f"❌ Error: Cannot compile templates: {e}")
+        return 1
+    print(f"✅ Compiled {stats['template_count']} templates into {stats['compiled_dir']} "
+          f"in {stats['seconds']:.2f}s")
+    return 0
+
+
+def render_from_snapshot(argv):
+    """
+    `allium.py render`: render pages from a relay snapshot saved with --save-snapshot.
+
+    Without --shard/--merge the whole site is rendered. With --shard I/N only the
+    pages of shard I are; once all N shards are rendered into the output directory,
+    --merge N writes the static files, search index and output manifest.
+    """
+    parser = argparse.ArgumentParser(
+        prog="allium.py render",
+        description="allium: render the site from a relay snapshot (see --save-snapshot)",
+    )
+    parser.add_argument(
+        "--snapshot",
+        dest="snapshot",
+        metavar="FILE",
+        required=True,
+        help="relay snapshot written by allium.py --save-snapshot FILE",
+    )
+    parser.add_argument(
+        "--out",
+        dest="output_dir",
+        type=str,
+        default="./www",
+        help='directory to store rendered files (default "./www")',
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--shard",
+        dest="shard",
+        metavar="I/N",
+        type=_shard_argument,
+        default=None,
+        help="render only shard I of N (pages are split by output path); finish with --merge N",
+    )
+    mode.add_argument(
+        "--merge",
+        dest="merge",
+        metavar="N",
+        type=int,
+        default=None,
+        help="after all N shards rendered into --out, write static files, search index and manifest",
+    )
+    parser.add_argument(
+        "--workers",
+        dest="mp_workers",
+        type=int,
+        default=max(4, os.cpu_count() or 4),
+        help="parallel workers for page generation (default: auto-detected CPU count, min 4)",
+    )
+    parser.add_argument(
+        "--incremental",
+        dest="incremental",
+        action="store_true",
+        help="only rewrite pages whose content changed since the previous run (see allium.py --help)",
+    )
+    parser.add_argument(
+        "--inline-critical-css",
+        dest="inline_critical_css",
+        action="store_true",
+        help="inline the critical part of the stylesheet in every page (use the same setting for every shard)",
+    )
+    parser.add_argument(
+        "--precompress",
+        dest="precompress",
+        metavar="FORMATS",
+        type=_precompress_argument,
+        default=None,
+        help="also write .gz and/or .br siblings of every page: gz, br or gz,br (see allium.py --help)",
+    )
+    parser.add_argument(
+        "--precompress-level",
+        dest="precompress_level",
+        type=int,
+        choices=range(1, 10),
+        metavar="1-9",
+        default=DEFAULT_LEVEL,
+        help=f"gzip level and brotli quality of --precompress, 1-9 (default: {DEFAULT_LEVEL})",
+    )
+    parser.add_argument(
+        "--profile-render",
+        dest="profile_render",
+        metavar="DIR",
+        default=None,
+        help="save per page type render timings to DIR/render-profile.json (one DIR per shard)",
+    )
+    parser.add_argument(
+        "--profile-slowest",
+        dest="profile_slowest",
+        type=int,
+        default=0,
+        help="with --profile-render, save cProfile stats of the N slowest pages to DIR/slowest/ (default: 0)",
+    )
+    parser.add_argument(
+        "-p", "--progress",
+        dest="progress",
+        action="store_true",
+        help="show progress updates during execution",
+    )
+    args = parser.parse_args(argv)
+    if args.merge is not None and args.merge < 1:
+        parser.error("--merge: shard count must be at least 1")
+
+    progress_logger = create_progress_logger(time.time(), 0, 0, args.progress)
+    check_dependencies(show_progress=args.progress)
+    ensure_output_directory(args.output_dir)
+
+    relay_set = load_snapshot_for_rendering(args.snapshot, args, progress_logger)
+
+    if args.merge is not None:
+        try:
+            merge_site(relay_set, args, progress_logger, args.merge)
+        except ShardError as e:
+            print(f"❌ Error: Cannot merge render shards: {e}")
+            return 1
+    else:
+        generate_site(relay_set, args, progress_logger, shard=args.shard)
+    return 0
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "render":
+        sys.exit(render_from_snapshot(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "compile-templates":
+        sys.exit(compile_templates_command(sys.argv[2:]))
+
     desc = "allium: generate static tor relay metrics and statistics"
     parser = argparse.ArgumentParser(description=desc)
     parser.add_argument(
@@ -185,7 +384,124 @@ if __name__ == "__main__":
         help="parallel workers for page generation (default: auto-detected CPU count, min 4)",
         required=False,
     )
+    parser.add_argument(
+        "--fuse-contact-pages",
+        dest="fuse_contact_pages",
+        action="store_true",
+        help=(
+            "compute each contact's page data in the worker that renders its page "
+            "instead of in a separate pool during processing (needs --workers > 0)"
+        ),
+        required=False,
+    )
+    parser.add_argument(
+        "--collector-downloads",
+        dest="collector_downloads",
+        type=int,
+        default=4,
+        help="CollecTor descriptor files downloaded in parallel on a cold cache (default: 4)",
+        required=False,
+    )
+    parser.add_argument(
+        "--incremental",
+        dest="incremental",
+        action="store_true",
+        help=(
+            "only rewrite pages whose content changed since the previous run and "
+            "remove pages that disappeared (tracked in OUTPUT_DIR/.allium-manifest.json)"
+        ),
+        required=False,
+    )
+    parser.add_argument(
+        "--inline-critical-css",
+        dest="inline_critical_css",
+        action="store_true",
+        help=(
+            "inline the critical part of the stylesheet (layout, navigation, search) in every "
+            "page and load static/css/allium.<hash>.css at the end of the page"
+        ),
+        required=False,
+    )
+    parser.add_argument(
+        "--precompress",
+        dest="precompress",
+        metavar="FORMATS",
+        type=_precompress_argument,
+        default=None,
+        help=(
+            "also write compressed siblings of every page (index.html.gz, index.html.br) for "
+            "static servers that serve precompressed files: gz, br (needs the brotli package) "
+            "or gz,br; with --incremental only changed pages are compressed again"
+        ),
+        required=False,
+    )
+    parser.add_argument(
+        "--precompress-level",
+        dest="precompress_level",
+        type=int,
+        choices=range(1, 10),
+        metavar="1-9",
+        default=DEFAULT_LEVEL,
+        help=f"gzip compression level and brotli quality for --precompress (default: {DEFAULT_LEVEL})",
+        required=False,
+    )
+    parser.add_argument(
+        "--profile-render",
+        dest="profile_render",
+        metavar="DIR",
+        default=None,
+        help=(
+            "time context build, template render and write of every page and save "
+            "per page type p50/p95/max to DIR/render-profile.json"
+        ),
+        required=False,
+    )
+    parser.add_argument(
+        "--profile-slowest",
+        dest="profile_slowest",
+        type=int,
+        default=0,
+        help="with --profile-render, save cProfile stats of the N slowest pages to DIR/slowest/ (default: 0)",
+        required=False,
+    )
+    parser.add_argument(
+        "--save-snapshot",
+        dest="save_snapshot",
+        metavar="FILE",
+        nargs="?",
+        const=DEFAULT_SNAPSHOT_PATH,
+        default=None,
+        help=(
+            "save the processed relay set to FILE (default: allium/data/relay-snapshot) before rendering, "
+            "for --render-only and `allium.py render --snapshot FILE [--shard I/N | --merge N]`"
+        ),
+        required=False,
+    )
+    parser.add_argument(
+        "--snapshot-only",
+        dest="snapshot_only",
+        action="store_true",
+        help="with --save-snapshot, exit after saving the snapshot without rendering pages",
+        required=False,
+    )
+    parser.add_argument(
+        "--render-only",
+        dest="render_only",
+        metavar="FILE",
+        nargs="?",
+        const=DEFAULT_SNAPSHOT_PATH,
+        default=None,
+        help=(
+            "skip fetching and processing: render the relay set saved by --save-snapshot "
+            "(default: allium/data/relay-snapshot), e.g. after template or CSS changes"
+        ),
+        required=False,
+    )
     args = parser.parse_args()
+    if args.snapshot_only and not args.save_snapshot:
+        parser.error("--snapshot-only requires --save-snapshot FILE")
+    if args.render_only and args.save_snapshot:
+        parser.error("--render-only renders an existing snapshot, it cannot be combined with --save-snapshot")
 
     start_time = time.time()
     
@@ -253,11 +569,27 @@ if __name__ == "__main__":
     ensure_output_directory(args.output_dir)
     progress_logger.log(f"Output directory ready at {args.output_dir}")
 
+    if args.render_only:
+        # Processing options (--apis, --base-url, units...) are those the snapshot was saved with
+        RELAY_SET = load_snapshot_for_rendering(args.render_only, args, progress_logger)
+        generate_site(RELAY_SET, args, progress_logger)
+        sys.exit(0)
+
     # object containing onionoo data and processing routines
     progress_logger.log("Initializing relay data from onionoo (using coordinator)...")
     
+    # Detail page types whose inputs are final early are rendered while processing continues
+    early_pages = None if args.snapshot_only else create_early_page_renderer(args, progress_logger)
+    if early_pages is not None:
+        # No forks while the API worker threads download; released once they are joined
+        early_pages.hold()
+    
     try:
-        RELAY_SET = create_relay_set_with_coordinator(args, progress_logger=progress_logger)
+        RELAY_SET = create_relay_set_with_coordinator(
+            args, progress_logger=progress_logger,
+            on_relay_set=early_pages.attach if early_pages is not None else None,
+            on_fetch_complete=early_pages.release if early_pages is not None else None,
+        )
         if RELAY_SET is None or RELAY_SET.json == None:
             # Progress-style error context message (conditional on progress flag)
             progress_logger.log("No onionoo data available, exiting gracefully")
@@ -274,6 +606,13 @@ if __name__ == "__main__":
         print("💡 Try running the command again, or check your internet connection")
         sys.exit(1)
     
+    if args.save_snapshot:
+        metadata = save_snapshot(RELAY_SET, args.save_snapshot)
+        progress_logger.log_without_increment(
+            f"Saved relay snapshot ({metadata['relays']} relays) to {args.save_snapshot}")
+        if args.snapshot_only:
+            sys.exit(0)
+
     # Generate the complete static site
     # Page definitions and generation logic are in lib/site_generator.py
-    generate_site(RELAY_SET, args, progress_logger)
+    generate_site(RELAY_SET, args, progress_logger, early_pages=early_pages)
@@ -143,7 +143,7 @@ def _convert_relay_breakdown(period_result, value_key='uptime'):
     return breakdown
 
 
-def _calculate_generic_score(operator_relays, data, time_period, metric_type, prebuilt_map=None):
+def _calculate_generic_score(operator_relays, data, time_period, metric_type, prebuilt_map=None, summary=None):
     """
     Generic function to calculate scores for different metrics (reliability, bandwidth).
     
@@ -152,7 +152,8 @@ def _calculate_generic_score(operator_relays, data, time_period, metric_type, pr
     uptime API payload for each operator (major performance gain).
     
     For bandwidth, uses pre-built bandwidth_map when available to avoid rebuilding
-    the fingerprint->data mapping for each operator.
+    the fingerprint->data mapping for each operator. With a RelayHistorySummary,
+    per-relay averages and daily totals are read from the shared table instead.
     
     Args:
         operator_relays (list): List of relay objects for this operator
@@ -160,6 +161,7 @@ def _calculate_generic_score(operator_relays, data, time_period, metric_type, pr
         time_period (str): Time period to use ('6_months' or '5_years')
         metric_type (str): Type of metric ('reliability' or 'bandwidth')
         prebuilt_map (dict, optional): Pre-built fingerprint->data mapping for batch processing
+        summary (RelayHistorySummary, optional): Per-relay summary table for the metric
         
     Returns:
         dict: Metrics including score, average value, relay count, etc.
@@ -196,11 +198,12 @@ def _calculate_generic_score(operator_relays, data, time_period, metric_type, pr
             return _make_score_result(average_value, average_value, relay_count, len(uptime_values), breakdown, 'uptime')
         
         # Fallback: If uptime_percentages not available, use raw API data with pre-built map
-        if not data and not prebuilt_map:
+        if not data and not prebuilt_map and summary is None:
             return _make_empty_score_result(relay_count, 'uptime')
         
         from .uptime_utils import extract_relay_uptime_for_period
-        period_result = extract_relay_uptime_for_period(operator_relays, data, time_period, uptime_map=prebuilt_map)
+        period_result = extract_relay_uptime_for_period(operator_relays, data, time_period, uptime_map=prebuilt_map,
+                                                        summary=summary)
         
         if not period_result['uptime_values']:
             return _make_empty_score_result(relay_count, 'uptime')
@@ -213,7 +216,8 @@ def _calculate_generic_score(operator_relays, data, time_period, metric_type, pr
         from .bandwidth_utils import extract_operator_daily_bandwidth_totals, extract_relay_bandwidth_for_period
         
         # Calculate daily total bandwidth (sum across all relays per day, then average)
-        daily_totals_result = extract_operator_daily_bandwidth_totals(operator_relays, data, time_period, bandwidth_map=prebuilt_map)
+        daily_totals_result = extract_operator_daily_bandwidth_totals(operator_relays, data, time_period,
+                                                                      bandwidth_map=prebuilt_map, summary=summary)
         
         if not daily_totals_result['daily_totals']:
             return _make_empty_score_result(relay_count, 'bandwidth')
@@ -221,7 +225,8 @@ def _calculate_generic_score(operator_relays, data, time_period, metric_type, pr
         average_value = daily_totals_result['average_daily_total']
         
         # Get relay breakdown for display purposes
-        period_result = extract_relay_bandwidth_for_period(operator_relays, data, time_period, bandwidth_map=prebuilt_map)
+        period_result = extract_relay_bandwidth_for_period(operator_relays, data, time_period,
+                                                           bandwidth_map=prebuilt_map, summary=summary)
         breakdown = _convert_relay_breakdown(period_result, 'bandwidth')
         
         return _make_score_result(average_value, average_value, relay_count, len(period_result['bandwidth_values']), breakdown, 'bandwidth')
@@ -230,7 +235,7 @@ def _calculate_generic_score(operator_relays, data, time_period, metric_type, pr
     return _make_empty_score_result(relay_count, metric_type)
 
 
-def _calculate_reliability_score(operator_relays, uptime_data, time_period, uptime_map=None):
+def _calculate_reliability_score(operator_relays, uptime_data, time_period, uptime_map=None, summary=None):
     """
     Calculate reliability score using simple average uptime (no weighting).
     
@@ -244,11 +249,13 @@ def _calculate_reliability_score(operator_relays, uptime_data, time_period, upti
         uptime_data (dict): Uptime data from Onionoo API
         time_period (str): Time period to use ('6_months' or '5_years')
         uptime_map (dict, optional): Pre-built fingerprint->uptime mapping
+        summary (RelayHistorySummary, optional): Per-relay summary table with uptime
     """
-    return _calculate_generic_score(operator_relays, uptime_data, time_period, 'uptime', prebuilt_map=uptime_map)
+    return _calculate_generic_score(operator_relays, uptime_data, time_period, 'uptime',
+                                    prebuilt_map=uptime_map, summary=summary)
 
 
-def _calculate_bandwidth_score(operator_relays, bandwidth_data, time_period, bandwidth_map=None):
+def _calculate_bandwidth_score(operator_relays, bandwidth_data, time_period, bandwidth_map=None, summary=None):
     """
     Calculate bandwidth score using daily total bandwidth averaging.
     
@@ -262,8 +269,10 @@ def _calculate_bandwidth_score(operator_relays, bandwidth_data, time_period, ban
         bandwidth_data (dict): Bandwidth data from Onionoo API
         time_period (str): Time period to use ('6_months' or '5_years')
         bandwidth_map (dict, optional): Pre-built fingerprint->bandwidth mapping
+        summary (RelayHistorySummary, optional): Per-relay summary table with bandwidth
     """
-    return _calculate_generic_score(operator_relays, bandwidth_data, time_period, 'bandwidth', prebuilt_map=bandwidth_map)
+    return _calculate_generic_score(operator_relays, bandwidth_data, time_period, 'bandwidth',
+                                    prebuilt_map=bandwidth_map, summary=summary)
 
 
 def _format_breakdown_details(breakdown_items, max_chars, formatter_func=None):
@@ -350,6 +359,69 @@ def _calculate_aroi_leaderboards(relays_instance):
     return _format_leaderboard_entries(leaderboards, aroi_operators, relays_instance)
 
 
+def _operator_identity(contact_hash, contact_data, all_relays):
+    """
+    Identify the AROI operator behind a contact group.
+
+    Returns:
+        tuple: (first_relay, aroi_domain, contact_info, operator_key), or None if
+               the contact does not qualify as an operator
+    """
+    # Get AROI domain and contact info from first relay in this contact group
+    relay_indices = contact_data.get('relays', [])
+    if not relay_indices:
+        return None
+
+    first_relay = all_relays[relay_indices[0]]
+    aroi_domain = first_relay.get('aroi_domain', 'none')
+    contact_info = first_relay.get('contact', '')
+
+    # Skip operators without contact information (AROI requires contact info)
+    if not contact_info or contact_info.strip() == '':
+        return None
+    if aroi_domain == 'none' and not contact_info:
+        return None
+
+    # Additional validation: skip if contact is just whitespace or very short
+    if len(contact_info.strip()) < 3:
+        return None
+
+    # Use AROI domain as key if available, otherwise use first 24 chars of contact_info
+    if aroi_domain and aroi_domain != 'none':
+        operator_key = aroi_domain
+    else:
+        # Use first 30 characters of contact info for better readability (extended from 24)
+        if contact_info and len(contact_info.strip()) > 0:
+            clean_contact = contact_info.strip()
+            if len(clean_contact) > 30:
+                operator_key = clean_contact[:30] + '...'
+            else:
+                operator_key = clean_contact
+        else:
+            # Fallback to contact hash only if no contact info available
+            operator_key = f"contact_{contact_hash[:8]}"
+    return first_relay, aroi_domain, contact_info, operator_key
+
+
+def count_aroi_operators(relays_instance):
+    """
+    Count AROI operators without building the leaderboards.
+
+    Equals the leaderboards' summary['total_operators'] but needs only details
+    data, so network health metrics can use it before uptime/bandwidth arrive.
+    """
+    contacts = relays_instance.json.get('sorted', {}).get('contact', {})
+    all_relays = relays_instance.json.get('relays', [])
+    if not contacts or not all_relays:
+        return 0
+    operator_keys = set()
+    for contact_hash, contact_data in contacts.items():
+        identity = _operator_identity(contact_hash, contact_data, all_relays)
+        if identity is not None:
+            operator_keys.add(identity[3])
+    return len(operator_keys)
+
+
 def _collect_operator_metrics(relays_instance):
     """
     Collect per-operator metrics from contact-based aggregations.
@@ -399,15 +471,22 @@ def _collect_operator_metrics(relays_instance):
     uptime_data = getattr(relays_instance, 'uptime_data', None)
     bandwidth_data = getattr(relays_instance, 'bandwidth_data', None)
     
-    # Pre-build maps once for all operator calculations
+    # Pre-build maps once for all operator calculations, unless the shared per-relay
+    # history summary (history_summary.py) already covers the document
+    from .history_summary import get_history_summary
+    uptime_summary = get_history_summary(relays_instance, 'uptime')
+    bandwidth_summary = get_history_summary(relays_instance, 'bandwidth')
     uptime_map = None
     bandwidth_map = None
-    if uptime_data:
+    if uptime_data and uptime_summary is None:
         from .uptime_utils import build_uptime_map
         uptime_map = build_uptime_map(uptime_data)
-    if bandwidth_data:
+    if bandwidth_data and bandwidth_summary is None:
         from .bandwidth_utils import build_bandwidth_map
         bandwidth_map = build_bandwidth_map(bandwidth_data)
+    for summary in (uptime_summary, bandwidth_summary):
+        if summary is not None:
+            summary.count(scans=1)
     
     # Progress tracking for large operations
     total_contacts = len(contacts)
@@ -418,39 +497,11 @@ def _collect_operator_metrics(relays_instance):
     aroi_operators = {}
     
     for contact_hash, contact_data in contacts.items():
-        # Get AROI domain and contact info from first relay in this contact group
-        relay_indices = contact_data.get('relays', [])
-        if not relay_indices:
-            continue
-            
-        first_relay = all_relays[relay_indices[0]]
-        aroi_domain = first_relay.get('aroi_domain', 'none')
-        contact_info = first_relay.get('contact', '')
-        
-        # Skip operators without contact information (AROI requires contact info)
-        if not contact_info or contact_info.strip() == '':
-            continue
-        if aroi_domain == 'none' and not contact_info:
-            continue
-            
-        # Additional validation: skip if contact is just whitespace or very short
-        if len(contact_info.strip()) < 3:
+        identity = _operator_identity(contact_hash, contact_data, all_relays)
+        if identity is None:
             continue
-            
-        # Use AROI domain as key if available, otherwise use first 24 chars of contact_info
-        if aroi_domain and aroi_domain != 'none':
-            operator_key = aroi_domain
-        else:
-            # Use first 30 characters of contact info for better readability (extended from 24)
-            if contact_info and len(contact_info.strip()) > 0:
-                clean_contact = contact_info.strip()
-                if len(clean_contact) > 30:
-                    operator_key = clean_contact[:30] + '...'
-                else:
-                    operator_key = clean_contact
-            else:
-                # Fallback to contact hash only if no contact info available
-                operator_key = f"contact_{contact_hash[:8]}"
+        first_relay, aroi_domain, contact_info, operator_key = identity
+        relay_indices = contact_data['relays']
         
         # === USE EXISTING CALCULATIONS (NO DUPLICATION) ===
         # All basic metrics are already computed in contact_data
@@ -726,20 +777,24 @@ def _collect_operator_metrics(relays_instance):
         # Uses pre-built uptime_map to avoid ~12K redundant map-building operations
         
         # 6-month reliability score (primary metric)
-        reliability_6m = _calculate_reliability_score(operator_relays, uptime_data, '6_months', uptime_map=uptime_map)
+        reliability_6m = _calculate_reliability_score(operator_relays, uptime_data, '6_months', uptime_map=uptime_map,
+                                                      summary=uptime_summary)
         
         # 5-year reliability score (legacy metric)
-        reliability_5y = _calculate_reliability_score(operator_relays, uptime_data, '5_years', uptime_map=uptime_map)
+        reliability_5y = _calculate_reliability_score(operator_relays, uptime_data, '5_years', uptime_map=uptime_map,
+                                                      summary=uptime_summary)
         
         # === BANDWIDTH CALCULATIONS (OPTIMIZED) ===
         # Calculate bandwidth scores for both 6-month and 1-year periods
         # Uses pre-built bandwidth_map to avoid ~12K redundant map-building operations
         
         # 6-month bandwidth score (primary metric)
-        bandwidth_6m = _calculate_bandwidth_score(operator_relays, bandwidth_data, '6_months', bandwidth_map=bandwidth_map)
+        bandwidth_6m = _calculate_bandwidth_score(operator_relays, bandwidth_data, '6_months', bandwidth_map=bandwidth_map,
+                                                  summary=bandwidth_summary)
         
         # 5-year bandwidth score (extended metric)
-        bandwidth_5y = _calculate_bandwidth_score(operator_relays, bandwidth_data, '5_years', bandwidth_map=bandwidth_map)
+        bandwidth_5y = _calculate_bandwidth_score(operator_relays, bandwidth_data, '5_years', bandwidth_map=bandwidth_map,
+                                                  summary=bandwidth_summary)
         
         # Progress logging for large batches (log every 500 contacts)
         processed_contacts += 1
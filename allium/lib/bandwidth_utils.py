@@ -6,6 +6,8 @@ to enable historic bandwidth leaderboard categories similar to uptime leaderboar
 """
 
 import statistics
+from .history_store import build_bandwidth_history_store
+from .json_stream import LazyJSONArray
 
 def calculate_network_cv_statistics(all_operators_data):
     """Calculate network-wide CV statistics for dynamic threshold setting."""
@@ -80,8 +82,12 @@ def build_bandwidth_map(bandwidth_data):
         bandwidth_data (dict): Bandwidth data from Onionoo API
         
     Returns:
-        dict: Mapping of fingerprint -> bandwidth relay data
+        dict: Mapping of fingerprint -> bandwidth relay data (a LazyJSONIndex
+              that decodes each relay on lookup when the document was loaded lazily)
     """
+    relays = bandwidth_data.get('relays') if bandwidth_data else None
+    if isinstance(relays, LazyJSONArray) and relays.key_field == 'fingerprint':
+        return relays.by_key()
     bandwidth_map = {}
     if bandwidth_data and bandwidth_data.get('relays'):
         for relay in bandwidth_data['relays']:
@@ -208,42 +214,14 @@ def _calculate_peak_performance(operator_relays, bandwidth_map, period, mean_ban
     
     return peak_performance, capacity_utilization
 
-def _calculate_growth_trend(operator_relays, bandwidth_map, period):
+def _calculate_growth_trend(operator_relays, bandwidth_map, period, summary=None):
     """Calculate simplified growth trend metrics."""
     if period != '6_months':
         return None
-        
-    # Build relay bandwidth arrays
-    relay_arrays = []
-    for relay in operator_relays:
-        fingerprint = relay.get('fingerprint', '')
-        relay_bandwidth = bandwidth_map.get(fingerprint)
-        if relay_bandwidth and relay_bandwidth.get('read_history'):
-            period_data = relay_bandwidth['read_history'].get(period, {})
-            if period_data.get('values') and period_data.get('factor'):
-                relay_arrays.append({
-                    'values': period_data['values'],
-                    'factor': period_data['factor']
-                })
-    
-    if not relay_arrays:
-        return None
     
-    # Calculate daily totals
-    max_length = max(len(r['values']) for r in relay_arrays)
-    daily_totals = []
-    
-    for day_index in range(max_length):
-        day_total = valid_count = 0
-        for relay_data in relay_arrays:
-            if day_index < len(relay_data['values']):
-                value = relay_data['values'][day_index]
-                if value is not None and isinstance(value, (int, float)) and value >= 0:
-                    day_total += value * relay_data['factor']
-                    valid_count += 1
-        
-        if valid_count > 0:
-            daily_totals.append(day_total)
+    # Daily totals (sum across the operator's relays per day)
+    daily_totals = extract_operator_daily_bandwidth_totals(
+        operator_relays, None, period, bandwidth_map=bandwidth_map, summary=summary)['daily_totals']
     
     if len(daily_totals) < 60:  # Need at least ~2 months
         return None
@@ -302,8 +280,13 @@ def _calculate_growth_trend(operator_relays, bandwidth_map, period):
         'display': display
     }
 
-def calculate_bandwidth_reliability_metrics(operator_relays, bandwidth_data, period, mean_bandwidth, std_dev, network_cv_stats=None, bandwidth_formatter=None):
-    """Calculate comprehensive bandwidth reliability metrics for an operator."""
+def calculate_bandwidth_reliability_metrics(operator_relays, bandwidth_data, period, mean_bandwidth, std_dev, network_cv_stats=None, bandwidth_formatter=None, summary=None):
+    """
+    Calculate comprehensive bandwidth reliability metrics for an operator.
+    
+    A RelayHistorySummary with bandwidth supplies the shared fingerprint map and
+    cached daily totals instead of rebuilding them from bandwidth_data.
+    """
     metrics = {
         'bandwidth_stability': None,
         'peak_performance': None,
@@ -314,8 +297,12 @@ def calculate_bandwidth_reliability_metrics(operator_relays, bandwidth_data, per
     if not operator_relays or not bandwidth_data or mean_bandwidth <= 0:
         return metrics
     
-    # Build shared bandwidth mapping once
-    bandwidth_map = _build_bandwidth_map(bandwidth_data)
+    # Build shared bandwidth mapping once (or reuse the summary's)
+    if summary is not None and summary.bandwidth is not None:
+        bandwidth_map = summary.bandwidth_map
+        summary.count(scans=1)
+    else:
+        bandwidth_map = _build_bandwidth_map(bandwidth_data)
     
     # Calculate individual metrics
     metrics['bandwidth_stability'] = _calculate_bandwidth_stability(
@@ -327,23 +314,27 @@ def calculate_bandwidth_reliability_metrics(operator_relays, bandwidth_data, per
     metrics['capacity_utilization'] = capacity_util
     
     metrics['growth_trend'] = _calculate_growth_trend(
-        operator_relays, bandwidth_map, period)
+        operator_relays, bandwidth_map, period, summary=summary)
     
     return metrics
 
-def extract_operator_daily_bandwidth_totals(operator_relays, bandwidth_data, time_period, bandwidth_map=None):
+def extract_operator_daily_bandwidth_totals(operator_relays, bandwidth_data, time_period, bandwidth_map=None, summary=None):
     """
     Calculate daily total bandwidth for an operator.
     
     OPTIMIZATION: Accepts pre-built bandwidth_map for batch processing. When processing
     multiple operators, build the map once with build_bandwidth_map() and pass it to
-    each call to avoid rebuilding the map ~3000+ times.
+    each call to avoid rebuilding the map ~3000+ times. With a RelayHistorySummary
+    the result is cached per (period, relay fingerprints), so the leaderboards,
+    network percentiles and contact pages sum each operator's series only once.
+    Callers must treat the returned dict as read-only.
     
     Args:
         operator_relays (list): List of relay objects for the operator
         bandwidth_data (dict): Bandwidth data from Onionoo API (used only if bandwidth_map is None)
         time_period (str): Time period key (e.g., '6_months', '1_year')
         bandwidth_map (dict, optional): Pre-built fingerprint->bandwidth mapping for batch processing
+        summary (RelayHistorySummary, optional): Per-relay summary table (takes precedence)
         
     Returns:
         dict: Contains daily_totals, average_daily_total, and valid_days
@@ -351,6 +342,16 @@ def extract_operator_daily_bandwidth_totals(operator_relays, bandwidth_data, tim
     if not operator_relays:
         return {'daily_totals': [], 'average_daily_total': 0.0, 'valid_days': 0}
     
+    if summary is not None and summary.bandwidth is not None:
+        key = (time_period, tuple(relay.get('fingerprint', '') for relay in operator_relays))
+        cached = summary.daily_totals.get(key)
+        if cached is None:
+            cached = summary.daily_totals[key] = extract_operator_daily_bandwidth_totals(
+                operator_relays, None, time_period, bandwidth_map=summary.bandwidth_map)
+        else:
+            summary.count(series=len(operator_relays))
+        return cached
+    
     # Use pre-built map if provided, otherwise build one (backwards compatibility)
     if bandwidth_map is None:
         if not bandwidth_data:
@@ -396,19 +397,21 @@ def extract_operator_daily_bandwidth_totals(operator_relays, bandwidth_data, tim
         'valid_days': len(daily_totals)
     }
 
-def extract_relay_bandwidth_for_period(operator_relays, bandwidth_data, time_period, bandwidth_map=None):
+def extract_relay_bandwidth_for_period(operator_relays, bandwidth_data, time_period, bandwidth_map=None, summary=None):
     """
     Extract bandwidth data for all relays in an operator for a specific time period.
     
     OPTIMIZATION: Accepts pre-built bandwidth_map for batch processing. When processing
     multiple operators, build the map once with build_bandwidth_map() and pass it to
-    each call to avoid rebuilding the map ~3000+ times.
+    each call to avoid rebuilding the map ~3000+ times. A RelayHistorySummary with
+    bandwidth supplies each relay's average and datapoint count directly.
     
     Args:
         operator_relays (list): List of relay objects for the operator
         bandwidth_data (dict): Bandwidth data from Onionoo API (used only if bandwidth_map is None)
         time_period (str): Time period key (e.g., '6_months', '1_year')
         bandwidth_map (dict, optional): Pre-built fingerprint->bandwidth mapping for batch processing
+        summary (RelayHistorySummary, optional): Per-relay summary table (takes precedence)
         
     Returns:
         dict: Contains bandwidth_values, relay_breakdown, and valid_relays
@@ -416,6 +419,27 @@ def extract_relay_bandwidth_for_period(operator_relays, bandwidth_data, time_per
     bandwidth_values = []
     relay_breakdown = {}
     
+    if summary is not None and summary.bandwidth is not None:
+        table = summary.bandwidth
+        for relay in operator_relays:
+            fingerprint = relay.get('fingerprint', '')
+            period_summary = table.get(fingerprint, {}).get(time_period) if fingerprint else None
+            if period_summary and period_summary[0] > 0:
+                avg_bandwidth, data_points = period_summary
+                bandwidth_values.append(avg_bandwidth)
+                relay_breakdown[fingerprint] = {
+                    'nickname': relay.get('nickname', 'Unknown'),
+                    'fingerprint': fingerprint,
+                    'bandwidth': avg_bandwidth,
+                    'data_points': data_points
+                }
+        summary.count(series=len(operator_relays))
+        return {
+            'bandwidth_values': bandwidth_values,
+            'relay_breakdown': relay_breakdown,
+            'valid_relays': len(bandwidth_values)
+        }
+    
     # Use pre-built map if provided, otherwise build one (backwards compatibility)
     if bandwidth_map is None:
         bandwidth_map = build_bandwidth_map(bandwidth_data) if bandwidth_data else {}
@@ -450,11 +474,26 @@ def extract_relay_bandwidth_for_period(operator_relays, bandwidth_data, time_per
         'valid_relays': len(bandwidth_values)
     }
 
-def process_all_bandwidth_data_consolidated(all_relays, bandwidth_data, include_flag_analysis=True):
-    """Consolidated bandwidth data processing function."""
+def process_all_bandwidth_data_consolidated(all_relays, bandwidth_data, include_flag_analysis=True, history_store=None):
+    """
+    Consolidated bandwidth data processing function.
+    
+    Per-relay averages and transferred-data totals are read from a columnar
+    HistoryStore (history_store.py), which reduces each read/write history series
+    for all relays in one batched pass.
+    
+    Args:
+        all_relays (list): List of all relay objects
+        bandwidth_data (dict): Onionoo bandwidth API data
+        include_flag_analysis (bool): Whether to include flag bandwidth analysis
+        history_store (HistoryStore, optional): Pre-built store for bandwidth_data (built here if None)
+    """
     if not bandwidth_data or not all_relays:
         return {'relay_bandwidth_data': {}, 'network_flag_statistics': {} if include_flag_analysis else None}
     
+    if history_store is None:
+        history_store = build_bandwidth_history_store(bandwidth_data)
+    
     # Create fingerprint mapping
     relay_fingerprint_map = {}
     for relay in all_relays:
@@ -462,26 +501,33 @@ def process_all_bandwidth_data_consolidated(all_relays, bandwidth_data, include_
         if fingerprint:
             relay_fingerprint_map[fingerprint] = relay
     
+    # Batched per-period reductions for every relay (row-indexed arrays)
+    average_periods = []
+    for period in ('6_months', '1_year', '5_years'):
+        series = history_store.get('read_history', period)
+        if series is not None:
+            average_periods.append((period, series.scaled_averages()))
+    total_periods = []
+    for period in ('1_month', '6_months', '1_year', '5_years'):
+        totals = [series.totals() for series in (history_store.get('write_history', period),
+                                                 history_store.get('read_history', period)) if series]
+        total_periods.append((period, totals))
+    overload_ratelimits = history_store.attributes['overload_ratelimits']
+    overload_fd_exhausted = history_store.attributes['overload_fd_exhausted']
+    
     # Initialize data structures
     relay_bandwidth_data = {}
     network_flag_data = {}
     
     # Process bandwidth data
-    for bandwidth_relay in bandwidth_data.get('relays', []):
-        fingerprint = bandwidth_relay.get('fingerprint')
+    for row, fingerprint in enumerate(history_store.fingerprints):
         if not fingerprint:
             continue
             
         relay_obj = relay_fingerprint_map.get(fingerprint)
         bandwidth_averages = {'6_months': 0.0, '1_year': 0.0, '5_years': 0.0}
-        read_history = bandwidth_relay.get('read_history', {})
-        
-        for period in ['6_months', '1_year', '5_years']:
-            period_data = read_history.get(period, {})
-            if period_data.get('values') and period_data.get('factor'):
-                factor = period_data['factor']
-                actual_values = [v * factor for v in period_data['values'] if v is not None]
-                bandwidth_averages[period] = calculate_relay_bandwidth_average(actual_values)
+        for period, averages in average_periods:
+            bandwidth_averages[period] = averages[row]
         
         # Flag analysis
         flag_data = {}
@@ -501,18 +547,16 @@ def process_all_bandwidth_data_consolidated(all_relays, bandwidth_data, include_
                     flag_data[flag] = bandwidth_averages
         
         # Calculate total data transferred (read + write) per period
-        write_total = calculate_total_data_from_history(bandwidth_relay.get('write_history', {}))
-        read_total = calculate_total_data_from_history(read_history)
-        total_data = {p: write_total.get(p, 0) + read_total.get(p, 0)
-                      for p in ('1_month', '6_months', '1_year', '5_years')}
+        total_data = {period: sum(totals[row] for totals in period_totals if totals[row])
+                      for period, period_totals in total_periods}
         
         relay_bandwidth_data[fingerprint] = {
             'bandwidth_averages': bandwidth_averages,
             'total_data': total_data,
             'flag_data': flag_data,
             # Overload fields from bandwidth endpoint (for stability computation)
-            'overload_ratelimits': bandwidth_relay.get('overload_ratelimits'),
-            'overload_fd_exhausted': bandwidth_relay.get('overload_fd_exhausted'),
+            'overload_ratelimits': overload_ratelimits[row],
+            'overload_fd_exhausted': overload_fd_exhausted[row],
         }
     
     # Calculate network flag statistics
@@ -0,0 +1,300 @@
+"""
+File: cache_codecs.py
+
+On-disk encodings for the API cache managed by CacheManager.
+
+The original cache format is indented JSON, which for the uptime and bandwidth
+documents means hundreds of MB of whitespace and a multi-second json.load on
+every run. Each codec here turns a cached API response into a file and back:
+
+- json:     indented JSON (legacy format, human readable)
+- json-min: minified JSON
+- json-gz:  minified JSON, gzip-compressed
+- pickle:   pickle with a small versioned header and CRC32 checksum (fastest load)
+
+The codec is chosen per API (APIConfig.cache_codec). CacheManager migrates an
+existing legacy ``.json`` cache file to the configured codec on first load.
+
+Benchmark the codecs against the current cache directory with:
+
+    python3 -m allium.lib.cache_codecs [--cache-dir DIR] [cache_key ...]
+"""
+
+import contextlib
+import gzip
+import io
+import json
+import os
+import pickle
+import struct
+import time
+import zlib
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from .json_stream import json_default
+
+
+class CacheFormatError(ValueError):
+    """Raised when a binary cache file has a bad header, version or checksum."""
+    pass
+
+
+class PackageUnpickler(pickle.Unpickler):
+    """Resolves allium classes whichever way the package was imported when the data was pickled."""
+
+    def find_class(self, module: str, name: str) -> Any:
+        # allium.py imports this package as "lib", tests and benchmarks as "allium.lib"
+        for prefix in ('allium.lib.', 'lib.'):
+            if module.startswith(prefix):
+                module = f"{__package__}.{module[len(prefix):]}"
+                break
+        return super().find_class(module, name)
+
+
+class CacheCodec:
+    """Base codec: subclasses define the file extension and the (de)serialization."""
+
+    name = ''
+    extension = ''
+
+    def dump(self, data: Any, fp: BinaryIO) -> None:
+        """Serialize data to a binary file object."""
+        raise NotImplementedError
+
+    def load(self, fp: BinaryIO) -> Any:
+        """Deserialize data from a binary file object."""
+        raise NotImplementedError
+
+
+class JsonCodec(CacheCodec):
+    """Plain JSON; indent=2 reproduces the legacy cache files byte for byte."""
+
+    def __init__(self, name: str = 'json', indent: Optional[int] = 2):
+        self.name = name
+        self.extension = '.json'
+        self.indent = indent
+        self.separators = None if indent is not None else (',', ':')
+
+    def dump(self, data, fp):
+        # json.dump streams small string pieces; a text wrapper keeps them off one big str
+        with _text_writer(fp) as text_fp:
+            json.dump(data, text_fp, indent=self.indent, separators=self.separators, default=json_default)
+
+    def load(self, fp):
+        return json.load(fp)
+
+
+class GzipJsonCodec(CacheCodec):
+    """Minified JSON inside a gzip stream; smallest files, slower than pickle to load."""
+
+    name = 'json-gz'
+    extension = '.json.gz'
+
+    def __init__(self, compresslevel: int = 6):
+        self.compresslevel = compresslevel
+
+    def dump(self, data, fp):
+        with gzip.GzipFile(fileobj=fp, mode='wb', compresslevel=self.compresslevel, mtime=0) as gz:
+            with _text_writer(gz) as text_fp:
+                json.dump(data, text_fp, separators=(',', ':'), default=json_default)
+
+    def load(self, fp):
+        with gzip.GzipFile(fileobj=fp, mode='rb') as gz:
+            return json.load(gz)
+
+
+class PickleCodec(CacheCodec):
+    """
+    Pickle with a fixed header so stale or damaged files are rejected, not trusted.
+
+    Header layout (18 bytes): magic b'ALMC', format version (uint8), pickle
+    protocol (uint8), CRC32 of the payload (uint32), payload length (uint64).
+    Both writing and reading stream through the checksum, so the payload is
+    never held as a single bytes object in addition to the decoded data.
+    """
+
+    name = 'pickle'
+    extension = '.pickle'
+    MAGIC = b'ALMC'
+    FORMAT_VERSION = 1
+    _HEADER = struct.Struct('>4sBBIQ')
+
+    def __init__(self, protocol: int = pickle.HIGHEST_PROTOCOL):
+        self.protocol = protocol
+
+    def dump(self, data, fp):
+        header_pos = fp.tell()
+        fp.write(b'\0' * self._HEADER.size)
+        writer = _ChecksumWriter(fp)
+        pickle.dump(data, writer, protocol=self.protocol)
+        end_pos = fp.tell()
+        fp.seek(header_pos)
+        fp.write(self._HEADER.pack(self.MAGIC, self.FORMAT_VERSION, self.protocol,
+                                   writer.crc, writer.length))
+        fp.seek(end_pos)
+
+    def load(self, fp):
+        header = fp.read(self._HEADER.size)
+        if len(header) != self._HEADER.size:
+            raise CacheFormatError("truncated cache header")
+        magic, version, _protocol, crc, length = self._HEADER.unpack(header)
+        if magic != self.MAGIC:
+            raise CacheFormatError("not an allium cache file")
+        if version != self.FORMAT_VERSION:
+            raise CacheFormatError(f"unsupported cache format version {version}")
+        reader = _ChecksumReader(fp)
+        data = PackageUnpickler(reader).load()
+        if reader.length != length or fp.read(1):
+            raise CacheFormatError("cache payload length mismatch")
+        if reader.crc != crc:
+            raise CacheFormatError("cache checksum mismatch")
+        return data
+
+
+@contextlib.contextmanager
+def _text_writer(fp):
+    """Buffered utf-8 text view of a binary file that leaves the file open afterwards."""
+    text_fp = io.TextIOWrapper(fp, encoding='utf-8', newline='')
+    try:
+        yield text_fp
+    finally:
+        text_fp.flush()
+        text_fp.detach()
+
+
+class _ChecksumWriter:
+    """File wrapper that tracks CRC32 and length of everything written."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.crc = 0
+        self.length = 0
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.length += len(data)
+        return self.fp.write(data)
+
+
+class _ChecksumReader:
+    """File wrapper that tracks CRC32 and length of everything read (for pickle.load)."""
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.crc = 0
+        self.length = 0
+
+    def _track(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.length += len(data)
+        return data
+
+    def read(self, size=-1):
+        return self._track(self.fp.read(size))
+
+    def readline(self, size=-1):
+        return self._track(self.fp.readline(size))
+
+    def readinto(self, buffer):
+        count = self.fp.readinto(buffer)
+        self._track(memoryview(buffer)[:count])
+        return count
+
+
+# Registry of available codecs by name (the value of APIConfig.cache_codec)
+CACHE_CODECS: Dict[str, CacheCodec] = {
+    'json': JsonCodec('json', indent=2),
+    'json-min': JsonCodec('json-min', indent=None),
+    'json-gz': GzipJsonCodec(),
+    'pickle': PickleCodec(),
+}
+
+DEFAULT_CACHE_CODEC = 'json'
+
+
+def get_cache_codec(name: Optional[str]) -> CacheCodec:
+    """
+    Look up a codec by name.
+
+    Raises:
+        ValueError: If the codec name is unknown
+    """
+    codec = CACHE_CODECS.get(name or DEFAULT_CACHE_CODEC)
+    if codec is None:
+        raise ValueError(f"unknown cache codec {name!r} (available: {', '.join(sorted(CACHE_CODECS))})")
+    return codec
+
+
+def benchmark_cache_codecs(cache_manager, cache_keys: List[str],
+                           codec_names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Measure save time, load time and file size of each codec for existing caches.
+
+    Each cache is loaded once through cache_manager, then written and re-read
+    with every codec in a scratch directory. The benchmark writes nothing to the
+    cache directory itself (loading a legacy ``.json`` cache for a key configured
+    with another codec migrates it, exactly as a normal run would).
+
+    Args:
+        cache_manager: CacheManager pointing at the cache directory
+        cache_keys: Cache identifiers to benchmark (e.g., ['onionoo_uptime'])
+        codec_names: Codecs to compare (default: all registered codecs)
+
+    Returns:
+        list: One dict per (cache_key, codec) with size_bytes, save_seconds, load_seconds
+    """
+    import tempfile
+
+    results = []
+    codec_names = codec_names or list(CACHE_CODECS)
+    with tempfile.TemporaryDirectory(prefix='allium-codec-bench-') as scratch:
+        for cache_key in cache_keys:
+            data = cache_manager.load_cache(cache_key)
+            if data is None:
+                continue
+            for codec_name in codec_names:
+                codec = get_cache_codec(codec_name)
+                path = os.path.join(scratch, f"{cache_key}{codec.extension}")
+                start = time.perf_counter()
+                with open(path, 'wb') as fp:
+                    codec.dump(data, fp)
+                save_seconds = time.perf_counter() - start
+                start = time.perf_counter()
+                with open(path, 'rb') as fp:
+                    codec.load(fp)
+                load_seconds = time.perf_counter() - start
+                results.append({
+                    'cache_key': cache_key,
+                    'codec': codec_name,
+                    'size_bytes': os.path.getsize(path),
+                    'save_seconds': round(save_seconds, 4),
+                    'load_seconds': round(load_seconds, 4),
+                })
+                os.remove(path)
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+    from .file_io_utils import create_cache_manager
+
+    default_cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'cache')
+    parser = argparse.ArgumentParser(description='benchmark allium API cache codecs')
+    parser.add_argument('cache_keys', nargs='*',
+                        default=['onionoo_details', 'onionoo_uptime', 'onionoo_bandwidth'],
+                        help='cache keys to benchmark (default: onionoo details, uptime, bandwidth)')
+    parser.add_argument('--cache-dir', default=default_cache_dir, help='cache directory (default: allium/data/cache)')
+    parser.add_argument('--json', dest='as_json', action='store_true', help='print machine-readable JSON')
+    cli_args = parser.parse_args()
+
+    from .workers import CACHE_CODEC_BY_KEY
+    manager = create_cache_manager(cli_args.cache_dir)
+    manager.codecs.update(CACHE_CODEC_BY_KEY)
+    rows = benchmark_cache_codecs(manager, cli_args.cache_keys)
+    if cli_args.as_json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print(f"{'cache':<24} {'codec':<9} {'size MB':>9} {'save s':>8} {'load s':>8}")
+        for row in rows:
+            print(f"{row['cache_key']:<24} {row['codec']:<9} {row['size_bytes'] / 1048576:>9.1f} "
+                  f"{row['save_seconds']:>8.3f} {row['load_seconds']:>8.3f}")
@@ -0,0 +1,153 @@
+"""
+File: compiled_templates.py
+
+Ahead-of-time compiled Jinja2 templates (`allium.py compile-templates`).
+
+page_writer.ENV otherwise parses and compiles each template the first time a
+process asks for it, caching the bytecode in allium/.jinja2_cache. A fresh
+container, or a process whose package directory is empty or read-only, pays
+that cost again before it writes its first page. The build step compiles every
+template in allium/templates into an importable Python module (Jinja2's
+Environment.compile_templates(), then byte-compiled with compileall), and
+page_writer serves them through a ModuleLoader.
+
+manifest.json records the SHA-256 of each template source the modules were
+compiled from, the Jinja2 version and the Environment options that shape the
+generated code. At startup a template is served compiled only if its source is
+unchanged; an edited, added or renamed template is loaded from source (through
+the bytecode cache as before) until the build step runs again, and a manifest
+from another Jinja2 version or other options disables the modules altogether.
+"""
+
+import compileall
+import hashlib
+import json
+import os
+import time
+from shutil import rmtree
+
+import jinja2
+from jinja2 import BaseLoader, ModuleLoader
+
+ABS_PATH = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES_DIR = os.path.join(os.path.dirname(ABS_PATH), "templates")
+
+# Build output, next to the bytecode cache (override with ALLIUM_COMPILED_TEMPLATES_DIR, "" disables)
+COMPILED_TEMPLATES_DIR = os.environ.get(
+    'ALLIUM_COMPILED_TEMPLATES_DIR', os.path.join(os.path.dirname(ABS_PATH), ".compiled_templates"))
+
+MANIFEST_FILE = "manifest.json"
+
+# Environment options compiled into the generated code
+_COMPILE_OPTIONS = ('trim_blocks', 'lstrip_blocks', 'keep_trailing_newline', 'autoescape',
+                    'block_start_string', 'block_end_string', 'variable_start_string',
+                    'variable_end_string', 'comment_start_string', 'comment_end_string',
+                    'line_statement_prefix', 'line_comment_prefix', 'newline_sequence')
+
+
+def _options_key(env):
+    """The compile-relevant Environment options, as stored in the manifest."""
+    return {option: repr(getattr(env, option)) for option in _COMPILE_OPTIONS}
+
+
+def source_hashes(source_loader):
+    """Template name -> SHA-256 of its source, for every template the loader lists."""
+    hashes = {}
+    for name in source_loader.list_templates():
+        filename = os.path.join(source_loader.searchpath[0], *name.split('/'))
+        with open(filename, 'rb') as f:
+            hashes[name] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def fresh_templates(env, source_loader, compiled_dir=COMPILED_TEMPLATES_DIR):
+    """
+    Names of the templates whose compiled module in compiled_dir matches the current source.
+
+    Returns an empty set without a build (or an unreadable manifest), and when
+    the modules were compiled by another Jinja2 version or with other options.
+    """
+    if not compiled_dir:
+        return set()
+    try:
+        with open(os.path.join(compiled_dir, MANIFEST_FILE), encoding='utf8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    if manifest.get('jinja2') != jinja2.__version__ or manifest.get('options') != _options_key(env):
+        return set()
+    compiled = manifest.get('templates', {})
+    return {name for name, digest in source_hashes(source_loader).items() if compiled.get(name) == digest}
+
+
+class CompiledTemplateLoader(BaseLoader):
+    """Serves templates compiled by compile_templates() and falls back to source for the others."""
+
+    def __init__(self, source_loader, compiled_dir, fresh):
+        """
+        Args:
+            source_loader: FileSystemLoader of allium/templates
+            compiled_dir: Output directory of compile_templates()
+            fresh: Template names to serve compiled (see fresh_templates())
+        """
+        self.source_loader = source_loader
+        self.module_loader = ModuleLoader(compiled_dir)
+        self.fresh = frozenset(fresh)
+
+    def get_source(self, environment, template):
+        return self.source_loader.get_source(environment, template)
+
+    def list_templates(self):
+        return self.source_loader.list_templates()
+
+    def load(self, environment, name, globals=None):
+        if name in self.fresh:
+            return self.module_loader.load(environment, name, globals)
+        return self.source_loader.load(environment, name, globals)
+
+
+def template_loader(env, compiled_dir=COMPILED_TEMPLATES_DIR):
+    """
+    Loader for env: compiled modules for unchanged templates, env's own loader otherwise.
+
+    Args:
+        env: Environment whose loader is the FileSystemLoader of the template sources
+    """
+    fresh = fresh_templates(env, env.loader, compiled_dir)
+    if not fresh:
+        return env.loader
+    return CompiledTemplateLoader(env.loader, compiled_dir, fresh)
+
+
+def compile_templates(env, compiled_dir=COMPILED_TEMPLATES_DIR):
+    """
+    Compile every template of env into compiled_dir (replacing an earlier build).
+
+    Modules are written next to the target and swapped in once complete, so a
+    running process never sees a partial build.
+
+    Returns:
+        dict: template_count, seconds, compiled_dir
+    """
+    start = time.perf_counter()
+    source_loader = getattr(env.loader, 'source_loader', env.loader)
+    compile_env = env.overlay(loader=source_loader)
+    compiled_dir = os.path.abspath(compiled_dir)
+    tmp_dir = compiled_dir + ".tmp"
+    rmtree(tmp_dir, ignore_errors=True)
+
+    hashes = source_hashes(source_loader)
+    compile_env.compile_templates(tmp_dir, zip=None, ignore_errors=False, log_function=None)
+    # .pyc files, so importing the modules does not compile them either
+    compileall.compile_dir(tmp_dir, quiet=1, ddir=compiled_dir)
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w', encoding='utf8') as f:
+        json.dump({'jinja2': jinja2.__version__, 'options': _options_key(env), 'templates': hashes},
+                  f, indent=2, sort_keys=True)
+
+    old_dir = compiled_dir + ".old"
+    rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(compiled_dir):
+        os.rename(compiled_dir, old_dir)
+    os.rename(tmp_dir, compiled_dir)
+    rmtree(old_dir, ignore_errors=True)
+    return {'template_count': len(hashes), 'seconds': time.perf_counter() - start, 'compiled_dir': compiled_dir}
@@ -6,14 +6,15 @@ Phase 1 implementation: basic threading coordination between workers and the mai
 Phase 2 implementation: multiple API support, threading, and incremental rendering.
 """
 
-import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from .workers import (
     fetch_onionoo_details, fetch_onionoo_uptime, fetch_onionoo_bandwidth,
     fetch_aroi_validation, fetch_collector_consensus_data, fetch_consensus_health,
-    fetch_collector_descriptors,
+    fetch_collector_descriptors, DESCRIPTORS_MAX_CONCURRENT_DOWNLOADS,
     get_worker_status, get_all_worker_status
 )
+from .http_client import close_idle_connections, format_connection_stats, get_connection_stats
 from .relays import Relays
 from .progress import log_progress
 from .progress_logger import ProgressLogger
@@ -29,7 +30,7 @@ class Coordinator:
     for backward compatibility with tests.
     """
     
-    def __init__(self, args=None, progress_logger=None, **kwargs):
+    def __init__(self, args=None, progress_logger=None, on_relay_set=None, on_fetch_complete=None, **kwargs):
         # Support both args namespace and keyword arguments (for tests/backward compat)
         if args is not None:
             # Read from argparse namespace
@@ -45,6 +46,8 @@ class Coordinator:
             self.filter_downtime_days = args.filter_downtime_days
             self.base_url = args.base_url
             self.mp_workers = args.mp_workers
+            self.fuse_contact_pages = getattr(args, 'fuse_contact_pages', False)
+            self.collector_downloads = getattr(args, 'collector_downloads', DESCRIPTORS_MAX_CONCURRENT_DOWNLOADS)
         else:
             # Backward-compatible keyword arguments (used by tests)
             self.output_dir = kwargs.get('output_dir', './www')
@@ -59,6 +62,8 @@ class Coordinator:
             self.filter_downtime_days = kwargs.get('filter_downtime_days', 7)
             self.base_url = kwargs.get('base_url', '')
             self.mp_workers = kwargs.get('mp_workers', 4)
+            self.fuse_contact_pages = kwargs.get('fuse_contact_pages', False)
+            self.collector_downloads = kwargs.get('collector_downloads', DESCRIPTORS_MAX_CONCURRENT_DOWNLOADS)
         
         self.start_time = kwargs.get('start_time') or (getattr(args, '_start_time', None) if args else None) or time.time()
         self.progress_step = kwargs.get('progress_step', 0)
@@ -74,14 +79,25 @@ class Coordinator:
         else:
             self.progress_logger = ProgressLogger(self.start_time, self.progress_step, self.total_steps, self.progress)
         
+        # Called with the Relays instance before secondary API enrichment starts
+        # (the site generator uses it to render pages as soon as their inputs are final)
+        self.on_relay_set = on_relay_set
+        # Called once every API worker thread has been joined (the early page
+        # renderer forks only then, see page_scheduler.py)
+        self.on_fetch_complete = on_fetch_complete
+        
         # Worker management
         self.workers = {}
         self.worker_data = {}
-        self.worker_threads = []
+        # api_name -> Future while workers run; secondary APIs not yet handed to Relays
+        self.worker_futures = {}
+        self._executor = None
+        self._undelivered = set()
         
         # Build API workers list from declarative registry
         # To add a new API: add one entry to API_WORKER_REGISTRY below
         self.api_workers = self._build_api_workers()
+        self.api_sources = {entry["name"]: entry.get("source") for entry in self.API_WORKER_REGISTRY}
     
     # =========================================================================
     # API WORKER REGISTRY
@@ -92,11 +108,13 @@ class Coordinator:
     #   group:      Which --apis mode includes this worker ('details' or 'all')
     #   args_fn:    Lambda returning the argument list for fetch_fn
     #   enabled_fn: Optional callable returning bool (for feature flags)
+    #   source:     Relays pipeline source fed with the result as soon as it
+    #               arrives (see Relays.attach_api_data)
     #
     # To add a new API source:
     #   1. Create a fetch function in workers.py
     #   2. Add one entry here
-    #   3. Handle the data in Relays.enrich_with_api_data()
+    #   3. Handle the data in Relays.enrich_with_api_data() (and add its source)
     # =========================================================================
     API_WORKER_REGISTRY = [
         {
@@ -110,31 +128,36 @@ class Coordinator:
             "fetch_fn": fetch_onionoo_uptime,
             "group": "all",
             "args_fn": lambda self: [self.onionoo_uptime_url, self._log_progress],
+            "source": "uptime_data",
         },
         {
             "name": "onionoo_bandwidth",
             "fetch_fn": fetch_onionoo_bandwidth,
             "group": "all",
             "args_fn": lambda self: [self.onionoo_bandwidth_url, self.bandwidth_cache_hours, self._log_progress],
+            "source": "bandwidth_data",
         },
         {
             "name": "aroi_validation",
             "fetch_fn": fetch_aroi_validation,
             "group": "all",
             "args_fn": lambda self: [self.aroi_url, self._log_progress],
+            "source": "aroi_validation_data",
         },
         {
             "name": "collector_consensus",
             "fetch_fn": fetch_collector_consensus_data,
             "group": "all",
             "args_fn": lambda self: [None, self._log_progress],
+            "source": "collector_consensus_data",
             "enabled_fn": None,  # Checked dynamically in _build_api_workers
         },
         {
             "name": "collector_descriptors",
             "fetch_fn": fetch_collector_descriptors,
             "group": "all",
-            "args_fn": lambda self: [self._log_progress],
+            "args_fn": lambda self: [self._log_progress, self.collector_downloads],
+            "source": "collector_descriptors_data",
             "enabled_fn": None,  # Checked dynamically in _build_api_workers
         },
     ]
@@ -251,45 +274,114 @@ class Coordinator:
         # Keep progress_step in sync for backwards compatibility
         self.progress_step = self.progress_logger.get_current_step()
 
-    def fetch_all_apis_threaded(self):
+    def fetch_all_apis_threaded(self, wait_for=None):
         """
         Fetch data from all APIs using threading (Phase 2 implementation)
+
+        Args:
+            wait_for: API names to wait for (None waits for every worker). Workers
+                      still running on return keep downloading; their results are
+                      collected by wait_for_api_workers().
+
+        Returns:
+            dict: self.worker_data (results of the workers finished so far)
         """
         if self.progress:
             self.progress_logger.start_section("API Fetching")
             self._log_progress_with_step_increment("Starting threaded API fetching...")
         
-        # Start all API workers in threads
+        # Start all API workers in a thread pool (one thread per API)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.api_workers)),
+                                            thread_name_prefix="Worker")
         for api_name, worker_func, args in self.api_workers:
-            thread = threading.Thread(
-                target=self._run_worker,
-                args=(api_name, worker_func, args),
-                name=f"Worker-{api_name}"
-            )
-            thread.start()
-            self.worker_threads.append((api_name, thread))
+            self.worker_futures[api_name] = self._executor.submit(self._run_worker, api_name, worker_func, args)
+        self._undelivered = set(self.worker_futures)
         
-        # Wait for all threads to complete
-        for api_name, thread in self.worker_threads:
-            thread.join()
-            # Don't log thread join messages to avoid clutter
+        if wait_for is None:
+            self.wait_for_api_workers()
+            return self.worker_data
         
+        waited = [self.worker_futures[name] for name in wait_for if name in self.worker_futures]
+        wait(waited)
+        self._undelivered.difference_update(wait_for)
+        if self._undelivered:
+            self._log_progress_without_increment(
+                f"{', '.join(self._get_api_display_name(name) for name in wait_for)} ready - "
+                f"{len(self._undelivered)} API workers still running")
+        else:
+            self._finish_api_fetching()
+        return self.worker_data
+
+    def wait_for_api_workers(self, on_complete=None):
+        """
+        Wait for the API workers still running, handing each result over as it arrives.
+
+        Args:
+            on_complete: Optional callable(api_name, data) invoked in completion order
+                         (data is None if the worker failed)
+        """
+        if not self.worker_futures:
+            return
+        pending = {self.worker_futures[name]: name for name in self._undelivered}
+        try:
+            for future in as_completed(pending):
+                api_name = pending[future]
+                self._undelivered.discard(api_name)
+                if on_complete is not None:
+                    on_complete(api_name, self.worker_data.get(api_name))
+        finally:
+            if not self._undelivered:
+                self._finish_api_fetching()
+
+    def _finish_api_fetching(self):
+        """Shut the worker pool down and close the API Fetching section."""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        # Idle keep-alive sockets are not needed once fetching is done
+        close_idle_connections()
+        if self.on_fetch_complete is not None:
+            self.on_fetch_complete()
         if self.progress:
             self._log_progress_with_step_increment("All API workers completed")
+            self.progress_logger.log_without_increment(
+                f"HTTP connection reuse: {format_connection_stats(get_connection_stats())}")
             self.progress_logger.end_section("API Fetching")
-        
-        return self.worker_data
 
-    def fetch_onionoo_data(self):
+    def _abandon_api_fetching(self):
+        """
+        Shut the worker pool down without waiting when processing ends early.
+
+        Downloads not yet started are cancelled; running ones finish in the
+        background, their results discarded. A no-op once every result was
+        handed over (_finish_api_fetching() already shut the pool down).
+        """
+        if self._executor is None:
+            return
+        for api_name in self._undelivered:
+            self.worker_futures[api_name].cancel()
+        self._executor.shutdown(wait=False)
+        self._executor = None
+        self._undelivered = set()
+
+    def fetch_onionoo_data(self, wait_for_all=True):
         """
         Fetch onionoo data using workers system.
         Phase 2: Uses threaded approach for multiple APIs, but returns only details for compatibility.
+
+        Args:
+            wait_for_all: If False, return as soon as the details API finishes and
+                          leave the secondary workers running for create_relay_set()
         """
         # No generic progress message here - the specific API messages are logged in _run_worker
         
         # For Phase 2, fetch all APIs but prioritize details for backward compatibility
         try:
-            all_data = self.fetch_all_apis_threaded()
+            if wait_for_all:
+                all_data = self.fetch_all_apis_threaded()
+            else:
+                all_data = self.fetch_all_apis_threaded(wait_for=("onionoo_details",))
         except Exception as e:
             if self.progress:
                 self._log_progress_with_step_increment(f"Error during threaded API fetching: {e}")
@@ -302,6 +394,7 @@ class Coordinator:
         if details_data:
             return details_data
         else:
+            self.wait_for_api_workers()
             if self.progress:
                 self._log_progress_with_step_increment("Failed to fetch onionoo details data")
             print("❌ Error: No details data available from onionoo API")
@@ -362,58 +455,85 @@ class Coordinator:
         The heavy lifting is split between Relays.__init__ (core processing from
         details API) and Relays.enrich_with_api_data() (secondary API enrichment).
         See enrich_with_api_data() docstring for the full pipeline overview.
+
+        If secondary API workers are still downloading (get_relay_set), each
+        dataset is attached to the relay set as soon as its worker finishes, so
+        its processing overlaps the remaining downloads.
         """
         if self.progress:
             self.progress_logger.start_section("Data Processing")
             self._log_progress_with_step_increment("Creating relay set with Details API data...")
         
-        relay_set = Relays(
-            output_dir=self.output_dir,
-            onionoo_url=self.onionoo_details_url,
-            relay_data=relay_data,
-            use_bits=self.use_bits,
-            progress=self.progress,
-            start_time=self.start_time,
-            progress_step=self.progress_step,
-            total_steps=self.total_steps,
-            filter_downtime_days=self.filter_downtime_days,
-            base_url=self.base_url,
-            progress_logger=self.progress_logger,
-            mp_workers=self.mp_workers,
-        )
+        # Secondary workers may still be downloading; if processing fails, the
+        # pool is shut down here rather than left to the interpreter's exit
+        try:
+            relay_set = Relays(
+                output_dir=self.output_dir,
+                onionoo_url=self.onionoo_details_url,
+                relay_data=relay_data,
+                use_bits=self.use_bits,
+                progress=self.progress,
+                start_time=self.start_time,
+                progress_step=self.progress_step,
+                total_steps=self.total_steps,
+                filter_downtime_days=self.filter_downtime_days,
+                base_url=self.base_url,
+                progress_logger=self.progress_logger,
+                mp_workers=self.mp_workers,
+                fuse_contact_pages=self.fuse_contact_pages,
+                defer_enrichment=True,
+            )
         
-        if relay_set.json is None:
-            if self.progress:
-                self._log_progress_with_step_increment("Failed to create relay set")
-            return None
+            if relay_set.json is None:
+                self.wait_for_api_workers()
+                if self.progress:
+                    self._log_progress_with_step_increment("Failed to create relay set")
+                return None
         
-        # Enrich with secondary API data (uptime, bandwidth, AROI, collector)
-        # Processing order and dependencies are documented in enrich_with_api_data()
-        relay_set.enrich_with_api_data(
-            uptime_data=self.get_uptime_data(),
-            bandwidth_data=self.get_bandwidth_data(),
-            aroi_validation_data=self.get_aroi_validation_data(),
-            collector_consensus_data=self.get_collector_consensus_data(),
-            consensus_health_data=self.get_consensus_health_data(),
-            collector_descriptors_data=self.get_collector_descriptors_data(),
-        )
+            if self.on_relay_set is not None:
+                self.on_relay_set(relay_set)
         
-        # Sync progress state
-        relay_set.progress_step = self.progress_step
+            # Feed secondary datasets still in flight as they arrive, then settle the rest
+            # Processing order and dependencies are documented in enrich_with_api_data()
+            self.wait_for_api_workers(on_complete=lambda api_name, data: self._attach_api_data(relay_set, api_name, data))
+            # Hand the datasets over rather than keeping them: the relay set releases
+            # the raw documents once processed, which frees them only if nothing else
+            # still refers to them
+            api_data = {source: self.worker_data.pop(api_name, None)
+                        for api_name, source in self.api_sources.items() if source is not None}
+            relay_set.enrich_with_api_data(consensus_health_data=self.get_consensus_health_data(), **api_data)
         
-        if self.progress:
-            self._log_progress_with_step_increment("Relay set created successfully with Details API and Uptime API data")
-            self.progress_logger.end_section("Data Processing")
+            # Sync progress state
+            relay_set.progress_step = self.progress_step
         
-        return relay_set
+            if self.progress:
+                self._log_progress_with_step_increment("Relay set created successfully with Details API and Uptime API data")
+                self.progress_logger.end_section("Data Processing")
+        
+            return relay_set
+        finally:
+            self._abandon_api_fetching()
+    
+    def _attach_api_data(self, relay_set, api_name, data):
+        """Hand a finished worker's dataset to the relay set's processing pipeline."""
+        source = self.api_sources.get(api_name)
+        if source is None:
+            return
+        executed = relay_set.attach_api_data(source, data)
+        if executed:
+            self._log_progress_without_increment(
+                f"{self._get_api_display_name(api_name)} - processed on arrival ({', '.join(executed)})")
     
     def get_relay_set(self):
         """
         Main entry point: fetch data and create Relays instance.
         This method provides the same interface as the original Relays() constructor.
+
+        Relay processing starts as soon as the details API completes; secondary
+        APIs keep downloading and are fed into the relay set as they finish.
         """
-        # Fetch data using workers
-        relay_data = self.fetch_onionoo_data()
+        # Fetch details; the other workers continue in the background
+        relay_data = self.fetch_onionoo_data(wait_for_all=False)
         if relay_data is None:
             return None
         
@@ -427,17 +547,21 @@ class Coordinator:
             "worker_count": len(statuses),
             "ready_count": len([s for s in statuses.values() if s.get("status") == "ready"]),
             "stale_count": len([s for s in statuses.values() if s.get("status") == "stale"]),
-            "workers": statuses
+            "workers": statuses,
+            "http_connections": get_connection_stats(),
         }
 
 
-def create_relay_set_with_coordinator(args, progress_logger=None):
+def create_relay_set_with_coordinator(args, progress_logger=None, on_relay_set=None, on_fetch_complete=None):
     """
     Create a relay set using the coordinator system.
     
     Args:
         args: argparse namespace with all CLI arguments
         progress_logger: Optional ProgressLogger instance for consistent progress tracking
+        on_relay_set: Optional callable(relay_set) invoked before secondary API enrichment
+        on_fetch_complete: Optional callable() invoked once the API worker threads are joined
     """
-    coordinator = Coordinator(args=args, progress_logger=progress_logger)
+    coordinator = Coordinator(args=args, progress_logger=progress_logger, on_relay_set=on_relay_set,
+                              on_fetch_complete=on_fetch_complete)
     return coordinator.get_relay_set()
\ No newline at end of file
@@ -4,7 +4,7 @@ File I/O Utilities - consolidates identical file I/O patterns with different err
 
 This module provides:
 - Unified file operations with consistent error handling
-- Cache file operations with automatic JSON serialization
+- Cache file operations with pluggable per-key codecs (JSON, gzip, pickle)
 - Timestamp file operations with text I/O
 - State file operations with JSON persistence
 - Directory management utilities
@@ -16,6 +16,7 @@ import tempfile
 import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
+from .cache_codecs import CACHE_CODECS, CacheCodec, DEFAULT_CACHE_CODEC, get_cache_codec
 from .error_handlers import handle_file_io_errors, handle_json_errors
 
 
@@ -127,11 +128,58 @@ class FileIOManager:
 
 
 class CacheManager(FileIOManager):
-    """Cache file operations with automatic JSON serialization."""
+    """
+    Cache file operations with a pluggable on-disk codec per cache key.
+    
+    Keys without a registered codec use the legacy indented JSON format
+    (``<key>.json``). Keys registered with another codec (see cache_codecs.py)
+    are stored as ``<key><codec extension>``; an existing legacy ``.json`` file
+    for such a key is migrated to the new format the first time it is loaded.
+    """
     
-    def __init__(self, cache_directory: str):
-        """Initialize with cache directory."""
+    def __init__(self, cache_directory: str, codecs: Optional[Dict[str, str]] = None):
+        """
+        Initialize with cache directory.
+        
+        Args:
+            cache_directory: Directory holding the cache files
+            codecs: Optional mapping of cache key to codec name (e.g. {'onionoo_uptime': 'pickle'})
+        """
         super().__init__(cache_directory)
+        self.codecs = {}
+        for cache_key, codec_name in (codecs or {}).items():
+            self.set_codec(cache_key, codec_name)
+    
+    def set_codec(self, cache_key: str, codec_name: str) -> None:
+        """
+        Select the on-disk codec for a cache key.
+        
+        Raises:
+            ValueError: If codec_name is not a registered codec
+        """
+        get_cache_codec(codec_name)
+        self.codecs[cache_key] = codec_name
+    
+    def get_codec(self, cache_key: str) -> CacheCodec:
+        """Return the codec used for a cache key (legacy JSON if none registered)."""
+        return get_cache_codec(self.codecs.get(cache_key, DEFAULT_CACHE_CODEC))
+    
+    def get_cache_path(self, cache_key: str) -> Path:
+        """Path of the cache file in the key's configured format."""
+        return self.get_file_path(f"{cache_key}{self.get_codec(cache_key).extension}")
+    
+    def _existing_cache_path(self, cache_key: str) -> Optional[Path]:
+        """Path of the cache file actually on disk: configured format first, then legacy JSON."""
+        path = self.get_cache_path(cache_key)
+        if path.exists():
+            return path
+        legacy_path = self.get_file_path(f"{cache_key}.json")
+        if legacy_path.exists():
+            return legacy_path
+        return None
+    
+    def _is_legacy_json(self, cache_key: str) -> bool:
+        return self.get_codec(cache_key).name == DEFAULT_CACHE_CODEC
     
     def save_cache(self, cache_key: str, data: Any) -> bool:
         """
@@ -139,18 +187,48 @@ class CacheManager(FileIOManager):
         
         Args:
             cache_key: Cache identifier (e.g., 'onionoo_details')
-            data: Data to cache (will be JSON serialized)
+            data: Data to cache (serialized with the key's codec)
             
         Returns:
             bool: True if successful, False if error
         """
-        cache_filename = f"{cache_key}.json"
-        return self.write_json_file(cache_filename, data)
+        if self._is_legacy_json(cache_key):
+            cache_filename = f"{cache_key}.json"
+            return self.write_json_file(cache_filename, data)
+        return self._save_with_codec(cache_key, data)
+    
+    @handle_file_io_errors("save cache", context="")
+    def _save_with_codec(self, cache_key: str, data: Any) -> bool:
+        """Write data with the key's codec via a temp file, then drop files in other formats."""
+        codec = self.get_codec(cache_key)
+        path = self.get_cache_path(cache_key)
+        tmp_path = path.with_name(path.name + ".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                codec.dump(data, f)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        self._remove_other_formats(cache_key)
+        return True
+
+    def _remove_other_formats(self, cache_key: str) -> None:
+        """Delete cache files of cache_key left in other codecs' formats (legacy JSON, a former codec)."""
+        path = self.get_cache_path(cache_key)
+        for extension in {codec.extension for codec in CACHE_CODECS.values()}:
+            other_path = self.get_file_path(f"{cache_key}{extension}")
+            if other_path != path and other_path.exists():
+                other_path.unlink()
     
     def load_cache(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """
         Load data from cache file.
         
+        A legacy ``.json`` cache for a key configured with another codec is
+        loaded once, re-saved in the configured format (keeping its mtime so
+        cache-age decisions are unchanged) and then removed.
+        
         Args:
             cache_key: Cache identifier (e.g., 'onionoo_details')
             
@@ -158,17 +236,61 @@ class CacheManager(FileIOManager):
             dict: Cached data or None if not available
         """
         cache_filename = f"{cache_key}.json"
-        return self.read_json_file(cache_filename)
+        if self._is_legacy_json(cache_key):
+            return self.read_json_file(cache_filename)
+        
+        path = self.get_cache_path(cache_key)
+        if path.exists():
+            return self._load_with_codec(cache_key, path)
+        
+        legacy_path = self.get_file_path(cache_filename)
+        if not legacy_path.exists():
+            return None
+        legacy_mtime = legacy_path.stat().st_mtime
+        data = self.read_json_file(cache_filename)
+        if data is not None and self._save_with_codec(cache_key, data):
+            os.utime(path, (legacy_mtime, legacy_mtime))
+        return data
+    
+    @handle_file_io_errors("load cache", context="")
+    def _load_with_codec(self, cache_key: str, path: Path) -> Optional[Dict[str, Any]]:
+        """Decode a cache file with the key's codec (None on any error)."""
+        with open(path, "rb") as f:
+            return self.get_codec(cache_key).load(f)
+    
+    @handle_file_io_errors("replace cache file", context="")
+    def replace_cache_file(self, cache_key: str, source_path: Union[str, Path]) -> bool:
+        """
+        Atomically promote an already-serialized JSON file to be the cache file.
+        
+        Used by streaming fetches, where the response body was written to disk
+        and parsed from there: renaming it avoids serializing the parsed data again.
+        Only possible for keys stored as JSON; returns False for other codecs so
+        the caller saves the parsed data through the codec instead.
+        
+        Args:
+            cache_key: Cache identifier (e.g., 'onionoo_uptime')
+            source_path: JSON file on the same filesystem as the cache directory
+            
+        Returns:
+            bool: True if the file was promoted, False otherwise
+        """
+        if self.get_codec(cache_key).extension != ".json":
+            return False
+        os.replace(source_path, self.get_cache_path(cache_key))
+        self._remove_other_formats(cache_key)
+        return True
     
     def cache_exists(self, cache_key: str) -> bool:
-        """Check if cache file exists."""
-        cache_filename = f"{cache_key}.json"
-        return self.file_exists(cache_filename)
+        """Check if cache file exists (in the configured or legacy format)."""
+        return self._existing_cache_path(cache_key) is not None
     
     def delete_cache(self, cache_key: str) -> bool:
-        """Delete cache file."""
-        cache_filename = f"{cache_key}.json"
-        return self.delete_file(cache_filename)
+        """Delete cache file (both configured and legacy formats)."""
+        deleted = self.delete_file(f"{cache_key}.json")
+        if not self._is_legacy_json(cache_key):
+            deleted = self.delete_file(self.get_cache_path(cache_key).name) and deleted
+        return deleted
     
     def get_cache_age(self, cache_key: str) -> Optional[float]:
         """
@@ -177,10 +299,9 @@ class CacheManager(FileIOManager):
         Returns:
             float: Age in seconds or None if file doesn't exist
         """
-        cache_filename = f"{cache_key}.json"
-        file_path = self.get_file_path(cache_filename)
+        file_path = self._existing_cache_path(cache_key)
         
-        if file_path.exists():
+        if file_path is not None:
             return time.time() - file_path.stat().st_mtime
         return None
 
@@ -426,9 +547,9 @@ class BulkFileOperations:
 
 
 # Convenience functions for backward compatibility
-def create_cache_manager(cache_directory: str) -> CacheManager:
-    """Create a new cache manager instance."""
-    return CacheManager(cache_directory)
+def create_cache_manager(cache_directory: str, codecs: Optional[Dict[str, str]] = None) -> CacheManager:
+    """Create a new cache manager instance (optionally with per-key codecs)."""
+    return CacheManager(cache_directory, codecs)
 
 
 def create_timestamp_manager(timestamp_directory: str) -> TimestampManager:
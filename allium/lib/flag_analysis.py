@@ -35,8 +35,12 @@ def calculate_network_bandwidth_percentiles(bandwidth_data, relay_set):
         
     try:
         from .bandwidth_utils import extract_operator_daily_bandwidth_totals
+        from .history_summary import get_history_summary
         import statistics
         
+        # Daily totals land in the summary's cache for the leaderboards and contact pages
+        summary = get_history_summary(relay_set, 'bandwidth')
+        
         contacts = relay_set.json['sorted']['contact']
         operator_bandwidth_values = []
         
@@ -49,9 +53,12 @@ def calculate_network_bandwidth_percentiles(bandwidth_data, relay_set):
             
             # Use daily totals calculation (matches AROI leaderboard logic)
             daily_totals_result = extract_operator_daily_bandwidth_totals(
-                operator_relays, bandwidth_data, '6_months'
+                operator_relays, bandwidth_data, '6_months', summary=summary
             )
             
+            if summary is not None:
+                summary.count(scans=1)
+            
             if daily_totals_result['daily_totals']:
                 avg_bandwidth = daily_totals_result['average_daily_total']
                 if avg_bandwidth > 0:  # Only include operators with actual bandwidth
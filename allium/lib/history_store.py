@@ -0,0 +1,401 @@
+"""
+File: history_store.py
+
+Columnar storage for Onionoo uptime and bandwidth history documents.
+
+Onionoo history documents hold, for every relay, one dict per history section
+and period with a Python list of ints (0-999 scaled by ``factor``). Walking that
+structure repeatedly (per period, per flag, for percentiles, for every operator)
+means millions of boxed ints and dict lookups. A HistoryStore converts a
+document once into one contiguous typed array per section/period, with
+per-relay offsets, lengths, factor, interval and first/last timestamps, plus a
+fingerprint -> row index. Per-relay reductions (averages, datapoint counts,
+totals) are then computed for all relays of a series in one batched pass using
+C-level array operations, and cached on the series.
+
+Only the standard library ``array`` module is used (no NumPy dependency).
+Non-null values are packed as unsigned 16-bit ints with null positions kept
+on the side; a series that contains anything else (floats, negatives, values
+above 65535) falls back to doubles, so results never depend on the packing.
+"""
+
+from array import array
+from itertools import repeat
+from operator import mul
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .json_stream import LazyJSONArray
+
+# History periods published by Onionoo (in document order)
+HISTORY_PERIODS = ('1_month', '6_months', '1_year', '5_years')
+
+# Raw uptime values are valid on Onionoo's 0-999 scale
+UPTIME_MAX_VALUE = 999
+# Minimum valid datapoints for a meaningful average (1 month of daily data)
+MIN_DATAPOINTS = 30
+
+
+def _zeros(typecode: str, count: int) -> array:
+    """Zero-filled typed array of the given length."""
+    return array(typecode, bytes(array(typecode).itemsize * count))
+
+
+def _split_nulls(values: List[Any]) -> Tuple[List[Any], List[int]]:
+    """
+    Split a value list into its non-null values and the positions of its nulls.
+
+    Nulls are located with list.index (a C-level scan), so rows with few gaps are
+    split with list slicing instead of a per-element Python loop.
+    """
+    positions = []
+    index = values.index
+    limit = len(values) // 8
+    start = 0
+    try:
+        while True:
+            position = index(None, start)
+            positions.append(position)
+            start = position + 1
+            if len(positions) > limit:
+                # Mostly-null row: a single comprehension pass is cheaper than repeated index() calls
+                return ([v for v in values if v is not None],
+                        [i for i, v in enumerate(values) if v is None])
+    except ValueError:
+        pass
+    if not positions:
+        return values, positions
+    present = values[:positions[0]]
+    for previous, position in zip(positions, positions[1:]):
+        present += values[previous + 1:position]
+    present += values[positions[-1] + 1:]
+    return present, positions
+
+
+class HistorySeries:
+    """
+    One history section and period for every row of a HistoryStore.
+
+    ``values`` holds the non-null datapoints of all rows back to back;
+    ``offsets``/``present`` locate a row and ``null_positions`` records where
+    the row's nulls were. Per-row aggregates of the non-null values (sum, max,
+    min and, for scaled series, sum of ``value * factor``) are taken while
+    packing, so the batched reductions below touch one number per row instead
+    of every datapoint.
+    """
+
+    def __init__(self, period: str, row_count: int, scaled: bool = False):
+        self.period = period
+        self.scaled = scaled
+        self.typecode = 'H'
+        self.values = array('H')
+        self.offsets = _zeros('Q', row_count)
+        self.lengths = _zeros('L', row_count)
+        self.present = _zeros('L', row_count)
+        self.null_positions = array('L')
+        self.null_offsets = _zeros('Q', row_count)
+        self.factors = _zeros('d', row_count)
+        self.intervals = _zeros('d', row_count)
+        self.firsts: List[Optional[str]] = [None] * row_count
+        self.lasts: List[Optional[str]] = [None] * row_count
+        self.sums = _zeros('d', row_count)
+        self.mins = _zeros('d', row_count)
+        self.maxs = _zeros('d', row_count)
+        self.scaled_sums = _zeros('d', row_count) if scaled else None
+        self._cache: Dict[Any, Any] = {}
+
+    def _append(self, row: int, period_data: Dict[str, Any]) -> None:
+        """Pack one relay's period object ({'values': [...], 'factor': ...}) into the column."""
+        values = period_data.get('values')
+        if not values:
+            return
+        present, nulls = _split_nulls(values)
+        try:
+            total, high = sum(present), max(present, default=0)
+        except TypeError:
+            # Non-numeric entries are treated like nulls
+            present = [v for v in values if isinstance(v, (int, float))]
+            nulls = [i for i, v in enumerate(values) if not isinstance(v, (int, float))]
+            total, high = sum(present), max(present, default=0)
+
+        start = len(self.values)
+        if self.typecode == 'H':
+            try:
+                self.values.fromlist(present)
+            except (OverflowError, TypeError):
+                # Negative, fractional or >16-bit values: keep this series as doubles
+                self._widen()
+        if self.typecode == 'd':
+            self.values.fromlist(present)
+            # Packed uint16 rows are never negative, so only doubles need a real minimum
+            self.mins[row] = min(present, default=0)
+
+        factor = period_data.get('factor') or 0.0
+        self.offsets[row] = start
+        self.lengths[row] = len(values)
+        self.present[row] = len(present)
+        self.null_offsets[row] = len(self.null_positions)
+        if nulls:
+            self.null_positions.fromlist(nulls)
+        self.factors[row] = factor
+        self.intervals[row] = period_data.get('interval') or 0.0
+        self.firsts[row] = period_data.get('first')
+        self.lasts[row] = period_data.get('last')
+        self.sums[row] = total
+        self.maxs[row] = high
+        if self.scaled and factor:
+            # Summed in datapoint order, exactly like sum(v * factor for v in values if v is not None)
+            self.scaled_sums[row] = sum(map(mul, present, repeat(factor)))
+
+    def _widen(self) -> None:
+        """Switch the column from packed uint16 to doubles."""
+        self.values = array('d', self.values)
+        self.typecode = 'd'
+
+    def has(self, row: int) -> bool:
+        """True if the row has a non-empty value list for this period."""
+        return self.lengths[row] > 0
+
+    def segment(self, row: int) -> array:
+        """Return a copy of the row's non-null values."""
+        start = self.offsets[row]
+        return self.values[start:start + self.present[row]]
+
+    def row_values(self, row: int) -> List[Optional[float]]:
+        """Return the row's values as a list with None for nulls (the original Onionoo shape)."""
+        values = self.segment(row).tolist()
+        start = self.null_offsets[row]
+        for position in self.null_positions[start:start + self.lengths[row] - self.present[row]]:
+            values.insert(position, None)
+        return values
+
+    def _present_values(self, row: int) -> List[float]:
+        """Non-null values of a row, in datapoint order."""
+        return self.segment(row).tolist()
+
+    def uptime_averages(self, max_value: int = UPTIME_MAX_VALUE,
+                        min_datapoints: int = MIN_DATAPOINTS) -> Tuple[array, array]:
+        """
+        Average uptime percentage and valid datapoint count for every row.
+
+        Same semantics as uptime_utils._compute_uptime_percentage_and_datapoints:
+        values outside 0..max_value and nulls are skipped, fewer than
+        min_datapoints valid values or an average of <=1% yield 0.0.
+
+        Returns:
+            tuple: (array('d') percentages, array('L') datapoints), indexed by row
+        """
+        key = ('uptime', max_value, min_datapoints)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        row_count = len(self.lengths)
+        percentages = _zeros('d', row_count)
+        datapoints = _zeros('L', row_count)
+        scale = 100.0 / 999.0
+        for row, count in enumerate(self.present):
+            if not count:
+                continue
+            if self.mins[row] >= 0 and self.maxs[row] <= max_value:
+                total = self.sums[row]
+            else:
+                valid = [v for v in self._present_values(row) if 0 <= v <= max_value]
+                count, total = len(valid), sum(valid)
+            datapoints[row] = count
+            if count < min_datapoints:
+                continue
+            percentage = (total / count) * scale
+            if percentage > 1.0:
+                percentages[row] = percentage
+        cached = (percentages, datapoints)
+        self._cache[key] = cached
+        return cached
+
+    def scaled_averages(self, min_datapoints: int = MIN_DATAPOINTS) -> array:
+        """
+        Average of ``value * factor`` over non-null, non-negative values for every row.
+
+        Same semantics as bandwidth_utils.calculate_relay_bandwidth_average applied
+        to the factor-scaled values; rows without a factor or with fewer than
+        min_datapoints valid values yield 0.0. Requires a scaled series.
+
+        Returns:
+            array('d'): Averages indexed by row
+        """
+        key = ('scaled', min_datapoints)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        averages = _zeros('d', len(self.lengths))
+        for row, count in enumerate(self.present):
+            factor = self.factors[row]
+            if not count or not factor:
+                continue
+            if factor > 0 and self.mins[row] >= 0:
+                total = self.scaled_sums[row]
+            else:
+                scaled = [v * factor for v in self._present_values(row) if v * factor >= 0]
+                count, total = len(scaled), sum(scaled)
+            if count >= min_datapoints:
+                averages[row] = total / count
+        self._cache[key] = averages
+        return averages
+
+    def totals(self) -> array:
+        """
+        Total ``sum(value * factor) * interval`` for every row (0 without factor or interval).
+
+        Same semantics as bandwidth_utils.calculate_total_data_from_history for one
+        period. Requires a scaled series.
+        """
+        cached = self._cache.get('totals')
+        if cached is None:
+            cached = _zeros('d', len(self.lengths))
+            for row, length in enumerate(self.lengths):
+                if length and self.factors[row] and self.intervals[row]:
+                    cached[row] = self.scaled_sums[row] * self.intervals[row]
+            self._cache['totals'] = cached
+        return cached
+
+    def nbytes(self) -> int:
+        """Approximate buffer memory held by this series."""
+        buffers = [self.values, self.offsets, self.lengths, self.present, self.null_positions,
+                   self.null_offsets, self.factors, self.intervals, self.sums, self.mins, self.maxs]
+        if self.scaled_sums is not None:
+            buffers.append(self.scaled_sums)
+        return sum(a.itemsize * len(a) for a in buffers)
+
+
+class HistoryStore:
+    """
+    Columnar view of an Onionoo history document, indexed by relay fingerprint.
+
+    Rows follow the order of the document's ``relays`` list (entries without a
+    fingerprint keep their row but are not indexed). Series are addressed by a
+    key: the section name (e.g. 'uptime', 'read_history') or 'section/name' for
+    nested sections such as per-flag uptime ('flags/Running').
+    """
+
+    def __init__(self, fingerprints: List[Optional[str]], periods: Tuple[str, ...] = HISTORY_PERIODS,
+                 scaled: bool = False):
+        self.fingerprints = fingerprints
+        self.periods = periods
+        self.scaled = scaled
+        self.index: Dict[str, int] = {fp: row for row, fp in enumerate(fingerprints) if fp}
+        self.series: Dict[str, Dict[str, HistorySeries]] = {}
+        self.nested_keys: Dict[str, List[Tuple[str, ...]]] = {}
+        self.attributes: Dict[str, List[Any]] = {}
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return fingerprint in self.index
+
+    def row_of(self, fingerprint: str) -> Optional[int]:
+        """Row number for a fingerprint, or None if the relay has no history entry."""
+        return self.index.get(fingerprint)
+
+    def get(self, key: str, period: str) -> Optional[HistorySeries]:
+        """Series for a key and period, or None if no relay has it."""
+        return self.series.get(key, {}).get(period)
+
+    def series_keys(self, prefix: str = '') -> List[str]:
+        """Series keys in first-seen document order, optionally filtered by 'section/' prefix."""
+        return [key for key in self.series if key.startswith(prefix)]
+
+    def _series_for(self, key: str, period: str) -> HistorySeries:
+        periods = self.series.setdefault(key, {})
+        series = periods.get(period)
+        if series is None:
+            series = periods[period] = HistorySeries(period, len(self.fingerprints), self.scaled)
+        return series
+
+    def _add_section(self, row: int, key: str, section: Dict[str, Any]) -> None:
+        for period in self.periods:
+            period_data = section.get(period)
+            if period_data and period_data.get('values'):
+                self._series_for(key, period)._append(row, period_data)
+
+    def nbytes(self) -> int:
+        """Approximate buffer memory held by all series."""
+        return sum(s.nbytes() for periods in self.series.values() for s in periods.values())
+
+    def datapoint_count(self) -> int:
+        """Total number of packed datapoints across all series."""
+        return sum(len(s.values) for periods in self.series.values() for s in periods.values())
+
+
+def build_history_store(document: Optional[Dict[str, Any]], sections: Iterable[str] = (),
+                        nested_sections: Iterable[str] = (), attributes: Iterable[str] = (),
+                        periods: Tuple[str, ...] = HISTORY_PERIODS, scaled: bool = False) -> HistoryStore:
+    """
+    Convert an Onionoo history document into a HistoryStore in one pass.
+
+    Args:
+        document: Onionoo uptime or bandwidth document ({'relays': [...]})
+        sections: Per-relay history sections stored as series keyed by section name
+            (e.g. 'uptime', 'read_history', 'write_history')
+        nested_sections: Per-relay sections of named histories stored as 'section/name'
+            series (e.g. 'flags' -> 'flags/Running'); per-row name order is kept in
+            store.nested_keys[section]
+        attributes: Scalar per-relay fields copied as-is into store.attributes
+        periods: History periods to keep
+        scaled: Also keep per-row sums of ``value * factor`` (needed for averages and
+            totals of factor-scaled series such as bandwidth)
+
+    Returns:
+        HistoryStore: Columnar store (empty if the document has no relays)
+    """
+    relays = (document or {}).get('relays') or []
+    if isinstance(relays, LazyJSONArray) and relays.key_field == 'fingerprint':
+        # Fingerprints were read while streaming; iterating decodes each relay, so only do it once below
+        fingerprints = list(relays.keys)
+    else:
+        fingerprints = [relay.get('fingerprint') for relay in relays]
+    store = HistoryStore(fingerprints, periods, scaled)
+    sections = tuple(sections)
+    nested_sections = tuple(nested_sections)
+    attributes = tuple(attributes)
+    for section in nested_sections:
+        store.nested_keys[section] = [()] * len(relays)
+    for name in attributes:
+        store.attributes[name] = [None] * len(relays)
+
+    for row, relay in enumerate(relays):
+        for name in attributes:
+            store.attributes[name][row] = relay.get(name)
+        for section in sections:
+            section_data = relay.get(section)
+            if section_data:
+                store._add_section(row, section, section_data)
+        for section in nested_sections:
+            nested = relay.get(section)
+            if not nested:
+                continue
+            store.nested_keys[section][row] = tuple(nested)
+            for name, section_data in nested.items():
+                # Register the key on first sight so series order follows the document
+                store.series.setdefault(f"{section}/{name}", {})
+                store._add_section(row, f"{section}/{name}", section_data or {})
+    return store
+
+
+def build_uptime_history_store(uptime_data: Optional[Dict[str, Any]]) -> HistoryStore:
+    """Columnar store for the Onionoo uptime document ('uptime' plus per-flag 'flags/<flag>')."""
+    return build_history_store(uptime_data, sections=('uptime',), nested_sections=('flags',))
+
+
+def build_bandwidth_history_store(bandwidth_data: Optional[Dict[str, Any]]) -> HistoryStore:
+    """Columnar store for the Onionoo bandwidth document (read/write history plus overload fields)."""
+    return build_history_store(
+        bandwidth_data,
+        sections=('read_history', 'write_history'),
+        attributes=('overload_ratelimits', 'overload_fd_exhausted'),
+        scaled=True,
+    )
+
+
+def describe_history_store(store: HistoryStore) -> str:
+    """One-line size summary for progress logging."""
+    return (f"{len(store):,} relays, {store.datapoint_count():,} datapoints in "
+            f"{store.nbytes() / (1024 * 1024):.1f} MB")
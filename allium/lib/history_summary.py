@@ -0,0 +1,129 @@
+"""
+File: history_summary.py
+
+Per-relay history summary table shared by contact page reliability statistics,
+AROI leaderboard scoring and network bandwidth percentiles.
+
+Those consumers look relays up in fingerprint maps built from the raw Onionoo
+uptime/bandwidth documents and re-derive each relay's period average from its
+value list. calculate_operator_reliability() passed no map at all, so every
+contact rebuilt up to fourteen maps over all ~10k history entries. The summary
+is filled once per document from the columnar HistoryStores (history_store.py)
+right after the uptime and bandwidth documents are processed, and holds:
+
+  - per relay and period: average and datapoint count (per-operator mean and
+    std-dev are taken over these averages)
+  - the fingerprint -> bandwidth entry map used for daily series
+  - per operator (relay fingerprints in order) and period: daily bandwidth
+    totals, so leaderboards, percentiles and contact pages share one result
+
+Consumers report what the table saved through count(). Worker processes that
+precompute contact pages send their counters back with each task result
+(take_stats) and the parent adds them up (add_stats).
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+from .history_store import HistoryStore
+
+
+class RelayHistorySummary:
+    """
+    Per-relay uptime/bandwidth period summaries keyed by fingerprint.
+
+    ``uptime`` and ``bandwidth`` map fingerprint -> {period: (average, data_points)}
+    and stay None until their document has been added. Only relays whose period
+    has values (and, for bandwidth, a factor) get an entry, matching the filters of
+    extract_relay_uptime_for_period / extract_relay_bandwidth_for_period.
+    """
+
+    def __init__(self):
+        self.uptime: Optional[Dict[str, Dict[str, Tuple[float, int]]]] = None
+        self.bandwidth: Optional[Dict[str, Dict[str, Tuple[float, int]]]] = None
+        self.bandwidth_map: Optional[Dict[str, Any]] = None
+        self.daily_totals: Dict[Tuple[str, Tuple[str, ...]], Dict[str, Any]] = {}
+        self.scans_avoided = 0  # full-document fingerprint map builds skipped
+        self.series_reused = 0  # per-relay period reductions served from the table
+
+    def add_uptime(self, store: HistoryStore) -> None:
+        """Summarize the 'uptime' series of an uptime HistoryStore."""
+        table: Dict[str, Dict[str, Tuple[float, int]]] = {}
+        for period in store.periods:
+            series = store.get('uptime', period)
+            if series is None:
+                continue
+            percentages, _ = series.uptime_averages()
+            for row, fingerprint in enumerate(store.fingerprints):
+                if fingerprint and series.lengths[row]:
+                    # data_points counts every non-null value, as the per-operator breakdown always did
+                    table.setdefault(fingerprint, {})[period] = (percentages[row], series.present[row])
+        self.uptime = table
+
+    def add_bandwidth(self, store: HistoryStore, bandwidth_data: Dict[str, Any]) -> None:
+        """Summarize the 'read_history' series of a bandwidth HistoryStore."""
+        from .bandwidth_utils import build_bandwidth_map
+
+        table: Dict[str, Dict[str, Tuple[float, int]]] = {}
+        for period in store.periods:
+            series = store.get('read_history', period)
+            if series is None:
+                continue
+            averages = series.scaled_averages()
+            for row, fingerprint in enumerate(store.fingerprints):
+                if fingerprint and series.lengths[row] and series.factors[row]:
+                    table.setdefault(fingerprint, {})[period] = (averages[row], series.present[row])
+        self.bandwidth_map = build_bandwidth_map(bandwidth_data)
+        self.bandwidth = table
+
+    def count(self, scans: int = 0, series: int = 0) -> None:
+        """Record full history scans and per-relay series reductions a consumer skipped."""
+        self.scans_avoided += scans
+        self.series_reused += series
+
+    def stats(self) -> Dict[str, int]:
+        """Counters recorded so far (including those added from worker processes)."""
+        return {'scans_avoided': self.scans_avoided, 'series_reused': self.series_reused}
+
+    def take_stats(self) -> Tuple[int, int]:
+        """Counters since the last call, then reset (worker processes report these to the parent)."""
+        stats = (self.scans_avoided, self.series_reused)
+        self.scans_avoided, self.series_reused = 0, 0
+        return stats
+
+    def add_stats(self, stats: Optional[Tuple[int, int]]) -> None:
+        """Add counters reported by another process (take_stats)."""
+        if stats:
+            scans, series = stats
+            self.count(scans=scans, series=series)
+
+    def describe(self) -> str:
+        """One-line summary for progress logging."""
+        stats = self.stats()
+        return (f"{stats['scans_avoided']:,} full history scans avoided, "
+                f"{stats['series_reused']:,} per-relay period summaries reused")
+
+
+def get_history_summary(relay_set: Any, section: str) -> Optional[RelayHistorySummary]:
+    """
+    The relay set's summary if it holds the given section ('uptime' or 'bandwidth').
+
+    Returns None for relay sets without one (tests, mocks, or a document that
+    was never processed), in which case callers use the raw document.
+    """
+    summary = getattr(relay_set, 'history_summary', None)
+    if isinstance(summary, RelayHistorySummary) and getattr(summary, section) is not None:
+        return summary
+    return None
+
+
+def take_stats(relay_set: Any) -> Optional[Tuple[int, int]]:
+    """take_stats() of relay_set's history summary, or None when it has none."""
+    summary = getattr(relay_set, 'history_summary', None)
+    return summary.take_stats() if isinstance(summary, RelayHistorySummary) else None
+
+
+def add_stats(relay_set: Any, stats: Optional[Tuple[int, int]]) -> None:
+    """Add counters from a worker process to relay_set's history summary."""
+    summary = getattr(relay_set, 'history_summary', None)
+    if isinstance(summary, RelayHistorySummary):
+        summary.add_stats(stats)
@@ -0,0 +1,194 @@
+"""
+File: http_client.py
+
+Shared HTTP connection pool for API workers (Onionoo, CollecTor, AROI validator).
+
+urllib opens a new TCP (and TLS) connection for every urlopen() call and sends
+"Connection: close". A run fetches ~30 descriptor files, 9 votes and several
+bandwidth files from collector.torproject.org plus four documents from
+onionoo.torproject.org, so most of the handshakes are avoidable.
+
+install_http_client() installs a urllib opener whose HTTP/HTTPS handlers keep
+idle connections per (scheme, host) and hand them to the next request for the
+same host. Callers keep using urllib.request.urlopen() with the same timeout,
+header and error semantics. A connection goes back to the pool only once its
+response has been read to the end; responses closed early (total timeout, size
+limit, partial reads) close their connection instead.
+
+Thread-safe: concurrent requests to one host each get their own connection.
+"""
+
+import http.client
+import threading
+import urllib.error
+import urllib.request
+
+# Idle connections kept per (scheme, host); extra ones are closed
+MAX_IDLE_PER_HOST = 4
+
+# Errors that mean a reused keep-alive connection was closed by the server
+# before our request got through (safe to resend on a fresh connection)
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    ConnectionAbortedError,
+    BrokenPipeError,
+)
+
+
+class _PooledResponse(http.client.HTTPResponse):
+    """HTTPResponse that returns its connection to the pool when fully read and closed."""
+
+    _release = None
+
+    def close(self):
+        # http.client drops fp itself once the whole body has been read
+        fully_read = self.fp is None
+        super().close()
+        release, self._release = self._release, None
+        if release is not None:
+            release(fully_read and not self.will_close)
+
+
+class ConnectionPool:
+    """Idle keep-alive connections per (scheme, host) with reuse counters."""
+
+    def __init__(self, max_idle_per_host=MAX_IDLE_PER_HOST):
+        self.max_idle_per_host = max_idle_per_host
+        self._lock = threading.Lock()
+        self._idle = {}   # (scheme, host) -> [HTTPConnection]
+        self._stats = {}  # host -> {'requests', 'opened', 'reused'}
+
+    def acquire(self, key):
+        """Take an idle connection for key, or None if there is none."""
+        with self._lock:
+            idle = self._idle.get(key)
+            return idle.pop() if idle else None
+
+    def release(self, key, conn, reusable):
+        """Return conn to the pool if reusable, otherwise close it."""
+        if reusable and conn.sock is not None:
+            with self._lock:
+                idle = self._idle.setdefault(key, [])
+                if len(idle) < self.max_idle_per_host:
+                    idle.append(conn)
+                    return
+        conn.close()
+
+    def count(self, host, reused):
+        """Record one request sent to host on a new or reused connection."""
+        with self._lock:
+            stats = self._stats.setdefault(host, {'requests': 0, 'opened': 0, 'reused': 0})
+            stats['requests'] += 1
+            stats['reused' if reused else 'opened'] += 1
+
+    def stats(self):
+        """Per-host counters: requests sent, connections opened, requests on reused connections."""
+        with self._lock:
+            return {host: dict(stats) for host, stats in self._stats.items()}
+
+    def close_all(self):
+        """Close every idle connection (e.g. before forking worker processes)."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+_pool = ConnectionPool()
+
+
+class _PooledHandlerMixin:
+    """do_open() replacement for urllib's HTTP(S)Handler that reuses pooled connections."""
+
+    def do_open(self, http_class, req, **http_conn_args):
+        if getattr(req, '_tunnel_host', None):
+            # HTTPS through a proxy: keep urllib's one-shot CONNECT handling
+            return super().do_open(http_class, req, **http_conn_args)
+        if not req.host:
+            raise urllib.error.URLError('no host given')
+
+        key = (req.type, req.host)
+        headers = dict(req.unredirected_hdrs)
+        headers.update({k: v for k, v in req.headers.items() if k not in headers})
+        headers["Connection"] = "keep-alive"
+        headers = {name.title(): value for name, value in headers.items()}
+
+        conn = _pool.acquire(key)
+        while True:
+            reused = conn is not None
+            if conn is None:
+                conn = http_class(req.host, timeout=req.timeout, **http_conn_args)
+                conn.response_class = _PooledResponse
+            else:
+                conn.timeout = req.timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(req.timeout)
+            try:
+                conn.request(req.get_method(), req.selector, req.data, headers,
+                             encode_chunked=req.has_header('Transfer-encoding'))
+                response = conn.getresponse()
+            except _STALE_CONNECTION_ERRORS as err:
+                conn.close()
+                if reused:
+                    # The server closed the idle connection: resend on a new one
+                    conn = None
+                    continue
+                if isinstance(err, OSError):
+                    raise urllib.error.URLError(err)
+                raise
+            except OSError as err:
+                conn.close()
+                raise urllib.error.URLError(err)
+            except BaseException:
+                conn.close()
+                raise
+            break
+
+        _pool.count(req.host, reused)
+        response._release = lambda reusable: _pool.release(key, conn, reusable)
+        response.url = req.get_full_url()
+        response.msg = response.reason
+        return response
+
+
+class PooledHTTPHandler(_PooledHandlerMixin, urllib.request.HTTPHandler):
+    pass
+
+
+class PooledHTTPSHandler(_PooledHandlerMixin, urllib.request.HTTPSHandler):
+    pass
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install_http_client():
+    """Install the pooled opener for urllib.request.urlopen() (idempotent)."""
+    global _installed
+    with _install_lock:
+        if not _installed:
+            urllib.request.install_opener(
+                urllib.request.build_opener(PooledHTTPHandler, PooledHTTPSHandler))
+            _installed = True
+
+
+def get_connection_stats():
+    """Per-host connection reuse counters for this process (see ConnectionPool.stats)."""
+    return _pool.stats()
+
+
+def format_connection_stats(stats):
+    """One-line summary of get_connection_stats() output for progress logs."""
+    return ", ".join(
+        f"{host}: {counts['requests']} requests over {counts['opened']} connections"
+        for host, counts in sorted(stats.items())
+    ) or "no requests"
+
+
+def close_idle_connections():
+    """Close all pooled idle connections."""
+    _pool.close_all()
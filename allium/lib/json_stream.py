@@ -0,0 +1,374 @@
+"""
+File: json_stream.py
+
+Incremental JSON document loading for large Onionoo responses.
+
+Onionoo uptime and bandwidth documents are a single top-level object whose
+``relays`` (and ``bridges``) arrays hold ~10k per-relay history objects. Loading
+them with ``json.loads(response.decode())`` keeps the raw bytes, the decoded str
+and the parsed dict alive at the same time. The helpers here parse the document
+from a file in fixed-size text chunks instead, decoding array-valued keys one
+element at a time, so peak memory is the parsed result plus one read buffer.
+
+Most relays in those documents are only read once (to build the columnar history
+stores, history_store.py), yet the decoded nested dicts would stay alive on the
+Relays instance for the whole run and be inherited by every forked render
+worker. Arrays under ``lazy_keys`` are therefore kept as LazyJSONArray: the JSON
+text of each element, captured while streaming, decoded again only when the
+element is read. Iteration, indexing and ``len()`` work as on the list
+``json.load`` would return, so ``document.get('relays')`` consumers are unchanged.
+
+Only the Python standard library is used (no ijson dependency).
+"""
+
+import json
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+# Read size for each refill of the text buffer (characters, not bytes)
+STREAM_READ_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+# Decoded elements each LazyJSONIndex keeps (lookups by fingerprint repeat for an operator's relays)
+LAZY_INDEX_CACHE_SIZE = 1024
+
+_decode_text = json.JSONDecoder().decode
+
+
+class LazyJSONArray(Sequence):
+    """
+    A JSON array kept as the JSON text of each element, decoded on access.
+
+    Behaves like the list of decoded elements (iteration, indexing, slicing,
+    len(), equality with a list); every access decodes a fresh object, so
+    changes to a returned element are not kept.
+    """
+
+    __hash__ = None
+
+    def __init__(self, raw_items: List[str], keys: Optional[List[Any]] = None,
+                 key_field: Optional[str] = None):
+        """
+        Args:
+            raw_items: JSON text of each element
+            keys: Value of key_field of each element (None where absent), for by_key()
+            key_field: Element field the keys were read from
+        """
+        self._raw_items = raw_items
+        self.keys = keys
+        self.key_field = key_field
+
+    @classmethod
+    def from_items(cls, items: Iterable[Any], key_field: Optional[str] = None) -> 'LazyJSONArray':
+        """Build from already decoded elements (e.g. a document loaded from a JSON cache)."""
+        raw_items = []
+        keys = [] if key_field else None
+        for item in items:
+            raw_items.append(json.dumps(item, separators=(',', ':')))
+            if key_field:
+                keys.append(item.get(key_field) if isinstance(item, dict) else None)
+        return cls(raw_items, keys, key_field)
+
+    def __len__(self) -> int:
+        return len(self._raw_items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_decode_text(text) for text in self._raw_items[index]]
+        return _decode_text(self._raw_items[index])
+
+    def __iter__(self) -> Iterator[Any]:
+        for text in self._raw_items:
+            yield _decode_text(text)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, LazyJSONArray):
+            other = list(other)
+        if not isinstance(other, list):
+            return NotImplemented
+        return len(self) == len(other) and list(self) == other
+
+    def __repr__(self) -> str:
+        return f"<LazyJSONArray of {len(self)} elements, {self.raw_size:,} characters>"
+
+    @property
+    def raw_size(self) -> int:
+        """Total length of the kept JSON text, in characters."""
+        return sum(map(len, self._raw_items))
+
+    def by_key(self) -> 'LazyJSONIndex':
+        """Read-only mapping of key -> decoded element (the last element wins for duplicate keys)."""
+        if self.keys is None:
+            raise ValueError("LazyJSONArray was built without a key field")
+        return LazyJSONIndex(self)
+
+
+class LazyJSONIndex(Mapping):
+    """Mapping of element key (e.g. fingerprint) -> element of a LazyJSONArray, decoded on lookup."""
+
+    def __init__(self, array: LazyJSONArray, cache_size: int = LAZY_INDEX_CACHE_SIZE):
+        self._array = array
+        self._positions = {key: position for position, key in enumerate(array.keys) if key is not None}
+        self._cache: 'OrderedDict[Any, Any]' = OrderedDict()
+        self._cache_size = cache_size
+
+    def __getitem__(self, key):
+        cache = self._cache
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        value = self._array[self._positions[key]]
+        cache[key] = value
+        if len(cache) > self._cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return key in self._positions
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._positions)
+
+
+def lazy_json_document(document: Any, lazy_keys: Iterable[str],
+                       key_field: str = 'fingerprint') -> Any:
+    """
+    Return document with the list values under lazy_keys replaced by LazyJSONArray.
+
+    For documents that were decoded whole (JSON caches); values that already
+    are LazyJSONArray, and anything that is not a dict, are returned unchanged.
+    """
+    if not isinstance(document, dict):
+        return document
+    converted = None
+    for key in lazy_keys:
+        value = document.get(key)
+        if isinstance(value, list):
+            if converted is None:
+                converted = dict(document)
+            converted[key] = LazyJSONArray.from_items(value, key_field)
+    return document if converted is None else converted
+
+
+def json_default(value: Any) -> Any:
+    """``default=`` hook for json.dump: serializes LazyJSONArray as a list."""
+    if isinstance(value, LazyJSONArray):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class _StreamBuffer:
+    """Sliding text window over a file object used by the incremental parser."""
+
+    def __init__(self, fp: TextIO, read_size: int = STREAM_READ_SIZE):
+        self.fp = fp
+        self.read_size = read_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_size: int = 0) -> bool:
+        """Append more text to the buffer, compacting consumed data. Returns False at EOF."""
+        if self.eof:
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        chunk = self.fp.read(max(self.read_size, min_size))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            buf = self.buf
+            pos = self.pos
+            length = len(buf)
+            while pos < length and buf[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < length:
+                return buf[pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, char: str) -> None:
+        """Consume ``char`` (after whitespace) or raise ValueError."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"expected {char!r} at stream offset, found {found!r}")
+        self.pos += 1
+
+    def decode_value(self, decoder: json.JSONDecoder) -> Any:
+        """Decode one complete JSON value, refilling the buffer until it parses."""
+        value, self.pos = self._raw_decode(decoder)
+        return value
+
+    def decode_with_text(self, decoder: json.JSONDecoder) -> Tuple[Any, str]:
+        """Like decode_value(), also returning the JSON text of the value."""
+        value, end = self._raw_decode(decoder)
+        text = self.buf[self.pos:end]
+        self.pos = end
+        return value, text
+
+    def _raw_decode(self, decoder: json.JSONDecoder) -> Tuple[Any, int]:
+        """Decode the value at the current position; returns it and its end offset in buf."""
+        self.peek()
+        grow = self.read_size
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill(grow):
+                    raise
+                grow *= 2
+                continue
+            # A number at the very end of the buffer may have been truncated
+            # mid-token ("12" of "123", "1" of "1.5"); make sure a delimiter follows it.
+            if (not self.eof and isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and all(c in _NUMBER_CHARS for c in self.buf[end:])):
+                if self.fill(grow):
+                    continue
+            return value, end
+
+
+def iter_json_array(fp: TextIO, decoder: Optional[json.JSONDecoder] = None,
+                    read_size: int = STREAM_READ_SIZE) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    Args:
+        fp: Text-mode file object positioned at the start of the array
+        decoder: Optional JSONDecoder to reuse
+        read_size: Characters to read per buffer refill
+
+    Yields:
+        Each decoded array element
+    """
+    stream = _StreamBuffer(fp, read_size)
+    yield from _iter_array(stream, decoder or json.JSONDecoder())
+
+
+def _iter_array(stream: _StreamBuffer, decoder: json.JSONDecoder, with_text: bool = False) -> Iterator[Any]:
+    """Yield array elements (or (element, JSON text) pairs) from the stream; the opening '[' must be next."""
+    decode = stream.decode_with_text if with_text else stream.decode_value
+    stream.expect('[')
+    if stream.peek() == ']':
+        stream.pos += 1
+        return
+    while True:
+        yield decode(decoder)
+        sep = stream.peek()
+        stream.pos += 1
+        if sep == ']':
+            return
+        if sep != ',':
+            raise ValueError(f"expected ',' or ']' in array, found {sep!r}")
+
+
+def load_json_document(fp: TextIO, stream_keys: Iterable[str] = ('relays', 'bridges'),
+                       on_item: Optional[Callable[[str, Any], None]] = None,
+                       read_size: int = STREAM_READ_SIZE, lazy_keys: Iterable[str] = (),
+                       lazy_key_field: str = 'fingerprint') -> Dict[str, Any]:
+    """
+    Incrementally parse a top-level JSON object from a file.
+
+    Array values under ``stream_keys`` are decoded element by element (one
+    relay at a time for Onionoo documents); every other value is decoded whole.
+    The result is equal to ``json.load(fp)``, except that arrays under
+    ``lazy_keys`` (a subset of ``stream_keys``) are LazyJSONArray.
+
+    Args:
+        fp: Text-mode file object containing a JSON object
+        stream_keys: Top-level keys whose array values are parsed incrementally
+        on_item: Optional callback invoked as ``on_item(key, element)`` for each streamed element
+        read_size: Characters to read per buffer refill
+        lazy_keys: Streamed keys whose elements are kept as JSON text (LazyJSONArray)
+        lazy_key_field: Element field LazyJSONArray.by_key() indexes
+
+    Returns:
+        dict: The parsed document
+
+    Raises:
+        ValueError: If the document is not a well-formed JSON object
+            (json.JSONDecodeError is a ValueError subclass)
+    """
+    decoder = json.JSONDecoder()
+    stream = _StreamBuffer(fp, read_size)
+    stream_keys = set(stream_keys)
+    lazy_keys = set(lazy_keys)
+    document = {}
+
+    stream.expect('{')
+    if stream.peek() == '}':
+        stream.pos += 1
+        return document
+
+    while True:
+        key = stream.decode_value(decoder)
+        if not isinstance(key, str):
+            raise ValueError("object keys must be strings")
+        stream.expect(':')
+        if key in stream_keys and key in lazy_keys and stream.peek() == '[':
+            raw_items = []
+            keys = []
+            for item, text in _iter_array(stream, decoder, with_text=True):
+                if on_item is not None:
+                    on_item(key, item)
+                raw_items.append(text)
+                keys.append(item.get(lazy_key_field) if isinstance(item, dict) else None)
+            document[key] = LazyJSONArray(raw_items, keys, lazy_key_field)
+        elif key in stream_keys and stream.peek() == '[':
+            items = []
+            append = items.append
+            for item in _iter_array(stream, decoder):
+                if on_item is not None:
+                    on_item(key, item)
+                append(item)
+            document[key] = items
+        else:
+            document[key] = stream.decode_value(decoder)
+
+        sep = stream.peek()
+        stream.pos += 1
+        if sep == '}':
+            break
+        if sep != ',':
+            raise ValueError(f"expected ',' or '}}' in object, found {sep!r}")
+
+    if stream.peek() != '':
+        raise ValueError("extra data after JSON document")
+    return document
+
+
+def load_json_file(path: str, stream_keys: Iterable[str] = ('relays', 'bridges'),
+                   encoding: str = 'utf-8', lazy_keys: Iterable[str] = ()) -> Tuple[Dict[str, Any], int]:
+    """
+    Incrementally parse a JSON object file and report how many elements were streamed.
+
+    Args:
+        path: Path to the JSON file
+        stream_keys: Top-level keys whose arrays are parsed element by element
+        encoding: Text encoding of the file
+        lazy_keys: Streamed keys kept as LazyJSONArray (see load_json_document)
+
+    Returns:
+        tuple: (parsed document, number of streamed array elements)
+    """
+    counter = [0]
+
+    def _count(_key, _item):
+        counter[0] += 1
+
+    with open(path, 'r', encoding=encoding) as fp:
+        document = load_json_document(fp, stream_keys=stream_keys, on_item=_count, lazy_keys=lazy_keys)
+    return document, counter[0]
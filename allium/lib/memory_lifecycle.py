@@ -0,0 +1,122 @@
+"""
+File: memory_lifecycle.py
+
+Releases the raw API documents once processing has distilled them.
+
+Relays keeps every secondary API document it was enriched with (uptime,
+bandwidth, CollecTor votes and relay index, descriptors, AROI validation).
+After the contact and family pages are precomputed nothing reads most of it:
+the per-relay results are stored on the relays and page data, and the few
+fields templates still read are small (publication timestamps, per-authority
+vote counts, flag thresholds). Every forked render worker would inherit the
+rest, and its pages get copied as reference counts change.
+
+release_api_payloads() replaces each document with the part pages read, and
+collect_and_freeze() then collects the freed containers, hands freed heap
+pages back to the OS where the C library allows it, and moves everything
+still alive into the permanent GC generation so forked workers do not touch
+(and copy) it during collections.
+"""
+
+import ctypes
+import ctypes.util
+import gc
+from typing import Any, Dict, List, Optional
+
+_SCALARS = (str, int, float, bool)
+
+# Collector document fields read by page rendering (directory authorities page)
+COLLECTOR_KEPT_FIELDS = ('fetched_at', 'flag_thresholds', 'bw_authorities', 'consensus_method_info',
+                         'ipv6_testing_authorities')
+
+
+def document_header(document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The scalar top-level fields of a document (e.g. Onionoo 'relays_published'), without its lists and dicts."""
+    if not isinstance(document, dict):
+        return document
+    return {key: value for key, value in document.items() if value is None or isinstance(value, _SCALARS)}
+
+
+def distill_collector_consensus(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Collector consensus data without the per-relay index and vote contents.
+
+    Each vote keeps its scalar fields plus 'relay_count' (the number of relays
+    it listed), which is what the directory authorities page shows.
+    """
+    if not isinstance(data, dict):
+        return data
+    distilled = document_header(data)
+    for key in COLLECTOR_KEPT_FIELDS:
+        if key in data:
+            distilled[key] = data[key]
+    votes = {}
+    for authority, vote in (data.get('votes') or {}).items():
+        if isinstance(vote, dict):
+            summary = document_header(vote)
+            summary['relay_count'] = vote.get('relay_count', len(vote.get('relays', {})))
+            votes[authority] = summary
+    distilled['votes'] = votes
+    return distilled
+
+
+def release_api_payloads(relay_set) -> List[str]:
+    """
+    Replace the raw API documents on relay_set with what page rendering reads.
+
+    Only call this once the contact and family pages are precomputed (or the
+    contact page data deferred to rendering, see Relays.fuse_contact_pages). The AROI
+    validation results are kept unless the validation map built from them
+    (network health) is there to answer contact status lookups.
+
+    Returns:
+        list: Names of the attributes that were released
+    """
+    released = []
+
+    def replace(name, distilled):
+        if getattr(relay_set, name, None) is not None:
+            setattr(relay_set, name, distilled)
+            released.append(name)
+
+    for name in ('uptime_data', 'bandwidth_data', 'collector_descriptors_data'):
+        replace(name, document_header(getattr(relay_set, name, None)))
+    replace('collector_consensus_data', distill_collector_consensus(getattr(relay_set, 'collector_consensus_data', None)))
+    validation_data = getattr(relay_set, 'aroi_validation_data', None)
+    if isinstance(validation_data, dict) and getattr(relay_set, 'validation_map', None) is not None:
+        replace('aroi_validation_data', {key: value for key, value in validation_data.items() if key != 'results'})
+
+    # Per-relay bandwidth entries were only needed to precompute operator reliability
+    # (which the contact page render workers still do when it was deferred to them)
+    summary = getattr(relay_set, 'history_summary', None)
+    if summary is not None and summary.bandwidth_map and not getattr(relay_set, 'contact_pages_deferred', False):
+        summary.bandwidth_map = {}
+        released.append('history_summary.bandwidth_map')
+    return released
+
+
+def _malloc_trim() -> None:
+    """Return free heap memory to the OS (glibc only; a no-op elsewhere)."""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6')
+        libc.malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def collect_and_freeze(freeze: bool = True) -> int:
+    """
+    Run a full collection, trim the heap and freeze the surviving objects.
+
+    Args:
+        freeze: Move survivors to the permanent generation (only worth it when
+                worker processes will be forked; frozen cycles are never collected)
+
+    Returns:
+        int: Number of unreachable objects collected
+    """
+    collected = gc.collect()
+    _malloc_trim()
+    if freeze:
+        gc.freeze()
+    return collected
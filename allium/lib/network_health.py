@@ -417,8 +417,11 @@ def calculate_network_health_metrics(relay_set):
     # This eliminates duplicate deduplication loops for better performance
     health_metrics['families_count'] = relay_set.json.get('family_statistics', {}).get('unique_families_count', 0)
     
-    # AROI operators - reuse existing calculation
-    if hasattr(relay_set, 'json') and 'aroi_leaderboards' in relay_set.json:
+    # AROI operators - reuse existing calculation (the operator count stage needs only
+    # details data, so health does not have to wait for the leaderboards)
+    if 'aroi_operator_count' in relay_set.json:
+        health_metrics['aroi_operators_count'] = relay_set.json['aroi_operator_count']
+    elif hasattr(relay_set, 'json') and 'aroi_leaderboards' in relay_set.json:
         aroi_summary = relay_set.json['aroi_leaderboards'].get('summary', {})
         health_metrics['aroi_operators_count'] = aroi_summary.get('total_operators', 0)
     else:
@@ -109,6 +109,8 @@ def calculate_operator_reliability(contact_hash, operator_relays, relay_set):
     
     Uses shared uptime utilities to avoid code duplication with aroileaders.py.
     Uses cached network percentiles for efficiency (calculated once in _reprocess_uptime_data).
+    Per-relay period averages and operator daily totals come from the relay set's
+    RelayHistorySummary when it has one (see history_summary.py).
     
     NEW: Also calculates bandwidth reliability metrics using shared bandwidth utilities.
     
@@ -131,6 +133,9 @@ def calculate_operator_reliability(contact_hash, operator_relays, relay_set):
         find_operator_percentile_position
     )
     from .bandwidth_utils import extract_relay_bandwidth_for_period, extract_operator_daily_bandwidth_totals
+    from .history_summary import get_history_summary
+    uptime_summary = get_history_summary(relay_set, 'uptime')
+    bandwidth_summary = get_history_summary(relay_set, 'bandwidth')
     
     # Available time periods from Onionoo APIs
     uptime_periods = ['1_month', '3_months', '6_months', '1_year', '5_years']
@@ -174,9 +179,12 @@ def calculate_operator_reliability(contact_hash, operator_relays, relay_set):
     all_relay_data = {}
     
     if uptime_data:
+        if uptime_summary is not None:
+            # Without the summary each period's extraction rebuilt the fingerprint map
+            uptime_summary.count(scans=len(uptime_periods))
         for period in uptime_periods:
             # Extract uptime data for this period using shared utility
-            period_result = extract_relay_uptime_for_period(operator_relays, uptime_data, period)
+            period_result = extract_relay_uptime_for_period(operator_relays, uptime_data, period, summary=uptime_summary)
         
             if period_result['uptime_values']:
                 mean_uptime = statistics.mean(period_result['uptime_values'])
@@ -230,9 +238,13 @@ def calculate_operator_reliability(contact_hash, operator_relays, relay_set):
         # Historical outliers (1y, 5y) are not actionable for current operations
         bandwidth_outlier_periods = ['6_months']  # Only current/recent outliers are actionable
         
+        if bandwidth_summary is not None:
+            # Per-relay extraction and daily totals each rebuilt the fingerprint map per period
+            bandwidth_summary.count(scans=2 * len(bandwidth_periods))
+        
         for period in bandwidth_periods:
             # Extract individual relay bandwidth data for this period
-            period_result = extract_relay_bandwidth_for_period(operator_relays, bandwidth_data, period)
+            period_result = extract_relay_bandwidth_for_period(operator_relays, bandwidth_data, period, summary=bandwidth_summary)
             
             if period_result['bandwidth_values']:
                 mean_bandwidth = statistics.mean(period_result['bandwidth_values'])
@@ -254,7 +266,7 @@ def calculate_operator_reliability(contact_hash, operator_relays, relay_set):
                 from .bandwidth_utils import calculate_bandwidth_reliability_metrics
                 advanced_metrics = calculate_bandwidth_reliability_metrics(
                     operator_relays, bandwidth_data, period, mean_bandwidth, std_dev, 
-                    bandwidth_formatter=relay_set.bandwidth_formatter
+                    bandwidth_formatter=relay_set.bandwidth_formatter, summary=bandwidth_summary
                 )
                 
                 # Add advanced metrics to the period data
@@ -343,7 +355,7 @@ def calculate_operator_reliability(contact_hash, operator_relays, relay_set):
         
         # Calculate daily total bandwidth averages for this operator using existing logic
         for period in bandwidth_periods:
-            daily_totals_result = extract_operator_daily_bandwidth_totals(operator_relays, bandwidth_data, period)
+            daily_totals_result = extract_operator_daily_bandwidth_totals(operator_relays, bandwidth_data, period, summary=bandwidth_summary)
             if daily_totals_result['daily_totals']:
                 avg_daily_total = daily_totals_result['average_daily_total']
                 
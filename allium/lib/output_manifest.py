@@ -0,0 +1,174 @@
+"""
+File: output_manifest.py
+
+Incremental output support for site generation.
+
+An OutputManifest remembers a content hash for every generated page (path
+relative to the output directory -> hash) in ``<output_dir>/.allium-manifest.json``.
+On the next run with ``--incremental`` a page is only rewritten when its rendered
+content hashes differently (or the file is missing), and pages that were written
+last run but not this run (relays, families, contacts... that disappeared) are
+removed. Unchanged files keep their mtime, so rsync/CDN uploads only transfer
+what actually changed.
+
+Every page embeds the generation timestamp, so volatile strings (the run's
+timestamp) are blanked out before hashing; a page whose only change is that
+timestamp is left as it is and keeps the time it last really changed.
+
+Worker processes cannot update the parent's manifest, so the write path is
+split in two: write_if_changed() writes (or skips) a file and returns a record,
+and record() stores that record in the parent process.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Iterable, Optional, Tuple
+
+from .precompress import remove_siblings
+
+MANIFEST_FILENAME = '.allium-manifest.json'
+MANIFEST_VERSION = 1
+
+# (relative path, content hash, whether the file was written)
+WriteRecord = Tuple[str, str, bool]
+
+
+def content_hash(content: str, volatile: Iterable[str] = ()) -> str:
+    """Hash rendered page content (blake2b, 128-bit hex digest), ignoring volatile strings."""
+    for text in volatile:
+        content = content.replace(text, '')
+    return hashlib.blake2b(content.encode('utf8'), digest_size=16).hexdigest()
+
+
+class OutputManifest:
+    """Content-hash manifest of the generated site, used to write only changed pages."""
+
+    def __init__(self, output_dir: str, previous: Optional[Dict[str, str]] = None,
+                 volatile: Iterable[str] = ()):
+        """
+        Args:
+            output_dir: Site output directory (paths are stored relative to it)
+            previous: Hashes recorded by the previous run (None if there was none)
+            volatile: Strings that change every run (e.g. the generation timestamp)
+                      and are ignored when comparing content
+        """
+        self.output_dir = os.path.abspath(output_dir)
+        self.volatile = tuple(text for text in volatile if text)
+        self.has_previous = previous is not None
+        self.previous = previous or {}
+        self.current: Dict[str, str] = {}
+        self.written = 0
+        self.unchanged = 0
+        self.removed = 0
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.output_dir, MANIFEST_FILENAME)
+
+    @classmethod
+    def load(cls, output_dir: str, volatile: Iterable[str] = ()) -> 'OutputManifest':
+        """
+        Load the manifest left by the previous run.
+
+        A missing, unreadable or differently-versioned manifest yields an empty
+        one (has_previous=False), so the run regenerates the whole tree.
+        """
+        previous = None
+        try:
+            with open(os.path.join(output_dir, MANIFEST_FILENAME), 'r', encoding='utf8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION and isinstance(data.get('files'), dict):
+                previous = data['files']
+        except (OSError, ValueError, AttributeError):
+            pass
+        return cls(output_dir, previous, volatile)
+
+    @staticmethod
+    def discard(output_dir: str) -> None:
+        """Delete a stale manifest (a full run rewrote the tree without recording hashes)."""
+        try:
+            os.remove(os.path.join(output_dir, MANIFEST_FILENAME))
+        except FileNotFoundError:
+            pass
+
+    def relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.output_dir).replace(os.sep, '/')
+
+    def write_if_changed(self, path: str, content: str) -> WriteRecord:
+        """
+        Write content to path unless the previous run wrote identical content there.
+
+        Safe to call from worker processes: it only reads the previous hashes.
+        Pass the returned record to record() in the parent process.
+        """
+        relative_path = self.relative(path)
+        digest = content_hash(content, self.volatile)
+        if self.previous.get(relative_path) == digest and os.path.isfile(path):
+            return relative_path, digest, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf8') as f:
+            f.write(content)
+        return relative_path, digest, True
+
+    def record(self, record: WriteRecord) -> None:
+        """Store the result of write_if_changed() for this run."""
+        relative_path, digest, written = record
+        self.current[relative_path] = digest
+        if written:
+            self.written += 1
+        else:
+            self.unchanged += 1
+
+    def merge(self, current: Dict[str, str], written: int, unchanged: int) -> None:
+        """Add the records of pages another process wrote for this run (see page_scheduler.py)."""
+        self.current.update(current)
+        self.written += written
+        self.unchanged += unchanged
+
+    def write(self, path: str, content: str) -> bool:
+        """Write (if changed) and record a page; returns True if the file was written."""
+        record = self.write_if_changed(path, content)
+        self.record(record)
+        return record[2]
+
+    def remove_stale(self) -> int:
+        """
+        Delete pages written by the previous run but not by this one.
+
+        Their .gz/.br siblings (--precompress) and directories left empty are
+        removed too. Only paths listed in the previous manifest are ever deleted.
+
+        Returns:
+            int: Number of files removed
+        """
+        for relative_path in self.previous.keys() - self.current.keys():
+            path = os.path.join(self.output_dir, relative_path)
+            if not os.path.abspath(path).startswith(self.output_dir + os.sep):
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            remove_siblings(path)
+            self.removed += 1
+            directory = os.path.dirname(path)
+            while directory != self.output_dir:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = os.path.dirname(directory)
+        return self.removed
+
+    def save(self) -> None:
+        """Atomically write this run's hashes for the next incremental run."""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': self.current}, f,
+                      separators=(',', ':'), sort_keys=True)
+        os.replace(temp_path, self.path)
+
+    def summary(self) -> str:
+        return (f"{self.written} written, {self.unchanged} unchanged, {self.removed} removed "
+                f"({len(self.current)} pages tracked)")
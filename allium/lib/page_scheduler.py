@@ -0,0 +1,158 @@
+"""
+File: page_scheduler.py
+
+Early page rendering: start writing page types while relay processing continues.
+
+Page types declare the Relays processing stages they read (see
+site_generator.EARLY_PAGE_DEPENDENCIES). EarlyPageRenderer watches the relay
+set's processing pipeline and, as soon as every input of a group of page types
+is final, forks a child process that renders them while the parent carries on
+with the remaining stages (AROI leaderboards, CollecTor evaluation,
+contact/family page precomputation). fork() snapshots the relay set, so the
+child renders exactly the data the pages depend on.
+
+fork() copies only the calling thread: a lock held by another thread at that
+moment stays locked in the child forever. While the coordinator's API workers
+still download, the renderer is held (hold()); page types whose inputs settle
+meanwhile are queued and forked by release(), once the worker threads are joined.
+
+generate_site() calls collect() before writing detail pages: page types
+rendered early are skipped there, and any whose child failed are rendered again
+in the normal loop. With --incremental the child sends its manifest records back
+to the parent, which merges them before saving the manifest.
+"""
+
+import functools
+import multiprocessing as mp
+import time
+
+from . import precompress, row_fragments
+
+
+def _render_page_types(relay_set, keys, conn):
+    """Child process: render each page type, then report the result to the parent."""
+    start_time = time.time()
+    try:
+        manifest = relay_set.output_manifest
+        if manifest is not None:
+            # Report only this child's pages (the parent keeps its own records)
+            manifest.current, manifest.written, manifest.unchanged = {}, 0, 0
+        row_fragments.take_stats(relay_set)
+        precompress.take_stats(relay_set)
+        for key in keys:
+            relay_set.write_pages_by_key(key)
+        records = None if manifest is None else (manifest.current, manifest.written, manifest.unchanged)
+        conn.send({'keys': list(keys), 'manifest': records, 'row_fragments': row_fragments.take_stats(relay_set),
+                   'precompress': precompress.take_stats(relay_set), 'seconds': time.time() - start_time})
+    except Exception as e:
+        conn.send({'keys': [], 'error': f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+
+class EarlyPageRenderer:
+    """Renders page types in forked processes as soon as their pipeline inputs are final."""
+
+    def __init__(self, dependencies, progress_logger, prepare=None):
+        """
+        Args:
+            dependencies: {page key: processing stages/sources the page type reads}
+            progress_logger: ProgressLogger shared with the site generator
+            prepare: Optional callable(relay_set) run before the first fork
+                     (e.g. loading the --incremental output manifest)
+        """
+        self.dependencies = dependencies
+        self.progress_logger = progress_logger
+        self.prepare = prepare
+        self.jobs = []  # (keys, process, connection)
+        self.held = None  # (relay_set, keys) queued while held, None when forking is safe
+
+    @staticmethod
+    def available(mp_workers):
+        """Early rendering needs worker processes (--workers > 0) and fork()."""
+        return mp_workers > 0 and 'fork' in mp.get_all_start_methods()
+
+    def attach(self, relay_set):
+        """
+        Watch relay_set's processing pipeline (call before enrichment starts).
+
+        Page types with the same inputs are rendered by one child process.
+        """
+        if self.prepare is not None:
+            self.prepare(relay_set)
+        groups = {}
+        for key, inputs in self.dependencies.items():
+            groups.setdefault(tuple(inputs), []).append(key)
+        for inputs, keys in groups.items():
+            relay_set.pipeline.when_settled(inputs, functools.partial(self._schedule, relay_set, keys))
+
+    def hold(self):
+        """Queue early renders instead of forking while other threads run (call before attach())."""
+        if self.held is None:
+            self.held = []
+
+    def release(self):
+        """Start the renders queued by hold(); later ones fork right away."""
+        held, self.held = self.held, None
+        for relay_set, keys in held or ():
+            self._start(relay_set, keys)
+
+    def _schedule(self, relay_set, keys):
+        if self.held is not None:
+            self.held.append((relay_set, keys))
+        else:
+            self._start(relay_set, keys)
+
+    def _start(self, relay_set, keys):
+        try:
+            ctx = mp.get_context('fork')
+            receiver, sender = ctx.Pipe(duplex=False)
+            process = ctx.Process(target=_render_page_types, args=(relay_set, keys, sender),
+                                  name=f"EarlyPages-{'-'.join(keys)}")
+            process.start()
+            sender.close()
+        except Exception as e:
+            # Not fatal: these page types are rendered in the normal generation loop
+            self.progress_logger.log_without_increment(f"Early page rendering unavailable ({e})")
+            return
+        self.jobs.append((keys, process, receiver))
+        self.progress_logger.log_without_increment(
+            f"Inputs final for {', '.join(keys)} pages - rendering them while processing continues")
+
+    def collect(self, relay_set):
+        """
+        Wait for the early renders and merge their results.
+
+        Returns:
+            set: Page keys written by early renders (to be skipped by the caller)
+        """
+        # Renders still held (fetching never completed) are left to the normal loop
+        self.held = None
+        rendered = set()
+        for keys, process, conn in self.jobs:
+            try:
+                result = conn.recv()
+            except (EOFError, OSError):
+                result = None
+            process.join()
+            conn.close()
+            if result is None:
+                result = {'keys': [], 'error': f"process exited with code {process.exitcode}"}
+            if result.get('error'):
+                self.progress_logger.log_without_increment(
+                    f"Early rendering of {', '.join(keys)} pages failed ({result['error']}), rendering them now")
+                continue
+            manifest = getattr(relay_set, 'output_manifest', None)
+            if manifest is not None and result['manifest'] is not None:
+                manifest.merge(*result['manifest'])
+            row_fragments.add_stats(relay_set, result.get('row_fragments'))
+            precompress.add_stats(relay_set, result.get('precompress'))
+            # The child logged one progress step per page type in its own copy of the logger
+            for _ in result['keys']:
+                self.progress_logger.increment_step()
+            rendered.update(result['keys'])
+            self.progress_logger.log_without_increment(
+                f"Early-rendered {', '.join(result['keys'])} pages in {result['seconds']:.2f}s "
+                f"(overlapped with relay processing)")
+        self.jobs = []
+        return rendered
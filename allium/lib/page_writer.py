@@ -11,6 +11,7 @@ import functools
 import multiprocessing as mp
 import os
 import time
+from contextlib import contextmanager
 from shutil import rmtree
 
 from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
@@ -24,26 +25,41 @@ from .bandwidth_formatter import (
     determine_unit_filter,
     format_bandwidth_filter,
 )
+from . import history_summary, precompress, render_profiler, row_fragments
+from .compiled_templates import TEMPLATES_DIR, template_loader
 from .intelligence_engine import IntelligenceEngine
+from .render_shards import in_shard
+from .stylesheet import load_stylesheet
 from .time_utils import format_time_ago, format_timestamp, format_timestamp_ago
+from .worker_pool import WorkerPool
 
 ABS_PATH = os.path.dirname(os.path.abspath(__file__))
 
 
 
 # Template bytecode cache directory for improved rendering performance
-TEMPLATE_CACHE_DIR = os.path.join(os.path.dirname(ABS_PATH), ".jinja2_cache")
-os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+# (override with ALLIUM_TEMPLATE_CACHE_DIR, "" disables)
+TEMPLATE_CACHE_DIR = os.environ.get(
+    'ALLIUM_TEMPLATE_CACHE_DIR', os.path.join(os.path.dirname(ABS_PATH), ".jinja2_cache"))
+try:
+    if TEMPLATE_CACHE_DIR:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+except OSError:
+    TEMPLATE_CACHE_DIR = ""  # read-only package directory: compile in memory
 
 ENV = Environment(
-    loader=FileSystemLoader(os.path.join(ABS_PATH, "../templates")),
+    loader=FileSystemLoader(TEMPLATES_DIR),
     trim_blocks=True,
     lstrip_blocks=True,
     autoescape=True,  # Enable autoescape to prevent XSS vulnerabilities
-    bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),  # Cache compiled templates
+    bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR) if TEMPLATE_CACHE_DIR else None,
     auto_reload=False,  # Disable for production performance
 )
 
+# Templates built by `allium.py compile-templates` load as Python modules; edited
+# ones fall back to source until the next build (see compiled_templates.py)
+ENV.loader = template_loader(ENV)
+
 # Jinja2 filter functions now imported from bandwidth_formatter.py
 
 # Add custom filters to the Jinja2 environment
@@ -53,10 +69,17 @@ ENV.filters['format_bandwidth'] = format_bandwidth_filter
 ENV.filters['format_time_ago'] = format_time_ago
 ENV.filters['split'] = lambda s, sep='/': s.split(sep) if s else []
 
+# Relay listing rows (relay-list.html), reused across pages by the relay set's RowFragmentCache
+ENV.globals['relay_row'] = row_fragments.relay_row
+
 # Overload section filters for millisecond timestamps (Onionoo overload fields)
 ENV.filters['format_timestamp'] = format_timestamp
 ENV.filters['format_timestamp_ago'] = format_timestamp_ago
 
+# Hashed site stylesheet referenced by skeleton.html (site_generator replaces it
+# before rendering when critical CSS is inlined)
+ENV.globals['stylesheet'] = load_stylesheet()
+
 # ============================================================================
 # HELPER: Partition effective_family by family-cert status
 # ============================================================================
@@ -100,46 +123,172 @@ def _get_family_support_counts(k, contact_display_data, i):
     return {}
 
 
+# ============================================================================
+# HELPER: Page output (plain writes, or incremental via the output manifest)
+# ============================================================================
+
+def _write_rendered(relay_set, html_path, rendered):
+    """Write a rendered page; with --incremental, skip it if unchanged since the last run.
+
+    With --precompress its .gz/.br siblings are written too (see precompress.py).
+
+    Safe to call in worker processes. Returns the manifest write record that the
+    parent must pass to OutputManifest.record(), or None when not incremental.
+    """
+    manifest = getattr(relay_set, 'output_manifest', None)
+    if manifest is None:
+        with open(html_path, "w", encoding="utf8") as html:
+            html.write(rendered)
+        record = None
+    else:
+        record = manifest.write_if_changed(html_path, rendered)
+    written = record is None or record[2]
+    compressor = getattr(relay_set, 'page_compressor', None)
+    if compressor is not None:
+        compressor.write(html_path, rendered, changed=written)
+    elif written:
+        # Siblings of an earlier --precompress run would no longer match the page
+        precompress.remove_siblings(html_path)
+    return record
+
+
+def _write_page(relay_set, html_path, rendered):
+    """Write a rendered page from the parent process, recording it in the manifest."""
+    record = _write_rendered(relay_set, html_path, rendered)
+    if record is not None:
+        relay_set.output_manifest.record(record)
+
+
+def _keeps_previous_output(relay_set):
+    """True when an incremental run or a render shard should update the output tree in place."""
+    if getattr(relay_set, 'page_shard', None) is not None:
+        # Other shards write their pages into the same directories
+        return True
+    manifest = getattr(relay_set, 'output_manifest', None)
+    return manifest is not None and manifest.has_previous
+
+
+def _reset_output_dir(relay_set, output_path):
+    """Remove and recreate an output directory (with retry for lingering file handles).
+
+    Incremental runs keep the existing tree: unchanged pages are left alone and
+    pages that disappeared are pruned via the manifest at the end of the run.
+    """
+    if _keeps_previous_output(relay_set):
+        os.makedirs(output_path, exist_ok=True)
+        return
+    for retry in range(3):
+        try:
+            if os.path.exists(output_path):
+                rmtree(output_path)
+            os.makedirs(output_path)
+            break
+        except OSError:
+            if retry < 2:
+                time.sleep(0.1)  # Brief pause before retry
+
+
+# Countries displayed with a leading "the" (e.g. "the Netherlands")
+THE_PREFIXED_COUNTRIES = [
+    "Dominican Republic", "Ivory Coast", "Marshall Islands",
+    "Northern Marianas Islands", "Solomon Islands", "United Arab Emirates",
+    "United Kingdom", "United States", "United States of America",
+    "Vatican City", "Czech Republic", "Bahamas", "Gambia", "Netherlands",
+    "Philippines", "Seychelles", "Sudan", "Ukraine",
+]
+
+
 # Multiprocessing globals (initialized via fork for copy-on-write memory sharing)
 _mp_relay_set = None
-_mp_template = None
-_mp_page_type = None
-_mp_the_prefixed = None
-_mp_validated_aroi_domains = None
+_mp_relay_info_setup = None  # relay-info page lookups, built on a worker's first relay page
 
 
-def _init_mp_worker(relay_set, template, page_type=None, the_prefixed=None, validated_aroi_domains=None):
-    """Initialize worker with shared data via fork"""
-    global _mp_relay_set, _mp_template, _mp_page_type, _mp_the_prefixed, _mp_validated_aroi_domains
+def _init_render_worker(relay_set):
+    """Initialize a render pool worker with the shared relay set via fork"""
+    global _mp_relay_set, _mp_relay_info_setup
     _mp_relay_set = relay_set
-    _mp_template = template
-    _mp_page_type = page_type
-    _mp_the_prefixed = the_prefixed if the_prefixed is not None else []
-    _mp_validated_aroi_domains = validated_aroi_domains if validated_aroi_domains is not None else set()
+    _mp_relay_info_setup = None
+    # Rows inherited from the parent are reused; counts start from zero (reported per task)
+    _worker_stats(relay_set)
+    history_summary.take_stats(relay_set)
+
+
+def create_render_pool(relay_set):
+    """
+    The worker pool generate_site() shares across page types (see worker_pool.py).
+
+    Returns None when worker processes are disabled (--workers 0) or fork() is
+    unavailable; each batch then falls back to sequential rendering.
+    """
+    if relay_set.mp_workers <= 0 or 'fork' not in mp.get_all_start_methods():
+        return None
+    return WorkerPool(relay_set.mp_workers, _init_render_worker, (relay_set,), log=relay_set._log_progress)
+
+
+@contextmanager
+def _render_pool(relay_set):
+    """
+    The worker pool for one batch of pages: relay_set.render_pool when generate_site()
+    shares one across page types, otherwise a pool for this batch alone.
+
+    A failed batch stops the workers; a shared pool forks new ones for the next batch.
+    """
+    shared = getattr(relay_set, 'render_pool', None)
+    if shared is None:
+        with WorkerPool(relay_set.mp_workers, _init_render_worker, (relay_set,),
+                        log=relay_set._log_progress) as pool:
+            yield pool
+        return
+    try:
+        yield shared
+    except Exception:
+        shared.terminate()
+        raise
 
 
 def _render_page_mp(args):
     """Render single page in worker process.
     
-    OPTIMIZED: Now receives only (html_path, value) and builds template args
-    using forked memory. This avoids serializing large relay_subset data
+    OPTIMIZED: Receives only (page type, html_path, value) and builds template
+    args using forked memory. This avoids serializing large relay_subset data
     through IPC, reducing overhead from ~300KB/page to ~100 bytes/page.
+    Returns the manifest write record and the worker's counters (_worker_stats).
     """
-    html_path, value = args
+    page_type, html_path, value = args
+    page = render_profiler.start_page(page_type)
     
     # Get page data from forked memory (no IPC serialization needed)
-    page_data = _mp_relay_set.json["sorted"][_mp_page_type][value]
+    page_data = _mp_relay_set.json["sorted"][page_type][value]
     
     # Build template args in worker (uses forked memory)
     template_args = _mp_relay_set._build_template_args(
-        _mp_page_type, value, page_data, _mp_the_prefixed, _mp_validated_aroi_domains
+        page_type, value, page_data, THE_PREFIXED_COUNTRIES,
+        getattr(_mp_relay_set, 'validated_aroi_domains', set())
     )
     
-    # Render and write
-    rendered = _mp_template.render(relays=_mp_relay_set, **template_args)
-    with open(html_path, "w", encoding="utf8") as f:
-        f.write(rendered)
-    return True
+    page.lap('context')
+    
+    # Render and write (templates are loaded once per worker by the Jinja environment)
+    rendered = ENV.get_template(page_type + ".html").render(relays=_mp_relay_set, **template_args)
+    page.lap('render')
+    record = _write_rendered(_mp_relay_set, html_path, rendered)
+    page.finish(html_path, rendered)
+    return record, _worker_stats(_mp_relay_set)
+
+
+def _worker_stats(relay_set):
+    """Counters a worker reports with each page task result: row fragments and page compression."""
+    return row_fragments.take_stats(relay_set), precompress.take_stats(relay_set)
+
+
+def _task_records(relay_set, results):
+    """Manifest write records of (record, worker counters) page task results; the counters are added up."""
+    records = []
+    for record, (row_stats, compression_stats) in results:
+        records.append(record)
+        row_fragments.add_stats(relay_set, row_stats)
+        precompress.add_stats(relay_set, compression_stats)
+    return records
 
 
 # =============================================================================
@@ -177,6 +326,8 @@ def _init_precompute_worker(relay_set):
     """Initialize precompute worker with shared relay_set via fork"""
     global _precompute_relay_set
     _precompute_relay_set = relay_set
+    # History summary counts start from zero (reported per task)
+    history_summary.take_stats(relay_set)
 
 
 def _compute_contact_predata(relay_set, contact_hash, aroi_validation_timestamp, validated_aroi_domains):
@@ -232,15 +383,75 @@ def _precompute_contact_worker(args):
     """Precompute data for a single contact in worker process.
     
     Thin wrapper around _compute_contact_predata using forked global relay_set.
+    Also returns the worker's history summary counters (added up by the parent).
     """
     contact_hash, aroi_validation_timestamp, validated_aroi_domains = args
     
     try:
         result = _compute_contact_predata(
             _precompute_relay_set, contact_hash, aroi_validation_timestamp, validated_aroi_domains)
-        return (contact_hash, result)
     except Exception as e:
-        return (contact_hash, None)
+        result = None
+    return (contact_hash, result, history_summary.take_stats(_precompute_relay_set))
+
+
+# Contact page data read by pages other than the contact's own (relay pages, vanity
+# URLs); all that a fused contact page task sends back to the parent
+CONTACT_SHARED_FIELDS = ('contact_validation_status', 'aroi_validation_timestamp', 'is_validated_aroi',
+                         'precomputed_bandwidth_unit', 'aroi_domain')
+
+
+def _shared_contact_fields(precomputed):
+    """The part of _compute_contact_predata() output other pages read."""
+    shared = {key: precomputed[key] for key in CONTACT_SHARED_FIELDS}
+    # Relay pages read only the uptime outliers (tooltip) of the display data
+    shared['contact_display_data'] = {'outliers': (precomputed['contact_display_data'] or {}).get('outliers')}
+    return shared
+
+
+def _render_contact_mp(args):
+    """Compute a contact's page data and render its page in one worker task (--fuse-contact-pages).
+
+    Rankings, reliability and display data stay in the worker; only the
+    shared fields (_shared_contact_fields) and the history summary counters
+    return with the page task result.
+    """
+    page_type, html_path, contact_hash = args
+    precomputed = _compute_contact_predata(
+        _mp_relay_set, contact_hash, _mp_relay_set._aroi_validation_timestamp,
+        getattr(_mp_relay_set, 'validated_aroi_domains', set()))
+    if precomputed:
+        _mp_relay_set.json["sorted"][page_type][contact_hash].update(precomputed)
+    result = _render_page_mp(args)
+    shared = _shared_contact_fields(precomputed) if precomputed else None
+    return result, contact_hash, shared, history_summary.take_stats(_mp_relay_set)
+
+
+def _end_contact_deferral(relay_set):
+    """Every contact's page data is in the parent now: drop what only computing it read."""
+    relay_set.contact_pages_deferred = False
+    # Operator reliability was the last reader of the per-relay bandwidth entries (see memory_lifecycle.py)
+    relay_set.history_summary.bandwidth_map = {}
+    render_pool = getattr(relay_set, 'render_pool', None)
+    if render_pool is not None:
+        # Workers forked before this would render relay pages without the contact data
+        render_pool.close()
+
+
+def settle_deferred_contact_data(relay_set):
+    """
+    Precompute contact page data deferred to fused contact page rendering
+    (Relays.fuse_contact_pages) where the contact pages cannot render that way:
+    sequentially, in a shard (relay pages read every contact), or after the
+    parallel batch failed. No-op unless the data was deferred.
+    """
+    if not getattr(relay_set, 'contact_pages_deferred', False):
+        return
+    render_pool = getattr(relay_set, 'render_pool', None)
+    if render_pool is not None:
+        render_pool.close()
+    relay_set._precompute_all_contact_page_data(allow_fusing=False)
+    _end_contact_deferral(relay_set)
 
 
 def _compute_family_predata(relay_set, family_hash):
@@ -304,29 +515,80 @@ def create_output_dir(relay_set):
     """
     os.makedirs(relay_set.output_dir, exist_ok=True)
 
-def write_misc(
-    relay_set,
-    template,
-    path,
-    page_ctx=None,
-    sorted_by=None,
-    reverse=True,
-    is_index=False,
-):
+
+# Misc listing templates that tabulate one json["sorted"] category ordered by sorted_by
+MISC_GROUP_CATEGORIES = {
+    "misc-families.html": "family",
+    "misc-networks.html": "as",
+    "misc-contacts.html": "contact",
+    "misc-countries.html": "country",
+    "misc-platforms.html": "platform",
+}
+
+
+def _sort_field_getter(sorted_by):
+    """Item getter for a Jinja sort attribute path such as "1.bandwidth" (item[1]['bandwidth'])."""
+    fields = [int(field) if field.isdigit() else field for field in sorted_by.split('.')]
+
+    def get(item):
+        for field in fields:
+            item = item.get(field) if isinstance(item, dict) else item[field]
+        # Jinja's sort filter compares strings case-insensitively by default. The
+        # 1-tuple mirrors its list keys: groups that all lack the field (e.g.
+        # bandwidth_mean outside contacts) compare equal and keep their order
+        return (item.lower() if isinstance(item, str) else item,)
+    return get
+
+
+def sorted_group_items(relay_set, category, sorted_by, reverse=True):
     """
-    Render and write unsorted HTML listings to disk
-    
-    Optimizes misc-families pages by pre-computing complex family statistics in Python
-    instead of expensive Jinja2 template loops with deduplication logic.
+    Return json["sorted"][category] as (key, group) pairs ordered by sorted_by.
 
-    Args:
-        template:    jinja template name
-        path:        path to generate HTML document
-        path_prefix: path to prefix other docs/includes
-        sorted_by:   key to sort by, used in family and networks pages
-        reverse:     passed to sort() function in family and networks pages
-        is_index:    whether document is main index listing, limits list to 500
+    Same order as the templates' former items()|sort(attribute=sorted_by, reverse=reverse),
+    computed once per (category, sorted_by, reverse) and cached on the relay set, so the
+    18 sorted-by variants of each misc listing share a handful of sorts instead of
+    sorting thousands of groups inside Jinja on every page.
     """
+    cache_key = (category, sorted_by, reverse)
+    ordered = relay_set._group_orders.get(cache_key)
+    if ordered is None:
+        groups = relay_set.json["sorted"].get(category, {})
+        ordered = tuple(sorted(groups.items(), key=_sort_field_getter(sorted_by), reverse=reverse))
+        relay_set._group_orders[cache_key] = ordered
+    return ordered
+
+
+def _add_contact_validation_status(relay_set):
+    """Store AROI validation status on each contact group (read by misc-contacts and contact pages)."""
+    for contact_hash, contact_data in relay_set.json["sorted"].get("contact", {}).items():
+        # Only calculate if not already stored
+        if "aroi_validation_status" not in contact_data:
+            relay_indices = contact_data.get("relays", [])
+            members = [relay_set.json["relays"][idx] for idx in relay_indices]
+            validation_status = relay_set._get_contact_validation_status(members)
+            contact_data["aroi_validation_status"] = validation_status["validation_status"]
+            # Store full validation status for operator pages to reuse
+            contact_data["aroi_validation_full"] = validation_status
+
+
+def set_authorities_attributes(relay_set):
+    """Store the directory authority data on relay_set (read as relays.X by misc-authorities and relay pages)."""
+    # Reuse existing authority uptime data from consolidated processing
+    authorities_data = get_directory_authorities_data(relay_set)
+    relay_set.authorities_data = authorities_data['authorities_data']
+    relay_set.authorities_summary = authorities_data['authorities_summary']
+    relay_set.consensus_status = authorities_data.get('consensus_status')
+    relay_set.latency_summary = authorities_data.get('latency_summary')
+    relay_set.authority_alerts = authorities_data.get('authority_alerts')
+    relay_set.collector_flag_thresholds = authorities_data.get('collector_flag_thresholds')
+    relay_set.collector_fetched_at = authorities_data.get('collector_fetched_at')
+    relay_set.consensus_method_info = authorities_data.get('consensus_method_info')
+    return authorities_data
+
+
+def _render_misc(relay_set, template, path, page_ctx=None, sorted_by=None, reverse=True, is_index=False):
+    """Render a misc page; returns (output file path, rendered HTML, page timer)."""
+    page = render_profiler.start_page(template.rsplit(".", 1)[0])
     template = ENV.get_template(template)
     # relay_subset passed directly to template for thread safety
     relay_subset = relay_set.json["relays"]
@@ -338,15 +600,7 @@ def write_misc(
     # Add AROI validation status to contact data for misc-contacts templates
     # This runs before write_pages_by_key, so we calculate once and store for reuse
     if template.name == "misc-contacts.html":
-        for contact_hash, contact_data in relay_set.json["sorted"].get("contact", {}).items():
-            # Only calculate if not already stored
-            if "aroi_validation_status" not in contact_data:
-                relay_indices = contact_data.get("relays", [])
-                members = [relay_set.json["relays"][idx] for idx in relay_indices]
-                validation_status = relay_set._get_contact_validation_status(members)
-                contact_data["aroi_validation_status"] = validation_status["validation_status"]
-                # Store full validation status for operator pages to reuse
-                contact_data["aroi_validation_full"] = validation_status
+        _add_contact_validation_status(relay_set)
     
     # Pre-compute family statistics for misc-families templates
     template_vars = {
@@ -360,6 +614,11 @@ def write_misc(
         "base_url": relay_set.base_url,
     }
     
+    # Group tables are pre-ordered in Python (see sorted_group_items)
+    if template.name in MISC_GROUP_CATEGORIES and sorted_by:
+        template_vars["sorted_groups"] = sorted_group_items(
+            relay_set, MISC_GROUP_CATEGORIES[template.name], sorted_by, reverse)
+    
     if template.name == "misc-families.html":
         family_stats = relay_set.json.get('family_statistics', {
             'centralization_percentage': '0.0',
@@ -368,25 +627,88 @@ def write_misc(
         })
         template_vars.update(family_stats)
     elif template.name == "misc-authorities.html":
-        # Reuse existing authority uptime data from consolidated processing
-        authorities_data = get_directory_authorities_data(relay_set)
-        # Set attributes as expected by template (template uses relays.X)
-        relay_set.authorities_data = authorities_data['authorities_data']
-        relay_set.authorities_summary = authorities_data['authorities_summary']
-        relay_set.consensus_status = authorities_data.get('consensus_status')
-        relay_set.latency_summary = authorities_data.get('latency_summary')
-        relay_set.authority_alerts = authorities_data.get('authority_alerts')
-        relay_set.collector_flag_thresholds = authorities_data.get('collector_flag_thresholds')
-        relay_set.collector_fetched_at = authorities_data.get('collector_fetched_at')
-        relay_set.consensus_method_info = authorities_data.get('consensus_method_info')
-        template_vars.update(authorities_data)
+        template_vars.update(set_authorities_attributes(relay_set))
     
+    page.lap('context')
     template_render = template.render(**template_vars)
+    page.lap('render')
     output = os.path.join(relay_set.output_dir, path)
     os.makedirs(os.path.dirname(output), exist_ok=True)
+    return output, template_render, page
+
+
+def write_misc(
+    relay_set,
+    template,
+    path,
+    page_ctx=None,
+    sorted_by=None,
+    reverse=True,
+    is_index=False,
+):
+    """
+    Render and write unsorted HTML listings to disk
+    
+    Optimizes misc-families pages by pre-computing complex family statistics in Python
+    instead of expensive Jinja2 template loops with deduplication logic.
+
+    Args:
+        template:    jinja template name
+        path:        path to generate HTML document
+        path_prefix: path to prefix other docs/includes
+        sorted_by:   key to sort by, used in family and networks pages
+        reverse:     sort direction for family and networks pages
+        is_index:    whether document is main index listing, limits list to 500
+    """
+    output, template_render, page = _render_misc(relay_set, template, path, page_ctx=page_ctx,
+                                                 sorted_by=sorted_by, reverse=reverse, is_index=is_index)
+    _write_page(relay_set, output, template_render)
+    page.finish(output, template_render)
+
+
+def _render_misc_mp(page_args):
+    """Render one misc page in a worker; only its write_misc() arguments cross IPC."""
+    output, template_render, page = _render_misc(_mp_relay_set, **page_args)
+    record = _write_rendered(_mp_relay_set, output, template_render)
+    page.finish(output, template_render)
+    return record, _worker_stats(_mp_relay_set)
+
+
+def write_misc_pages(relay_set, pages):
+    """
+    Render and write a batch of misc listing pages (e.g. the sorted-by variants).
+
+    Pages are rendered in a fork()-based worker pool when --workers > 0; otherwise
+    (or if the pool fails) one after another. Group orderings and contact validation
+    status are computed in the parent first, so workers forked after this share them.
+
+    Args:
+        pages: list of dicts of write_misc() keyword arguments
+               (template, path, and optionally page_ctx, sorted_by, reverse, is_index)
+    """
+    templates = {page["template"] for page in pages}
+    if "misc-contacts.html" in templates:
+        _add_contact_validation_status(relay_set)
+    for page in pages:
+        if page["template"] in MISC_GROUP_CATEGORIES and page.get("sorted_by"):
+            sorted_group_items(relay_set, MISC_GROUP_CATEGORIES[page["template"]],
+                               page["sorted_by"], page.get("reverse", True))
+
+    if relay_set.mp_workers > 0 and len(pages) > 1 and hasattr(mp, 'get_context'):
+        try:
+            with _render_pool(relay_set) as pool:
+                records = _task_records(relay_set, pool.map(_render_misc_mp, pages))
+                pool.log_worker_memory("misc pages")
+            if getattr(relay_set, 'output_manifest', None) is not None:
+                for record in records:
+                    relay_set.output_manifest.record(record)
+            return
+        except Exception as e:
+            relay_set._log_progress(f"Multiprocessing failed ({e}), falling back to sequential...")
+
+    for page in pages:
+        write_misc(relay_set, **page)
 
-    with open(output, "w", encoding="utf8") as html:
-        html.write(template_render)
 
 def get_directory_authorities_data(relay_set):
     """
@@ -416,7 +738,9 @@ def get_directory_authorities_data(relay_set):
         votes_by_prefix = {}  # fingerprint[:8].upper() -> (vote_data, relay_count)
         
         for vote_key, vote_data in votes.items():
-            relay_count = len(vote_data.get('relays', {})) if isinstance(vote_data, dict) else 0
+            # Released collector data keeps only the count (memory_lifecycle.distill_collector_consensus)
+            relay_count = (vote_data.get('relay_count', len(vote_data.get('relays', {})))
+                           if isinstance(vote_data, dict) else 0)
             vote_tuple = (vote_data, relay_count)
             
             vote_key_upper = vote_key.upper()
@@ -642,6 +966,12 @@ def get_directory_authorities_data(relay_set):
 
 
 
+def _detail_page_dir(k, v):
+    """Directory name of the k detail page for value v (sanitized against directory traversal)."""
+    v = v.replace("..", "").replace("/", "_")
+    return v.lower() if k == "flag" else v
+
+
 def get_detail_page_context(relay_set, category, value):
     """Generate page context with correct breadcrumb data for detail pages"""
     # Use centralized page context generation
@@ -655,35 +985,34 @@ def write_pages_by_key(relay_set, k):
     
     template = ENV.get_template(k + ".html")
     output_path = os.path.join(relay_set.output_dir, k)
+    the_prefixed = THE_PREFIXED_COUNTRIES
 
-    the_prefixed = [
-        "Dominican Republic", "Ivory Coast", "Marshall Islands",
-        "Northern Marianas Islands", "Solomon Islands", "United Arab Emirates",
-        "United Kingdom", "United States", "United States of America",
-        "Vatican City", "Czech Republic", "Bahamas", "Gambia", "Netherlands",
-        "Philippines", "Seychelles", "Sudan", "Ukraine",
-    ]
-
-    if os.path.exists(output_path):
-        rmtree(output_path)
-    os.makedirs(output_path)
+    _reset_output_dir(relay_set, output_path)
 
     sorted_values = sorted(relay_set.json["sorted"][k].keys()) if k == "first_seen" else list(relay_set.json["sorted"][k].keys())
+    shard = getattr(relay_set, 'page_shard', None)
+    if shard is not None:
+        # Vanity URL pages are written by the shard of their contact page
+        sorted_values = [v for v in sorted_values if in_shard(shard, f"{k}/{_detail_page_dir(k, v)}/index.html")]
     
     # Use multiprocessing for large page sets on systems with fork()
     # Contact pages now use precomputed data so they can be parallelized too
     use_mp = (relay_set.mp_workers > 0 and len(sorted_values) >= 100 and 
               hasattr(mp, 'get_context'))
+    if k == "contact" and (not use_mp or shard is not None):
+        settle_deferred_contact_data(relay_set)
     
     if use_mp:
-        write_pages_parallel(relay_set, k, sorted_values, template, output_path, the_prefixed, start_time)
+        write_pages_parallel(relay_set, k, sorted_values, output_path, start_time)
         return
     
     page_count = render_time = io_time = 0
+    stored_display_data = False
     
     for v in sorted_values:
         # Sanitize the value to prevent directory traversal attacks
         v = v.replace("..", "").replace("/", "_")
+        page = render_profiler.start_page(k)
         i = relay_set.json["sorted"][k][v]
         members = []
 
@@ -723,7 +1052,13 @@ def write_pages_by_key(relay_set, k):
         primary_country_data = None
         contact_validation_status = None
         aroi_validation_timestamp = None
-        if k == "contact":
+        if k == "contact" and "contact_rankings" in i:
+            # Precomputed by the contact_pages stage (the raw history documents may be released since)
+            contact_rankings = i["contact_rankings"]
+            operator_reliability = i.get("operator_reliability")
+            contact_display_data = i["contact_display_data"]
+            primary_country_data = i.get("primary_country_data")
+        elif k == "contact":
             contact_rankings = relay_set._generate_contact_rankings(v)
             # Calculate operator reliability statistics
             operator_reliability = relay_set._calculate_operator_reliability(v, members)
@@ -733,6 +1068,7 @@ def write_pages_by_key(relay_set, k):
             )
             # Store contact_display_data in the contact structure for relay pages to access
             i['contact_display_data'] = contact_display_data
+            stored_display_data = True
             # Get primary country data for this contact
             primary_country_data = i.get("primary_country_data")
         
@@ -761,6 +1097,7 @@ def write_pages_by_key(relay_set, k):
         # Family support counts for summary bullet (DRY helper)
         family_support_counts = _get_family_support_counts(k, contact_display_data, i)
         
+        page.lap('context')
         # Time the template rendering
         render_start = time.time()
         rendered = template.render(
@@ -826,13 +1163,14 @@ def write_pages_by_key(relay_set, k):
             family_support_counts=family_support_counts
         )
         render_time += time.time() - render_start
+        page.lap('render')
 
         # Time the file I/O
         io_start = time.time()
         html_path = os.path.join(dir_path, "index.html")
-        with open(html_path, "w", encoding="utf8") as html:
-            html.write(rendered)
+        _write_page(relay_set, html_path, rendered)
         io_time += time.time() - io_start
+        page.finish(html_path, rendered)
         
         # Create vanity URL for validated AROI domains (copy and adjust paths)
         # Only create if base_url is configured - Place at root level (e.g., /domain/ instead of /contact/domain/)
@@ -852,8 +1190,7 @@ def write_pages_by_key(relay_set, k):
                     # Adjust path prefix from depth 2 to depth 1
                     adjusted_html = html_content.replace('href="../../', 'href="../').replace('src="../../', 'src="../')
                     # Write adjusted HTML to vanity URL directory
-                    with open(os.path.join(vanity_dir, "index.html"), 'w', encoding='utf8') as f:
-                        f.write(adjusted_html)
+                    _write_page(relay_set, os.path.join(vanity_dir, "index.html"), adjusted_html)
                 except OSError:
                     pass  # Silent fail - don't break generation for vanity URL issues
         
@@ -863,6 +1200,11 @@ def write_pages_by_key(relay_set, k):
         if page_count % 1000 == 0:
             relay_set._log_progress(f"Processed {page_count} {k} pages...")
 
+    render_pool = getattr(relay_set, 'render_pool', None)
+    if stored_display_data and render_pool is not None:
+        # Workers forked before this would render relay pages without the new display data
+        render_pool.close()
+
     end_time = time.time()
     total_time = end_time - start_time
     
@@ -970,42 +1312,59 @@ def build_template_args(relay_set, k, v, i, the_prefixed, validated_aroi_domains
         'family_support_counts': family_support_counts,
     }
 
-def write_pages_parallel(relay_set, k, sorted_values, template, output_path, the_prefixed, start_time):
+def write_pages_parallel(relay_set, k, sorted_values, output_path, start_time):
     """Parallel page generation using fork() for significant speedup on large page sets.
     
-    OPTIMIZED: Now passes only (html_path, value) to workers instead of full template args.
-    Workers build template args from forked memory, avoiding ~300KB/page IPC serialization.
-    This dramatically improves performance for large page sets like families (105+ members avg).
+    OPTIMIZED: Now passes only (page type, html_path, value) to workers instead of full
+    template args. Workers build template args from forked memory, avoiding ~300KB/page
+    IPC serialization. This dramatically improves performance for large page sets like
+    families (105+ members avg).
+    
+    Contact pages whose data was deferred (--fuse-contact-pages) are computed and
+    rendered by the same task (_render_contact_mp); the parent stores the shared
+    fields each task returns.
     """
-    validated_aroi_domains = getattr(relay_set, 'validated_aroi_domains', set())
     page_args = []
-    vanity_url_tasks = []  # Collect vanity URL tasks for post-processing
+    fused = k == "contact" and getattr(relay_set, 'contact_pages_deferred', False)
     
     for v in sorted_values:
         v = v.replace("..", "").replace("/", "_")
-        i = relay_set.json["sorted"][k][v]
         dir_path = os.path.join(output_path, v.lower() if k == "flag" else v)
         os.makedirs(dir_path, exist_ok=True)
         html_path = os.path.join(dir_path, "index.html")
-        # OPTIMIZED: Pass only (html_path, value) - workers build template args from forked memory
-        page_args.append((html_path, v))
-        
-        # Collect vanity URL tasks for contact pages (to be processed after parallel generation)
-        # Uses precomputed aroi_domain to avoid re-fetching members
-        if k == "contact" and relay_set.base_url and i.get("is_validated_aroi"):
-            aroi_domain = i.get("aroi_domain")
-            if aroi_domain and aroi_domain != "none":
-                vanity_url_tasks.append((html_path, aroi_domain, output_path))
+        # OPTIMIZED: Pass only (page type, html_path, value) - workers build template args from forked memory
+        page_args.append((k, html_path, v))
     
-    pool = None
     try:
-        ctx = mp.get_context('fork')
-        # Initialize workers with page_type and shared data for building template args
-        pool = ctx.Pool(relay_set.mp_workers, _init_mp_worker, 
-                       (relay_set, template, k, the_prefixed, validated_aroi_domains))
-        pool.map(_render_page_mp, page_args)
-        pool.close()
-        pool.join()
+        with _render_pool(relay_set) as pool:
+            if fused:
+                fused_results = pool.map(_render_contact_mp, page_args)
+                results = [result for result, _, _, _ in fused_results]
+            else:
+                results = pool.map(_render_page_mp, page_args)
+            pool.log_worker_memory(f"{k} pages")
+        records = _task_records(relay_set, results)
+        if fused:
+            contacts = relay_set.json["sorted"][k]
+            for _, contact_hash, shared, summary_stats in fused_results:
+                if shared:
+                    contacts[contact_hash].update(shared)
+                history_summary.add_stats(relay_set, summary_stats)
+            _end_contact_deferral(relay_set)
+            relay_set._log_progress(f"Computed and rendered {len(results)} contact pages in one worker pass")
+        if getattr(relay_set, 'output_manifest', None) is not None:
+            for record in records:
+                relay_set.output_manifest.record(record)
+        
+        # Collect vanity URL tasks for contact pages (after parallel generation, which may store is_validated_aroi)
+        # Uses precomputed aroi_domain to avoid re-fetching members
+        vanity_url_tasks = []
+        if k == "contact" and relay_set.base_url:
+            for _, html_path, v in page_args:
+                i = relay_set.json["sorted"][k][v]
+                aroi_domain = i.get("aroi_domain")
+                if i.get("is_validated_aroi") and aroi_domain and aroi_domain != "none":
+                    vanity_url_tasks.append((html_path, aroi_domain, output_path))
         
         # Post-process vanity URLs for contact pages (after parallel generation)
         if vanity_url_tasks:
@@ -1017,8 +1376,7 @@ def write_pages_parallel(relay_set, k, sorted_values, template, output_path, the
                     with open(html_path, 'r', encoding='utf8') as f:
                         html_content = f.read()
                     adjusted_html = html_content.replace('href="../../', 'href="../').replace('src="../../', 'src="../')
-                    with open(os.path.join(vanity_dir, "index.html"), 'w', encoding='utf8') as f:
-                        f.write(adjusted_html)
+                    _write_page(relay_set, os.path.join(vanity_dir, "index.html"), adjusted_html)
                 except OSError:
                     pass  # Silent fail for vanity URL issues
         
@@ -1027,96 +1385,171 @@ def write_pages_parallel(relay_set, k, sorted_values, template, output_path, the
         if relay_set.progress:
             print(f"    🚀 Parallel: {relay_set.mp_workers} workers, {total_time/len(page_args)*1000:.1f}ms/page avg")
     except Exception as e:
-        # Ensure pool is properly terminated before fallback
-        if pool is not None:
-            try:
-                pool.terminate()
-                pool.join()
-            except Exception:
-                pass  # Ignore cleanup errors
-        
         relay_set._log_progress(f"Multiprocessing failed ({e}), falling back to sequential...")
         relay_set.mp_workers = 0
         
-        # Clean up partial output before sequential fallback (with retry for lingering file handles)
-        for retry in range(3):
-            try:
-                if os.path.exists(output_path):
-                    rmtree(output_path)
-                os.makedirs(output_path)
-                break
-            except OSError:
-                if retry < 2:
-                    time.sleep(0.1)  # Brief pause before retry
+        # Clean up partial output before sequential fallback
+        _reset_output_dir(relay_set, output_path)
         
         write_pages_by_key(relay_set, k)
 
+def _relay_info_setup(relay_set):
+    """Collect the lookups shared by every relay-info page (computed once per run)."""
+    from .page_context import StandardTemplateContexts
+    return {
+        'standard_contexts': StandardTemplateContexts(relay_set),
+        # Safely get contact map - avoiding 3-level .get() in loop
+        'contact_map': relay_set.json.get("sorted", {}).get("contact", {}),
+        'validated_aroi_domains': getattr(relay_set, 'validated_aroi_domains', set()),
+        'aroi_validation_timestamp': relay_set._aroi_validation_timestamp,
+        'base_url': relay_set.base_url,
+        # Pre-fetch family cert data for partitioned family display (O(1) per member)
+        'family_cert_fps': getattr(relay_set, '_family_cert_fps_cache', set()),
+        'fp_to_family_key': getattr(relay_set, '_fp_to_family_key', {}),
+        'family_key_to_fps': getattr(relay_set, '_family_key_to_fps', {}),
+    }
+
+
+def _write_relay_info_page(relay_set, template, relay, setup, output_path):
+    """Render and write one relay/FINGERPRINT/index.html page.
+
+    Shared by the sequential and parallel paths so both produce identical bytes.
+
+    Returns:
+        tuple: (render_seconds, io_seconds, manifest write record or None)
+    """
+    page = render_profiler.start_page('relay')
+    render_start = time.perf_counter()
+
+    # Optimization: Fast direct lookup for contact data
+    contact_hash = relay.get('contact_md5')
+    contact_display_data = {}
+    contact_validation_status = None
+
+    contact_map = setup['contact_map']
+    if contact_hash and contact_hash in contact_map:
+        contact_data = contact_map[contact_hash]
+        contact_display_data = contact_data.get('contact_display_data', {})
+        contact_validation_status = contact_data.get('contact_validation_status')
+
+    page_ctx = setup['standard_contexts'].get_relay_page_context(relay, contact_display_data)
+
+    # Partition family lists by family-cert status for template display
+    _partition_family_lists(relay, setup['family_cert_fps'], setup['fp_to_family_key'],
+                            setup['family_key_to_fps'])
+    page.lap('context')
+
+    rendered = template.render(
+        relay=relay, page_ctx=page_ctx, relays=relay_set, contact_display_data=contact_display_data,
+        contact_validation_status=contact_validation_status,
+        aroi_validation_timestamp=setup['aroi_validation_timestamp'],
+        validated_aroi_domains=setup['validated_aroi_domains'],
+        base_url=setup['base_url']
+    )
+    page.lap('render')
+    io_start = time.perf_counter()
+
+    # Create directory structure: relay/FINGERPRINT/index.html (depth 2)
+    relay_dir = os.path.join(output_path, relay["fingerprint"])
+    os.makedirs(relay_dir, exist_ok=True)
+
+    html_path = os.path.join(relay_dir, "index.html")
+    record = _write_rendered(relay_set, html_path, rendered)
+    io_end = time.perf_counter()
+    page.finish(html_path, rendered)
+    return io_start - render_start, io_end - io_start, record
+
+
+def _render_relay_info_mp(index):
+    """Render one relay-info page in a worker; only the relay index crosses IPC.
+
+    Returns the page timings and the worker's page compression counters.
+    """
+    global _mp_relay_info_setup
+    if _mp_relay_info_setup is None:
+        # Same lookups the parent builds, from the relay set this worker was forked with
+        _mp_relay_info_setup = _relay_info_setup(_mp_relay_set)
+    relay = _mp_relay_set.json["relays"][index]
+    timing = _write_relay_info_page(_mp_relay_set, ENV.get_template("relay-info.html"), relay,
+                                    _mp_relay_info_setup, os.path.join(_mp_relay_set.output_dir, "relay"))
+    return timing, precompress.take_stats(_mp_relay_set)
+
+
+def _record_relay_info_writes(relay_set, timings):
+    """Record relay-info page writes in the output manifest (incremental runs only)."""
+    manifest = getattr(relay_set, 'output_manifest', None)
+    if manifest is not None:
+        for timing in timings:
+            manifest.record(timing[2])
+
+
+def _log_relay_info_stats(relay_set, timings, total_time, workers=0):
+    """Log relay-info completion with per-page render/I/O timing (avg, p95, max)."""
+    page_count = len(timings)
+    mode = f"{workers} workers" if workers else "sequential"
+    relay_set._log_progress(
+        f"relay page generation complete - Generated {page_count} pages in {total_time:.2f}s ({mode})")
+    if not relay_set.progress or not page_count:
+        return
+    render_times = sorted(t[0] for t in timings)
+    io_times = sorted(t[1] for t in timings)
+    p95_index = min(page_count - 1, int(page_count * 0.95))
+    print(f"    🎨 Template render per page: avg {sum(render_times)/page_count*1000:.1f}ms, "
+          f"p95 {render_times[p95_index]*1000:.1f}ms, max {render_times[-1]*1000:.1f}ms")
+    print(f"    💾 File I/O per page: avg {sum(io_times)/page_count*1000:.1f}ms, "
+          f"p95 {io_times[p95_index]*1000:.1f}ms, max {io_times[-1]*1000:.1f}ms")
+    print(f"    ⚡ Wall time per page: {total_time/page_count*1000:.1f}ms")
+    print("---")
+
+
 def write_relay_info(relay_set):
     """
     Render and write per-relay HTML info documents to disk
+
+    Pages are rendered in a fork()-based worker pool when --workers > 0 and there
+    are enough relays; otherwise (or if the pool fails) they are rendered in a
+    sequential loop. Both paths share _write_relay_info_page, so output is identical.
     """
+    start_time = time.time()
     relay_list = relay_set.json["relays"]
     template = ENV.get_template("relay-info.html")
     output_path = os.path.join(relay_set.output_dir, "relay")
 
-    if os.path.exists(output_path):
-        rmtree(output_path)
-    os.makedirs(output_path)
+    _reset_output_dir(relay_set, output_path)
+    # Relay pages read contact data (when no contact pages were rendered to compute it)
+    settle_deferred_contact_data(relay_set)
 
     # Optimization: Move imports and setup outside the loop (10k+ iterations)
-    from .page_context import StandardTemplateContexts
-    standard_contexts = StandardTemplateContexts(relay_set)
-    
-    # Optimization: Pre-fetch collections for fast lookup
-    # Safely get contact map - avoiding 3-level .get() in loop
-    contact_map = relay_set.json.get("sorted", {}).get("contact", {})
-    
-    # Optimization: Cache frequently-accessed properties before 10K relay loop
-    validated_aroi_domains = getattr(relay_set, 'validated_aroi_domains', set())
-    aroi_validation_timestamp = relay_set._aroi_validation_timestamp
-    base_url = relay_set.base_url
-    # Pre-fetch family cert data for partitioned family display (O(1) per member)
-    family_cert_fps = getattr(relay_set, '_family_cert_fps_cache', set())
-    fp_to_family_key = getattr(relay_set, '_fp_to_family_key', {})
-    family_key_to_fps = getattr(relay_set, '_family_key_to_fps', {})
-
-    for relay in relay_list:
-        if not relay["fingerprint"].isalnum():
-            continue
-        
-        # Optimization: Fast direct lookup for contact data
-        contact_hash = relay.get('contact_md5')
-        contact_display_data = {}
-        contact_validation_status = None
-        
-        if contact_hash and contact_hash in contact_map:
-            contact_data = contact_map[contact_hash]
-            contact_display_data = contact_data.get('contact_display_data', {})
-            contact_validation_status = contact_data.get('contact_validation_status')
-        
-        full_context = standard_contexts.get_relay_page_context(relay, contact_display_data)
-        page_ctx = full_context
-        
-        # Partition family lists by family-cert status for template display
-        _partition_family_lists(relay, family_cert_fps, fp_to_family_key, family_key_to_fps)
-        
-        rendered = template.render(
-            relay=relay, page_ctx=page_ctx, relays=relay_set, contact_display_data=contact_display_data,
-            contact_validation_status=contact_validation_status,
-            aroi_validation_timestamp=aroi_validation_timestamp,
-            validated_aroi_domains=validated_aroi_domains,
-            base_url=base_url
-        )
-        
-        # Create directory structure: relay/FINGERPRINT/index.html (depth 2)
-        relay_dir = os.path.join(output_path, relay["fingerprint"])
-        os.makedirs(relay_dir, exist_ok=True)
-        
-        with open(
-            os.path.join(relay_dir, "index.html"),
-            "w",
-            encoding="utf8",
-        ) as html:
-            html.write(rendered)
+    setup = _relay_info_setup(relay_set)
+    shard = getattr(relay_set, 'page_shard', None)
+    indices = [index for index, relay in enumerate(relay_list) if relay["fingerprint"].isalnum()
+               and in_shard(shard, f"relay/{relay['fingerprint']}/index.html")]
 
+    use_mp = (relay_set.mp_workers > 0 and len(indices) >= 100 and
+              hasattr(mp, 'get_context'))
 
+    if use_mp:
+        try:
+            # Chunked dispatch balances load without per-page IPC round trips
+            chunk_size = max(50, len(indices) // (relay_set.mp_workers * 4))
+            with _render_pool(relay_set) as pool:
+                timings = []
+                for timing, compression_stats in pool.imap_unordered(_render_relay_info_mp, indices,
+                                                                     chunksize=chunk_size):
+                    timings.append(timing)
+                    precompress.add_stats(relay_set, compression_stats)
+                pool.log_worker_memory("relay pages")
+            _record_relay_info_writes(relay_set, timings)
+            _log_relay_info_stats(relay_set, timings, time.time() - start_time, relay_set.mp_workers)
+            return
+        except Exception as e:
+            relay_set._log_progress(f"Multiprocessing failed ({e}), falling back to sequential...")
+            _reset_output_dir(relay_set, output_path)
+
+    timings = []
+    for index in indices:
+        timings.append(_write_relay_info_page(relay_set, template, relay_list[index], setup, output_path))
+        if len(timings) % 1000 == 0:
+            relay_set._log_progress(f"Processed {len(timings)} relay pages...")
+    _record_relay_info_writes(relay_set, timings)
+    _log_relay_info_stats(relay_set, timings, time.time() - start_time)
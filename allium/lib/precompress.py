@@ -0,0 +1,163 @@
+"""
+File: precompress.py
+
+Precompressed siblings of the generated pages (--precompress).
+
+Static servers with precompressed-file support (nginx gzip_static/brotli_static,
+Caddy precompressed, ...) serve page.html.gz or page.html.br next to
+page.html instead of compressing on every request. PageCompressor writes those
+siblings as each page is written, in the process that rendered it (the parent,
+a fork()ed pool worker or an early-render child), from the rendered string, so
+there is no separate pass that reads the site back from disk.
+
+With --incremental a page that was not rewritten keeps its siblings: only
+pages whose content changed are compressed again (or unchanged pages that have
+no sibling yet, e.g. on the first run with --precompress). A page written
+without --precompress loses stale siblings of an earlier run, and pages removed
+by the output manifest take their siblings with them.
+
+gzip output is reproducible (mtime 0). Brotli needs the optional brotli
+package. Counters are reported per page task like row_fragments.py, so the
+progress output shows raw and compressed bytes of the whole run.
+"""
+
+import gzip
+import os
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Sibling formats, by file suffix
+FORMATS = ('gz', 'br')
+SIBLING_SUFFIXES = tuple('.' + fmt for fmt in FORMATS)
+DEFAULT_LEVEL = 9
+
+
+def parse_formats(text):
+    """
+    Formats of a --precompress value: "gz", "br" or "gz,br".
+
+    Raises:
+        ValueError: Unknown format, or br without the brotli package
+    """
+    formats = tuple(dict.fromkeys(fmt.strip().lower() for fmt in text.split(',') if fmt.strip()))
+    unknown = [fmt for fmt in formats if fmt not in FORMATS]
+    if not formats or unknown:
+        raise ValueError(f"expected gz, br or gz,br, got {text!r}")
+    if 'br' in formats and brotli is None:
+        raise ValueError("br needs the brotli package (pip3 install brotli)")
+    return formats
+
+
+def remove_siblings(path):
+    """Delete compressed siblings of path left by an earlier run."""
+    for suffix in SIBLING_SUFFIXES:
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def _format_mb(size):
+    return f"{size / (1024 * 1024):,.1f} MB"
+
+
+class PageCompressor:
+    """Writes .gz/.br siblings of pages and counts raw and compressed bytes."""
+
+    def __init__(self, formats, level=DEFAULT_LEVEL):
+        """
+        Args:
+            formats: Sibling formats to write (see parse_formats())
+            level: 1-9, the gzip compression level and the brotli quality
+        """
+        self.formats = tuple(formats)
+        self.level = level
+        self._reset()
+
+    def _reset(self):
+        self.pages = 0  # pages compressed
+        self.skipped = 0  # unchanged pages whose siblings were kept
+        self.raw_bytes = 0
+        self.compressed_bytes = dict.fromkeys(self.formats, 0)
+        self.seconds = 0.0
+
+    def _compress(self, fmt, data):
+        if fmt == 'gz':
+            return gzip.compress(data, compresslevel=self.level, mtime=0)
+        return brotli.compress(data, quality=self.level, mode=brotli.MODE_TEXT)
+
+    def write(self, path, content, changed=True):
+        """
+        Write the siblings of the page at path with the given content.
+
+        Args:
+            changed: False when the page file was left as it is (--incremental);
+                     its siblings are then only written, from the file, if one is missing
+
+        Returns:
+            bool: True if siblings were written
+        """
+        if not changed:
+            if all(os.path.isfile(path + '.' + fmt) for fmt in self.formats):
+                self.skipped += 1
+                return False
+            # The page kept the content of the run that wrote it (e.g. its timestamp)
+            with open(path, 'r', encoding='utf8') as f:
+                content = f.read()
+        data = content.encode('utf8')
+        start = time.perf_counter()
+        for fmt in self.formats:
+            compressed = self._compress(fmt, data)
+            with open(path + '.' + fmt, 'wb') as f:
+                f.write(compressed)
+            self.compressed_bytes[fmt] += len(compressed)
+        self.seconds += time.perf_counter() - start
+        self.pages += 1
+        self.raw_bytes += len(data)
+        return True
+
+    def take_stats(self):
+        """Counters since the last call, then reset (worker processes report these to the parent)."""
+        if not (self.pages or self.skipped):
+            return None
+        stats = (self.pages, self.skipped, self.raw_bytes, dict(self.compressed_bytes), self.seconds)
+        self._reset()
+        return stats
+
+    def add_stats(self, stats):
+        """Add counters reported by another process (take_stats)."""
+        if stats:
+            pages, skipped, raw_bytes, compressed_bytes, seconds = stats
+            self.pages += pages
+            self.skipped += skipped
+            self.raw_bytes += raw_bytes
+            for fmt, size in compressed_bytes.items():
+                self.compressed_bytes[fmt] = self.compressed_bytes.get(fmt, 0) + size
+            self.seconds += seconds
+
+    def describe(self):
+        """Progress summary: pages compressed, raw and compressed bytes per format."""
+        if not self.pages:
+            return f"Precompressed pages: none changed ({self.skipped:,} unchanged kept their siblings)"
+        sizes = ", ".join(
+            f"{_format_mb(size)} .{fmt} ({size / self.raw_bytes * 100:.1f}%)"
+            for fmt, size in self.compressed_bytes.items())
+        return (f"Precompressed {self.pages:,} pages (level {self.level}): {_format_mb(self.raw_bytes)} raw -> "
+                f"{sizes} in {self.seconds:.1f}s of worker time, {self.skipped:,} unchanged kept their siblings")
+
+
+def take_stats(relay_set):
+    """take_stats() of relay_set's page compressor, or None when it has none."""
+    compressor = getattr(relay_set, 'page_compressor', None)
+    return compressor.take_stats() if compressor is not None else None
+
+
+def add_stats(relay_set, stats):
+    """Add counters from a worker or child process to relay_set's page compressor."""
+    compressor = getattr(relay_set, 'page_compressor', None)
+    if compressor is not None:
+        compressor.add_stats(stats)
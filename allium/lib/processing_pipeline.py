@@ -0,0 +1,216 @@
+"""
+File: processing_pipeline.py
+
+Dependency-aware stage runner for Relays data processing.
+
+Relays builds its derived products (categories, AROI leaderboards, network
+health metrics, page precomputation, ...) from several API sources that arrive
+at different times. Each product is declared as a Stage with the inputs it
+needs; ProcessingPipeline runs the stages in dependency order once their
+inputs are settled, so every product is built exactly once after everything it
+reads is ready, instead of being recomputed after each new API source.
+
+Inputs are either other stages or sources (API documents such as 'uptime').
+A source is pending until it is provided as available or absent:
+
+- requires: inputs that must be available/done, otherwise the stage is skipped
+- after:    optional inputs; the stage waits until they are settled and uses
+            them if they turned out to be available
+
+A source that becomes available after a dependent stage already ran makes that
+stage (and, transitively, its dependents) stale, so it runs once more. This only
+happens when a caller settles sources early (e.g. Relays built without
+deferring enrichment); the coordinator defers, and then nothing runs twice.
+
+Consumers of the products (e.g. the site generator rendering a page type) can
+register with when_settled() to act as soon as the products they read are final,
+while later stages are still pending.
+"""
+
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Input/stage states
+PENDING = 'pending'
+AVAILABLE = 'available'
+ABSENT = 'absent'
+DONE = 'done'
+FAILED = 'failed'
+SKIPPED = 'skipped'
+
+_SETTLED = (AVAILABLE, ABSENT, DONE, FAILED, SKIPPED)
+_SATISFIED = (AVAILABLE, DONE)
+
+
+def start_peak_measurement():
+    """
+    Reset tracemalloc's peak and return the traced memory to measure the next peak from.
+
+    Returns None when tracemalloc is not tracing, or on Python 3.8, which has no
+    tracemalloc.reset_peak() (restarting tracing instead would discard the
+    measurements of any caller tracing around this one).
+    """
+    if not tracemalloc.is_tracing() or not hasattr(tracemalloc, 'reset_peak'):
+        return None
+    tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[0]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """A processing step of Relays (method name plus its declared inputs)."""
+
+    name: str
+    method: str
+    requires: Tuple[str, ...] = ()
+    after: Tuple[str, ...] = ()
+    # Guarded stages print this warning ({error} is replaced) and continue when they raise
+    warning: Optional[str] = None
+
+
+class ProcessingPipeline:
+    """
+    Runs Stage definitions against an owner object (a Relays instance).
+
+    Stage methods are looked up on the owner at run time, so patched or
+    overridden methods are honored.
+    """
+
+    def __init__(self, owner, stages: Iterable[Stage], sources: Iterable[str]):
+        """
+        Args:
+            owner: Object whose methods implement the stages
+            stages: Stage definitions, in a valid topological order
+            sources: Names of the external inputs (all start pending)
+        """
+        self.owner = owner
+        self.stages: List[Stage] = list(stages)
+        self.state: Dict[str, str] = {name: PENDING for name in sources}
+        # Monotonic sequence number of the last state change of each input/stage
+        self._changed_at: Dict[str, int] = {}
+        self._ran_at: Dict[str, int] = {}
+        self._sequence = 0
+        self.timings: Dict[str, float] = {}
+        self.run_counts: Dict[str, int] = {}
+        # Peak traced allocation (bytes above the stage's starting point), only while tracemalloc is tracing
+        self.memory_peaks: Dict[str, int] = {}
+        self._watchers: List[Tuple[Tuple[str, ...], Callable[[], None]]] = []
+
+        known = set(self.state)
+        for stage in self.stages:
+            for dependency in stage.requires + stage.after:
+                if dependency not in known:
+                    raise ValueError(f"stage {stage.name!r} depends on unknown or later input {dependency!r}")
+            if stage.name in known:
+                raise ValueError(f"duplicate stage or source name {stage.name!r}")
+            known.add(stage.name)
+            self.state[stage.name] = PENDING
+
+    def __getstate__(self) -> Dict[str, object]:
+        # Pending when_settled() callbacks belong to this process's consumers (relay snapshots drop them)
+        state = self.__dict__.copy()
+        state['_watchers'] = []
+        return state
+
+    def _touch(self, name: str, state: str) -> None:
+        self._sequence += 1
+        self.state[name] = state
+        self._changed_at[name] = self._sequence
+
+    def provide(self, source: str, available: bool) -> None:
+        """Settle a source as available (its data is present) or absent."""
+        if source not in self.state or any(stage.name == source for stage in self.stages):
+            raise KeyError(f"unknown source {source!r}")
+        new_state = AVAILABLE if available else ABSENT
+        if self.state[source] != new_state:
+            self._touch(source, new_state)
+
+    def is_settled(self, names: Iterable[str]) -> bool:
+        """Whether every named stage/source is settled and no pending input can make a stage rerun."""
+        return all(self.state[name] in _SETTLED and not self._awaits_rerun(name) for name in names)
+
+    def _awaits_rerun(self, name: str) -> bool:
+        stage = next((stage for stage in self.stages if stage.name == name), None)
+        return stage is not None and (self._is_stale(stage) or
+                                      any(self._awaits_rerun(dependency)
+                                          for dependency in stage.requires + stage.after))
+
+    def when_settled(self, names: Iterable[str], callback: Callable[[], None]) -> None:
+        """
+        Call callback once all named stages/sources are settled.
+
+        The callback runs immediately if they already are, otherwise from run()
+        right after the stage that settles the last of them, before later stages.
+        """
+        names = tuple(names)
+        unknown = [name for name in names if name not in self.state]
+        if unknown:
+            raise KeyError(f"unknown stage or source {unknown[0]!r}")
+        if self.is_settled(names):
+            callback()
+        else:
+            self._watchers.append((names, callback))
+
+    def _notify(self) -> None:
+        ready = [watcher for watcher in self._watchers if self.is_settled(watcher[0])]
+        for watcher in ready:
+            self._watchers.remove(watcher)
+            watcher[1]()
+
+    def _is_stale(self, stage: Stage) -> bool:
+        ran_at = self._ran_at.get(stage.name)
+        if ran_at is None:
+            return True
+        return any(self._changed_at.get(dependency, 0) > ran_at
+                   for dependency in stage.requires + stage.after)
+
+    def run(self) -> List[str]:
+        """
+        Run every stage whose inputs are settled and that has not run since they changed.
+
+        Returns:
+            list: Names of the stages executed by this call
+        """
+        executed = []
+        for stage in self.stages:
+            inputs = stage.requires + stage.after
+            if any(self.state[dependency] not in _SETTLED for dependency in inputs):
+                continue  # Waiting for a pending source (or a stage that is waiting)
+            if not self._is_stale(stage):
+                continue
+            if any(self.state[dependency] not in _SATISFIED for dependency in stage.requires):
+                if self.state[stage.name] != SKIPPED:
+                    self._touch(stage.name, SKIPPED)
+                self._ran_at[stage.name] = self._sequence
+                self._notify()
+                continue
+            base_memory = start_peak_measurement()
+            start = time.perf_counter()
+            try:
+                getattr(self.owner, stage.method)()
+                new_state = DONE
+            except Exception as e:
+                if stage.warning is None:
+                    raise
+                print("Warning: " + stage.warning.format(error=e))
+                new_state = FAILED
+            self.timings[stage.name] = self.timings.get(stage.name, 0.0) + time.perf_counter() - start
+            self.run_counts[stage.name] = self.run_counts.get(stage.name, 0) + 1
+            if base_memory is not None:
+                peak = tracemalloc.get_traced_memory()[1] - base_memory
+                self.memory_peaks[stage.name] = max(self.memory_peaks.get(stage.name, 0), peak)
+            self._touch(stage.name, new_state)
+            self._ran_at[stage.name] = self._sequence
+            executed.append(stage.name)
+            self._notify()
+        return executed
+
+    def summary(self) -> str:
+        """One-line per-stage timing summary (slowest first)."""
+        parts = []
+        for name, seconds in sorted(self.timings.items(), key=lambda item: -item[1]):
+            runs = self.run_counts.get(name, 0)
+            parts.append(f"{name} {seconds:.2f}s" + (f" x{runs}" if runs > 1 else ""))
+        return ', '.join(parts)
@@ -15,6 +15,51 @@ import threading
 _print_lock = threading.Lock()
 
 
+def get_rss_mb():
+    """
+    Get the current and peak resident set size of this process.
+    
+    Returns:
+        tuple: (current MB or None where /proc is unavailable, peak MB)
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    peak_kb = usage.ru_maxrss
+    if sys.platform == 'darwin':
+        peak_kb = peak_kb / 1024
+    
+    current_rss_kb = None
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    current_rss_kb = int(line.split()[1])
+                    break
+    except (FileNotFoundError, PermissionError, ValueError):
+        pass
+    
+    return (current_rss_kb / 1024 if current_rss_kb else None), peak_kb / 1024
+
+
+def get_uss_mb(pid):
+    """
+    Get the unique set size of a process: memory it does not share with any other.
+
+    For a fork()ed worker this is what it costs on top of its parent.
+
+    Returns:
+        float: USS in MB, or None where /proc/<pid>/smaps_rollup is unavailable
+    """
+    private_kb = 0
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            for line in f:
+                if line.startswith(('Private_Clean:', 'Private_Dirty:', 'Private_Hugetlb:')):
+                    private_kb += int(line.split()[1])
+    except (FileNotFoundError, PermissionError, ProcessLookupError, ValueError):
+        return None
+    return private_kb / 1024
+
+
 def get_memory_usage():
     """
     Get current memory usage information.
@@ -23,25 +68,8 @@ def get_memory_usage():
         str: Formatted memory usage string
     """
     try:
-        usage = resource.getrusage(resource.RUSAGE_SELF)
-        peak_kb = usage.ru_maxrss
-        if sys.platform == 'darwin':
-            peak_kb = peak_kb / 1024
-        
-        current_rss_kb = None
-        try:
-            with open('/proc/self/status', 'r') as f:
-                for line in f:
-                    if line.startswith('VmRSS:'):
-                        current_rss_kb = int(line.split()[1])
-                        break
-        except (FileNotFoundError, PermissionError, ValueError):
-            current_rss_kb = peak_kb
-        
-        current_mb = (current_rss_kb or peak_kb) / 1024
-        peak_mb = peak_kb / 1024
-        
-        if current_rss_kb and current_rss_kb != peak_kb:
+        current_mb, peak_mb = get_rss_mb()
+        if current_mb is not None and current_mb != peak_mb:
             return f"RSS: {current_mb:.1f}MB, Peak: {peak_mb:.1f}MB"
         else:
             return f"Peak RSS: {peak_mb:.1f}MB"
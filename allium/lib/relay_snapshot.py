@@ -0,0 +1,170 @@
+"""
+File: relay_snapshot.py
+
+Relay snapshots: the fully processed relay set saved to a file, so pages can be
+rendered later, or by several processes or hosts, without fetching and
+processing the API data again (``allium.py --save-snapshot [FILE]`` writes one,
+``allium.py --render-only [FILE]`` and ``allium.py render --snapshot FILE``
+render from it; see render_shards.py).
+
+Layout::
+
+    ALLIUM-RELAY-SNAPSHOT\\n
+    {"version": 2, "relays": ..., "timestamp": ..., "created": ...}\\n
+    <pickled Relays instance, without the detached attributes>
+    <one pickle per detached attribute>
+    {"relay_set": [start, end], "uptime_history": [start, end], ...}
+    <8-byte little-endian offset of the section index above>
+
+The file is memory-mapped on load. The relay set is unpickled with the cyclic
+garbage collector paused (it would otherwise rescan the millions of new
+containers over and over, doubling the load time). DETACHED_ATTRIBUTES - large
+products of processing that no page reads - stay in the mapping and are only
+decoded if something accesses them (see Relays.__getattr__).
+
+Pickle executes code on load, so only load snapshots you wrote yourself. The
+format is tied to the allium version that wrote it: a different format version
+is refused, but class changes between versions are not detected.
+"""
+
+import functools
+import gc
+import json
+import mmap
+import os
+import pickle
+import struct
+import time
+from typing import Any, Dict
+
+from .cache_codecs import PackageUnpickler
+
+SNAPSHOT_MAGIC = b'ALLIUM-RELAY-SNAPSHOT\n'
+SNAPSHOT_VERSION = 2
+
+# Used by --save-snapshot / --render-only without a FILE argument
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'data', 'relay-snapshot')
+
+# Columnar uptime/bandwidth history stores (history_store.py): only processing
+# stages read them, page rendering uses the summaries derived from them
+DETACHED_ATTRIBUTES = ('uptime_history', 'bandwidth_history')
+
+_INDEX_OFFSET = struct.Struct('<Q')
+
+
+class SnapshotError(ValueError):
+    """A file is not a relay snapshot this version of allium can load."""
+
+
+def save_snapshot(relay_set, path: str) -> Dict[str, Any]:
+    """
+    Atomically write a processed relay set to path.
+
+    Per-run state (output manifest, progress logger) is not saved, see
+    Relays.__getstate__.
+
+    Returns:
+        dict: The snapshot header
+    """
+    metadata = {
+        'version': SNAPSHOT_VERSION,
+        'relays': len(relay_set.json.get('relays', [])),
+        'timestamp': relay_set.timestamp,
+        'created': int(time.time()),
+    }
+    # Sections still pending from a loaded snapshot are decoded so they can be written again
+    detached = {name: getattr(relay_set, name) for name in DETACHED_ATTRIBUTES if hasattr(relay_set, name)}
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = path + '.tmp'
+    index = {}
+    for name in detached:
+        del relay_set.__dict__[name]
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(json.dumps(metadata, sort_keys=True).encode('utf8') + b'\n')
+            for name, value in [('relay_set', relay_set)] + list(detached.items()):
+                start = f.tell()
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                index[name] = [start, f.tell()]
+            index_offset = f.tell()
+            f.write(json.dumps(index, sort_keys=True).encode('utf8'))
+            f.write(_INDEX_OFFSET.pack(index_offset))
+    finally:
+        relay_set.__dict__.update(detached)
+    os.replace(temp_path, path)
+    return metadata
+
+
+def _read_header(f, path: str) -> Dict[str, Any]:
+    if f.readline() != SNAPSHOT_MAGIC:
+        raise SnapshotError(f"{path} is not an allium relay snapshot")
+    try:
+        metadata = json.loads(f.readline())
+    except ValueError:
+        raise SnapshotError(f"{path} has a corrupt snapshot header")
+    if not isinstance(metadata, dict) or metadata.get('version') != SNAPSHOT_VERSION:
+        version = metadata.get('version') if isinstance(metadata, dict) else None
+        raise SnapshotError(f"{path} is a version {version} snapshot, expected version {SNAPSHOT_VERSION}")
+    return metadata
+
+
+def _read_index(mapping, path: str) -> Dict[str, Any]:
+    try:
+        index_offset, = _INDEX_OFFSET.unpack(mapping[-_INDEX_OFFSET.size:])
+        index = json.loads(mapping[index_offset:-_INDEX_OFFSET.size])
+        return {name: (int(start), int(end)) for name, (start, end) in index.items()}
+    except (struct.error, ValueError, TypeError, AttributeError):
+        raise SnapshotError(f"{path} is truncated or corrupt: no section index")
+
+
+def _load_section(mapping, start: int, end: int, path: str) -> Any:
+    """Unpickle the section at mapping[start:end]."""
+    if not 0 <= start < end <= len(mapping):
+        raise SnapshotError(f"{path} is truncated or corrupt: section outside the file")
+    mapping.seek(start)
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return PackageUnpickler(mapping).load()
+    except (EOFError, pickle.UnpicklingError) as e:
+        raise SnapshotError(f"{path} is truncated or corrupt: {e}")
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def read_snapshot_metadata(path: str) -> Dict[str, Any]:
+    """Read the header of a snapshot without loading the relay set."""
+    with open(path, 'rb') as f:
+        return _read_header(f, path)
+
+
+def load_snapshot(path: str, progress_logger):
+    """
+    Load a relay set saved by save_snapshot().
+
+    Detached attributes are decoded from the memory-mapped file on first access.
+
+    Args:
+        path: Snapshot file
+        progress_logger: ProgressLogger the loaded relay set logs to
+
+    Raises:
+        SnapshotError: Not a snapshot, a different format version, or truncated
+    """
+    with open(path, 'rb') as f:
+        _read_header(f, path)
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    index = _read_index(mapping, path)
+    if 'relay_set' not in index:
+        raise SnapshotError(f"{path} is truncated or corrupt: no relay set section")
+    relay_set = _load_section(mapping, *index.pop('relay_set'), path)
+    relay_set._snapshot_sections = {
+        name: functools.partial(_load_section, mapping, start, end, path)
+        for name, (start, end) in index.items()
+    }
+    relay_set.progress_logger = progress_logger
+    return relay_set
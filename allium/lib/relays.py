@@ -12,8 +12,11 @@ import multiprocessing as mp
 import os
 import re
 import time
-from .aroileaders import _calculate_aroi_leaderboards
+from .aroileaders import _calculate_aroi_leaderboards, count_aroi_operators
 from .ip_utils import safe_parse_ip_address as _safe_parse_ip_address
+from .processing_pipeline import ProcessingPipeline, Stage
+from .worker_pool import WorkerPool
+from .history_summary import RelayHistorySummary
 from .progress_logger import ProgressLogger
 from .bandwidth_formatter import (
     BandwidthFormatter,
@@ -49,10 +52,62 @@ from .page_writer import (
     _precompute_family_worker,
 )
 
+# Pipeline sources: the details document, the secondary API documents settled by
+# attach_api_data()/enrich_with_api_data() (named like the attributes holding them),
+# and 'enrichment'
+PIPELINE_SOURCES = (
+    'details', 'uptime_data', 'bandwidth_data', 'aroi_validation_data', 'collector_consensus_data',
+    'consensus_health_data', 'collector_descriptors_data', 'enrichment',
+)
+ENRICHMENT_SOURCES = PIPELINE_SOURCES[1:-1]
+
+# Processing stages in dependency order. Each derived product is built once all of
+# its inputs are settled (see processing_pipeline.py):
+#   - health needs only the AROI operator count, not the leaderboards
+#   - group total_data needs bandwidth and health (network_total_data_by_period)
+#   - leaderboards read uptime, bandwidth, group total_data and health
+#   - contact/family page precomputation depends on everything
+#   - the raw API documents are released once the pages are precomputed
+_ALL_PRODUCTS = ('aroi_leaderboards', 'network_health', 'uptime', 'bandwidth', 'group_total_data',
+                 'collector', 'aroi_validation_data', 'consensus_health_data')
+PROCESSING_STAGES = (
+    Stage('filter_and_fix', '_filter_and_fix_relays', requires=('details',)),
+    Stage('sort_by_bandwidth', '_sort_by_observed_bandwidth', requires=('filter_and_fix',)),
+    Stage('trim_platform', '_trim_platform', requires=('sort_by_bandwidth',)),
+    Stage('hashed_contact', '_add_hashed_contact', requires=('trim_platform',)),
+    Stage('aroi_contacts', '_process_aroi_contacts', requires=('hashed_contact',)),
+    Stage('template_data', '_preprocess_template_data', requires=('aroi_contacts',)),
+    Stage('categorize', '_categorize', requires=('template_data',)),
+    Stage('as_rarity', '_propagate_as_rarity', requires=('categorize',)),
+    Stage('aroi_operator_count', '_count_aroi_operators', requires=('as_rarity',)),
+    Stage('smart_context', '_generate_smart_context', requires=('as_rarity',)),
+    Stage('uptime', '_reprocess_uptime_data', requires=('as_rarity', 'uptime_data')),
+    Stage('bandwidth', '_reprocess_bandwidth_data', requires=('as_rarity', 'bandwidth_data'),
+          warning="Bandwidth processing failed ({error}), continuing without bandwidth metrics"),
+    Stage('network_health', '_calculate_network_health_metrics',
+          requires=('smart_context', 'aroi_operator_count'),
+          after=('uptime', 'bandwidth', 'aroi_validation_data', 'collector_consensus_data',
+                 'collector_descriptors_data')),
+    Stage('group_total_data', '_aggregate_total_data_to_groups', requires=('bandwidth', 'network_health'),
+          warning="Bandwidth processing failed ({error}), continuing without bandwidth metrics"),
+    Stage('aroi_leaderboards', '_generate_aroi_leaderboards', requires=('as_rarity',),
+          after=('uptime', 'bandwidth', 'group_total_data', 'network_health', 'aroi_validation_data')),
+    Stage('collector', '_reprocess_collector_data', requires=('as_rarity', 'collector_consensus_data'),
+          warning="Collector consensus processing failed ({error}), continuing without consensus evaluation"),
+    Stage('family_support', '_set_family_support_types', requires=('as_rarity', 'enrichment'),
+          after=('collector_descriptors_data', 'collector')),
+    Stage('contact_pages', '_precompute_all_contact_page_data', requires=('family_support',),
+          after=_ALL_PRODUCTS),
+    Stage('family_pages', '_precompute_all_family_page_data', requires=('family_support',),
+          after=_ALL_PRODUCTS),
+    Stage('release_payloads', '_release_api_payloads', requires=('contact_pages', 'family_pages')),
+)
+
+
 class Relays:
     """Relay class consisting of processing routines and onionoo data"""
 
-    def __init__(self, output_dir, onionoo_url, relay_data, use_bits=False, progress=False, start_time=None, progress_step=0, total_steps=53, filter_downtime_days=7, base_url='', progress_logger=None, mp_workers=4):
+    def __init__(self, output_dir, onionoo_url, relay_data, use_bits=False, progress=False, start_time=None, progress_step=0, total_steps=53, filter_downtime_days=7, base_url='', progress_logger=None, mp_workers=4, fuse_contact_pages=False, defer_enrichment=False):
         self.output_dir = output_dir
         self.onionoo_url = onionoo_url
         self.use_bits = use_bits
@@ -63,6 +118,14 @@ class Relays:
         self.filter_downtime_days = filter_downtime_days
         self.base_url = base_url
         self.mp_workers = mp_workers  # 0 = disable, >0 = worker count
+        self.fuse_contact_pages = fuse_contact_pages  # compute contact page data while rendering, see page_writer.py
+        self.contact_pages_deferred = False  # contact page data left to the contact page render workers
+        self.output_manifest = None  # OutputManifest when generating incrementally (--incremental)
+        self.render_pool = None  # WorkerPool shared by page types during generate_site, see worker_pool.py
+        self.row_fragments = None  # RowFragmentCache of relay listing rows during generate_site, see row_fragments.py
+        self.page_compressor = None  # PageCompressor with --precompress, see precompress.py
+        self._group_orders = {}  # (category, sorted_by, reverse) -> ordered groups, see page_writer.sorted_group_items
+        self.history_summary = RelayHistorySummary()  # per-relay uptime/bandwidth period summaries, see history_summary.py
         self.ts_file = os.path.join(os.path.dirname(ABS_PATH), "timestamp")
         
         # Initialize bandwidth formatter with correct units setting
@@ -83,17 +146,36 @@ class Relays:
         # Generate timestamp for compatibility - use centralized function
         self.timestamp = format_timestamp_gmt()
 
-        self._filter_and_fix_relays()
-        self._sort_by_observed_bandwidth()
-        self._trim_platform()
-        self._add_hashed_contact()
-        self._process_aroi_contacts()  # Process AROI display info first
-        self._preprocess_template_data()  # Pre-compute template optimization data
-        self._categorize()  # Then build categories with processed relay objects
-        self._propagate_as_rarity()  # Copy AS rarity scores to each relay for templates
-        self._generate_aroi_leaderboards()  # Generate AROI operator leaderboards
-        self._generate_smart_context()  # Generate intelligence analysis (needed for CW/BW ratios)
-        self._calculate_network_health_metrics()  # Calculate network health dashboard metrics (regenerated after uptime data)
+        # Details-only stages run now. With defer_enrichment (the coordinator, which
+        # always calls enrich_with_api_data next) products that also read secondary
+        # API data wait for it; otherwise they are built from details data right away
+        # and rebuilt once if enrichment later supplies new inputs.
+        self.pipeline = ProcessingPipeline(self, PROCESSING_STAGES, PIPELINE_SOURCES)
+        self.pipeline.provide('details', True)
+        if not defer_enrichment:
+            for source in ENRICHMENT_SOURCES:
+                self.pipeline.provide(source, False)
+        self.pipeline.run()
+
+    def __getstate__(self):
+        """Pickled state for relay snapshots (relay_snapshot.py), without this run's output and logging."""
+        state = self.__dict__.copy()
+        state['output_manifest'] = None
+        state['render_pool'] = None
+        state['row_fragments'] = None
+        state['page_compressor'] = None
+        state['progress_logger'] = None
+        state.pop('_snapshot_sections', None)
+        return state
+
+    def __getattr__(self, name):
+        """Decode an attribute left in the snapshot file by relay_snapshot.load_snapshot() on first access."""
+        sections = self.__dict__.get('_snapshot_sections')
+        if not sections or name not in sections:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        value = sections.pop(name)()
+        setattr(self, name, value)
+        return value
 
     def enrich_with_api_data(self, uptime_data=None, bandwidth_data=None,
                              aroi_validation_data=None, collector_consensus_data=None,
@@ -103,27 +185,32 @@ class Relays:
         Called by coordinator after threaded API fetch completes.
 
         This is the second half of the processing pipeline (after __init__).
-        The full pipeline is:
-
-        __init__:                             enrich_with_api_data:
-          1. filter_and_fix_relays              7. Attach raw API data
-          2. sort_by_observed_bandwidth         8. Uptime processing
-          3. trim_platform                      9. Re-generate leaderboards (uses uptime)
-          4. add_hashed_contact                10. Re-calculate health metrics (uses uptime)
-          5. preprocess_template_data          11. Bandwidth processing
-          6. categorize                        12. Re-generate leaderboards (uses total_data)
-             propagate_as_rarity               13. Re-calculate health metrics (uses bandwidth)
-             generate_aroi_leaderboards        14. Collector consensus evaluation
-             generate_smart_context          14.5. Set family support types + cache descriptor sets
-             calculate_network_health_metrics  15. Pre-compute contact page data
-             calculate_network_health_metrics  16. Pre-compute family page data
+        The pipeline is declared in PROCESSING_STAGES; each stage runs once all
+        of its inputs are settled:
+
+        __init__ (details):                   enrich_with_api_data:
+          filter_and_fix_relays                 attach raw API data, settle sources
+          sort_by_observed_bandwidth            uptime processing
+          trim_platform                         bandwidth processing
+          add_hashed_contact                    network health (uptime, bandwidth, validation)
+          process_aroi_contacts                 group total_data (bandwidth + health)
+          preprocess_template_data              AROI leaderboards (uptime, total_data, validation)
+          categorize, propagate_as_rarity       collector consensus evaluation
+          count AROI operators                  family support types + descriptor sets
+          generate_smart_context                contact/family page precompute (everything)
 
         Processing order matters:
         - Uptime BEFORE leaderboards (leaderboards reuse per-relay uptime_percentages)
         - Bandwidth BEFORE health (health uses overload data from bandwidth)
         - ALL data processing BEFORE precompute (contact/family pages depend on everything)
+
+        Per-stage timings are available in self.pipeline.timings.
+
+        Sources already delivered through attach_api_data() (the coordinator feeds
+        each dataset as its download completes) are not processed again; this call
+        settles the remaining ones and runs whatever is still waiting.
         """
-        # Step 7: Attach raw API data as attributes
+        # Attach raw API data as attributes
         self.uptime_data = uptime_data
         self.bandwidth_data = bandwidth_data
         self.aroi_validation_data = aroi_validation_data
@@ -133,36 +220,39 @@ class Relays:
         # Legacy attribute for backward compatibility
         self.collector_data = None
 
-        # Steps 8-10: Uptime processing → regenerate leaderboards + health
-        if uptime_data:
-            self._reprocess_uptime_data()
-            self._generate_aroi_leaderboards()
-            self._calculate_network_health_metrics()
+        for source in ENRICHMENT_SOURCES:
+            self.pipeline.provide(source, self._source_available(source, getattr(self, source)))
+        self.pipeline.provide('enrichment', True)
+        self.pipeline.run()
+        self._log_progress(f"Processing stages: {self.pipeline.summary()}")
 
-        # Steps 11-14: Bandwidth → health → aggregate groups (needs health %) → leaderboards
-        if bandwidth_data and self.json.get('relays'):
-            try:
-                self._reprocess_bandwidth_data()
-                self._calculate_network_health_metrics()
-                self._aggregate_total_data_to_groups()
-                self._generate_aroi_leaderboards()
-            except Exception as e:
-                print(f"Warning: Bandwidth processing failed ({e}), continuing without bandwidth metrics")
+    def attach_api_data(self, source, data):
+        """
+        Attach one secondary API document as soon as it is available.
 
-        # Step 13: Collector consensus evaluation
-        if collector_consensus_data and self.json.get('relays'):
-            try:
-                self._reprocess_collector_data()
-            except Exception as e:
-                print(f"Warning: Collector consensus processing failed ({e}), continuing without consensus evaluation")
+        Runs every stage that only waited for this source (e.g. uptime processing
+        once the uptime document arrives) while other downloads are still in
+        flight. Stages that also read other pending sources keep waiting, so each
+        product is still built once; enrich_with_api_data() completes the set.
 
-        # Step 13.5: Set per-relay family support type and cache descriptor sets
-        # (depends on collector_descriptors_data from Step 7, consumed by Steps 14-15)
-        self._set_family_support_types()
+        Args:
+            source: Pipeline source name (one of ENRICHMENT_SOURCES, e.g. 'uptime_data')
+            data: The API document, or None if the worker failed
 
-        # Steps 14-15: Pre-compute page data (depends on ALL above)
-        self._precompute_all_contact_page_data()
-        self._precompute_all_family_page_data()
+        Returns:
+            list: Names of the stages executed by this call
+        """
+        if source not in ENRICHMENT_SOURCES:
+            raise KeyError(f"unknown API source {source!r}")
+        setattr(self, source, data)
+        self.pipeline.provide(source, self._source_available(source, data))
+        return self.pipeline.run()
+
+    def _source_available(self, source, data):
+        """Whether an API document can feed its stages (some also need relays to match against)."""
+        if source in ('bandwidth_data', 'collector_consensus_data'):
+            return bool(data) and bool(self.json.get('relays'))
+        return bool(data)
 
     def _log_progress(self, message, increment_step=False):
         """Log progress message using shared progress utility"""
@@ -475,13 +565,20 @@ class Relays:
             
         try:
             from .uptime_utils import process_all_uptime_data_consolidated
+            from .history_store import build_uptime_history_store, describe_history_store
+            
+            # Convert the uptime document once into columnar arrays shared by all uptime consumers
+            self.uptime_history = build_uptime_history_store(uptime_data)
+            self._log_progress(f"Uptime history store: {describe_history_store(self.uptime_history)}")
+            self.history_summary.add_uptime(self.uptime_history)
             
             # SINGLE PASS PROCESSING: Process all uptime data in one optimized loop
             # This replaces multiple separate loops with consolidated processing
             consolidated_results = process_all_uptime_data_consolidated(
                 all_relays=self.json["relays"],
                 uptime_data=uptime_data,
-                include_flag_analysis=True
+                include_flag_analysis=True,
+                history_store=self.uptime_history
             )
             
             relay_uptime_data = consolidated_results['relay_uptime_data']
@@ -527,7 +624,8 @@ class Relays:
         if uptime_data:
             from .uptime_utils import calculate_network_uptime_percentiles
             self._log_progress("Calculating network uptime percentiles (6-month period)...")
-            self.network_uptime_percentiles = calculate_network_uptime_percentiles(uptime_data, '6_months')
+            self.network_uptime_percentiles = calculate_network_uptime_percentiles(
+                uptime_data, '6_months', history_store=getattr(self, 'uptime_history', None))
             if self.network_uptime_percentiles:
                 total_relays = self.network_uptime_percentiles.get('total_relays', 0)
                 self._log_progress(f"Network percentiles calculated: {total_relays:,} relays analyzed")
@@ -558,13 +656,20 @@ class Relays:
             # Use consolidated bandwidth processing with flag analysis
             from .bandwidth_utils import process_all_bandwidth_data_consolidated
             from .bandwidth_formatter import format_data_volume_with_unit as _fmt_data_vol
+            from .history_store import build_bandwidth_history_store, describe_history_store
+            
+            # Convert the bandwidth document once into columnar arrays (read/write history)
+            self.bandwidth_history = build_bandwidth_history_store(bandwidth_data)
+            self._log_progress(f"Bandwidth history store: {describe_history_store(self.bandwidth_history)}")
+            self.history_summary.add_bandwidth(self.bandwidth_history, bandwidth_data)
             
             # SINGLE PASS PROCESSING: Process all bandwidth data in one optimized loop
             # This includes flag bandwidth analysis similar to uptime processing
             consolidated_results = process_all_bandwidth_data_consolidated(
                 all_relays=self.json["relays"],
                 bandwidth_data=bandwidth_data,
-                include_flag_analysis=True
+                include_flag_analysis=True,
+                history_store=self.bandwidth_history
             )
             
             if not consolidated_results:
@@ -973,7 +1078,7 @@ class Relays:
             else:
                 relay['family_support_type'] = 'none'
 
-    def _precompute_all_contact_page_data(self):
+    def _precompute_all_contact_page_data(self, allow_fusing=True):
         """
         PERF OPTIMIZATION: Pre-compute all contact page data using parallel processing.
         
@@ -988,6 +1093,12 @@ class Relays:
         - contact_display_data: Formatted display values
         - contact_validation_status: AROI validation status
         - is_validated_aroi: Whether contact has validated AROI domain
+        
+        With fuse_contact_pages (--fuse-contact-pages) the parallel precomputation is
+        skipped and contact_pages_deferred set: the contact page render workers compute
+        each contact's data while rendering its page (page_writer.write_pages_parallel).
+        allow_fusing=False runs the precomputation for a deferred relay set that cannot
+        be rendered that way.
         """
         if "contact" not in self.json["sorted"]:
             return
@@ -1004,20 +1115,30 @@ class Relays:
         use_mp = (self.mp_workers > 0 and len(contact_hashes) >= 100 and 
                   hasattr(mp, 'get_context'))
         
+        if use_mp and allow_fusing and self.fuse_contact_pages:
+            self.contact_pages_deferred = True
+            self._log_progress(f"Contact page data for {len(contact_hashes)} contacts deferred to contact page rendering")
+            return
+        self.contact_pages_deferred = False
+        
         if use_mp:
             try:
                 self._precompute_contacts_parallel(contact_hashes, aroi_validation_timestamp, 
                                                    validated_aroi_domains)
-                return
             except Exception as e:
                 # Fall back to sequential if parallel fails
+                use_mp = False
                 if self.progress:
                     self._log_progress(f"Parallel precomputation failed ({e}), using sequential...")
         
-        # Sequential fallback
-        for contact_hash in contact_hashes:
-            self._precompute_single_contact(contact_hash, aroi_validation_timestamp, 
-                                            validated_aroi_domains)
+        if not use_mp:
+            # Sequential fallback
+            for contact_hash in contact_hashes:
+                self._precompute_single_contact(contact_hash, aroi_validation_timestamp, 
+                                                validated_aroi_domains)
+        
+        # Leaderboards, bandwidth percentiles and contact reliability have all read the summary by now
+        self._log_progress(f"History summary table: {self.history_summary.describe()}")
     
     def _precompute_single_contact(self, contact_hash, aroi_validation_timestamp, validated_aroi_domains):
         """Precompute data for a single contact (sequential path).
@@ -1037,9 +1158,6 @@ class Relays:
         - Keep peak memory lower by processing results as they complete
         - Enable granular progress reporting during precomputation
         """
-        # Use fork context for efficient memory sharing
-        ctx = mp.get_context('fork')
-        
         # Prepare arguments for worker function
         worker_args = [(contact_hash, aroi_validation_timestamp, validated_aroi_domains) 
                        for contact_hash in contact_hashes]
@@ -1048,12 +1166,13 @@ class Relays:
         processed = 0
         chunk_size = max(50, total_contacts // (self.mp_workers * 4))  # Balance granularity vs overhead
         
-        # Initialize workers with self reference (fork shares memory)
-        with ctx.Pool(self.mp_workers, _init_precompute_worker, (self,)) as pool:
+        # Initialize workers with self reference (fork shares memory; the heap is frozen first)
+        with WorkerPool(self.mp_workers, _init_precompute_worker, (self,), log=self._log_progress) as pool:
             # Use imap_unordered for streaming results (lower peak memory)
-            for contact_hash, precomputed_data in pool.imap_unordered(
+            for contact_hash, precomputed_data, summary_stats in pool.imap_unordered(
                 _precompute_contact_worker, worker_args, chunksize=chunk_size
             ):
+                self.history_summary.add_stats(summary_stats)
                 # Apply result directly to contact data (flat storage pattern)
                 if precomputed_data and contact_hash in self.json["sorted"]["contact"]:
                     contact_data = self.json["sorted"]["contact"][contact_hash]
@@ -1065,6 +1184,7 @@ class Relays:
                 processed += 1
                 if processed % 500 == 0:
                     self._log_progress(f"Pre-computed {processed}/{total_contacts} contacts...")
+            pool.log_worker_memory("contact precomputation")
 
     def _precompute_all_family_page_data(self):
         """
@@ -1118,9 +1238,6 @@ class Relays:
         
         Mirrors _precompute_contacts_parallel for consistency.
         """
-        # Use fork context for efficient memory sharing
-        ctx = mp.get_context('fork')
-        
         # Prepare arguments for worker function (single-element tuple)
         worker_args = [(family_hash,) for family_hash in family_hashes]
         
@@ -1128,8 +1245,8 @@ class Relays:
         processed = 0
         chunk_size = max(50, total_families // (self.mp_workers * 4))
         
-        # Initialize workers with self reference (fork shares memory)
-        with ctx.Pool(self.mp_workers, _init_precompute_worker, (self,)) as pool:
+        # Initialize workers with self reference (fork shares memory; the heap is frozen first)
+        with WorkerPool(self.mp_workers, _init_precompute_worker, (self,), log=self._log_progress) as pool:
             # Use imap_unordered for streaming results
             for family_hash, precomputed_data in pool.imap_unordered(
                 _precompute_family_worker, worker_args, chunksize=chunk_size
@@ -1144,6 +1261,30 @@ class Relays:
                 processed += 1
                 if processed % 1000 == 0:
                     self._log_progress(f"Pre-computed {processed}/{total_families} families...")
+            pool.log_worker_memory("family precomputation")
+
+    def _release_api_payloads(self):
+        """
+        Drop the raw API documents before pages are rendered (see memory_lifecycle.py).
+
+        Keeps the fields templates read, then collects the heap and, when pages
+        are rendered by forked workers, freezes it so they share it instead of
+        copying it.
+        """
+        from .memory_lifecycle import collect_and_freeze, release_api_payloads
+        from .progress import get_rss_mb
+
+        before_mb, peak_mb = get_rss_mb()
+        released = release_api_payloads(self)
+        collected = collect_and_freeze(freeze=self.mp_workers > 0)
+        after_mb, _ = get_rss_mb()
+        if before_mb is None:
+            self._log_progress(f"Released raw API data ({', '.join(released) or 'nothing'}); peak RSS {peak_mb:.1f}MB")
+            return
+        self._log_progress(
+            f"Released raw API data ({', '.join(released) or 'nothing'}, {collected:,} objects collected): "
+            f"RSS {before_mb:.1f}MB -> {after_mb:.1f}MB, peak {peak_mb:.1f}MB"
+        )
 
     def _generate_aroi_leaderboards(self):
         """
@@ -1158,6 +1299,10 @@ class Relays:
         contact_count = len(self.json.get('sorted', {}).get('contact', {}))
         self._log_progress(f"AROI leaderboards generated for {contact_count} operators")
 
+    def _count_aroi_operators(self):
+        """Count AROI operators for network health (details data only, no leaderboards needed)."""
+        self.json['aroi_operator_count'] = count_aroi_operators(self)
+
     def _generate_smart_context(self):
         """
         Generate smart context information using intelligence engine
@@ -1180,6 +1325,11 @@ class Relays:
         from .page_writer import write_misc
         write_misc(self, template, path, page_ctx=page_ctx, sorted_by=sorted_by, reverse=reverse, is_index=is_index)
 
+    def write_misc_pages(self, pages):
+        """Render and write a batch of misc listings (parallel when workers are enabled)."""
+        from .page_writer import write_misc_pages
+        write_misc_pages(self, pages)
+
     def _get_directory_authorities_data(self):
         """Prepare directory authorities data for template rendering."""
         from .page_writer import get_directory_authorities_data
@@ -1204,10 +1354,10 @@ class Relays:
         from .page_writer import build_template_args
         return build_template_args(self, k, v, i, the_prefixed, validated_aroi_domains)
 
-    def _write_pages_parallel(self, k, sorted_values, template, output_path, the_prefixed, start_time):
+    def _write_pages_parallel(self, k, sorted_values, output_path, start_time):
         """Parallel page generation using fork()."""
         from .page_writer import write_pages_parallel
-        write_pages_parallel(self, k, sorted_values, template, output_path, the_prefixed, start_time)
+        write_pages_parallel(self, k, sorted_values, output_path, start_time)
 
     def write_relay_info(self):
         """Render and write per-relay HTML info documents to disk."""
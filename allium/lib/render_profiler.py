@@ -0,0 +1,249 @@
+"""
+File: render_profiler.py
+
+Per-page render profiling for ``--profile-render DIR``.
+
+Every page writer (page_writer.py) times its pages in three phases:
+
+  - context: building the template variables (group lookups, formatting,
+    page context and breadcrumbs)
+  - render:  template.render()
+  - write:   writing the file (or comparing it with --incremental)
+
+Pages are rendered in the parent, in fork()ed pool workers and in early-render
+child processes, so each process appends one JSON line per page to its own
+spool file (DIR/spool/<pid>.jsonl). finish() merges the spool files into
+DIR/render-profile.json with per page type p50/p95/max for each phase, bytes
+written, and the slowest page of each type.
+
+With ``--profile-slowest N`` every page also runs under cProfile. Each process
+keeps the stats of its N slowest pages, and finish() moves the N slowest overall
+to DIR/slowest/ (open with ``python -m pstats`` or snakeviz).
+"""
+
+import cProfile
+import heapq
+import json
+import os
+import re
+import time
+from shutil import rmtree
+from typing import Any, Dict, List, Optional
+
+PROFILE_REPORT = 'render-profile.json'
+PHASES = ('context', 'render', 'write')
+
+_profiler = None  # RenderProfiler while --profile-render is on
+
+
+class _NullPage:
+    """Page timer used when profiling is off (every method is a no-op)."""
+
+    __slots__ = ()
+
+    def lap(self, phase):
+        pass
+
+    def finish(self, path, rendered):
+        pass
+
+
+_NULL_PAGE = _NullPage()
+
+
+class PageTiming:
+    """Phase timer for one page; created by start_page()."""
+
+    __slots__ = ('profiler', 'page_type', 'phases', 'last', 'cprofile')
+
+    def __init__(self, profiler: 'RenderProfiler', page_type: str, cprofile: Optional[cProfile.Profile]):
+        self.profiler = profiler
+        self.page_type = page_type
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.cprofile = cprofile
+        if cprofile is not None:
+            cprofile.enable()
+        self.last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        """Charge the time since the previous lap to phase."""
+        now = time.perf_counter()
+        self.phases[phase] += now - self.last
+        self.last = now
+
+    def finish(self, path: str, rendered: str) -> None:
+        """End the write phase and record the page."""
+        self.lap('write')
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        self.profiler.record(self, path, len(rendered.encode('utf8')))
+
+
+class RenderProfiler:
+    """Collects page timings from every rendering process into one report."""
+
+    def __init__(self, report_dir: str, output_dir: str, slowest: int = 0):
+        """
+        Args:
+            report_dir: Directory for render-profile.json and slowest/*.prof
+            output_dir: Site output directory (page paths are reported relative to it)
+            slowest: Number of slowest pages to keep cProfile stats for (0 = no cProfile)
+        """
+        self.report_dir = os.path.abspath(report_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.slowest = slowest
+        self.spool_dir = os.path.join(self.report_dir, 'spool')
+        self.slowest_dir = os.path.join(self.report_dir, 'slowest')
+        for directory in (self.spool_dir, self.slowest_dir):
+            if os.path.exists(directory):
+                rmtree(directory)
+        os.makedirs(self.spool_dir)
+        self._pid = None
+        self._spool = None
+        self._kept = []  # min-heap of (seconds, profile file) for this process
+        self._sequence = 0
+
+    def start_page(self, page_type: str) -> PageTiming:
+        return PageTiming(self, page_type, cProfile.Profile() if self.slowest else None)
+
+    def record(self, page: PageTiming, path: str, size: int) -> None:
+        """Append a page to this process's spool file."""
+        if self._pid != os.getpid():
+            # First page in this process (forked children inherit the parent's state)
+            self._pid = os.getpid()
+            self._spool = open(os.path.join(self.spool_dir, f"{self._pid}.jsonl"), 'a',
+                               encoding='utf8', buffering=1)
+            self._kept = []
+        seconds = sum(page.phases.values())
+        entry = {'type': page.page_type, 'path': os.path.relpath(os.path.abspath(path), self.output_dir),
+                 'seconds': seconds, 'bytes': size, **page.phases}
+        if page.cprofile is not None:
+            entry['profile'] = self._keep_profile(page.cprofile, seconds)
+        self._spool.write(json.dumps(entry) + "\n")
+
+    def _keep_profile(self, profile: cProfile.Profile, seconds: float) -> Optional[str]:
+        """Dump profile if it is among this process's slowest pages; returns its file name."""
+        if len(self._kept) >= self.slowest and seconds <= self._kept[0][0]:
+            return None
+        self._sequence += 1
+        filename = f"{self._pid}-{self._sequence}.prof"
+        profile.dump_stats(os.path.join(self.spool_dir, filename))
+        if len(self._kept) >= self.slowest:
+            _, evicted = heapq.heapreplace(self._kept, (seconds, filename))
+            os.remove(os.path.join(self.spool_dir, evicted))
+        else:
+            heapq.heappush(self._kept, (seconds, filename))
+        return filename
+
+    def _read_spool(self) -> List[Dict[str, Any]]:
+        pages = {}
+        for filename in sorted(os.listdir(self.spool_dir)):
+            if filename.endswith('.jsonl'):
+                with open(os.path.join(self.spool_dir, filename), encoding='utf8') as f:
+                    for line in f:
+                        entry = json.loads(line)
+                        # A page type re-rendered after a failed early render counts once
+                        pages[entry['path']] = entry
+        return list(pages.values())
+
+    def report(self) -> Dict[str, Any]:
+        """Merge the spool files, write render-profile.json and return its content."""
+        if self._spool is not None and self._pid == os.getpid():
+            self._spool.close()
+        pages = self._read_spool()
+        by_type = {}
+        for entry in pages:
+            by_type.setdefault(entry['type'], []).append(entry)
+        page_types = {page_type: _summarize(entries) for page_type, entries in sorted(by_type.items())}
+
+        slowest = []
+        if self.slowest:
+            os.makedirs(self.slowest_dir, exist_ok=True)
+            profiled = [entry for entry in pages if entry.get('profile')
+                        and os.path.exists(os.path.join(self.spool_dir, entry['profile']))]
+            profiled.sort(key=lambda entry: entry['seconds'], reverse=True)
+            for rank, entry in enumerate(profiled[:self.slowest], 1):
+                name = f"{rank:02d}-{entry['type']}-{_safe_name(entry['path'])}.prof"
+                os.replace(os.path.join(self.spool_dir, entry['profile']), os.path.join(self.slowest_dir, name))
+                slowest.append({'path': entry['path'], 'type': entry['type'],
+                                'ms': round(entry['seconds'] * 1000, 2), 'profile': os.path.join('slowest', name)})
+        rmtree(self.spool_dir, ignore_errors=True)
+
+        report = {
+            'pages': len(pages),
+            'seconds': round(sum(entry['seconds'] for entry in pages), 3),
+            'bytes': sum(entry['bytes'] for entry in pages),
+            'page_types': page_types,
+            'slowest': slowest,
+        }
+        with open(os.path.join(self.report_dir, PROFILE_REPORT), 'w', encoding='utf8') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def _summarize(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-phase totals and p50/p95/max (milliseconds) for one page type."""
+    summary = {'pages': len(entries), 'bytes': sum(entry['bytes'] for entry in entries)}
+    for phase in PHASES + ('seconds',):
+        values = sorted(entry[phase] for entry in entries)
+        summary['total' if phase == 'seconds' else phase] = {
+            'sum_s': round(sum(values), 3),
+            'p50_ms': round(_percentile(values, 0.5) * 1000, 2),
+            'p95_ms': round(_percentile(values, 0.95) * 1000, 2),
+            'max_ms': round(values[-1] * 1000, 2),
+        }
+    summary['slowest_page'] = max(entries, key=lambda entry: entry['seconds'])['path']
+    return summary
+
+
+def _safe_name(path: str) -> str:
+    return re.sub(r'[^A-Za-z0-9._-]+', '_', path)[:80]
+
+
+def format_report(report: Dict[str, Any]) -> List[str]:
+    """Progress log lines for a report: one per page type, slowest first."""
+    lines = [f"Render profile: {report['pages']:,} pages, {report['seconds']:.2f}s render-process time, "
+             f"{report['bytes'] / 1048576:.1f} MB"]
+    ordered = sorted(report['page_types'].items(), key=lambda item: item[1]['total']['sum_s'], reverse=True)
+    for page_type, summary in ordered:
+        total = summary['total']
+        lines.append(
+            f"  {page_type}: {summary['pages']:,} pages, {total['sum_s']:.2f}s "
+            f"(context {summary['context']['sum_s']:.2f}s, render {summary['render']['sum_s']:.2f}s, "
+            f"write {summary['write']['sum_s']:.2f}s), "
+            f"p50 {total['p50_ms']:.1f}ms / p95 {total['p95_ms']:.1f}ms / max {total['max_ms']:.1f}ms "
+            f"({summary['slowest_page']})")
+    for entry in report['slowest']:
+        lines.append(f"  cProfile {entry['ms']:.1f}ms {entry['path']} -> {entry['profile']}")
+    return lines
+
+
+def start_page(page_type: str):
+    """Start timing a page (a no-op timer unless profiling is enabled)."""
+    if _profiler is None:
+        return _NULL_PAGE
+    return _profiler.start_page(page_type)
+
+
+def enable(report_dir: str, output_dir: str, slowest: int = 0) -> RenderProfiler:
+    """Start profiling pages rendered by this process and processes forked from it."""
+    global _profiler
+    _profiler = RenderProfiler(report_dir, output_dir, slowest)
+    return _profiler
+
+
+def active() -> Optional[RenderProfiler]:
+    return _profiler
+
+
+def finish() -> Optional[Dict[str, Any]]:
+    """Write the report and stop profiling; returns None when profiling was off."""
+    global _profiler
+    if _profiler is None:
+        return None
+    profiler, _profiler = _profiler, None
+    return profiler.report()
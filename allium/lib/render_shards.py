@@ -0,0 +1,111 @@
+"""
+File: render_shards.py
+
+Sharded page rendering from a relay snapshot (relay_snapshot.py).
+
+``allium.py render --snapshot FILE --shard I/N`` renders the pages whose path
+(relative to the output directory) hashes to shard I of N, so N processes or
+hosts can split one site build. The partition only depends on the page path,
+so every shard of the same snapshot agrees on it. Each shard leaves a shard
+record in the output directory listing the pages it wrote; once all N records
+are there (shards on other hosts copy their output in first), ``--merge N``
+writes what needs the whole site: static files, stylesheet, search index and
+the output manifest.
+"""
+
+import json
+import os
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+SHARD_RECORD_FILENAME = '.allium-shard-{index}-of-{count}.json'
+SHARD_RECORD_VERSION = 1
+
+# (shard index, shard count); index is 1-based
+Shard = Tuple[int, int]
+
+
+class ShardError(ValueError):
+    """Shard records are missing or do not belong to the same snapshot."""
+
+
+def parse_shard(text: str) -> Shard:
+    """Parse "I/N" (1 <= I <= N) into (I, N)."""
+    index, separator, count = text.partition('/')
+    if not separator or not index.strip().isdigit() or not count.strip().isdigit():
+        raise ValueError(f"expected I/N, e.g. 1/4, got {text!r}")
+    index, count = int(index), int(count)
+    if not 1 <= index <= count:
+        raise ValueError(f"shard index must be between 1 and {count}, got {index}")
+    return index, count
+
+
+def page_shard(relative_path: str, count: int) -> int:
+    """The shard (1-based) that renders the page at relative_path (forward slashes)."""
+    return zlib.crc32(relative_path.encode('utf8')) % count + 1
+
+
+def in_shard(shard: Optional[Shard], relative_path: str) -> bool:
+    """Whether the page at relative_path belongs to shard (every page does when not sharding)."""
+    return shard is None or page_shard(relative_path, shard[1]) == shard[0]
+
+
+def _record_path(output_dir: str, index: int, count: int) -> str:
+    return os.path.join(output_dir, SHARD_RECORD_FILENAME.format(index=index, count=count))
+
+
+def write_shard_record(output_dir: str, shard: Shard, timestamp: str, manifest) -> str:
+    """Record the pages a shard wrote (its OutputManifest) for the merge step; returns the file path."""
+    index, count = shard
+    path = _record_path(output_dir, index, count)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf8') as f:
+        json.dump({
+            'version': SHARD_RECORD_VERSION,
+            'shard': index,
+            'count': count,
+            'timestamp': timestamp,
+            'written': manifest.written,
+            'unchanged': manifest.unchanged,
+            'files': manifest.current,
+        }, f, separators=(',', ':'), sort_keys=True)
+    os.replace(temp_path, path)
+    return path
+
+
+def read_shard_records(output_dir: str, count: int, timestamp: str) -> List[Dict[str, Any]]:
+    """
+    Load the records of all count shards.
+
+    Raises:
+        ShardError: A record is missing or unreadable, or was rendered from a
+                    snapshot with a different timestamp
+    """
+    records = []
+    missing = []
+    for index in range(1, count + 1):
+        try:
+            with open(_record_path(output_dir, index, count), 'r', encoding='utf8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            missing.append(str(index))
+            continue
+        if record.get('version') != SHARD_RECORD_VERSION:
+            missing.append(str(index))
+            continue
+        if record.get('timestamp') != timestamp:
+            raise ShardError(f"shard {index}/{count} was rendered from a different snapshot "
+                             f"({record.get('timestamp')}, expected {timestamp})")
+        records.append(record)
+    if missing:
+        raise ShardError(f"no shard record in {output_dir} for shard(s) {', '.join(missing)} of {count}")
+    return records
+
+
+def remove_shard_records(output_dir: str, count: int) -> None:
+    """Delete the shard records once they are merged into the output manifest."""
+    for index in range(1, count + 1):
+        try:
+            os.remove(_record_path(output_dir, index, count))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,173 @@
+"""
+File: row_fragments.py
+
+Relay row fragments shared by the relay listing pages.
+
+Every page built from relay-list.html (AS, country, platform, flag and
+first_seen pages, top 500 and all relays) renders one table row per relay from
+relay-row.html, so a relay's row used to be rendered again on each listing it
+appears on: one AS, country, platform and first_seen page and every one of its
+flag pages.
+
+RowFragmentCache renders each relay's row once per page variant (path prefix,
+with or without the detail page columns) and reuses the markup on every page of
+that variant. A detail page does not link to itself, so the AS page drops the
+AS link and so on: for those the cache keeps a second row with every such cell
+unlinked and splices the page type's cells into the linked row. A relay
+therefore costs at most two row renders per variant, however many listings
+show it.
+
+Rows are rendered in whichever process renders the page: the parent, fork()ed
+pool workers and early-render children each fill their own copy of the cache
+(workers inherit what the parent had). Workers report their counters with each
+task result (take_stats) and the parent adds them up, so the progress output
+shows the hit rate and the row rendering time saved for the whole run.
+"""
+
+import re
+import time
+
+from jinja2 import pass_context
+from markupsafe import Markup
+
+ROW_TEMPLATE = "relay-row.html"
+
+# Cells of a relay row in relay-row.html order (the extended cells only on detail pages)
+ROW_CELLS = ('status', 'nickname', 'aroi', 'contact', 'bandwidth', 'measured', 'ip', 'as', 'as_name',
+             'country', 'platform', 'flags', 'first_seen', 'last_restarted')
+EXTENDED_CELLS = ('measured', 'last_restarted')
+
+# Cells that do not link to the page type showing them (e.g. the AS cell on AS pages)
+SELF_LINK_CELLS = {
+    'contact': ('aroi', 'contact'),
+    'as': ('as',),
+    'country': ('country',),
+    'platform': ('platform',),
+    'first_seen': ('first_seen',),
+}
+
+_CELL_START_RE = re.compile(r'(?=<td[\s>])')
+
+
+def _split_cells(row):
+    """Split a rendered row into the text before the first cell and one segment per cell."""
+    return _CELL_START_RE.split(row)
+
+
+class RowFragmentCache:
+    """Rendered relay rows of one site generation, by relay fingerprint and page variant."""
+
+    def __init__(self):
+        self.rows = {}  # (fingerprint, path_prefix, extended, base_url) -> [linked segments, unlinked segments]
+        self.hits = 0  # rows served without rendering
+        self.renders = 0  # row template renders
+        self.render_seconds = 0.0
+
+    def _render(self, template, context_vars, plain_cells):
+        start = time.perf_counter()
+        row = template.render(plain_cells=plain_cells, **context_vars)
+        self.render_seconds += time.perf_counter() - start
+        self.renders += 1
+        return _split_cells(row)
+
+    def row(self, template, relay, key, context_vars):
+        """
+        The row markup of relay for a listing of page type key.
+
+        context_vars are the row template variables other than plain_cells
+        (relay, page_ctx, extended_columns, base_url, validated_aroi_domains).
+        Validated AROI domains are the same for every page of a run.
+        """
+        entry_key = (relay['fingerprint'], context_vars['page_ctx']['path_prefix'],
+                     context_vars['extended_columns'], context_vars['base_url'])
+        entry = self.rows.get(entry_key)
+        rendered = False
+        if entry is None:
+            entry = self.rows[entry_key] = [self._render(template, context_vars, ()), None]
+            rendered = True
+        segments = entry[0]
+
+        own_cells = SELF_LINK_CELLS.get(key)
+        if own_cells:
+            if entry[1] is None:
+                entry[1] = self._render(template, context_vars, tuple(SELF_LINK_CELLS))
+                rendered = True
+            unlinked = entry[1]
+            cells = [cell for cell in ROW_CELLS if context_vars['extended_columns'] or cell not in EXTENDED_CELLS]
+            if len(segments) != len(cells) + 1 or len(unlinked) != len(segments):
+                # A row that does not split into its cells: render this variant directly
+                return ''.join(self._render(template, context_vars, own_cells))
+            segments = list(segments)
+            for cell in own_cells:
+                index = cells.index(cell) + 1
+                segments[index] = unlinked[index]
+
+        if not rendered:
+            self.hits += 1
+        return ''.join(segments)
+
+    def clear(self):
+        """Drop the rendered rows (the counters are kept for describe())."""
+        self.rows = {}
+
+    def take_stats(self):
+        """Counters since the last call, then reset (worker processes report these to the parent)."""
+        stats = (self.hits, self.renders, self.render_seconds)
+        self.hits, self.renders, self.render_seconds = 0, 0, 0.0
+        return stats
+
+    def add_stats(self, stats):
+        """Add counters reported by another process (take_stats)."""
+        if stats:
+            hits, renders, render_seconds = stats
+            self.hits += hits
+            self.renders += renders
+            self.render_seconds += render_seconds
+
+    def describe(self):
+        """Progress summary: rows rendered and reused, and the rendering time reuse saved."""
+        used = self.hits + self.renders
+        if not used:
+            return "Relay row fragments: no relay listings rendered"
+        per_render = self.render_seconds / self.renders if self.renders else 0.0
+        return (f"Relay row fragments: {self.renders} rendered, {self.hits} reused "
+                f"({self.hits / used * 100:.1f}% hit rate), "
+                f"~{self.hits * per_render:.2f}s of row rendering saved "
+                f"({per_render * 1000:.2f}ms/row)")
+
+
+def take_stats(relay_set):
+    """take_stats() of relay_set's row cache, or None when it has none."""
+    cache = getattr(relay_set, 'row_fragments', None)
+    return cache.take_stats() if cache is not None else None
+
+
+def add_stats(relay_set, stats):
+    """Add counters from a worker or child process to relay_set's row cache."""
+    cache = getattr(relay_set, 'row_fragments', None)
+    if cache is not None:
+        cache.add_stats(stats)
+
+
+@pass_context
+def relay_row(context, relay):
+    """
+    Jinja global: the table row of relay on a relay-list.html page.
+
+    Reads the page's key, is_index, page_ctx, base_url and validated_aroi_domains,
+    and uses the row cache of the relay set being rendered (rendering the row
+    directly when it has none, e.g. outside generate_site()).
+    """
+    key = context.get('key')
+    context_vars = {
+        'relay': relay,
+        'page_ctx': {'path_prefix': context['page_ctx']['path_prefix']},
+        'extended_columns': bool(key and not context.get('is_index')),
+        'base_url': context.get('base_url'),
+        'validated_aroi_domains': context.get('validated_aroi_domains'),
+    }
+    template = context.environment.get_template(ROW_TEMPLATE)
+    cache = getattr(context.get('relays'), 'row_fragments', None)
+    if cache is None:
+        return Markup(template.render(plain_cells=SELF_LINK_CELLS.get(key, ()), **context_vars))
+    return Markup(cache.row(template, relay, key, context_vars))
@@ -3,6 +3,7 @@ File: allium/lib/search_index.py
 
 Search index generator for Cloudflare Pages Function search.
 Generates a compact JSON index of relays and families for server-side search.
+The same index is also written as the sharded v2 layout (search_shards.py).
 
 Design principles:
 - Compute-efficient: Precomputed lookups, minimal iterations, parallel processing
@@ -298,27 +299,21 @@ def _process_relay_batch(
 # MAIN GENERATOR
 # =============================================================================
 
-def generate_search_index(
+def build_search_index(
     relays_data: Dict[str, Any],
-    output_path: str,
     use_parallel: bool = True,
     validated_aroi_domains: Optional[Set[str]] = None
-) -> Dict[str, int]:
+) -> Dict[str, Any]:
     """
-    Generate a compact search index for the Cloudflare Pages Function.
+    Build the search index (meta, relays, families and lookups) in memory.
 
     Args:
         relays_data: The RELAY_SET.json data structure from allium
-        output_path: Path to write the search-index.json file
         use_parallel: Whether to use parallel processing for large datasets
         validated_aroi_domains: Set of validated AROI domains for operator page redirects
 
     Returns:
-        Dictionary with statistics about the generated index
-        
-    Security:
-        - Validates output_path is writable
-        - Uses atomic write pattern to prevent partial writes
+        The index as written to search-index.json
     """
     relays = relays_data.get('relays', [])
     sorted_data = relays_data.get('sorted', {})
@@ -431,11 +426,20 @@ def generate_search_index(
         }
     }
 
-    # Write minified JSON (atomic write pattern for safety)
+    return index
+
+
+def write_json_atomic(data: Any, output_path: str) -> int:
+    """
+    Write data as minified JSON to output_path (atomic write pattern for safety).
+
+    Returns:
+        Size of the written file in bytes
+    """
     temp_path = output_path + '.tmp'
     try:
         with open(temp_path, 'w', encoding='utf-8') as f:
-            json.dump(index, f, separators=(',', ':'), ensure_ascii=False)
+            json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
         # Atomic rename
         os.replace(temp_path, output_path)
     except Exception:
@@ -443,14 +447,45 @@ def generate_search_index(
         if os.path.exists(temp_path):
             os.remove(temp_path)
         raise
+    return os.path.getsize(output_path)
+
+
+def generate_search_index(
+    relays_data: Dict[str, Any],
+    output_path: str,
+    use_parallel: bool = True,
+    validated_aroi_domains: Optional[Set[str]] = None,
+    sharded_output_dir: Optional[str] = None
+) -> Dict[str, int]:
+    """
+    Generate a compact search index for the Cloudflare Pages Function.
 
-    file_size = os.path.getsize(output_path)
+    Args:
+        relays_data: The RELAY_SET.json data structure from allium
+        output_path: Path to write the search-index.json file
+        use_parallel: Whether to use parallel processing for large datasets
+        validated_aroi_domains: Set of validated AROI domains for operator page redirects
+        sharded_output_dir: Also write the sharded v2 index (search_shards.py) to this directory
 
-    return {
-        'relay_count': len(relay_entries),
-        'family_count': len(family_entries),
-        'as_count': len(as_names),
-        'country_count': len(country_names),
+    Returns:
+        Dictionary with statistics about the generated index
+        
+    Security:
+        - Validates output_path is writable
+        - Uses atomic write pattern to prevent partial writes
+    """
+    index = build_search_index(relays_data, use_parallel, validated_aroi_domains)
+    file_size = write_json_atomic(index, output_path)
+
+    stats = {
+        'relay_count': len(index['relays']),
+        'family_count': len(index['families']),
+        'as_count': len(index['lookups']['as_names']),
+        'country_count': len(index['lookups']['country_names']),
         'file_size_bytes': file_size,
         'file_size_kb': round(file_size / 1024, 1)
     }
+    if sharded_output_dir:
+        from .search_shards import write_sharded_index
+        stats.update(write_sharded_index(index, sharded_output_dir))
+    return stats
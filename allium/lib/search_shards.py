@@ -0,0 +1,429 @@
+"""
+File: allium/lib/search_shards.py
+
+Sharded search index (v2) for the Cloudflare Pages Function search.
+
+search-index.json (search_index.py) holds every relay, family and lookup table
+in one file, so the search function downloads and parses the whole network on
+every cold start and then scans it linearly for each query. The v2 layout
+splits the same index into small files and adds inverted indexes, so a query
+reads the manifest plus one or two shards:
+
+    search/
+      manifest.json             meta, shard layout, query -> shard map, small lookups
+      relays/<FP prefix>.json   compact relay entries, by fingerprint prefix
+      families/<ID prefix>.json compact family entries, by family ID prefix
+      terms/<kind>/<n>.json     inverted index of one term kind, shard n = fnv1a32(term) % shards
+
+Term kinds (terms are lowercase unless noted):
+    nick    exact nickname -> {"f": [fingerprints], "fam": ID if the matches share one family}
+    tok     nickname token prefix -> [fingerprints] (first FUZZY_LIMIT relays)
+    fnick   family member nickname token prefix -> [family IDs] (first FAMILY_NICKNAME_LIMIT)
+    px      family nickname prefix -> [family ID, "prefix" | "generic_prefix"]
+    aroi    AROI domain -> {"fam": ID} or {"c": contact md5, "a": domain}, plus "v": 1 if validated
+    as      AS number ("AS1234", upper case) -> AS name
+    asname  AS name token prefix -> [AS number, AS name]
+    ip      IP address (as written in relay entries) -> fingerprint
+
+Token prefixes are the prefixes of every suffix of a name that starts at a
+word, camelCase or digit boundary ("MyTorRelay01" -> "my...", "tor...",
+"relay...", "01"), so a fuzzy query matches where v1's substring scan matches
+at such a boundary. Postings keep v1's result limits and relay/family order,
+so ShardedSearchIndex.search() returns what the v1 search returns for
+everything else. benchmark_search.py compares query latency and bytes loaded.
+"""
+
+import json
+import os
+import re
+import shutil
+from typing import Any, Dict, List, Optional
+
+# Shard sizing: entry shards by fingerprint prefix (at most 16**MAX_PREFIX_LENGTH files),
+# term shards by hash (a power of two, at most MAX_TERM_SHARDS files per kind)
+TARGET_SHARD_BYTES = 32 * 1024
+MAX_PREFIX_LENGTH = 2
+MAX_TERM_SHARDS = 256
+
+# Result limits of the v1 search (functions/search.js)
+EXACT_NICKNAME_LIMIT = 50
+FUZZY_LIMIT = 30
+PARTIAL_RELAY_LIMIT = 10
+PARTIAL_FAMILY_LIMIT = 5
+FAMILY_NICKNAME_LIMIT = 10
+
+TERM_KINDS = ('nick', 'tok', 'fnick', 'px', 'aroi', 'as', 'asname', 'ip')
+
+# Which files answer which query step (in search order)
+QUERY_SHARDS = {
+    'fingerprint': ['relays', 'families'],
+    'exact_nickname': ['nick'],
+    'family_prefix': ['px'],
+    'aroi_domain': ['aroi'],
+    'as_number': ['as'],
+    'as_name': ['asname'],
+    'country': ['manifest'],
+    'ip_address': ['ip'],
+    'platform_flag': ['manifest'],
+    'fuzzy_nickname': ['tok'],
+    'family_nickname': ['fnick'],
+}
+
+FULL_FINGERPRINT = re.compile(r'^[A-Fa-f0-9]{40}$')
+PARTIAL_FINGERPRINT = re.compile(r'^[A-Fa-f0-9]{6,39}$')
+IP_ADDRESS = re.compile(r'^[\d.:a-fA-F]+$')
+AS_NUMBER = re.compile(r'^(?:AS)?(\d+)$', re.IGNORECASE)
+
+_TOKEN_START_RE = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+|[^\W\d_]+')
+
+
+# =============================================================================
+# TERMS AND SHARD KEYS
+# =============================================================================
+
+def term_shard(term: str, shards: int) -> int:
+    """Term shard number: 32-bit FNV-1a of the UTF-8 term modulo shards (a power of two)."""
+    h = 0x811c9dc5
+    for byte in term.encode('utf-8'):
+        h = ((h ^ byte) * 0x01000193) & 0xffffffff
+    return h & (shards - 1)
+
+
+def token_prefixes(name: str) -> List[str]:
+    """Lowercase prefixes of every suffix of name starting at a token boundary (no duplicates)."""
+    terms = {}
+    for match in _TOKEN_START_RE.finditer(name):
+        suffix = name[match.start():].lower()
+        for end in range(1, len(suffix) + 1):
+            terms[suffix[:end]] = None
+    return list(terms)
+
+
+def _prefix_length(entries: List[Dict[str, Any]]) -> int:
+    """Fingerprint prefix length that keeps entry shards near TARGET_SHARD_BYTES."""
+    size = len(json.dumps(entries, separators=(',', ':')))
+    length = 1
+    while length < MAX_PREFIX_LENGTH and size / 16 ** length > TARGET_SHARD_BYTES:
+        length += 1
+    return length
+
+
+def _term_shard_count(postings: Dict[str, Any]) -> int:
+    size = len(json.dumps(postings, separators=(',', ':')))
+    shards = 1
+    while shards < MAX_TERM_SHARDS and size / shards > TARGET_SHARD_BYTES:
+        shards *= 2
+    return shards
+
+
+def _shard_entries(entries: List[Dict[str, Any]], key: str, length: int) -> Dict[str, List[Dict[str, Any]]]:
+    shards: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in entries:
+        shards.setdefault(entry[key][:length].upper(), []).append(entry)
+    return shards
+
+
+# =============================================================================
+# INVERTED INDEXES
+# =============================================================================
+
+def _add_limited(postings: Dict[str, List[str]], term: str, value: str, limit: int) -> None:
+    values = postings.setdefault(term, [])
+    if len(values) < limit:
+        values.append(value)
+
+
+def build_term_index(index: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Inverted indexes of a v1 index (build_search_index()), by term kind."""
+    relays = index['relays']
+    families = index['families']
+    terms: Dict[str, Dict[str, Any]] = {kind: {} for kind in TERM_KINDS}
+
+    nick, tok, ip = terms['nick'], terms['tok'], terms['ip']
+    members: Dict[str, List[str]] = {}
+    for relay in relays:
+        fingerprint, nickname = relay['f'], relay.get('n', '')
+        _add_limited(nick, nickname.lower(), relay, EXACT_NICKNAME_LIMIT)
+        for term in token_prefixes(nickname):
+            _add_limited(tok, term, fingerprint, FUZZY_LIMIT)
+        for address in relay.get('ip', []):
+            ip.setdefault(address, fingerprint)
+        if relay.get('fam'):
+            members.setdefault(relay['fam'], []).append(nickname)
+    for term, matches in nick.items():
+        posting = {'f': [relay['f'] for relay in matches]}
+        family_ids = {relay['fam'] for relay in matches if relay.get('fam')}
+        if len(matches) > 1 and len(family_ids) == 1:
+            posting['fam'] = family_ids.pop()
+        nick[term] = posting
+
+    fnick, px, aroi = terms['fnick'], terms['px'], terms['aroi']
+    generic_px: Dict[str, str] = {}
+    for family in families:
+        family_terms = {}
+        for nickname in members.get(family['id'], []):
+            family_terms.update(dict.fromkeys(token_prefixes(nickname)))
+        for term in family_terms:
+            _add_limited(fnick, term, family['id'], FAMILY_NICKNAME_LIMIT)
+        if family.get('px'):
+            prefix = family['px'].lower()
+            if not family.get('pxg'):
+                px.setdefault(prefix, [family['id'], 'prefix'])
+            else:
+                generic_px.setdefault(prefix, family['id'])
+        if family.get('a'):
+            aroi.setdefault(family['a'].lower(), {'fam': family['id']})
+    for prefix, family_id in generic_px.items():
+        px.setdefault(prefix, [family_id, 'generic_prefix'])
+    for relay in relays:
+        if relay.get('a') and relay.get('c'):
+            aroi.setdefault(relay['a'].lower(), {'c': relay['c'], 'a': relay['a']})
+    for domain in index['lookups'].get('validated_aroi_domains', []):
+        aroi.setdefault(domain.lower(), {})['v'] = 1
+
+    as_terms, asname = terms['as'], terms['asname']
+    for as_number, as_name in index['lookups']['as_names'].items():
+        as_terms[as_number.upper()] = as_name
+        for term in token_prefixes(as_name):
+            asname.setdefault(term, [as_number, as_name])
+    return terms
+
+
+# =============================================================================
+# WRITER
+# =============================================================================
+
+def _write(path: str, data: Any) -> int:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'), ensure_ascii=False)
+    return os.path.getsize(path)
+
+
+def write_sharded_index(index: Dict[str, Any], output_dir: str) -> Dict[str, int]:
+    """
+    Write the v2 layout of a v1 index (build_search_index()) to output_dir.
+
+    The files are written to a temporary sibling directory that then replaces
+    output_dir, so the search function never sees a half-written index.
+
+    Returns:
+        Dictionary with the shard file count and sizes
+    """
+    output_dir = os.path.normpath(output_dir)
+    temp_dir = output_dir + '.tmp'
+    if os.path.exists(temp_dir):
+        shutil.rmtree(temp_dir)
+
+    relay_prefix = _prefix_length(index['relays'])
+    family_prefix = _prefix_length(index['families'])
+    terms = build_term_index(index)
+    term_shards = {kind: _term_shard_count(postings) for kind, postings in terms.items() if postings}
+    lookups = index['lookups']
+    manifest = {
+        'meta': {**index['meta'], 'version': '2.0'},
+        'relays': {'path': 'relays/{prefix}.json', 'prefix_length': relay_prefix},
+        'families': {'path': 'families/{prefix}.json', 'prefix_length': family_prefix},
+        'terms': {'path': 'terms/{kind}/{shard}.json', 'hash': 'fnv1a32', 'shards': term_shards},
+        'queries': QUERY_SHARDS,
+        'lookups': {key: lookups[key] for key in ('country_names', 'platforms', 'flags')},
+    }
+
+    files, size = 0, 0
+    try:
+        for name, entries, length in (('relays', index['relays'], relay_prefix),
+                                      ('families', index['families'], family_prefix)):
+            for prefix, shard in _shard_entries(entries, 'f' if name == 'relays' else 'id', length).items():
+                size += _write(os.path.join(temp_dir, name, f"{prefix}.json"), shard)
+                files += 1
+        for kind, shards in term_shards.items():
+            sharded: Dict[int, Dict[str, Any]] = {}
+            for term, posting in terms[kind].items():
+                sharded.setdefault(term_shard(term, shards), {})[term] = posting
+            for shard, postings in sharded.items():
+                size += _write(os.path.join(temp_dir, 'terms', kind, f"{shard}.json"), postings)
+                files += 1
+        manifest_size = _write(os.path.join(temp_dir, 'manifest.json'), manifest)
+    except Exception:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    if os.path.exists(output_dir):
+        old_dir = output_dir + '.old'
+        os.replace(output_dir, old_dir)
+        os.replace(temp_dir, output_dir)
+        shutil.rmtree(old_dir)
+    else:
+        os.replace(temp_dir, output_dir)
+
+    return {
+        'shard_file_count': files + 1,
+        'shard_size_bytes': size + manifest_size,
+        'manifest_size_bytes': manifest_size,
+    }
+
+
+# =============================================================================
+# READER (reference for the search function)
+# =============================================================================
+
+def _family_result(f: Dict[str, Any], hint: Optional[str] = None) -> Dict[str, Any]:
+    """Return operator page if family has validated AROI, otherwise family page."""
+    if f.get('v') and f.get('a'):
+        return {'type': 'operator', 'aroi_domain': f['a'], 'hint': hint}
+    return {'type': 'family', 'family_id': f['id'], 'hint': hint}
+
+
+class ShardedSearchIndex:
+    """
+    Query a v2 index directory, reading only the files a query needs.
+
+    Follows the search steps of the v1 search function (full and partial
+    fingerprint, exact nickname, family prefix, AROI domain, AS, country, IP,
+    platform or flag, fuzzy nickname, family member nickname). Files are parsed
+    once per instance, like a warm search function isolate; bytes_loaded and
+    files_loaded count what was read.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.bytes_loaded = 0
+        self.files_loaded = 0
+        self._files: Dict[str, Any] = {}
+        self.manifest = self._load('manifest.json', {})
+
+    def _load(self, path: str, default: Any) -> Any:
+        if path not in self._files:
+            try:
+                with open(os.path.join(self.directory, path), 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                self._files[path] = default  # No entries or terms in this shard
+            else:
+                self.bytes_loaded += len(data)
+                self.files_loaded += 1
+                self._files[path] = json.loads(data)
+        return self._files[path]
+
+    def _entries(self, name: str, fingerprint: str) -> List[Dict[str, Any]]:
+        layout = self.manifest[name]
+        return self._load(layout['path'].format(prefix=fingerprint[:layout['prefix_length']].upper()), [])
+
+    def _relay(self, fingerprint: str) -> Dict[str, Any]:
+        return next(r for r in self._entries('relays', fingerprint) if r['f'] == fingerprint)
+
+    def _family(self, family_id: str) -> Dict[str, Any]:
+        return next(f for f in self._entries('families', family_id) if f['id'] == family_id)
+
+    def _posting(self, kind: str, term: str) -> Any:
+        layout = self.manifest['terms']
+        shards = layout['shards'].get(kind)
+        if not shards:
+            return None
+        return self._load(layout['path'].format(kind=kind, shard=term_shard(term, shards)), {}).get(term)
+
+    def _relay_result(self, fingerprint: str, hint: Optional[str] = None) -> Dict[str, Any]:
+        result = {'type': 'relay', 'fingerprint': fingerprint, 'nickname': self._relay(fingerprint).get('n', '')}
+        if hint:
+            result['hint'] = hint
+        return result
+
+    def search(self, query: str) -> Dict[str, Any]:
+        """Result of query, in the v1 search function's result format."""
+        q = query.strip()
+        if not q:
+            return {'type': 'not_found', 'query': ''}
+        q_lower = q.lower()
+        q_upper = q.upper()
+        lookups = self.manifest['lookups']
+
+        # Step 1: Full fingerprint
+        if FULL_FINGERPRINT.match(q):
+            for r in self._entries('relays', q_upper):
+                if r['f'].upper() == q_upper:
+                    return {'type': 'relay', 'fingerprint': r['f'], 'nickname': r.get('n', '')}
+            for f in self._entries('families', q_upper):
+                if f['id'].upper() == q_upper:
+                    return _family_result(f)
+            return {'type': 'not_found', 'query': q}
+
+        # Step 2: Partial fingerprint (every match is in the shard of its prefix)
+        if PARTIAL_FINGERPRINT.match(q):
+            relay_matches = [r for r in self._entries('relays', q_upper)
+                             if r['f'].upper().startswith(q_upper)][:PARTIAL_RELAY_LIMIT]
+            family_matches = [f for f in self._entries('families', q_upper)
+                              if f['id'].upper().startswith(q_upper)][:PARTIAL_FAMILY_LIMIT]
+            if len(relay_matches) == 1 and len(family_matches) == 0:
+                return {'type': 'relay', 'fingerprint': relay_matches[0]['f'],
+                        'nickname': relay_matches[0].get('n', '')}
+            if len(family_matches) == 1 and len(relay_matches) == 0:
+                return _family_result(family_matches[0])
+            if relay_matches or family_matches:
+                return {'type': 'multiple', 'relays': len(relay_matches), 'families': len(family_matches)}
+
+        # Step 3: Exact nickname
+        posting = self._posting('nick', q_lower)
+        if posting:
+            if len(posting['f']) == 1:
+                return self._relay_result(posting['f'][0])
+            if 'fam' in posting:
+                return _family_result(self._family(posting['fam']), 'same_family')
+            return {'type': 'multiple', 'relays': len(posting['f']), 'hint': 'nickname'}
+
+        # Step 4: Family prefix (non-generic first, then generic)
+        posting = self._posting('px', q_lower)
+        if posting:
+            return _family_result(self._family(posting[0]), posting[1])
+
+        # Step 5: AROI domain
+        posting = self._posting('aroi', q_lower)
+        if posting and 'fam' in posting:
+            return _family_result(self._family(posting['fam']), 'aroi')
+        if posting and 'c' in posting:
+            return {'type': 'contact', 'contact_md5': posting['c'], 'aroi': posting['a']}
+
+        # Step 6: AS number, then AS name
+        as_match = AS_NUMBER.match(q)
+        if as_match:
+            as_num = f"AS{as_match.group(1)}"
+            as_name = self._posting('as', as_num)
+            if as_name is not None:
+                return {'type': 'as', 'as_number': as_num, 'as_name': as_name}
+        posting = self._posting('asname', q_lower)
+        if posting:
+            return {'type': 'as', 'as_number': posting[0], 'as_name': posting[1]}
+
+        # Step 7: Country
+        if q_lower in lookups['country_names']:
+            return {'type': 'country', 'country_code': q_lower, 'country_name': lookups['country_names'][q_lower]}
+        for code, name in lookups['country_names'].items():
+            if name.lower() == q_lower:
+                return {'type': 'country', 'country_code': code, 'country_name': name}
+
+        # Step 8: IP address
+        if IP_ADDRESS.match(q) and ('.' in q or ':' in q):
+            fingerprint = self._posting('ip', q)
+            if fingerprint:
+                return self._relay_result(fingerprint, 'ip')
+
+        # Step 9: Platform or flag
+        if q_lower in lookups['platforms']:
+            return {'type': 'platform', 'platform': q_lower}
+        if q_lower in lookups['flags']:
+            return {'type': 'flag', 'flag': q_lower}
+
+        # Step 10: Fuzzy nickname (token prefixes)
+        matches = self._posting('tok', q_lower)
+        if matches and len(matches) == 1:
+            return self._relay_result(matches[0], 'fuzzy')
+        if matches:
+            return {'type': 'multiple', 'relays': len(matches), 'hint': 'fuzzy_nickname'}
+
+        # Step 11: Family member nickname (token prefixes)
+        family_ids = self._posting('fnick', q_lower)
+        if family_ids and len(family_ids) == 1:
+            return _family_result(self._family(family_ids[0]), 'member_nickname')
+        if family_ids:
+            return {'type': 'multiple', 'families': len(family_ids), 'hint': 'family_nickname'}
+
+        return {'type': 'not_found', 'query': q}
@@ -13,9 +13,17 @@ To add a new sorted-by variant (e.g., "by-latency"):
 """
 
 import os
-from shutil import copytree
+from shutil import copytree, ignore_patterns
 
+from . import render_profiler
+from .output_manifest import OutputManifest
+from .precompress import DEFAULT_LEVEL, PageCompressor
+from .page_scheduler import EarlyPageRenderer
 from .page_context import get_page_context, get_misc_page_context, StandardTemplateContexts
+from .page_writer import ENV, _add_contact_validation_status, create_render_pool, set_authorities_attributes
+from .render_shards import in_shard, read_shard_records, remove_shard_records, write_shard_record
+from .row_fragments import RowFragmentCache
+from .stylesheet import load_stylesheet, output_size_report
 
 
 # =============================================================================
@@ -90,12 +98,67 @@ SORTED_PAGE_KEYS = [
     "first_seen",
 ]
 
+# Relays processing stages (see PROCESSING_STAGES in relays.py) read by detail page
+# types that can be rendered before processing finishes. Their listings use the
+# categorized relay rows, group total_data (bandwidth + health) and the validated AROI
+# domain set (health); nothing later in the pipeline changes them, so these pages are
+# written while AROI leaderboards, CollecTor evaluation and contact/family precompute
+# still run. Contact pages are left out: rendering them stores display data that relay
+# pages read later, which has to happen in the main process.
+EARLY_PAGE_DEPENDENCIES = {
+    key: ("as_rarity", "group_total_data", "network_health")
+    for key in ("as", "country", "flag", "platform", "first_seen")
+}
+
 
 # =============================================================================
 # SITE GENERATION
 # =============================================================================
 
-def generate_site(relay_set, args, progress_logger):
+def create_early_page_renderer(args, progress_logger):
+    """
+    Create the renderer that writes EARLY_PAGE_DEPENDENCIES page types during processing.
+
+    Hold it while the API workers run, pass its attach and release methods to the
+    coordinator (on_relay_set, on_fetch_complete) and the renderer to
+    generate_site(). Returns None when worker processes are disabled or fork() is
+    unavailable.
+    """
+    if not EarlyPageRenderer.available(args.mp_workers):
+        return None
+    return EarlyPageRenderer(
+        EARLY_PAGE_DEPENDENCIES, progress_logger,
+        prepare=lambda relay_set: _prepare_output(relay_set, args, progress_logger),
+    )
+
+
+def _prepare_output(relay_set, args, progress_logger, shard=None):
+    """Set up the stylesheet, render profiling, precompression and incremental output before the first page is written."""
+    relay_set.page_shard = shard
+    relay_set.row_fragments = RowFragmentCache()
+    formats = getattr(args, 'precompress', None)
+    relay_set.page_compressor = (PageCompressor(formats, getattr(args, 'precompress_level', DEFAULT_LEVEL))
+                                 if formats else None)
+    ENV.globals['stylesheet'] = load_stylesheet(inline_critical=getattr(args, 'inline_critical_css', False))
+    profile_dir = getattr(args, 'profile_render', None)
+    if profile_dir and render_profiler.active() is None:
+        # Enabled before early page renders fork, so their pages are profiled too
+        render_profiler.enable(profile_dir, args.output_dir, slowest=getattr(args, 'profile_slowest', 0))
+    if getattr(args, 'incremental', False):
+        # Incremental output: compare against the previous run's page hashes
+        if relay_set.output_manifest is None:
+            relay_set.output_manifest = OutputManifest.load(args.output_dir, volatile=[relay_set.timestamp])
+            if not relay_set.output_manifest.has_previous:
+                progress_logger.log_without_increment("No output manifest from a previous run - writing all pages")
+    elif shard is not None:
+        # Shards record their pages for the merge step, which saves the manifest
+        relay_set.output_manifest = OutputManifest(args.output_dir, volatile=[relay_set.timestamp])
+    else:
+        # A full run rewrites every page, so a manifest from an earlier run no longer matches
+        OutputManifest.discard(args.output_dir)
+
+
+def generate_site(relay_set, args, progress_logger, early_pages=None, shard=None):
     """
     Generate the complete static site from processed relay data.
     
@@ -106,17 +169,27 @@ def generate_site(relay_set, args, progress_logger):
         relay_set: Relays instance with fully processed data
         args: argparse namespace with output_dir, progress, etc.
         progress_logger: ProgressLogger instance for consistent progress tracking
+        early_pages: Optional EarlyPageRenderer attached during processing; the
+                     page types it wrote are not rendered again
+        shard: Optional (index, count) to render only the pages of one shard
+               (see render_shards.py); merge_site() completes the site
     """
-    # Path to the allium package directory (where static/ and templates/ live)
-    allium_pkg_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    
     progress_logger.log(f"Details API data loaded successfully - found {len(relay_set.json.get('relays', []))} relays")
 
+    _prepare_output(relay_set, args, progress_logger, shard)
+
     # Start page generation section
     progress_logger.start_section("Page Generation")
 
+    if shard is not None:
+        # Pages of other shards would have left these on relay_set first
+        _add_contact_validation_status(relay_set)
+        set_authorities_attributes(relay_set)
+
     # --- Standalone pages ---
     for page_def in STANDALONE_PAGES:
+        if not in_shard(shard, page_def["output"]):
+            continue
         progress_logger.log(f"Generating {page_def['label']}...")
         page_ctx = _build_page_context(page_def, relay_set)
         relay_set.write_misc(
@@ -127,40 +200,122 @@ def generate_site(relay_set, args, progress_logger):
         )
         progress_logger.log(f"Generated {page_def['label']}")
 
+    # One set of render workers for the listing, detail and relay pages. They are
+    # forked on the first parallel batch, once the parent has prepared what pages read
+    relay_set.render_pool = create_render_pool(relay_set)
+    try:
+        _write_listing_and_detail_pages(relay_set, progress_logger, early_pages, shard)
+    finally:
+        if relay_set.render_pool is not None:
+            relay_set.render_pool.close()
+            relay_set.render_pool = None
+
+    # --- Precompressed siblings (--precompress) ---
+    if relay_set.page_compressor is not None:
+        progress_logger.log_without_increment(relay_set.page_compressor.describe())
+
+    if shard is None:
+        _write_site_files(relay_set, args, progress_logger)
+    else:
+        # --- Shard record for merge_site() ---
+        manifest = relay_set.output_manifest
+        write_shard_record(args.output_dir, shard, relay_set.timestamp, manifest)
+        progress_logger.log_without_increment(
+            f"Shard {shard[0]}/{shard[1]}: {len(manifest.current)} pages "
+            f"({manifest.written} written, {manifest.unchanged} unchanged)")
+
+    # --- Render profile (--profile-render) ---
+    profile = render_profiler.finish()
+    if profile is not None:
+        for line in render_profiler.format_report(profile):
+            progress_logger.log_without_increment(line)
+
+    # End page generation section
+    progress_logger.end_section("Page Generation")
+    progress_logger.log("Allium static site generation completed successfully!")
+
+
+def _write_listing_and_detail_pages(relay_set, progress_logger, early_pages, shard):
+    """Write the misc sorted listings, the detail pages by key and the relay pages."""
     # --- Miscellaneous sorted pages ---
     progress_logger.log("Generating miscellaneous sorted pages...")
+    standard_contexts = StandardTemplateContexts(relay_set)
+    misc_pages = []
     for suffix, sorted_by in SORTED_BY_VARIANTS.items():
         for page_type, page_title in MISC_SORTED_PAGE_TYPES:
-            standard_contexts = StandardTemplateContexts(relay_set)
+            path = f"misc/{page_type}-{suffix}.html"
+            if not in_shard(shard, path):
+                continue
             page_ctx = standard_contexts.get_misc_page_context(
                 f"misc-{page_type}.html", page_title, sorted_by=sorted_by
             )
-            relay_set.write_misc(
-                template=f"misc-{page_type}.html",
-                path=f"misc/{page_type}-{suffix}.html",
-                sorted_by=sorted_by,
-                page_ctx=page_ctx,
-            )
+            misc_pages.append({
+                "template": f"misc-{page_type}.html",
+                "path": path,
+                "sorted_by": sorted_by,
+                "page_ctx": page_ctx,
+            })
+    # Group orderings are sorted once per (page type, sort key); pages render in parallel
+    relay_set.write_misc_pages(misc_pages)
     progress_logger.log(f"Generated {len(MISC_SORTED_PAGE_TYPES)} miscellaneous sorted pages")
 
     # --- Detail pages by key (family, contact, as, country, flag, platform, first_seen) ---
+    rendered_early = early_pages.collect(relay_set) if early_pages is not None else set()
     for key in SORTED_PAGE_KEYS:
-        relay_set.write_pages_by_key(key)
+        if key not in rendered_early:
+            relay_set.write_pages_by_key(key)
+    # Relay pages have no listings: report the row reuse of every listing and free the rows
+    progress_logger.log_without_increment(relay_set.row_fragments.describe())
+    relay_set.row_fragments.clear()
 
     # --- Individual relay pages ---
     progress_logger.log("Generating individual relay info pages...")
     relay_set.write_relay_info()
     progress_logger.log(f"Generated individual pages for {len(relay_set.json.get('relays', []))} relays")
 
+
+def merge_site(relay_set, args, progress_logger, shard_count):
+    """
+    Complete a site rendered by shard_count generate_site() shards into args.output_dir.
+
+    Writes the static files, stylesheet and search index, and saves the output
+    manifest of all shards' pages (with --incremental, pages the previous run
+    wrote but no shard did are removed).
+
+    Raises:
+        ShardError: A shard record is missing or belongs to a different snapshot
+    """
+    records = read_shard_records(args.output_dir, shard_count, relay_set.timestamp)
+    ENV.globals['stylesheet'] = load_stylesheet(inline_critical=getattr(args, 'inline_critical_css', False))
+    manifest = OutputManifest.load(args.output_dir, volatile=[relay_set.timestamp])
+    for record in records:
+        manifest.merge(record['files'], record['written'], record['unchanged'])
+    relay_set.output_manifest = manifest
+
+    progress_logger.start_section("Site Merge")
+    _write_site_files(relay_set, args, progress_logger)
+    remove_shard_records(args.output_dir, shard_count)
+    progress_logger.end_section("Site Merge")
+    progress_logger.log(f"Merged {shard_count} render shards into {args.output_dir}")
+
+
+def _write_site_files(relay_set, args, progress_logger):
+    """Write the files that cover the whole site: static files, search index and output manifest."""
+    # Path to the allium package directory (where static/ and templates/ live)
+    allium_pkg_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
     # --- Static files ---
     progress_logger.log("Copying static files...")
     static_src = os.path.join(allium_pkg_dir, "static")
     static_dst = os.path.join(args.output_dir, "static")
     if not os.path.exists(static_dst):
-        copytree(static_src, static_dst)
+        # The stylesheet source is published under its hashed name below
+        copytree(static_src, static_dst, ignore=ignore_patterns("allium.css"))
         progress_logger.log("Copied static files to output directory")
     else:
         progress_logger.log("Static files already exist, skipping copy")
+    stylesheet = ENV.globals['stylesheet']
+    stylesheet.write(args.output_dir)
 
     # --- Search index ---
     progress_logger.log("Generating search index...")
@@ -168,16 +323,24 @@ def generate_site(relay_set, args, progress_logger):
     search_index_path = os.path.join(args.output_dir, "search-index.json")
     search_stats = generate_search_index(
         relay_set.json, search_index_path,
-        validated_aroi_domains=getattr(relay_set, 'validated_aroi_domains', None)
+        validated_aroi_domains=getattr(relay_set, 'validated_aroi_domains', None),
+        sharded_output_dir=os.path.join(args.output_dir, "search")
     )
     progress_logger.log(
         f"Generated search index: {search_stats['relay_count']} relays, "
-        f"{search_stats['family_count']} families, {search_stats['file_size_kb']} KB"
+        f"{search_stats['family_count']} families, {search_stats['file_size_kb']} KB "
+        f"(sharded v2: {search_stats['shard_file_count']} files, "
+        f"{search_stats['manifest_size_bytes'] / 1024:.1f} KB manifest)"
     )
 
-    # End page generation section
-    progress_logger.end_section("Page Generation")
-    progress_logger.log("Allium static site generation completed successfully!")
+    # --- Incremental output bookkeeping ---
+    manifest = getattr(relay_set, 'output_manifest', None)
+    if manifest is not None:
+        manifest.remove_stale()
+        manifest.save()
+        progress_logger.log_without_increment(f"Incremental output: {manifest.summary()}")
+
+    progress_logger.log_without_increment(f"Output size: {output_size_report(args.output_dir, stylesheet)}")
 
 
 def _build_page_context(page_def, relay_set):
@@ -0,0 +1,101 @@
+"""
+File: stylesheet.py
+
+Site stylesheet as a content-hashed static asset.
+
+The allium CSS used to be inlined by templates/skeleton.html into every
+generated page (~21,700 pages, ~50 KB each). It now lives in
+static/css/allium.css and is written once per build as
+static/css/allium.<hash>.css, so browsers and CDNs can cache it forever and a
+CSS change gets a new URL. The skeleton reads the ``stylesheet`` template
+global (a Stylesheet) for the file name and, with --inline-critical-css, the
+critical sections to inline in <head>; the full stylesheet is then linked at the
+end of <body>.
+"""
+
+import glob
+import hashlib
+import os
+import re
+
+from .bandwidth_formatter import format_data_volume_with_unit
+
+STYLESHEET_SOURCE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "css", "allium.css")
+
+# Output location, relative to the output directory
+STYLESHEET_DIR = os.path.join("static", "css")
+
+_CRITICAL_SECTION = re.compile(r"/\* @critical \*/\n(.*?)/\* @end-critical \*/", re.S)
+
+
+def extract_critical_css(css):
+    """Concatenate the sections between @critical / @end-critical markers, in file order."""
+    return "".join(_CRITICAL_SECTION.findall(css))
+
+
+class Stylesheet:
+    """The site CSS with its content-hashed file name and optional critical subset."""
+
+    def __init__(self, css, inline_critical=False):
+        self.css = css
+        self.digest = hashlib.sha256(css.encode("utf-8")).hexdigest()[:12]
+        self.filename = f"allium.{self.digest}.css"
+        self.inline_critical = inline_critical
+        self.critical_css = extract_critical_css(css) if inline_critical else ""
+
+    def write(self, output_dir):
+        """
+        Write the hashed stylesheet under output_dir (skipped if already present).
+
+        Stylesheets from earlier builds (other hashes) are removed.
+
+        Returns:
+            str: Path of the written stylesheet
+        """
+        css_dir = os.path.join(output_dir, STYLESHEET_DIR)
+        os.makedirs(css_dir, exist_ok=True)
+        path = os.path.join(css_dir, self.filename)
+        for previous in glob.glob(os.path.join(css_dir, "allium.*.css")):
+            if previous != path:
+                os.remove(previous)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.css)
+            os.replace(tmp_path, path)
+        return path
+
+
+def load_stylesheet(inline_critical=False):
+    """Read static/css/allium.css into a Stylesheet."""
+    with open(STYLESHEET_SOURCE, encoding="utf-8") as f:
+        return Stylesheet(f.read(), inline_critical=inline_critical)
+
+
+def output_size_report(output_dir, stylesheet):
+    """
+    Size of the generated HTML with the shared stylesheet vs. with it inlined.
+
+    The "inlined" figure adds, for every page, the inline <style> block the
+    skeleton used to emit (the stylesheet with 16-space template indentation)
+    minus the critical CSS that is still inlined, if any.
+
+    Returns:
+        str: One-line report for progress logging
+    """
+    page_count = 0
+    html_bytes = 0
+    for dirpath, _, filenames in os.walk(output_dir):
+        for filename in filenames:
+            if filename.endswith(".html"):
+                page_count += 1
+                html_bytes += os.path.getsize(os.path.join(dirpath, filename))
+    css_bytes = len(stylesheet.css.encode("utf-8"))
+    inline_bytes = css_bytes + 16 * stylesheet.css.count("\n")
+    saved_per_page = inline_bytes - len(stylesheet.critical_css.encode("utf-8"))
+    before = html_bytes + page_count * saved_per_page
+    after = html_bytes + css_bytes
+    return (f"{page_count:,} HTML pages: {format_data_volume_with_unit(after)} with shared "
+            f"{stylesheet.filename} ({format_data_volume_with_unit(css_bytes)}), "
+            f"{format_data_volume_with_unit(before)} with the stylesheet inlined")
@@ -9,6 +9,8 @@ import statistics
 import math
 from .error_handlers import handle_calculation_errors
 from .statistical_utils import StatisticalUtils
+from .history_store import build_uptime_history_store
+from .json_stream import LazyJSONArray
 
 
 def normalize_uptime_value(raw_value):
@@ -116,8 +118,12 @@ def build_uptime_map(uptime_data):
         uptime_data (dict): Uptime data from Onionoo API
         
     Returns:
-        dict: Mapping of fingerprint -> uptime relay data
+        dict: Mapping of fingerprint -> uptime relay data (a LazyJSONIndex
+              that decodes each relay on lookup when the document was loaded lazily)
     """
+    relays = uptime_data.get('relays') if uptime_data else None
+    if isinstance(relays, LazyJSONArray) and relays.key_field == 'fingerprint':
+        return relays.by_key()
     uptime_map = {}
     if uptime_data and uptime_data.get('relays'):
         for uptime_relay in uptime_data['relays']:
@@ -127,7 +133,7 @@ def build_uptime_map(uptime_data):
     return uptime_map
 
 
-def extract_relay_uptime_for_period(operator_relays, uptime_data, time_period, uptime_map=None):
+def extract_relay_uptime_for_period(operator_relays, uptime_data, time_period, uptime_map=None, summary=None):
     """
     Extract uptime data for all relays in an operator for a specific time period.
     
@@ -135,13 +141,16 @@ def extract_relay_uptime_for_period(operator_relays, uptime_data, time_period, u
     
     OPTIMIZATION: Accepts pre-built uptime_map for batch processing. When processing
     multiple operators, build the map once with build_uptime_map() and pass it to
-    each call to avoid rebuilding the map ~3000+ times.
+    each call to avoid rebuilding the map ~3000+ times. A RelayHistorySummary with
+    uptime (history_summary.py) goes further and supplies each relay's average and
+    datapoint count without touching its value list.
     
     Args:
         operator_relays (list): List of relay objects for the operator
         uptime_data (dict): Uptime data from Onionoo API
         time_period (str): Time period key (e.g., '6_months', '1_year')
         uptime_map (dict, optional): Pre-built fingerprint->uptime mapping for batch processing
+        summary (RelayHistorySummary, optional): Per-relay summary table (takes precedence)
         
     Returns:
         dict: Contains uptime_values (list), relay_breakdown (dict), and valid_relays (int)
@@ -149,6 +158,27 @@ def extract_relay_uptime_for_period(operator_relays, uptime_data, time_period, u
     uptime_values = []
     relay_breakdown = {}
     
+    if summary is not None and summary.uptime is not None:
+        table = summary.uptime
+        for relay in operator_relays:
+            fingerprint = relay.get('fingerprint', '')
+            period_summary = table.get(fingerprint, {}).get(time_period) if fingerprint else None
+            if period_summary and period_summary[0] > 0:
+                avg_uptime, data_points = period_summary
+                uptime_values.append(avg_uptime)
+                relay_breakdown[fingerprint] = {
+                    'nickname': relay.get('nickname', 'Unknown'),
+                    'fingerprint': fingerprint,
+                    'uptime': avg_uptime,
+                    'data_points': data_points
+                }
+        summary.count(series=len(operator_relays))
+        return {
+            'uptime_values': uptime_values,
+            'relay_breakdown': relay_breakdown,
+            'valid_relays': len(uptime_values)
+        }
+    
     # Use pre-built map if provided, otherwise build one (backwards compatibility)
     if uptime_map is None:
         uptime_map = build_uptime_map(uptime_data)
@@ -190,7 +220,7 @@ def extract_relay_uptime_for_period(operator_relays, uptime_data, time_period, u
 
 
 @handle_calculation_errors("calculate network uptime percentiles", default_return=None)
-def calculate_network_uptime_percentiles(uptime_data, time_period='6_months'):
+def calculate_network_uptime_percentiles(uptime_data, time_period='6_months', history_store=None):
     """
     Calculate network-wide uptime percentiles for all active relays.
     
@@ -207,6 +237,7 @@ def calculate_network_uptime_percentiles(uptime_data, time_period='6_months'):
     Args:
         uptime_data (dict): Uptime data from Onionoo API containing all network relays
         time_period (str): Time period key (default: '6_months')
+        history_store (HistoryStore, optional): Pre-built store for uptime_data (built here if None)
         
     Returns:
         dict: Contains percentile values and statistics for network-wide uptime distribution
@@ -223,31 +254,31 @@ def calculate_network_uptime_percentiles(uptime_data, time_period='6_months'):
         'invalid_data': 0
     }
     
+    if history_store is None:
+        history_store = build_uptime_history_store(uptime_data)
+    series = history_store.get('uptime', time_period)
+    if series is not None:
+        percentages, datapoints = series.uptime_averages()
+    
     # Collect uptime data from all active relays in the network
-    for relay_uptime in uptime_data.get('relays', []):
+    for row in range(len(history_store)):
         total_relays_processed += 1
         
-        if not relay_uptime.get('uptime'):
-            excluded_relays['no_uptime_data'] += 1
-            continue
-            
-        period_data = relay_uptime['uptime'].get(time_period, {})
-        if not period_data.get('values'):
+        if series is None or not series.lengths[row]:
             excluded_relays['no_uptime_data'] += 1
             continue
         
-        # Calculate average uptime - this includes all relays >1% (includes problem relays)
-        avg_uptime = calculate_relay_uptime_average(period_data['values'])
+        # Average uptime - this includes all relays >1% (includes problem relays)
+        avg_uptime = percentages[row]
         
         if avg_uptime == 0.0:
             # Could be insufficient data, low uptime, or invalid data
-            # The calculate_relay_uptime_average function handles the specific filtering
-            values = period_data.get('values', [])
-            valid_values = [v for v in values if v is not None and isinstance(v, (int, float)) and 0 <= v <= 999]
+            # (datapoints counts the values inside the valid 0-999 range)
+            valid_count = datapoints[row]
             
-            if not valid_values:
+            if not valid_count:
                 excluded_relays['invalid_data'] += 1
-            elif len(valid_values) < 30:
+            elif valid_count < 30:
                 excluded_relays['insufficient_data'] += 1
             else:
                 # Must be low uptime (≤1% - essentially offline)
@@ -513,7 +544,7 @@ def _calculate_period_statistics(values):
     }
 
 
-def process_all_uptime_data_consolidated(all_relays, uptime_data, include_flag_analysis=True):
+def process_all_uptime_data_consolidated(all_relays, uptime_data, include_flag_analysis=True, history_store=None):
     """
     Consolidated uptime data processing function that extracts all uptime-related data
     in a single pass through the uptime API data to optimize performance.
@@ -524,10 +555,14 @@ def process_all_uptime_data_consolidated(all_relays, uptime_data, include_flag_a
     - Network-wide statistical analysis for outlier detection  
     - Flag-specific uptime data for flag reliability analysis
     
+    Per-relay averages are read from a columnar HistoryStore (history_store.py), which
+    computes each uptime/flag series for all relays in one batched pass.
+    
     Args:
         all_relays (list): List of all relay objects
         uptime_data (dict): Onionoo uptime API data
         include_flag_analysis (bool): Whether to include flag reliability analysis
+        history_store (HistoryStore, optional): Pre-built store for uptime_data (built here if None)
         
     Returns:
         dict: Consolidated uptime analysis with all computed metrics
@@ -539,6 +574,10 @@ def process_all_uptime_data_consolidated(all_relays, uptime_data, include_flag_a
             'flag_analysis_data': {} if include_flag_analysis else None
         }
     
+    if history_store is None:
+        history_store = build_uptime_history_store(uptime_data)
+    periods = ['1_month', '6_months', '1_year', '5_years']
+    
     # Create fingerprint to relay mapping for fast lookup
     relay_fingerprint_map = {}
     for relay in all_relays:
@@ -546,15 +585,33 @@ def process_all_uptime_data_consolidated(all_relays, uptime_data, include_flag_a
         if fingerprint:
             relay_fingerprint_map[fingerprint] = relay
     
+    # Batched per-period averages for every relay (row-indexed arrays, or None if no relay has the period)
+    period_averages = []
+    for period in periods:
+        series = history_store.get('uptime', period)
+        period_averages.append((period, series, series.uptime_averages() if series else None))
+    
+    # Flag series averages, keyed by flag then period (computed lazily per series)
+    flag_averages = {}
+    
+    def _flag_period_averages(flag):
+        cached = flag_averages.get(flag)
+        if cached is None:
+            cached = flag_averages[flag] = []
+            for period in periods:
+                series = history_store.get(f'flags/{flag}', period)
+                if series:
+                    cached.append((period, series, series.uptime_averages()))
+        return cached
+    
     # Initialize data structures for consolidated processing
     relay_uptime_data = {}  # fingerprint -> {uptime_percentages, uptime_datapoints, flag_data}
     network_uptime_values = {'1_month': [], '6_months': [], '1_year': [], '5_years': []}
     network_flag_data = {}  # flag -> period -> [values] for network statistics
-    network_relays_with_uptime = 0  # Track count during processing (avoid re-counting later)
+    row_flags = history_store.nested_keys.get('flags', [])
     
-    # SINGLE PASS through uptime data - this replaces multiple separate loops
-    for uptime_relay in uptime_data.get('relays', []):
-        fingerprint = uptime_relay.get('fingerprint')
+    # SINGLE PASS over the store rows (document order) - this replaces multiple separate loops
+    for row, fingerprint in enumerate(history_store.fingerprints):
         if not fingerprint:
             continue
             
@@ -564,54 +621,43 @@ def process_all_uptime_data_consolidated(all_relays, uptime_data, include_flag_a
         # Process regular uptime data
         uptime_percentages = {'1_month': 0.0, '6_months': 0.0, '1_year': 0.0, '5_years': 0.0}
         uptime_datapoints = {'1_month': 0, '6_months': 0, '1_year': 0, '5_years': 0}
-        uptime_section = uptime_relay.get('uptime', {})
-        has_any_uptime = False
         
-        for period in ['1_month', '6_months', '1_year', '5_years']:
-            period_data = uptime_section.get(period, {})
-            if period_data.get('values'):
-                # Use optimized single-pass calculation that returns both values
-                uptime_percentage, datapoints = _compute_uptime_percentage_and_datapoints(period_data['values'])
+        for period, series, averages in period_averages:
+            if series is not None and series.lengths[row]:
+                uptime_percentage = averages[0][row]
                 uptime_percentages[period] = uptime_percentage
-                uptime_datapoints[period] = datapoints
+                uptime_datapoints[period] = averages[1][row]
                 
                 # Collect for network statistics (only relays with valid uptime)
                 if uptime_percentage > 0.0:
                     network_uptime_values[period].append(uptime_percentage)
-                    has_any_uptime = True
-        
-        if has_any_uptime:
-            network_relays_with_uptime += 1
         
         # Process flag-specific uptime data (if enabled)
         flag_data = {}
         if include_flag_analysis:
-            flags_section = uptime_relay.get('flags', {})
-            
-            for flag, periods in flags_section.items():
+            for flag in row_flags[row]:
                 flag_data[flag] = {}
                 
                 # Initialize network flag data structure
                 if flag not in network_flag_data:
                     network_flag_data[flag] = {'1_month': [], '6_months': [], '1_year': [], '5_years': []}
                 
-                for period, data in periods.items():
-                    if period in ['1_month', '6_months', '1_year', '5_years'] and data.get('values'):
-                        # Use optimized single-pass calculation for flag data
-                        avg_uptime, datapoints = _compute_uptime_percentage_and_datapoints(data['values'])
-                        
-                        if avg_uptime > 0.0:
-                            flag_data[flag][period] = {
-                                'uptime': avg_uptime,
-                                'data_points': datapoints,
-                                'relay_info': {
-                                    'nickname': relay_obj.get('nickname', 'Unknown') if relay_obj else 'Unknown',
-                                    'fingerprint': fingerprint
-                                }
+                for period, series, averages in _flag_period_averages(flag):
+                    if not series.lengths[row]:
+                        continue
+                    avg_uptime = averages[0][row]
+                    if avg_uptime > 0.0:
+                        flag_data[flag][period] = {
+                            'uptime': avg_uptime,
+                            'data_points': averages[1][row],
+                            'relay_info': {
+                                'nickname': relay_obj.get('nickname', 'Unknown') if relay_obj else 'Unknown',
+                                'fingerprint': fingerprint
                             }
-                            
-                            # Collect for network flag statistics
-                            network_flag_data[flag][period].append(avg_uptime)
+                        }
+                        
+                        # Collect for network flag statistics
+                        network_flag_data[flag][period].append(avg_uptime)
         
         # Store processed data for this relay (including datapoints for AROI leaderboard display)
         relay_uptime_data[fingerprint] = {
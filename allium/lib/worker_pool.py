@@ -0,0 +1,124 @@
+"""
+File: worker_pool.py
+
+fork()-based worker pools that share the relay set copy-on-write.
+
+Forked workers read the parent's multi-GB relay set without copying it, until
+CPython writes to the objects they touch: every reference count change and
+every GC pass over a container dirties the page it lives on, so most of the
+inherited heap used to end up copied in each worker - and again in every pool,
+since each page type forked its own.
+
+prepare_fork() is the pre-fork routine every pool runs: a full collection,
+then gc.freeze(), which moves the surviving objects to the permanent
+generation so collections in the workers never touch them.
+
+WorkerPool forks its workers on first use and keeps them until close(), so
+generate_site() renders every page type with one set of workers. Workers see
+the relay set as it was when they were forked: the parent finishes whatever
+the pages read (group orderings, authority data) before the first task, and
+tasks name the page type they render.
+
+Worker memory is reported as USS (unique set size: the pages no other process
+shares), which is what each worker costs on top of the parent.
+"""
+
+import gc
+import multiprocessing as mp
+from typing import Callable, Iterable, List, Optional
+
+from .memory_lifecycle import collect_and_freeze
+from .progress import get_uss_mb
+
+
+def prepare_fork() -> None:
+    """Collect garbage and freeze the heap so forked workers share it unchanged."""
+    collect_and_freeze(freeze=True)
+
+
+class WorkerPool:
+    """A fork()-based multiprocessing pool that is forked on first use and reused until closed."""
+
+    def __init__(self, workers: int, initializer: Optional[Callable] = None, initargs: tuple = (),
+                 log: Optional[Callable[[str], None]] = None):
+        """
+        Args:
+            workers: Number of worker processes
+            initializer: Called in each worker after fork (typically storing
+                         shared objects in module globals)
+            initargs: Arguments for initializer (inherited via fork, not pickled)
+            log: Optional callable(message) for worker memory reports
+        """
+        self.workers = workers
+        self.initializer = initializer
+        self.initargs = initargs
+        self.log = log
+        self.forks = 0  # times the workers were forked (1 unless a batch failed)
+        self._pool = None
+
+    @property
+    def started(self) -> bool:
+        return self._pool is not None
+
+    def _workers(self):
+        if self._pool is None:
+            prepare_fork()
+            try:
+                ctx = mp.get_context('fork')
+                self._pool = ctx.Pool(self.workers, self.initializer, self.initargs)
+            except Exception:
+                gc.unfreeze()
+                raise
+            self.forks += 1
+        return self._pool
+
+    def map(self, func: Callable, iterable: Iterable, chunksize: Optional[int] = None) -> list:
+        return self._workers().map(func, iterable, chunksize)
+
+    def imap_unordered(self, func: Callable, iterable: Iterable, chunksize: int = 1):
+        return self._workers().imap_unordered(func, iterable, chunksize)
+
+    def worker_uss_mb(self) -> List[float]:
+        """Unique memory of each live worker in MB (empty where /proc is unavailable)."""
+        if self._pool is None:
+            return []
+        sizes = (get_uss_mb(process.pid) for process in getattr(self._pool, '_pool', []))
+        return [size for size in sizes if size is not None]
+
+    def log_worker_memory(self, label: str) -> None:
+        """Log per-worker USS after a batch of tasks (label names the batch, e.g. 'contact pages')."""
+        sizes = self.worker_uss_mb()
+        if self.log is None or not sizes:
+            return
+        self.log(f"Worker memory after {label}: USS {', '.join(f'{size:.1f}' for size in sizes)}MB "
+                 f"(avg {sum(sizes) / len(sizes):.1f}MB, max {max(sizes):.1f}MB)")
+
+    def close(self) -> None:
+        """Let the workers finish and exit; the parent's collector gets the frozen heap back."""
+        if self._pool is None:
+            return
+        pool, self._pool = self._pool, None
+        pool.close()
+        pool.join()
+        gc.unfreeze()
+
+    def terminate(self) -> None:
+        """Stop the workers now (after a failed batch); the next task forks new ones."""
+        if self._pool is None:
+            return
+        pool, self._pool = self._pool, None
+        try:
+            pool.terminate()
+            pool.join()
+        except Exception:
+            pass  # Ignore cleanup errors
+        gc.unfreeze()
+
+    def __enter__(self) -> 'WorkerPool':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
@@ -16,10 +16,15 @@ import urllib.request
 import urllib.error
 import socket
 import threading
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import zlib
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from datetime import datetime, timedelta
 from pathlib import Path
 from .error_handlers import handle_file_io_errors, handle_http_errors, handle_json_errors
+from .http_client import get_connection_stats, install_http_client
+from .json_stream import LazyJSONArray, lazy_json_document, load_json_file
+from .progress import get_memory_usage
 
 logger = logging.getLogger(__name__)
 
@@ -40,39 +45,37 @@ class TotalTimeoutError(Exception):
     pass
 
 
-def _fetch_url_with_total_timeout(url: str, timeout: int, headers: dict = None) -> bytes:
+# All urlopen() calls share per-host keep-alive connections (see http_client.py)
+install_http_client()
+
+
+def _iter_url_chunks_with_total_timeout(url: str, timeout: int, headers: dict = None,
+                                        chunk_size: int = 64 * 1024):
     """
-    Fetch URL content with a guaranteed total timeout.
-    
-    Unlike urllib's timeout parameter (which only applies to individual socket
-    operations), this function enforces a true total timeout for the entire
-    request, including connection, waiting for headers, and all data transfer.
-    
-    Implementation:
-    - Uses socket timeout equal to total timeout for initial connection
-    - Reads response in chunks while tracking total elapsed time
-    - Aborts immediately when total timeout is exceeded
+    Yield response body chunks for a URL while enforcing a total timeout.
     
-    Note: The socket timeout on urlopen() applies to waiting for response headers,
-    so setting it to the total timeout ensures the connection phase respects the limit.
+    Shared by the buffered (_fetch_url_with_total_timeout) and streaming
+    (_fetch_url_to_file_with_total_timeout) fetch paths so both apply exactly
+    the same connection and read deadline handling.
     
     Args:
         url: URL to fetch
         timeout: Maximum total time in seconds for the entire request
         headers: Optional dict of HTTP headers to include
+        chunk_size: Bytes to request per read (default: 64KB)
         
-    Returns:
-        bytes: Response content
+    Yields:
+        bytes: Successive non-empty response chunks (gzip-encoded bodies are
+               requested and decompressed transparently)
         
     Raises:
         TotalTimeoutError: If the request exceeds the total timeout
         urllib.error.URLError: On network errors (not timeout)
         urllib.error.HTTPError: On HTTP errors (4xx, 5xx)
     """
-    if headers:
-        req = urllib.request.Request(url, headers=headers)
-    else:
-        req = urllib.request.Request(url)
+    headers = dict(headers) if headers else {}
+    headers.setdefault('Accept-Encoding', 'gzip')
+    req = urllib.request.Request(url, headers=headers)
     
     start_time = time.time()
     
@@ -94,8 +97,9 @@ def _fetch_url_with_total_timeout(url: str, timeout: int, headers: dict = None)
         raise
     
     # Phase 2: Read response in chunks, checking total elapsed time after each chunk
-    chunks = []
-    chunk_size = 64 * 1024  # 64KB chunks
+    received = 0
+    content_encoding = response.headers.get('Content-Encoding') if hasattr(response, 'headers') else None
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if content_encoding == 'gzip' else None
     
     try:
         while True:
@@ -105,7 +109,7 @@ def _fetch_url_with_total_timeout(url: str, timeout: int, headers: dict = None)
                 response.close()
                 raise TotalTimeoutError(
                     f"Request to {url} exceeded total timeout of {timeout}s "
-                    f"(elapsed: {elapsed:.1f}s, received: {sum(len(c) for c in chunks)} bytes)"
+                    f"(elapsed: {elapsed:.1f}s, received: {received} bytes)"
                 )
             
             # Calculate remaining time for this chunk read
@@ -135,11 +139,18 @@ def _fetch_url_with_total_timeout(url: str, timeout: int, headers: dict = None)
             
             if not chunk:
                 # End of response
+                if decompressor is not None:
+                    tail = decompressor.flush()
+                    if tail:
+                        yield tail
                 break
             
-            chunks.append(chunk)
-        
-        return b''.join(chunks)
+            received += len(chunk)
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+                if not chunk:
+                    continue
+            yield chunk
         
     finally:
         try:
@@ -147,6 +158,83 @@ def _fetch_url_with_total_timeout(url: str, timeout: int, headers: dict = None)
         except Exception:
             pass
 
+
+def _fetch_url_with_total_timeout(url: str, timeout: int, headers: dict = None) -> bytes:
+    """
+    Fetch URL content with a guaranteed total timeout.
+    
+    Unlike urllib's timeout parameter (which only applies to individual socket
+    operations), this function enforces a true total timeout for the entire
+    request, including connection, waiting for headers, and all data transfer.
+    
+    Implementation:
+    - Uses socket timeout equal to total timeout for initial connection
+    - Reads response in chunks while tracking total elapsed time
+    - Aborts immediately when total timeout is exceeded
+    
+    Note: The socket timeout on urlopen() applies to waiting for response headers,
+    so setting it to the total timeout ensures the connection phase respects the limit.
+    
+    Args:
+        url: URL to fetch
+        timeout: Maximum total time in seconds for the entire request
+        headers: Optional dict of HTTP headers to include
+        
+    Returns:
+        bytes: Response content
+        
+    Raises:
+        TotalTimeoutError: If the request exceeds the total timeout
+        urllib.error.URLError: On network errors (not timeout)
+        urllib.error.HTTPError: On HTTP errors (4xx, 5xx)
+    """
+    return b''.join(_iter_url_chunks_with_total_timeout(url, timeout, headers))
+
+
+def _fetch_url_to_file_with_total_timeout(url: str, timeout: int, dest_path: str,
+                                          headers: dict = None) -> int:
+    """
+    Stream URL content straight to a file with a guaranteed total timeout.
+    
+    Same timeout semantics as _fetch_url_with_total_timeout, but each 64KB chunk
+    is written to dest_path as it arrives instead of being collected in memory,
+    so a multi-hundred-MB Onionoo document never exists as one bytes object.
+    The file is truncated on every call, which makes this safe to retry, and
+    removed again if the download fails, so no partial body is left behind.
+    
+    Args:
+        url: URL to fetch
+        timeout: Maximum total time in seconds for the entire request
+        dest_path: File to write the response body to
+        headers: Optional dict of HTTP headers to include
+        
+    Returns:
+        int: Number of bytes written
+        
+    Raises:
+        TotalTimeoutError: If the request exceeds the total timeout
+        urllib.error.URLError: On network errors (not timeout)
+        urllib.error.HTTPError: On HTTP errors (4xx, 5xx)
+    """
+    written = 0
+    try:
+        with open(dest_path, 'wb') as f:
+            for chunk in _iter_url_chunks_with_total_timeout(url, timeout, headers):
+                f.write(chunk)
+                written += len(chunk)
+    except BaseException:
+        _remove_partial_file(dest_path)
+        raise
+    return written
+
+
+def _remove_partial_file(path):
+    """Delete a partially downloaded file if it exists."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass  # Never created, or already promoted to cache
+
 # Global constants
 ABS_PATH = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(os.path.dirname(ABS_PATH), "data")
@@ -212,6 +300,12 @@ COLLECTOR_TIMEOUT_STALE_CACHE = 300   # 5 minutes when no cache exists
 DESCRIPTORS_CACHE_MAX_AGE_HOURS = 1   # Cache older than this is considered stale (1 hour)
 DESCRIPTORS_TIMEOUT_FRESH_CACHE = 60  # 60 seconds per file when cache available (typically 1 new file)
 DESCRIPTORS_TIMEOUT_STALE_CACHE = 300 # 5 minutes when no cache exists (first run: ~18 files)
+DESCRIPTORS_MAX_CONCURRENT_DOWNLOADS = 4  # Descriptor files in flight at once (--collector-downloads)
+DESCRIPTORS_MAX_PARSE_WORKERS = 4     # Processes parsing downloaded descriptor files
+
+# COLLECTOR cache formats (the Onionoo/AROI formats live in their APIConfig below)
+COLLECTOR_CACHE_CODEC = 'pickle'      # Votes + relay index: large nested dicts
+DESCRIPTORS_CACHE_CODEC = 'pickle'    # Merged result and per-file parse cache
 # ============================================================================
 
 
@@ -219,7 +313,7 @@ DESCRIPTORS_TIMEOUT_STALE_CACHE = 300 # 5 minutes when no cache exists (first ru
 # API CONFIGURATION DATACLASS
 # ============================================================================
 from dataclasses import dataclass
-from typing import Optional, Dict, Any, Callable
+from typing import Optional, Dict, Any, Callable, Tuple
 
 @dataclass
 class APIConfig:
@@ -236,6 +330,12 @@ class APIConfig:
     retry_count: int = 3             # Max retries on transient failures (0 = no retry)
     retry_delay_base: float = 1.0    # Base delay in seconds for exponential backoff
     retry_on_fresh_cache: bool = False  # If True, retry even when fresh cache exists
+    # Streaming settings
+    stream_to_file: bool = False     # Stream body to a temp file and parse relay by relay
+    # Streamed arrays kept as per-relay JSON text, decoded on access (json_stream.LazyJSONArray)
+    lazy_keys: Tuple[str, ...] = ()
+    # On-disk cache format (see cache_codecs.py): 'json', 'json-min', 'json-gz', 'pickle'
+    cache_codec: str = 'json'
 
 
 # Pre-configured API settings
@@ -247,6 +347,10 @@ DETAILS_CONFIG = APIConfig(
     timeout_stale_cache=DETAILS_TIMEOUT_STALE_CACHE,
     retry_count=3,               # Critical API: retry up to 3 times
     retry_delay_base=2.0,        # 2s → 4s → 8s backoff
+    stream_to_file=True,         # Large document: avoid bytes + str + dict peak
+    # The streamed body is renamed into place as the cache file; pickling the
+    # decoded document instead would add to the memory peak of the fetch
+    cache_codec='json-min',
 )
 
 UPTIME_CONFIG = APIConfig(
@@ -257,6 +361,10 @@ UPTIME_CONFIG = APIConfig(
     timeout_stale_cache=UPTIME_TIMEOUT_STALE_CACHE,
     retry_count=2,               # Non-critical: retry up to 2 times
     retry_delay_base=2.0,
+    stream_to_file=True,         # Large document: avoid bytes + str + dict peak
+    lazy_keys=('relays',),       # Most relay histories are read once: keep them as JSON text
+    # Pickles the kept JSON text (cheap); a JSON cache would be decoded in full on load
+    cache_codec='pickle',
 )
 
 BANDWIDTH_CONFIG = APIConfig(
@@ -267,6 +375,10 @@ BANDWIDTH_CONFIG = APIConfig(
     timeout_stale_cache=BANDWIDTH_TIMEOUT_STALE_CACHE,
     retry_count=2,               # Non-critical: retry up to 2 times
     retry_delay_base=2.0,
+    stream_to_file=True,         # Large document: avoid bytes + str + dict peak
+    lazy_keys=('relays',),       # Most relay histories are read once: keep them as JSON text
+    # Pickles the kept JSON text (cheap); a JSON cache would be decoded in full on load
+    cache_codec='pickle',
 )
 
 AROI_CONFIG = APIConfig(
@@ -287,8 +399,25 @@ AROI_CONFIG = APIConfig(
 # Use centralized file I/O utilities
 from .file_io_utils import create_cache_manager, create_timestamp_manager, create_state_manager
 
+# On-disk cache codec per cache key (keys not listed use legacy indented JSON)
+CACHE_CODEC_BY_KEY = {
+    config.api_name: config.cache_codec
+    for config in (DETAILS_CONFIG, UPTIME_CONFIG, BANDWIDTH_CONFIG, AROI_CONFIG)
+}
+CACHE_CODEC_BY_KEY.update({
+    'collector_consensus': COLLECTOR_CACHE_CODEC,
+    'collector_descriptors': DESCRIPTORS_CACHE_CODEC,
+    'collector_descriptors_files': DESCRIPTORS_CACHE_CODEC,
+})
+
+# Arrays kept lazily per cache key, also for documents loaded from a JSON cache
+LAZY_KEYS_BY_API = {
+    config.api_name: config.lazy_keys
+    for config in (DETAILS_CONFIG, UPTIME_CONFIG, BANDWIDTH_CONFIG, AROI_CONFIG) if config.lazy_keys
+}
+
 # Initialize file managers
-_cache_manager = create_cache_manager(CACHE_DIR)
+_cache_manager = create_cache_manager(CACHE_DIR, CACHE_CODEC_BY_KEY)
 _timestamp_manager = create_timestamp_manager(CACHE_DIR)
 _state_manager = create_state_manager(STATE_FILE)
 
@@ -313,7 +442,12 @@ def _load_cache(api_name):
     Returns:
         Cached data or None if not available
     """
-    return _cache_manager.load_cache(api_name)
+    data = _cache_manager.load_cache(api_name)
+    lazy_keys = LAZY_KEYS_BY_API.get(api_name)
+    if lazy_keys:
+        # Pickle caches written since lazy loading keep the LazyJSONArray; older caches hold lists
+        data = lazy_json_document(data, lazy_keys)
+    return data
 
 
 def _mark_ready(api_name):
@@ -354,6 +488,7 @@ def _save_state():
     """Save worker state to file (called with lock held)"""
     state_data = {
         "workers": _worker_status,
+        "http_connections": get_connection_stats(),
         "last_updated": time.time()
     }
     with open(STATE_FILE, "w", encoding="utf-8") as f:
@@ -645,13 +780,46 @@ def _fetch_with_cache_fallback(
     else:
         effective_retries = config.retry_count
     
+    # Streaming mode: body goes to a temp file next to the cache (same filesystem,
+    # so a successful response can be promoted to the cache with an atomic rename)
+    stream_path = None
+    if config.stream_to_file:
+        stream_path = _cache_manager.get_file_path(f"{api_name}.json.part")
+        log_progress(f"streaming response to disk ({get_memory_usage()} before fetch)")
+        fetch_fn = _fetch_url_to_file_with_total_timeout
+        fetch_args = (url, timeout_seconds, str(stream_path), headers if headers else None)
+    else:
+        fetch_fn = _fetch_url_with_total_timeout
+        fetch_args = (url, timeout_seconds, headers if headers else None)
+    
+    try:
+        return _fetch_and_parse(
+            fetch_fn, fetch_args, config, timeout_seconds, effective_retries,
+            cached_data, stream_path, log_progress, validator,
+        )
+    finally:
+        if stream_path is not None:
+            _remove_partial_file(stream_path)
+
+
+def _fetch_and_parse(fetch_fn, fetch_args, config, timeout_seconds, effective_retries,
+                     cached_data, stream_path, log_progress, validator):
+    """
+    Fetch, parse, validate and cache one API response (body of _fetch_with_cache_fallback).
+    
+    When stream_path is set, fetch_fn writes the response body to that file and
+    the document is parsed incrementally from disk; otherwise fetch_fn returns bytes.
+    """
+    api_name = config.api_name
+    display_name = config.display_name
+    
     # Try to fetch with TOTAL timeout (not just socket timeout) + retry with backoff
     # Falls back to cache on exhausted retries or non-retryable errors
     fetch_start = time.time()
     try:
         api_response = _retry_with_backoff(
-            fetch_fn=_fetch_url_with_total_timeout,
-            args=(url, timeout_seconds, headers if headers else None),
+            fetch_fn=fetch_fn,
+            args=fetch_args,
             retry_count=effective_retries,
             retry_delay_base=config.retry_delay_base,
             log_fn=log_progress,
@@ -708,7 +876,16 @@ def _fetch_with_cache_fallback(
     # Parse JSON response with explicit error handling
     log_progress("parsing JSON response...")
     try:
-        data = json.loads(api_response.decode("utf-8"))
+        if stream_path is not None:
+            data, streamed_items = load_json_file(str(stream_path), lazy_keys=config.lazy_keys)
+            lazy_size = sum(value.raw_size for value in data.values() if isinstance(value, LazyJSONArray))
+            lazy_info = f", {lazy_size / (1024 * 1024):.1f}MB kept as JSON text" if lazy_size else ""
+            log_progress(
+                f"parsed {api_response / (1024 * 1024):.1f}MB response incrementally "
+                f"({streamed_items} streamed items{lazy_info}, {get_memory_usage()} after parse)"
+            )
+        else:
+            data = json.loads(api_response.decode("utf-8"))
     except (json.JSONDecodeError, UnicodeDecodeError, ValueError) as e:
         log_progress(f"failed to parse JSON response: {e}")
         if cached_data:
@@ -727,9 +904,11 @@ def _fetch_with_cache_fallback(
             return cached_data
         return None
     
-    # Cache the data
+    # Cache the data (a streamed body is already valid JSON on disk: promote it
+    # instead of re-serializing the parsed document)
     log_progress(f"caching {display_name} data...")
-    _save_cache(api_name, data)
+    if stream_path is None or not _cache_manager.replace_cache_file(api_name, stream_path):
+        _save_cache(api_name, data)
     
     # Write timestamp for future conditional requests
     if config.use_conditional_requests:
@@ -1021,7 +1200,228 @@ def fetch_collector_data(progress_logger=None):
     return fetch_collector_consensus_data(progress_logger=progress_logger)
 
 
-def fetch_collector_descriptors(progress_logger=None):
+def _parse_server_descriptors(raw_content):
+    """
+    Parse one CollecTor server-descriptors file into its per-file cache entry.
+    
+    Single pass over the file: relay fingerprint, family-cert presence and the
+    family key (signing key extension of the family-cert). Module-level so it
+    can run in a parse worker process.
+    
+    Args:
+        raw_content: Raw file bytes as downloaded
+    
+    Returns:
+        dict with 'cert' and 'no_cert' fingerprint lists and 'cert_keys'
+        (fingerprint -> family key hex)
+    """
+    content = raw_content.decode('utf-8', errors='replace')
+    
+    # Single-pass parse: fingerprint + family-cert presence + family key extraction
+    cert_fps = set()
+    no_cert_fps = set()
+    fp_to_family_key = {}
+    current_fp = None
+    has_cert = False
+    in_cert_block = False
+    cert_b64_lines = []
+    current_family_key = None
+    
+    for line in content.split('\n'):
+        if in_cert_block:
+            if line.startswith('-----END'):
+                in_cert_block = False
+                try:
+                    cert_bytes = base64.b64decode(''.join(cert_b64_lines))
+                    # Family key is the SIGNING key (ext type 0x04),
+                    # not the certified key (which is per-relay identity).
+                    if len(cert_bytes) > 40:
+                        n_ext = cert_bytes[39]
+                        off = 40
+                        for _ in range(n_ext):
+                            if off + 4 > len(cert_bytes):
+                                break
+                            ext_len = int.from_bytes(cert_bytes[off:off+2], 'big')
+                            ext_type = cert_bytes[off+2]
+                            # ext_flags = cert_bytes[off+3]
+                            if ext_type == 0x04:
+                                current_family_key = cert_bytes[off+4:off+4+ext_len].hex().upper()
+                                break
+                            off += 4 + ext_len
+                except (IndexError, ValueError) as e:
+                    logger.debug("family-cert parse failed for %s: %s", current_fp, e)
+                cert_b64_lines = []
+            elif not line.startswith('-----'):
+                cert_b64_lines.append(line.strip())
+            continue
+    
+        if line.startswith('router '):
+            if current_fp is not None:
+                if has_cert:
+                    cert_fps.add(current_fp)
+                    if current_family_key:
+                        fp_to_family_key[current_fp] = current_family_key
+                else:
+                    no_cert_fps.add(current_fp)
+            current_fp = None
+            has_cert = False
+            current_family_key = None
+        elif line.startswith('fingerprint '):
+            current_fp = line[12:].replace(' ', '').upper()
+        elif line.rstrip() == 'family-cert':
+            has_cert = True
+            in_cert_block = True
+            cert_b64_lines = []
+    
+    if current_fp is not None:
+        if has_cert:
+            cert_fps.add(current_fp)
+            if current_family_key:
+                fp_to_family_key[current_fp] = current_family_key
+        else:
+            no_cert_fps.add(current_fp)
+    
+    
+    return {
+        'cert': list(cert_fps),
+        'no_cert': list(no_cert_fps),
+        'cert_keys': fp_to_family_key,
+    }
+
+
+def _merge_descriptor_files(file_results):
+    """
+    Merge per-file descriptor parse results (oldest file first).
+    
+    When a relay appears in multiple files, the latest file wins: a relay with
+    family-cert in an older file but without in a newer file is not counted.
+    
+    Args:
+        file_results: _parse_server_descriptors() results in chronological order
+    
+    Returns:
+        tuple: (family-cert fingerprints set, all seen fingerprints set,
+        family_cert_groups dict of family key -> sorted fingerprints)
+    """
+    final_cert_fps = set()
+    final_seen_fps = set()
+    merged_fp_to_key = {}
+    for file_result in file_results:
+        cert_in_file = set(file_result.get('cert', []))
+        no_cert_in_file = set(file_result.get('no_cert', []))
+        # Later files override earlier: add certs, remove non-certs
+        final_cert_fps.update(cert_in_file)
+        final_cert_fps -= no_cert_in_file
+        final_seen_fps.update(cert_in_file)
+        final_seen_fps.update(no_cert_in_file)
+        # Merge fp→family_key (later files override)
+        for fp, key in file_result.get('cert_keys', {}).items():
+            merged_fp_to_key[fp] = key
+        # Remove key mapping for relays that lost cert in later file
+        for fp in no_cert_in_file:
+            merged_fp_to_key.pop(fp, None)
+    
+    # Build family_cert_groups: family_key → [fingerprints]
+    from collections import defaultdict
+    family_groups = defaultdict(list)
+    for fp in final_cert_fps:
+        key = merged_fp_to_key.get(fp)
+        if key:
+            family_groups[key].append(fp)
+    family_cert_groups = {k: sorted(v) for k, v in family_groups.items()}
+    return final_cert_fps, final_seen_fps, family_cert_groups
+
+
+def _download_descriptor_file(url, timeout_seconds):
+    """Download one descriptor file (with total timeout + retry)."""
+    return _retry_with_backoff(
+        fetch_fn=_fetch_url_with_total_timeout,
+        args=(url, timeout_seconds, {'User-Agent': 'Allium/1.0'}),
+        retry_count=2,
+        retry_delay_base=1.0,
+        operation_name=f"descriptor file {url.rsplit('/', 1)[-1]}",
+    )
+
+
+def _create_parse_pool(file_count):
+    """
+    Process pool for parsing descriptor files, or None to parse in this thread.
+    
+    A single file (the usual hourly run) is parsed inline. The pool uses the
+    spawn start method because API workers run in threads, where fork() could
+    copy locks held by other threads.
+    """
+    workers = min(file_count, DESCRIPTORS_MAX_PARSE_WORKERS, os.cpu_count() or 1)
+    if workers < 2:
+        return None
+    try:
+        return ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn'))
+    except (OSError, ValueError, NotImplementedError) as e:
+        logger.debug("descriptor parse pool unavailable, parsing inline: %s", e)
+        return None
+
+
+def _fetch_descriptor_files(files, file_cache, timeout_seconds, max_downloads, log_fn):
+    """
+    Download and parse descriptor files, storing each parse result in file_cache.
+    
+    Downloads run in a bounded thread pool (max_downloads files in flight, each
+    with its own total timeout); each finished download is handed straight to the
+    parse stage, so parsing overlaps with the remaining transfers. Files that fail
+    to download or parse are skipped, as before.
+    
+    Args:
+        files: List of (filename, url) to fetch
+        file_cache: Per-file cache dict (filename -> parse result), updated in place
+        timeout_seconds: Total timeout per file
+        max_downloads: Maximum concurrent downloads
+        log_fn: Progress logging function
+    
+    Returns:
+        int: Number of files downloaded and parsed
+    """
+    if not files:
+        return 0
+    max_downloads = max(1, min(max_downloads or 1, len(files)))
+    if len(files) > 1:
+        log_fn(f"downloading {len(files)} descriptor files ({max_downloads} at a time)...")
+    
+    parse_pool = _create_parse_pool(len(files))
+    parse_futures = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_downloads, thread_name_prefix="descriptors") as downloads:
+            pending = {downloads.submit(_download_descriptor_file, url, timeout_seconds): filename
+                       for filename, url in files}
+            for future in as_completed(pending):
+                filename = pending[future]
+                try:
+                    raw_content = future.result()
+                except Exception as e:
+                    logger.warning(f"Failed to fetch {filename}: {e}")
+                    continue
+                if parse_pool is None:
+                    try:
+                        file_cache[filename] = _parse_server_descriptors(raw_content)
+                    except Exception as e:
+                        logger.warning(f"Failed to parse {filename}: {e}")
+                else:
+                    parse_futures[filename] = parse_pool.submit(_parse_server_descriptors, raw_content)
+        
+        for filename, future in parse_futures.items():
+            try:
+                file_cache[filename] = future.result()
+            except Exception as e:
+                logger.warning(f"Failed to parse {filename}: {e}")
+    finally:
+        if parse_pool is not None:
+            # (shutdown(cancel_futures=True) needs Python 3.9)
+            for future in parse_futures.values():
+                future.cancel()
+            parse_pool.shutdown(wait=True)
+    return sum(1 for filename, _ in files if filename in file_cache)
+
+
+def fetch_collector_descriptors(progress_logger=None, max_downloads=DESCRIPTORS_MAX_CONCURRENT_DOWNLOADS):
     """
     Fetch CollecTor server-descriptors covering the last 18 hours and extract
     family-cert presence per relay. Achieves full network coverage on every run.
@@ -1033,10 +1433,14 @@ def fetch_collector_descriptors(progress_logger=None):
     Optimization: Parsed results are cached per-file. On each run, only NEW files
     (typically 1 per hour) are downloaded. Previously-parsed files are loaded from
     the per-file cache. This means the first run downloads ~18 files (~126MB total),
-    but subsequent hourly runs only download ~1 new file (~7MB).
+    but subsequent hourly runs only download ~1 new file (~7MB). New files are
+    downloaded max_downloads at a time and parsed in worker processes as they
+    arrive, so a cold cache costs roughly its transfer time, not the file count
+    times the per-file latency.
     
     Args:
         progress_logger: Optional function for progress updates
+        max_downloads: Maximum descriptor files downloaded concurrently
     
     Returns:
         dict with 'family_cert_fingerprints' (list), 'all_seen_fingerprints' (list),
@@ -1133,150 +1537,27 @@ def fetch_collector_descriptors(progress_logger=None):
         file_cache = _load_cache(file_cache_name) or {}
         
         # Step 4: Download and parse only NEW files; reuse cached results
-        files_downloaded = 0
-        files_from_cache = 0
-        all_cert_fps = set()
-        all_seen_fps = set()
+        new_files = [filename for filename in target_files if filename not in file_cache]
+        files_from_cache = len(target_files) - len(new_files)
+        files_downloaded = _fetch_descriptor_files(
+            [(filename, f"{base_url}{descs_path}{filename}") for filename in new_files],
+            file_cache, timeout_seconds, max_downloads, log_progress)
         
+        all_seen_fps = set()
         for filename in target_files:
-            if filename in file_cache:
-                # Reuse cached parse result for this file
-                file_result = file_cache[filename]
-                all_cert_fps.update(file_result.get('cert', []))
+            file_result = file_cache.get(filename)
+            if file_result:
                 all_seen_fps.update(file_result.get('cert', []))
                 all_seen_fps.update(file_result.get('no_cert', []))
-                files_from_cache += 1
-            else:
-                # Download and parse this new file (with total timeout + retry)
-                url = f"{base_url}{descs_path}{filename}"
-                try:
-                    file_headers = {'User-Agent': 'Allium/1.0'}
-                    raw_content = _retry_with_backoff(
-                        fetch_fn=_fetch_url_with_total_timeout,
-                        args=(url, timeout_seconds, file_headers),
-                        retry_count=2,
-                        retry_delay_base=1.0,
-                        operation_name=f"descriptor file {filename}",
-                    )
-                    content = raw_content.decode('utf-8', errors='replace')
-                    
-                    # Single-pass parse: fingerprint + family-cert presence + family key extraction
-                    cert_fps = set()
-                    no_cert_fps = set()
-                    fp_to_family_key = {}
-                    current_fp = None
-                    has_cert = False
-                    in_cert_block = False
-                    cert_b64_lines = []
-                    current_family_key = None
-                    
-                    for line in content.split('\n'):
-                        if in_cert_block:
-                            if line.startswith('-----END'):
-                                in_cert_block = False
-                                try:
-                                    cert_bytes = base64.b64decode(''.join(cert_b64_lines))
-                                    # Family key is the SIGNING key (ext type 0x04),
-                                    # not the certified key (which is per-relay identity).
-                                    if len(cert_bytes) > 40:
-                                        n_ext = cert_bytes[39]
-                                        off = 40
-                                        for _ in range(n_ext):
-                                            if off + 4 > len(cert_bytes):
-                                                break
-                                            ext_len = int.from_bytes(cert_bytes[off:off+2], 'big')
-                                            ext_type = cert_bytes[off+2]
-                                            # ext_flags = cert_bytes[off+3]
-                                            if ext_type == 0x04:
-                                                current_family_key = cert_bytes[off+4:off+4+ext_len].hex().upper()
-                                                break
-                                            off += 4 + ext_len
-                                except (IndexError, ValueError) as e:
-                                    logger.debug("family-cert parse failed for %s: %s", current_fp, e)
-                                cert_b64_lines = []
-                            elif not line.startswith('-----'):
-                                cert_b64_lines.append(line.strip())
-                            continue
-                        
-                        if line.startswith('router '):
-                            if current_fp is not None:
-                                if has_cert:
-                                    cert_fps.add(current_fp)
-                                    if current_family_key:
-                                        fp_to_family_key[current_fp] = current_family_key
-                                else:
-                                    no_cert_fps.add(current_fp)
-                            current_fp = None
-                            has_cert = False
-                            current_family_key = None
-                        elif line.startswith('fingerprint '):
-                            current_fp = line[12:].replace(' ', '').upper()
-                        elif line.rstrip() == 'family-cert':
-                            has_cert = True
-                            in_cert_block = True
-                            cert_b64_lines = []
-                    
-                    if current_fp is not None:
-                        if has_cert:
-                            cert_fps.add(current_fp)
-                            if current_family_key:
-                                fp_to_family_key[current_fp] = current_family_key
-                        else:
-                            no_cert_fps.add(current_fp)
-                    
-                    # Cache this file's parsed result
-                    file_cache[filename] = {
-                        'cert': list(cert_fps),
-                        'no_cert': list(no_cert_fps),
-                        'cert_keys': fp_to_family_key,
-                    }
-                    
-                    all_cert_fps.update(cert_fps)
-                    all_seen_fps.update(cert_fps)
-                    all_seen_fps.update(no_cert_fps)
-                    files_downloaded += 1
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to fetch {filename}: {e}")
-                    continue
         
         if not all_seen_fps:
             log_progress("warning: no descriptors parsed from any file")
             _mark_stale(api_name, "No descriptors parsed")
             return cached_data if has_valid_cache else None
         
-        # Step 5: When a relay appears in multiple files, the latest file wins.
-        # Since we process files chronologically (sorted), later files overwrite earlier.
-        # A relay with family-cert in an older file but without in a newer file
-        # should NOT be counted. Rebuild from chronological order:
-        final_cert_fps = set()
-        final_seen_fps = set()
-        merged_fp_to_key = {}
-        for filename in target_files:
-            if filename in file_cache:
-                file_result = file_cache[filename]
-                cert_in_file = set(file_result.get('cert', []))
-                no_cert_in_file = set(file_result.get('no_cert', []))
-                # Later files override earlier: add certs, remove non-certs
-                final_cert_fps.update(cert_in_file)
-                final_cert_fps -= no_cert_in_file
-                final_seen_fps.update(cert_in_file)
-                final_seen_fps.update(no_cert_in_file)
-                # Merge fp→family_key (later files override)
-                for fp, key in file_result.get('cert_keys', {}).items():
-                    merged_fp_to_key[fp] = key
-                # Remove key mapping for relays that lost cert in later file
-                for fp in no_cert_in_file:
-                    merged_fp_to_key.pop(fp, None)
-        
-        # Build family_cert_groups: family_key → [fingerprints]
-        from collections import defaultdict
-        family_groups = defaultdict(list)
-        for fp in final_cert_fps:
-            key = merged_fp_to_key.get(fp)
-            if key:
-                family_groups[key].append(fp)
-        family_cert_groups = {k: sorted(v) for k, v in family_groups.items()}
+        # Step 5: When a relay appears in multiple files, the latest file wins
+        final_cert_fps, final_seen_fps, family_cert_groups = _merge_descriptor_files(
+            [file_cache[filename] for filename in target_files if filename in file_cache])
         
         # Step 6: Prune file cache — remove files older than our window
         target_set = set(target_files)
@@ -1298,8 +1579,9 @@ def fetch_collector_descriptors(progress_logger=None):
         _mark_ready(api_name)
         
         fetch_elapsed = time.time() - fetch_start
-        cert_without_key = len(final_cert_fps) - len(merged_fp_to_key)
-        key_info = f", {len(merged_fp_to_key)} with verified key"
+        cert_with_key = sum(len(fps) for fps in family_cert_groups.values())
+        cert_without_key = len(final_cert_fps) - cert_with_key
+        key_info = f", {cert_with_key} with verified key"
         if cert_without_key > 0:
             key_info += f", {cert_without_key} cert-present-but-key-not-extracted"
         log_progress(
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the data-processing pipeline at several network sizes.
+
+Times, and measures the peak traced memory of, every processing step between
+the API documents and the rendered site:
+
+  - the CollecTor parsers (9 authority votes, the bandwidth file, the relay
+    index and a server-descriptors file)
+  - Relays.__init__ and Relays.enrich_with_api_data
+  - aroileaders._collect_operator_metrics
+  - every ProcessingPipeline stage inside them (categorize, network_health,
+    uptime, ...)
+
+Inputs are synthesized (tests/helpers/synthetic_network.py: ~10k relays, ~3k
+contacts, full uptime and bandwidth histories and raw votes at scale 1) or
+replayed from recorded API documents with --replay, and multiplied by each
+--scales factor. Every scale runs in a fresh process so max RSS is per scale.
+Timings come from runs without tracemalloc; peak memory from one extra traced
+run (tracemalloc slows allocation-heavy code down several times).
+
+Workflow:
+  1. python3 benchmark_pipeline.py --results before.json
+  2. (make code changes)
+  3. python3 benchmark_pipeline.py --results after.json --compare before.json
+
+Exit codes:
+  0 = benchmark completed (and nothing regressed beyond --threshold)
+  1 = a step got slower or its peak memory grew beyond --threshold percent
+  2 = usage error (no recorded data to replay, bad --scales, missing baseline)
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing as mp
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from allium.lib.aroileaders import _collect_operator_metrics
+from allium.lib.consensus.collector_fetcher import AUTHORITIES, CollectorFetcher
+from allium.lib.json_stream import lazy_json_document
+from allium.lib.processing_pipeline import start_peak_measurement
+from allium.lib.relays import Relays
+from allium.lib.workers import LAZY_KEYS_BY_API, _load_cache, _merge_descriptor_files, _parse_server_descriptors
+from benchmark_render import git_revision
+from tests.helpers.synthetic_network import generate_network, replicate_network
+
+# Recorded document -> API cache name (allium/data/cache or --replay DIR/<name>.json)
+RECORDED_DOCUMENTS = {
+    'details': 'onionoo_details',
+    'uptime': 'onionoo_uptime',
+    'bandwidth': 'onionoo_bandwidth',
+    'aroi_validation': 'aroi_validation',
+}
+
+# Steps below these are too noisy to compare
+MIN_COMPARE_SECONDS = 0.05
+MIN_COMPARE_MB = 1.0
+
+
+# ---------------------------------------------------------------------------
+# Inputs
+# ---------------------------------------------------------------------------
+
+def load_recorded(replay_dir):
+    """Recorded API documents from replay_dir/<cache name>.json, or the allium API caches."""
+    documents = {}
+    for name, cache_name in RECORDED_DOCUMENTS.items():
+        if replay_dir:
+            path = os.path.join(replay_dir, f"{cache_name}.json")
+            documents[name] = None
+            if os.path.isfile(path):
+                with open(path, encoding='utf8') as f:
+                    documents[name] = json.load(f)
+        else:
+            documents[name] = _load_cache(cache_name)
+    return documents
+
+
+def build_network(options, scale):
+    """Input documents for one scale factor (a fresh copy: the pipeline modifies them)."""
+    if options['replay'] is not None:
+        network = replicate_network(load_recorded(options['replay']), int(scale), seed=options['seed'])
+    else:
+        network = generate_network(relays=round(options['relays'] * scale),
+                                   contacts=round(options['contacts'] * scale), seed=options['seed'])
+    # Kept lazily as the API workers return them (json_stream.LazyJSONArray)
+    for name, cache_name in RECORDED_DOCUMENTS.items():
+        if cache_name in LAZY_KEYS_BY_API:
+            network[name] = lazy_json_document(network[name], LAZY_KEYS_BY_API[cache_name])
+    return network
+
+
+# ---------------------------------------------------------------------------
+# Steps
+# ---------------------------------------------------------------------------
+
+def _measure(results, name, function, *args, **kwargs):
+    """Run function, recording its wall time and (while tracing) peak traced memory under name."""
+    base_memory = start_peak_measurement()
+    start = time.perf_counter()
+    value = function(*args, **kwargs)
+    results[name] = {'seconds': time.perf_counter() - start}
+    if base_memory is not None:
+        results[name]['peak_bytes'] = tracemalloc.get_traced_memory()[1] - base_memory
+    return value
+
+
+def parse_collector_documents(network, steps):
+    """Run the CollecTor parsers offline; returns (collector consensus data, descriptors data)."""
+    fetcher = CollectorFetcher()
+    # The current method comes from the live consensus; offline it is inferred from the votes
+    fetcher._fetch_current_consensus_method = lambda: None
+
+    def parse_votes():
+        for signing_key, text in network['votes'].items():
+            name = AUTHORITIES.get(signing_key, signing_key[:8])
+            fetcher.votes[name] = fetcher._parse_vote(text, signing_key)
+            if fetcher.votes[name].get('has_bandwidth_file_headers'):
+                fetcher.bw_authorities.add(name)
+
+    def parse_descriptors():
+        cert_fps, seen_fps, family_cert_groups = _merge_descriptor_files(
+            [_parse_server_descriptors(network['server_descriptors'])])
+        return {
+            'family_cert_fingerprints': list(cert_fps),
+            'all_seen_fingerprints': list(seen_fps),
+            'family_cert_groups': family_cert_groups,
+            'coverage_hours': 1,
+            'fetched_at': network['details']['relays_published'],
+        }
+
+    _measure(steps, 'parse_votes', parse_votes)
+    fetcher.bandwidth_files = _measure(steps, 'parse_bandwidth_file', fetcher._parse_bandwidth_file,
+                                       network['bandwidth_file'])
+    _measure(steps, 'build_relay_index', fetcher._build_relay_index)
+    consensus_method_info = _measure(steps, 'consensus_method_info', fetcher._compute_consensus_method_info)
+    collector_data = {
+        'votes': fetcher.votes,
+        'bandwidth_files': fetcher.bandwidth_files,
+        'relay_index': fetcher.relay_index,
+        'flag_thresholds': fetcher.flag_thresholds,
+        'bw_authorities': list(fetcher.bw_authorities),
+        'ipv6_testing_authorities': list(fetcher.ipv6_testing_authorities),
+        'consensus_method_info': consensus_method_info,
+        'fetched_at': network['details']['relays_published'],
+        'errors': [],
+        'timings': {},
+    }
+    descriptors_data = _measure(steps, 'parse_server_descriptors', parse_descriptors)
+    return collector_data, descriptors_data
+
+
+def run_steps(network, workers):
+    """
+    Process one network through every benchmarked step.
+
+    Returns:
+        tuple: (steps, pipeline stages, relay set, parsed collector data); steps
+        and stages map names to {'seconds', 'peak_bytes' (only while tracemalloc
+        is tracing)}. The relay set has already released its raw documents.
+    """
+    steps = {}
+    collector_data, descriptors_data = parse_collector_documents(network, steps)
+    with tempfile.TemporaryDirectory() as output_dir:
+        relay_set = _measure(
+            steps, 'relays_init', Relays,
+            output_dir=output_dir,
+            onionoo_url='https://onionoo.torproject.org/details',
+            relay_data=network['details'],
+            mp_workers=workers,
+            defer_enrichment=True,
+        )
+        _measure(
+            steps, 'enrich_with_api_data', relay_set.enrich_with_api_data,
+            uptime_data=network['uptime'],
+            bandwidth_data=network['bandwidth'],
+            aroi_validation_data=network['aroi_validation'],
+            collector_consensus_data=collector_data,
+            collector_descriptors_data=descriptors_data,
+        )
+        _measure(steps, 'collect_operator_metrics', _collect_operator_metrics, relay_set)
+    # Processing froze the heap for forked workers; unfreeze so later runs can collect this one
+    gc.unfreeze()
+    pipeline = relay_set.pipeline
+    stages = {name: {'seconds': seconds} for name, seconds in pipeline.timings.items()}
+    for name, peak in pipeline.memory_peaks.items():
+        stages[name]['peak_bytes'] = peak
+    return steps, stages, relay_set, collector_data
+
+
+def _max_rss_mb():
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(max_rss / (1048576 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _merge_runs(timed, traced):
+    """Median seconds over the timed runs plus peak MB of the traced run, per step."""
+    merged = {}
+    for name in timed[0]:
+        runs = [run[name]['seconds'] for run in timed if name in run]
+        merged[name] = {'seconds': round(statistics.median(runs), 4)}
+        if traced is not None and 'peak_bytes' in traced.get(name, {}):
+            merged[name]['peak_mb'] = round(traced[name]['peak_bytes'] / 1048576, 2)
+    return merged
+
+
+def benchmark_scale(options, scale):
+    """
+    Benchmark one scale factor in this process.
+
+    Args:
+        options: dict with relays, contacts, seed, replay, workers, runs, memory
+        scale: Network size factor
+
+    Returns:
+        dict: Input sizes, per-step and per-pipeline-stage results and max RSS
+    """
+    timed_steps, timed_stages = [], []
+    network_seconds = []
+    for _ in range(options['runs']):
+        start = time.perf_counter()
+        network = build_network(options, scale)
+        network_seconds.append(time.perf_counter() - start)
+        sizes = {
+            'relays': len(network['details']['relays']),
+            'contacts': len({relay.get('contact') for relay in network['details']['relays']} - {None}),
+            'votes': len(network['votes']),
+            'vote_bytes': sum(len(text) for text in network['votes'].values()),
+        }
+        steps, stages, relay_set, collector_data = run_steps(network, options['workers'])
+        timed_steps.append(steps)
+        timed_stages.append(stages)
+        sizes['indexed_relays'] = len(collector_data['relay_index'])
+        del network, relay_set, collector_data
+
+    traced_steps = traced_stages = None
+    if options['memory']:
+        network = build_network(options, scale)
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            traced_steps, traced_stages, _, _ = run_steps(network, options['workers'])
+        finally:
+            if started:
+                tracemalloc.stop()
+        del network
+
+    steps = _merge_runs(timed_steps, traced_steps)
+    return {
+        **sizes,
+        'input_s': round(statistics.median(network_seconds), 3),
+        'total_s': round(sum(step['seconds'] for step in steps.values()), 3),
+        'steps': steps,
+        'pipeline': _merge_runs(timed_stages, traced_stages),
+        'max_rss_mb': _max_rss_mb(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def _rows(title, rows):
+    print(f"  {title:<28}{'seconds':>10}{'peak MB':>10}")
+    for name, row in sorted(rows.items(), key=lambda item: item[1]['seconds'], reverse=True):
+        peak = f"{row['peak_mb']:>10.1f}" if 'peak_mb' in row else f"{'-':>10}"
+        print(f"  {name:<28}{row['seconds']:>10.3f}{peak}")
+
+
+def print_summary(results):
+    for scale, result in results['scales'].items():
+        print(f"\nPipeline benchmark x{scale}: {result['relays']:,} relays, {result['contacts']:,} contacts, "
+              f"{result['votes']} votes ({result['vote_bytes'] / 1048576:.0f} MB), "
+              f"{result['total_s']:.2f}s total, max RSS {result['max_rss_mb']:.0f} MB")
+        _rows('step', result['steps'])
+        _rows('pipeline stage', result['pipeline'])
+
+
+def _change(before, after):
+    return (after - before) / before * 100 if before else 0.0
+
+
+def compare(results, baseline, threshold):
+    """Print changes against a baseline; returns the steps/stages that regressed beyond threshold %."""
+    print(f"\nCompared with {baseline.get('revision') or 'baseline'}")
+    regressions = []
+    for scale, result in results['scales'].items():
+        before_scale = baseline['scales'].get(scale)
+        if before_scale is None:
+            print(f"  x{scale}: not in baseline")
+            continue
+        print(f"  x{scale}: total {before_scale['total_s']:.2f}s -> {result['total_s']:.2f}s")
+        for section in ('steps', 'pipeline'):
+            for name, row in result[section].items():
+                before = before_scale[section].get(name)
+                if before is None:
+                    continue
+                time_change = _change(before['seconds'], row['seconds'])
+                flags = []
+                if time_change > threshold and before['seconds'] >= MIN_COMPARE_SECONDS:
+                    flags.append('SLOWER')
+                memory = ""
+                if 'peak_mb' in row and 'peak_mb' in before:
+                    memory_change = _change(before['peak_mb'], row['peak_mb'])
+                    memory = f", peak {before['peak_mb']:.1f} -> {row['peak_mb']:.1f} MB ({memory_change:+.1f}%)"
+                    if memory_change > threshold and before['peak_mb'] >= MIN_COMPARE_MB:
+                        flags.append('MORE MEMORY')
+                if flags:
+                    regressions.append(f"x{scale} {name}")
+                print(f"    {name:<28}{before['seconds']:>8.3f}s -> {row['seconds']:>8.3f}s "
+                      f"({time_change:+.1f}%){memory}{'  ' + ', '.join(flags) if flags else ''}")
+    return regressions
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def _parse_scales(value):
+    try:
+        scales = [float(scale) for scale in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid scale list: {value!r}")
+    if not scales or any(scale <= 0 for scale in scales):
+        raise argparse.ArgumentTypeError("scales must be positive")
+    return scales
+
+
+def _scale_key(scale):
+    return f"{scale:g}"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark allium data processing on synthesized or replayed API data.',
+        epilog=(
+            'Workflow:\n'
+            '  1. python3 benchmark_pipeline.py --results before.json\n'
+            '  2. (make code changes)\n'
+            '  3. python3 benchmark_pipeline.py --results after.json --compare before.json\n'
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--scales', type=_parse_scales, default=[1.0, 2.0, 5.0],
+        help='Comma-separated network size factors (default: 1,2,5)',
+    )
+    parser.add_argument(
+        '--relays', type=int, default=10000,
+        help='Synthesized relays at scale 1 (default: 10000)',
+    )
+    parser.add_argument(
+        '--contacts', type=int, default=3000,
+        help='Synthesized operator contacts at scale 1 (default: 3000)',
+    )
+    parser.add_argument(
+        '--seed', type=int, default=0,
+        help='Random seed of the synthesized network (default: 0)',
+    )
+    parser.add_argument(
+        '--replay', nargs='?', const='', metavar='DIR',
+        help='Replay recorded API documents (DIR/onionoo_details.json, onionoo_uptime.json, '
+             'onionoo_bandwidth.json, aroi_validation.json; default: the allium API caches) '
+             'instead of synthesizing them; scales must be whole numbers',
+    )
+    parser.add_argument(
+        '--workers', type=int, default=0,
+        help='Relays mp_workers, 0 = sequential (default: 0)',
+    )
+    parser.add_argument(
+        '--runs', type=int, default=1,
+        help='Timed runs per scale; medians are reported (default: 1)',
+    )
+    parser.add_argument(
+        '--no-memory', dest='memory', action='store_false',
+        help='Skip the tracemalloc run (no per-step peak memory)',
+    )
+    parser.add_argument(
+        '--results', default='pipeline-benchmark.json',
+        help='Machine-readable results file (default: pipeline-benchmark.json)',
+    )
+    parser.add_argument(
+        '--compare', metavar='BASELINE_JSON',
+        help='Results file of an earlier benchmark to compare against',
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=10.0,
+        help='Percent increase of a step\'s time or peak memory reported as a regression (default: 10)',
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        if not os.path.isfile(args.compare):
+            print(f"Error: baseline results not found: {args.compare}")
+            sys.exit(2)
+        with open(args.compare, encoding='utf8') as f:
+            baseline = json.load(f)
+    if args.replay is not None:
+        if any(scale != int(scale) for scale in args.scales):
+            print("Error: --replay copies the recorded network, so --scales must be whole numbers")
+            sys.exit(2)
+        if not (load_recorded(args.replay)['details'] or {}).get('relays'):
+            print(f"Error: no recorded Onionoo details data in {args.replay or 'allium/data/cache'}")
+            print("Run allium once first:  python3 allium/allium.py --apis all")
+            sys.exit(2)
+
+    if args.memory and not hasattr(tracemalloc, 'reset_peak'):
+        print("Note: Python 3.8 has no tracemalloc.reset_peak(), skipping the peak memory run")
+        args.memory = False
+
+    options = {
+        'relays': args.relays,
+        'contacts': args.contacts,
+        'seed': args.seed,
+        'replay': args.replay,
+        'workers': args.workers,
+        'runs': max(1, args.runs),
+        'memory': args.memory,
+    }
+    scales = {}
+    for scale in args.scales:
+        print(f"Benchmarking scale x{_scale_key(scale)}...", flush=True)
+        # A fresh process per scale: max RSS and allocator state are not carried over
+        with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context('spawn')) as executor:
+            scales[_scale_key(scale)] = executor.submit(benchmark_scale, options, scale).result()
+
+    results = {
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'source': 'replay' if args.replay is not None else 'synthetic',
+        'seed': args.seed,
+        'workers': args.workers,
+        'runs': options['runs'],
+        'scales': scales,
+    }
+    with open(args.results, 'w', encoding='utf8') as f:
+        json.dump(results, f, indent=2)
+
+    print_summary(results)
+    print(f"\nResults written to {args.results}")
+    regressions = compare(results, baseline, args.threshold) if baseline is not None else []
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
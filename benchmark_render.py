@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Repeatable page-rendering benchmark on cached API data.
+
+Builds the relay set once from the API caches in allium/data/cache (written by
+any previous allium run, no network access), then runs generate_site() several
+times with --profile-render and reports per page type render-process time and
+p50/p95/max page latency (see allium/lib/render_profiler.py).
+
+Workflow:
+  1. python3 allium/allium.py --apis all          (fills the API caches once)
+  2. python3 benchmark_render.py --results before.json
+  3. (make code changes)
+  4. python3 benchmark_render.py --results after.json --compare before.json
+
+Exit codes:
+  0 = benchmark completed (and no page type regressed beyond --threshold)
+  1 = a page type got slower than --threshold percent against --compare
+  2 = usage error (no cached details data, missing baseline file)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from allium.lib.progress_logger import create_progress_logger
+from allium.lib.relays import Relays
+from allium.lib.render_profiler import PROFILE_REPORT
+from allium.lib.site_generator import generate_site
+from allium.lib.workers import _load_cache
+
+# Cached secondary API data -> Relays.enrich_with_api_data() keyword
+SECONDARY_CACHES = {
+    'onionoo_uptime': 'uptime_data',
+    'onionoo_bandwidth': 'bandwidth_data',
+    'aroi_validation': 'aroi_validation_data',
+    'collector_consensus': 'collector_consensus_data',
+    'consensus_health': 'consensus_health_data',
+    'collector_descriptors': 'collector_descriptors_data',
+}
+
+# Page types whose render-process time is below this are too noisy to compare
+MIN_COMPARE_SECONDS = 0.05
+
+
+# ---------------------------------------------------------------------------
+# Relay set
+# ---------------------------------------------------------------------------
+
+def build_relay_set(args, progress_logger):
+    """Process the cached API documents into a Relays instance (not timed as rendering)."""
+    details = _load_cache('onionoo_details')
+    if not details or not details.get('relays'):
+        print("Error: no cached Onionoo details data in allium/data/cache")
+        print("Run allium once first:  python3 allium/allium.py --apis all")
+        sys.exit(2)
+    enrichment = {}
+    if args.apis == 'all':
+        enrichment = {keyword: _load_cache(name) for name, keyword in SECONDARY_CACHES.items()}
+    relay_set = Relays(
+        output_dir=args.output_dir,
+        onionoo_url='https://onionoo.torproject.org/details',
+        relay_data=details,
+        progress=args.progress,
+        progress_logger=progress_logger,
+        mp_workers=args.mp_workers,
+        defer_enrichment=True,
+    )
+    relay_set.enrich_with_api_data(**enrichment)
+    return relay_set
+
+
+# ---------------------------------------------------------------------------
+# Runs
+# ---------------------------------------------------------------------------
+
+def run_once(relay_set, args, progress_logger, run_name, profile_slowest=0):
+    """Generate the site once with render profiling; returns (wall seconds, profile report)."""
+    profile_dir = os.path.join(args.profile_dir, run_name)
+    site_args = argparse.Namespace(
+        output_dir=args.output_dir,
+        mp_workers=args.mp_workers,
+        incremental=False,
+        inline_critical_css=False,
+        profile_render=profile_dir,
+        profile_slowest=profile_slowest,
+    )
+    relay_set.mp_workers = args.mp_workers
+    start = time.perf_counter()
+    generate_site(relay_set, site_args, progress_logger)
+    seconds = time.perf_counter() - start
+    with open(os.path.join(profile_dir, PROFILE_REPORT), encoding='utf8') as f:
+        return seconds, json.load(f)
+
+
+def summarize_runs(runs):
+    """Median over runs of each page type's totals and latency percentiles."""
+    page_types = {}
+    for page_type in runs[0][1]['page_types']:
+        summaries = [report['page_types'][page_type] for _, report in runs
+                     if page_type in report['page_types']]
+        page_types[page_type] = {
+            'pages': summaries[-1]['pages'],
+            'bytes': summaries[-1]['bytes'],
+            **{f"{phase}_s": round(statistics.median(s[phase]['sum_s'] for s in summaries), 3)
+               for phase in ('total', 'context', 'render', 'write')},
+            **{f"{stat}_ms": round(statistics.median(s['total'][f"{stat}_ms"] for s in summaries), 2)
+               for stat in ('p50', 'p95', 'max')},
+        }
+    walls = [seconds for seconds, _ in runs]
+    return {
+        'wall_s': {'median': round(statistics.median(walls), 3), 'min': round(min(walls), 3),
+                   'runs': [round(seconds, 3) for seconds in walls]},
+        'page_types': page_types,
+    }
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def print_summary(results):
+    print(f"\nRender benchmark: {results['relays']:,} relays, {results['mp_workers']} workers, "
+          f"wall median {results['wall_s']['median']:.2f}s over {len(results['wall_s']['runs'])} runs")
+    print(f"  {'page type':<28}{'pages':>8}{'total s':>10}{'context s':>11}{'render s':>10}"
+          f"{'write s':>9}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+    ordered = sorted(results['page_types'].items(), key=lambda item: item[1]['total_s'], reverse=True)
+    for page_type, row in ordered:
+        print(f"  {page_type:<28}{row['pages']:>8,}{row['total_s']:>10.2f}{row['context_s']:>11.2f}"
+              f"{row['render_s']:>10.2f}{row['write_s']:>9.2f}{row['p50_ms']:>9.1f}"
+              f"{row['p95_ms']:>9.1f}{row['max_ms']:>9.1f}")
+    for entry in results['slowest']:
+        print(f"  cProfile {entry['ms']:.1f}ms {entry['path']} -> {entry['profile']}")
+
+
+def compare(results, baseline, threshold):
+    """Print per page type changes against a baseline; returns page types slower than threshold %."""
+    print(f"\nCompared with {baseline.get('revision') or 'baseline'} "
+          f"(wall median {baseline['wall_s']['median']:.2f}s -> {results['wall_s']['median']:.2f}s)")
+    regressions = []
+    for page_type, row in sorted(results['page_types'].items()):
+        before = baseline['page_types'].get(page_type)
+        if before is None:
+            print(f"  {page_type:<28}new page type")
+            continue
+        change = (row['total_s'] - before['total_s']) / before['total_s'] * 100 if before['total_s'] else 0.0
+        flag = ""
+        if change > threshold and before['total_s'] >= MIN_COMPARE_SECONDS:
+            regressions.append(page_type)
+            flag = "  REGRESSION"
+        print(f"  {page_type:<28}{before['total_s']:>8.2f}s -> {row['total_s']:>8.2f}s ({change:+.1f}%), "
+              f"p95 {before['p95_ms']:.1f} -> {row['p95_ms']:.1f}ms{flag}")
+    return regressions
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark allium page rendering on cached API data.',
+        epilog=(
+            'Workflow:\n'
+            '  1. python3 allium/allium.py --apis all\n'
+            '  2. python3 benchmark_render.py --results before.json\n'
+            '  3. (make code changes)\n'
+            '  4. python3 benchmark_render.py --results after.json --compare before.json\n'
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--out', dest='output_dir', default='allium/www_benchmark',
+        help='Output directory for the generated site (default: allium/www_benchmark)',
+    )
+    parser.add_argument(
+        '--profile-dir', default='allium/www_benchmark-profile',
+        help='Directory for per-run render profiles (default: allium/www_benchmark-profile)',
+    )
+    parser.add_argument(
+        '--apis', choices=['details', 'all'], default='all',
+        help='Cached API data to process: details only, or all (default: all)',
+    )
+    parser.add_argument(
+        '--workers', dest='mp_workers', type=int, default=max(4, os.cpu_count() or 4),
+        help='Page generation workers, 0 = sequential (default: CPU count, min 4)',
+    )
+    parser.add_argument(
+        '--runs', type=int, default=3,
+        help='Timed generate_site() runs; medians are reported (default: 3)',
+    )
+    parser.add_argument(
+        '--profile-slowest', type=int, default=0,
+        help='After the timed runs, one more run under cProfile keeps the N slowest pages (default: 0)',
+    )
+    parser.add_argument(
+        '--results', default='render-benchmark.json',
+        help='Machine-readable results file (default: render-benchmark.json)',
+    )
+    parser.add_argument(
+        '--compare', metavar='BASELINE_JSON',
+        help='Results file of an earlier benchmark to compare against',
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=10.0,
+        help='Percent increase of a page type\'s render time reported as a regression (default: 10)',
+    )
+    parser.add_argument(
+        '--progress', action='store_true',
+        help='Show allium progress output during processing and rendering',
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        if not os.path.isfile(args.compare):
+            print(f"Error: baseline results not found: {args.compare}")
+            sys.exit(2)
+        with open(args.compare, encoding='utf8') as f:
+            baseline = json.load(f)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    progress_logger = create_progress_logger(time.time(), 0, 0, args.progress)
+
+    start = time.perf_counter()
+    relay_set = build_relay_set(args, progress_logger)
+    processing_seconds = time.perf_counter() - start
+
+    runs = [run_once(relay_set, args, progress_logger, f"run-{run_index}") for run_index in range(1, args.runs + 1)]
+    slowest = []
+    if args.profile_slowest:
+        # cProfile slows every page down, so this run is not part of the timings
+        _, report = run_once(relay_set, args, progress_logger, 'cprofile', args.profile_slowest)
+        slowest = [{**entry, 'profile': os.path.join(args.profile_dir, 'cprofile', entry['profile'])}
+                   for entry in report['slowest']]
+    results = {
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'relays': len(relay_set.json['relays']),
+        'mp_workers': args.mp_workers,
+        'processing_s': round(processing_seconds, 3),
+        **summarize_runs(runs),
+        'slowest': slowest,
+    }
+    with open(args.results, 'w', encoding='utf8') as f:
+        json.dump(results, f, indent=2)
+
+    print_summary(results)
+    print(f"\nResults written to {args.results}")
+    regressions = compare(results, baseline, args.threshold) if baseline is not None else []
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
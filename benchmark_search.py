@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Search index query benchmark: monolithic search-index.json (v1) against the
+sharded v2 layout (allium/lib/search_shards.py).
+
+Builds both layouts from one relay set, either synthesized
+(tests/helpers/synthetic_network.py, ~10k relays at the defaults) or processed
+from the cached Onionoo details in allium/data/cache with --cached, and runs a
+query mix sampled from the index (fingerprints, fingerprint prefixes,
+nicknames, nickname prefixes, family prefixes, AROI domains, AS numbers,
+countries, IP addresses and misses). For every query kind it reports:
+
+  - cold latency: v1 loads and parses the whole file, then scans it (the
+    search function's cold start); v2 reads the manifest and the shards the
+    query needs
+  - warm latency: files already parsed (a warm search function isolate)
+  - bytes and files loaded per cold query
+
+v1 queries run through the search simulation in
+tests/unit/templates/test_search_index.py; queries where the v2 result differs
+(v2 matches nickname and AS name fragments at token boundaries only) are
+counted.
+
+Workflow:
+  1. python3 benchmark_search.py --results before.json
+  2. (make code changes)
+  3. python3 benchmark_search.py --results after.json --compare before.json
+
+Exit codes:
+  0 = benchmark completed (and no query kind regressed beyond --threshold)
+  1 = a query kind got slower cold, or loads more bytes, than --threshold percent against --compare
+  2 = usage error (no cached details data, missing baseline file)
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+from allium.lib.relays import Relays
+from allium.lib.search_index import generate_search_index
+from allium.lib.search_shards import ShardedSearchIndex
+from allium.lib.workers import _load_cache
+from benchmark_render import git_revision
+from tests.helpers.synthetic_network import generate_network
+from tests.unit.templates.test_search_index import search as search_v1
+
+# Cold v1 loads to time (every cold v1 query parses the same file)
+V1_LOADS = 5
+
+# Cold v2 latency below this is too noisy to compare
+MIN_COMPARE_MS = 0.5
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+def build_index(args, output_dir):
+    """Write search-index.json and the v2 directory into output_dir; returns (v1 path, v2 dir, stats)."""
+    if args.cached:
+        details = _load_cache('onionoo_details')
+        if not details or not details.get('relays'):
+            print("Error: no cached Onionoo details data in allium/data/cache")
+            print("Run allium once first:  python3 allium/allium.py --apis details")
+            sys.exit(2)
+    else:
+        details = generate_network(relays=args.relays, contacts=args.contacts, seed=args.seed)['details']
+    with patch('builtins.print'):
+        relay_set = Relays(output_dir=output_dir, onionoo_url='https://onionoo.torproject.org/details',
+                           relay_data=details, mp_workers=0)
+    v1_path = os.path.join(output_dir, 'search-index.json')
+    v2_dir = os.path.join(output_dir, 'search')
+    start = time.perf_counter()
+    stats = generate_search_index(relay_set.json, v1_path, sharded_output_dir=v2_dir,
+                                  validated_aroi_domains=getattr(relay_set, 'validated_aroi_domains', None))
+    stats['generate_s'] = round(time.perf_counter() - start, 3)
+    return v1_path, v2_dir, stats
+
+
+def sample_queries(index, per_kind, seed):
+    """Query kind -> queries sampled from the index."""
+    rng = random.Random(seed)
+    relays, families, lookups = index['relays'], index['families'], index['lookups']
+
+    def pick(values):
+        values = [value for value in values if value]
+        return rng.sample(values, min(per_kind, len(values)))
+
+    return {
+        'fingerprint': pick(r['f'] for r in relays),
+        'fingerprint_prefix': pick(r['f'][:8] for r in relays),
+        'nickname': pick(r.get('n') for r in relays),
+        'nickname_prefix': pick(r.get('n', '')[:4] for r in relays if len(r.get('n', '')) > 5),
+        'family_prefix': pick(f.get('px') for f in families),
+        'aroi_domain': pick(r.get('a') for r in relays),
+        'as_number': pick(lookups['as_names']),
+        'country': pick(lookups['country_names'].values()),
+        'ip_address': pick(r['ip'][0] for r in relays if r.get('ip')),
+        'not_found': [f"xyznonexistent{n}" for n in range(per_kind)],
+    }
+
+
+# ---------------------------------------------------------------------------
+# Queries
+# ---------------------------------------------------------------------------
+
+def _ms(seconds):
+    return seconds * 1000
+
+
+def _percentiles(values):
+    ordered = sorted(values)
+    return {'p50_ms': round(statistics.median(ordered), 3),
+            'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3)}
+
+
+def run_queries(v1_path, v2_dir, queries):
+    """Per query kind latencies and bytes loaded, plus the v1 load time and result mismatches."""
+    v1_bytes = os.path.getsize(v1_path)
+    loads = []
+    for _ in range(V1_LOADS):
+        start = time.perf_counter()
+        with open(v1_path, 'rb') as f:
+            index = json.loads(f.read())
+        loads.append(time.perf_counter() - start)
+    v1_load = statistics.median(loads)
+
+    warm_reader = ShardedSearchIndex(v2_dir)
+    for kind_queries in queries.values():
+        for query in kind_queries:
+            warm_reader.search(query)
+
+    kinds, mismatches = {}, 0
+    for kind, kind_queries in queries.items():
+        v1_warm, v2_cold, v2_warm, v2_bytes, v2_files = [], [], [], [], []
+        for query in kind_queries:
+            start = time.perf_counter()
+            expected = search_v1(query, index)
+            v1_warm.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            reader = ShardedSearchIndex(v2_dir)
+            result = reader.search(query)
+            v2_cold.append(time.perf_counter() - start)
+            v2_bytes.append(reader.bytes_loaded)
+            v2_files.append(reader.files_loaded)
+            mismatches += result != expected
+
+            start = time.perf_counter()
+            warm_reader.search(query)
+            v2_warm.append(time.perf_counter() - start)
+        kinds[kind] = {
+            'queries': len(kind_queries),
+            'v1_cold': _percentiles([_ms(v1_load + seconds) for seconds in v1_warm]),
+            'v1_warm': _percentiles([_ms(seconds) for seconds in v1_warm]),
+            'v2_cold': _percentiles([_ms(seconds) for seconds in v2_cold]),
+            'v2_warm': _percentiles([_ms(seconds) for seconds in v2_warm]),
+            'v1_bytes': v1_bytes,
+            'v2_bytes_avg': round(statistics.mean(v2_bytes)),
+            'v2_bytes_max': max(v2_bytes),
+            'v2_files_avg': round(statistics.mean(v2_files), 1),
+        }
+    return {'v1_load_ms': round(_ms(v1_load), 1), 'mismatches': mismatches, 'kinds': kinds}
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def print_summary(results):
+    index = results['index']
+    print(f"\nSearch benchmark: {index['relay_count']:,} relays, {index['family_count']:,} families; "
+          f"v1 {index['file_size_kb']:,.0f} KB (load {results['v1_load_ms']:.0f}ms), "
+          f"v2 {index['shard_file_count']:,} files, {index['shard_size_bytes'] / 1024:,.0f} KB "
+          f"({index['manifest_size_bytes'] / 1024:.1f} KB manifest)")
+    print(f"  {'query kind':<20}{'v1 cold':>10}{'v2 cold':>10}{'v1 warm':>10}{'v2 warm':>10}"
+          f"{'v2 KB avg':>11}{'v2 KB max':>11}{'v2 files':>10}   (p50 ms)")
+    for kind, row in results['kinds'].items():
+        print(f"  {kind:<20}{row['v1_cold']['p50_ms']:>10.2f}{row['v2_cold']['p50_ms']:>10.2f}"
+              f"{row['v1_warm']['p50_ms']:>10.3f}{row['v2_warm']['p50_ms']:>10.3f}"
+              f"{row['v2_bytes_avg'] / 1024:>11.1f}{row['v2_bytes_max'] / 1024:>11.1f}"
+              f"{row['v2_files_avg']:>10.1f}")
+    queries = sum(row['queries'] for row in results['kinds'].values())
+    print(f"  {results['mismatches']} of {queries} queries answered differently by v2 "
+          f"(token-boundary nickname and AS name matching)")
+
+
+def compare(results, baseline, threshold):
+    """Print per query kind changes of v2 cold latency and bytes; returns kinds worse than threshold %."""
+    print(f"\nCompared with {baseline.get('revision') or 'baseline'}")
+    regressions = []
+    for kind, row in results['kinds'].items():
+        before = baseline['kinds'].get(kind)
+        if before is None:
+            print(f"  {kind:<20}new query kind")
+            continue
+        latency, size = row['v2_cold']['p50_ms'], row['v2_bytes_avg']
+        latency_change = (latency - before['v2_cold']['p50_ms']) / before['v2_cold']['p50_ms'] * 100 \
+            if before['v2_cold']['p50_ms'] else 0.0
+        size_change = (size - before['v2_bytes_avg']) / before['v2_bytes_avg'] * 100 if before['v2_bytes_avg'] else 0.0
+        flag = ""
+        if size_change > threshold or (latency_change > threshold and latency >= MIN_COMPARE_MS):
+            regressions.append(kind)
+            flag = "  REGRESSION"
+        print(f"  {kind:<20}cold p50 {before['v2_cold']['p50_ms']:.2f} -> {latency:.2f}ms "
+              f"({latency_change:+.1f}%), {before['v2_bytes_avg']:,} -> {size:,} bytes ({size_change:+.1f}%){flag}")
+    return regressions
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark search queries on the monolithic and the sharded search index.',
+        epilog=(
+            'Workflow:\n'
+            '  1. python3 benchmark_search.py --results before.json\n'
+            '  2. (make code changes)\n'
+            '  3. python3 benchmark_search.py --results after.json --compare before.json\n'
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--cached', action='store_true',
+        help='Index the cached Onionoo details in allium/data/cache instead of a synthetic network',
+    )
+    parser.add_argument(
+        '--relays', type=int, default=10000,
+        help='Relays of the synthetic network (default: 10000)',
+    )
+    parser.add_argument(
+        '--contacts', type=int, default=3000,
+        help='Contacts of the synthetic network (default: 3000)',
+    )
+    parser.add_argument(
+        '--seed', type=int, default=1,
+        help='Seed of the synthetic network and the query sample (default: 1)',
+    )
+    parser.add_argument(
+        '--queries', type=int, default=50,
+        help='Queries per query kind (default: 50)',
+    )
+    parser.add_argument(
+        '--out', dest='output_dir',
+        help='Directory for the generated indexes (default: a temporary directory)',
+    )
+    parser.add_argument(
+        '--results', default='search-benchmark.json',
+        help='Machine-readable results file (default: search-benchmark.json)',
+    )
+    parser.add_argument(
+        '--compare', metavar='BASELINE_JSON',
+        help='Results file of an earlier benchmark to compare against',
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=10.0,
+        help='Percent increase of a query kind\'s v2 cold latency or bytes reported as a regression (default: 10)',
+    )
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        if not os.path.isfile(args.compare):
+            print(f"Error: baseline results not found: {args.compare}")
+            sys.exit(2)
+        with open(args.compare, encoding='utf8') as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_dir = args.output_dir or temp_dir
+        os.makedirs(output_dir, exist_ok=True)
+        v1_path, v2_dir, index_stats = build_index(args, output_dir)
+        with open(v1_path, encoding='utf8') as f:
+            queries = sample_queries(json.load(f), args.queries, args.seed)
+        results = {
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'index': index_stats,
+            **run_queries(v1_path, v2_dir, queries),
+        }
+
+    with open(args.results, 'w', encoding='utf8') as f:
+        json.dump(results, f, indent=2)
+    print_summary(results)
+    print(f"\nResults written to {args.results}")
+
+    regressions = compare(results, baseline, args.threshold) if baseline is not None else []
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
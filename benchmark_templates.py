@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Template cold start benchmark: startup-to-first-page latency of a fresh process
+with templates loaded from source (empty, warm or no bytecode cache) against
+templates compiled ahead of time (`allium.py compile-templates`, see
+allium/lib/compiled_templates.py).
+
+Processes a synthetic relay set once (tests/helpers/synthetic_network.py) and
+saves it as a relay snapshot, then starts a fresh Python process per run and
+mode. Each process imports page_writer, loads the snapshot (not counted) and
+writes one relay page, then loads every other template. Reported per mode:
+
+  - startup to first page: process start (interpreter and imports included)
+    to the first relay page written, minus the snapshot load
+  - import: importing allium.lib.page_writer
+  - first page: loading relay-info.html (and the skeleton and macros it uses),
+    rendering and writing the page
+  - all templates: loading the remaining templates, what a process rendering
+    every page type pays on top
+
+Modes:
+  source-cold      empty bytecode cache (fresh container, first run)
+  source-warm      bytecode cache filled by an earlier run
+  source-nocache   no bytecode cache (read-only package directory)
+  compiled         compiled modules, no bytecode cache
+
+Workflow:
+  1. python3 benchmark_templates.py --results before.json
+  2. (make code changes)
+  3. python3 benchmark_templates.py --results after.json --compare before.json
+
+Exit codes:
+  0 = benchmark completed (and no mode regressed beyond --threshold)
+  1 = a mode's startup to first page got slower than --threshold percent against --compare
+  2 = usage error (missing baseline file)
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+MODES = ('source-cold', 'source-warm', 'source-nocache', 'compiled')
+
+# Latency below this is too noisy to compare
+MIN_COMPARE_MS = 5.0
+
+
+# ---------------------------------------------------------------------------
+# Child process
+# ---------------------------------------------------------------------------
+
+def run_child(snapshot_path, output_dir):
+    """Time imports, the first relay page and the other templates; prints one JSON line."""
+    start = time.perf_counter()
+    from allium.lib import page_writer
+    from allium.lib.progress_logger import ProgressLogger
+    from allium.lib.relay_snapshot import load_snapshot
+    imported = time.perf_counter()
+
+    relay_set = load_snapshot(snapshot_path, ProgressLogger(progress_enabled=False))
+    relay_set.output_dir = output_dir
+    setup = page_writer._relay_info_setup(relay_set)
+    loaded = time.perf_counter()
+
+    template = page_writer.ENV.get_template('relay-info.html')
+    page_writer._write_relay_info_page(relay_set, template, relay_set.json['relays'][0], setup,
+                                       os.path.join(output_dir, 'relay'))
+    first_page = time.perf_counter()
+
+    for name in page_writer.ENV.list_templates():
+        page_writer.ENV.get_template(name)
+    all_templates = time.perf_counter()
+
+    print(json.dumps({
+        'first_page_at': time.time() - (all_templates - first_page),
+        'import_ms': (imported - start) * 1000,
+        'snapshot_ms': (loaded - imported) * 1000,
+        'first_page_ms': (first_page - loaded) * 1000,
+        'all_templates_ms': (all_templates - first_page) * 1000,
+        'loader': type(page_writer.ENV.loader).__name__,
+    }))
+
+
+# ---------------------------------------------------------------------------
+# Runs
+# ---------------------------------------------------------------------------
+
+def build_snapshot(args, work_dir):
+    """Save a processed synthetic relay set; returns the snapshot path."""
+    from allium.lib.relay_snapshot import save_snapshot
+    from allium.lib.relays import Relays
+    from tests.helpers.synthetic_network import generate_network
+
+    details = generate_network(relays=args.relays, contacts=args.contacts, seed=args.seed)['details']
+    with patch('builtins.print'):
+        relay_set = Relays(output_dir=work_dir, onionoo_url='https://onionoo.torproject.org/details',
+                           relay_data=details, mp_workers=0)
+    path = os.path.join(work_dir, 'relays.snapshot')
+    save_snapshot(relay_set, path)
+    return path
+
+
+def compile_into(compiled_dir):
+    """Run the build step into compiled_dir; returns its stats."""
+    from allium.lib.compiled_templates import compile_templates
+    from allium.lib.page_writer import ENV
+    return compile_templates(ENV, compiled_dir)
+
+
+def spawn(snapshot_path, work_dir, cache_dir, compiled_dir):
+    """One fresh process; returns its timings plus startup to first page."""
+    env = dict(os.environ, ALLIUM_TEMPLATE_CACHE_DIR=cache_dir, ALLIUM_COMPILED_TEMPLATES_DIR=compiled_dir)
+    output_dir = tempfile.mkdtemp(dir=work_dir)
+    started = time.time()
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', snapshot_path, output_dir],
+                               env=env, capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    timings['startup_to_first_page_ms'] = (timings.pop('first_page_at') - started) * 1000 - timings['snapshot_ms']
+    return timings
+
+
+def run_mode(mode, snapshot_path, work_dir, compiled_dir, runs):
+    """Median timings of runs fresh processes in mode."""
+    samples = []
+    warm_cache = tempfile.mkdtemp(dir=work_dir)
+    if mode == 'source-warm':
+        spawn(snapshot_path, work_dir, warm_cache, '')
+    for _ in range(runs):
+        if mode == 'source-cold':
+            samples.append(spawn(snapshot_path, work_dir, tempfile.mkdtemp(dir=work_dir), ''))
+        elif mode == 'source-warm':
+            samples.append(spawn(snapshot_path, work_dir, warm_cache, ''))
+        elif mode == 'source-nocache':
+            samples.append(spawn(snapshot_path, work_dir, '', ''))
+        else:
+            samples.append(spawn(snapshot_path, work_dir, '', compiled_dir))
+    result = {key: round(statistics.median(sample[key] for sample in samples), 1)
+              for key in ('startup_to_first_page_ms', 'import_ms', 'first_page_ms', 'all_templates_ms')}
+    result['loader'] = samples[0]['loader']
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Report
+# ---------------------------------------------------------------------------
+
+def print_summary(results):
+    print(f"\nTemplate cold start: {results['relays']:,} relays, {results['template_count']} templates "
+          f"(build step {results['compile_s']:.2f}s), median of {results['runs']} processes")
+    print(f"  {'mode':<16}{'to 1st page':>13}{'import':>10}{'1st page':>10}{'all tmpl':>10}   (ms)")
+    for mode, row in results['modes'].items():
+        print(f"  {mode:<16}{row['startup_to_first_page_ms']:>13.1f}{row['import_ms']:>10.1f}"
+              f"{row['first_page_ms']:>10.1f}{row['all_templates_ms']:>10.1f}")
+
+
+def compare(results, baseline, threshold):
+    """Print per mode changes of startup to first page; returns modes worse than threshold %."""
+    print(f"\nCompared with {baseline.get('revision') or 'baseline'}")
+    regressions = []
+    for mode, row in results['modes'].items():
+        before = baseline['modes'].get(mode)
+        if before is None:
+            print(f"  {mode:<16}new mode")
+            continue
+        latency = row['startup_to_first_page_ms']
+        change = (latency - before['startup_to_first_page_ms']) / before['startup_to_first_page_ms'] * 100
+        flag = ""
+        if change > threshold and latency - before['startup_to_first_page_ms'] >= MIN_COMPARE_MS:
+            regressions.append(mode)
+            flag = "  REGRESSION"
+        print(f"  {mode:<16}{before['startup_to_first_page_ms']:.1f} -> {latency:.1f}ms ({change:+.1f}%){flag}")
+    return regressions
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        run_child(sys.argv[2], sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser(
+        description='Benchmark startup-to-first-page latency with source and compiled templates.',
+        epilog=(
+            'Workflow:\n'
+            '  1. python3 benchmark_templates.py --results before.json\n'
+            '  2. (make code changes)\n'
+            '  3. python3 benchmark_templates.py --results after.json --compare before.json\n'
+        ),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        '--relays', type=int, default=500,
+        help='Relays of the synthetic network (default: 500)',
+    )
+    parser.add_argument(
+        '--contacts', type=int, default=150,
+        help='Contacts of the synthetic network (default: 150)',
+    )
+    parser.add_argument(
+        '--seed', type=int, default=1,
+        help='Seed of the synthetic network (default: 1)',
+    )
+    parser.add_argument(
+        '--runs', type=int, default=5,
+        help='Fresh processes per mode (default: 5)',
+    )
+    parser.add_argument(
+        '--modes', default=','.join(MODES),
+        help=f'Comma-separated modes to run (default: {",".join(MODES)})',
+    )
+    parser.add_argument(
+        '--results', default='templates-benchmark.json',
+        help='Machine-readable results file (default: templates-benchmark.json)',
+    )
+    parser.add_argument(
+        '--compare', metavar='BASELINE_JSON',
+        help='Results file of an earlier benchmark to compare against',
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=10.0,
+        help='Percent increase of a mode\'s startup to first page reported as a regression (default: 10)',
+    )
+    args = parser.parse_args()
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        parser.error(f"unknown mode(s): {', '.join(unknown)}")
+
+    baseline = None
+    if args.compare:
+        if not os.path.isfile(args.compare):
+            print(f"Error: baseline results not found: {args.compare}")
+            sys.exit(2)
+        with open(args.compare, encoding='utf8') as f:
+            baseline = json.load(f)
+
+    from benchmark_render import git_revision
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        snapshot_path = build_snapshot(args, work_dir)
+        compiled = compile_into(os.path.join(work_dir, 'compiled'))
+        results = {
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'relays': args.relays,
+            'runs': args.runs,
+            'template_count': compiled['template_count'],
+            'compile_s': round(compiled['seconds'], 2),
+            'modes': {mode: run_mode(mode, snapshot_path, work_dir, compiled['compiled_dir'], args.runs)
+                      for mode in modes},
+        }
+
+    with open(args.results, 'w', encoding='utf8') as f:
+        json.dump(results, f, indent=2)
+    print_summary(results)
+    print(f"\nResults written to {args.results}")
+
+    regressions = compare(results, baseline, args.threshold) if baseline is not None else []
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -96,6 +96,11 @@ else
     ALLIUM_PY_PATH="allium/allium.py"
 fi
 
+echo "🧩 Compiling page templates..."
+if ! python3 "$ALLIUM_PY_PATH" compile-templates; then
+    echo "⚠️  Template compilation failed, templates will be compiled on first use"
+fi
+
 for attempt in 1 2 3; do
     echo "🔄 Generation attempt $attempt of 3..."
     echo "📁 Running from: $(pwd)"
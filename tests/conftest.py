@@ -310,6 +310,33 @@ def jinja_env():
     return env
 
 
+@pytest.fixture(autouse=True)
+def isolated_worker_data(tmp_path_factory, monkeypatch):
+    """
+    Point the API workers' cache, timestamps and state file at a temporary
+    directory, so tests never write to (or read stale data from) allium/data.
+
+    The managers are redirected in place: tests that imported _cache_manager
+    by name use the temporary directory too.
+    """
+    importlib.import_module('allium.lib.workers')
+    data_dir = tmp_path_factory.mktemp('allium_data')
+    cache_dir = data_dir / 'cache'
+    cache_dir.mkdir()
+    for module_name in ('allium.lib.workers', 'lib.workers'):
+        workers = sys.modules.get(module_name)
+        if workers is None:
+            continue
+        monkeypatch.setattr(workers, 'DATA_DIR', str(data_dir))
+        monkeypatch.setattr(workers, 'CACHE_DIR', str(cache_dir))
+        monkeypatch.setattr(workers, 'STATE_FILE', str(data_dir / 'state.json'))
+        monkeypatch.setattr(workers._cache_manager, 'base_directory', cache_dir)
+        monkeypatch.setattr(workers._timestamp_manager, 'base_directory', cache_dir)
+        monkeypatch.setattr(workers._state_manager, 'base_directory', data_dir)
+        monkeypatch.setattr(workers._state_manager, 'state_file_path', data_dir / 'state.json')
+    return data_dir
+
+
 # ============================================================================
 # PYTEST HOOKS
 # ============================================================================
@@ -0,0 +1,100 @@
+"""
+Small Onionoo documents and relay sets shared by the unit tests.
+
+Unlike synthetic_network.py these are sized for fast tests: relay_document()
+and build_relay_set() feed rendering tests, uptime_document() and
+bandwidth_document() the history processing tests (seeded, so the same
+arguments give the same document).
+"""
+
+import random
+from unittest.mock import patch
+
+from allium.lib.relays import Relays
+
+PERIODS = ('1_month', '6_months', '1_year', '5_years')
+
+
+def _series(rng, length, low=0, high=999, null_rate=0.1):
+    return [None if rng.random() < null_rate else rng.randint(low, high) for _ in range(length)]
+
+
+def uptime_document(seed=7, relay_count=60):
+    """Onionoo uptime document with gaps, short series, per-flag uptime and a relay without fingerprint."""
+    rng = random.Random(seed)
+    relays = []
+    for i in range(relay_count):
+        uptime = {}
+        for period in PERIODS:
+            if rng.random() < 0.85:
+                length = rng.choice([0, 5, 29, 30, 31, 90, 180])
+                # Some relays are essentially offline (values near 0)
+                high = 5 if i % 7 == 0 else 999
+                uptime[period] = {'first': '2026-01-01 00:00:00', 'last': '2026-10-01 00:00:00',
+                                  'interval': 86400, 'factor': 0.001001001001001,
+                                  'count': length, 'values': _series(rng, length, high=high)}
+        flags = {}
+        for flag in rng.sample(['Running', 'Guard', 'Fast', 'Stable', 'Exit'], rng.randint(0, 4)):
+            flags[flag] = {p: {'values': _series(rng, 40)} for p in PERIODS if rng.random() < 0.7}
+        entry = {'fingerprint': f"{i:040X}", 'uptime': uptime}
+        if flags:
+            entry['flags'] = flags
+        relays.append(entry)
+    relays.append({'uptime': {'1_month': {'values': [999] * 40}}})  # no fingerprint
+    return {'relays': relays}
+
+
+def bandwidth_document(seed=11, relay_count=40):
+    """Onionoo bandwidth document with mixed intervals and a few overload entries."""
+    rng = random.Random(seed)
+    relays = []
+    for i in range(relay_count):
+        entry = {'fingerprint': f"{i:040X}"}
+        for section in ('read_history', 'write_history'):
+            history = {}
+            for period in PERIODS:
+                if rng.random() < 0.8:
+                    history[period] = {'interval': rng.choice([3600, 86400]),
+                                       'factor': rng.uniform(1, 5000),
+                                       'values': _series(rng, rng.choice([10, 35, 120]))}
+            entry[section] = history
+        if i % 5 == 0:
+            entry['overload_ratelimits'] = {'rate-limit': 1, 'burst-limit': 2}
+        relays.append(entry)
+    return {'relays': relays}
+
+
+def relay_document(relay_count):
+    """Onionoo details document of relay_count relays (every third a guard, every fifth an exit)."""
+    relays = []
+    for i in range(relay_count):
+        flags = ['Running', 'Valid']
+        if i % 3 == 0:
+            flags.append('Guard')
+        if i % 5 == 0:
+            flags.append('Exit')
+        relays.append({
+            'nickname': f"relay{i}",
+            'fingerprint': f"{i:040X}",
+            'observed_bandwidth': 1000 * i + 1,
+            'consensus_weight': i + 1,
+            'consensus_weight_fraction': 0.001,
+            'flags': flags,
+            'country': 'us',
+            'as': f"AS{i % 7}",
+            'as_name': 'Example Networks',
+            'contact': f"operator{i % 9}@example.com",
+            'platform': 'Tor 0.4.8.1 on Linux',
+            'first_seen': '2023-01-01 12:00:00',
+            'last_seen': '2026-10-01 00:00:00',
+            'or_addresses': [f"10.0.{i // 250}.{i % 250}:9001"],
+            'running': True,
+        })
+    return {'relays': relays, 'relays_published': '2026-10-01 00:00:00', 'version': '1.0'}
+
+
+def build_relay_set(relay_count=120):
+    """Relays processed from relay_document(relay_count), without a worker pool."""
+    with patch('builtins.print'):
+        return Relays(output_dir='', onionoo_url='https://test.example.com',
+                      relay_data=relay_document(relay_count), mp_workers=0)
@@ -0,0 +1,70 @@
+"""
+Helpers for tests that render a whole site and compare the output trees.
+"""
+
+import datetime as datetime_module
+import os
+import sys
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from allium.lib.progress_logger import ProgressLogger
+from allium.lib.site_generator import generate_site
+
+
+FIXED_NOW = datetime(2026, 10, 16, 12, 0, tzinfo=timezone.utc)
+
+
+class FixedDatetime(datetime):
+    """Render clock pinned so relative times ("3d ago") match across renders."""
+
+    @classmethod
+    def now(cls, tz=None):
+        if tz is None:
+            # Naive local time, as datetime.now() returns
+            return FIXED_NOW.astimezone().replace(tzinfo=None)
+        return FIXED_NOW.astimezone(tz)
+
+    @classmethod
+    def utcnow(cls):
+        return FIXED_NOW.replace(tzinfo=None)
+
+
+@contextmanager
+def fixed_clock():
+    """
+    Pin every clock processing and rendering read to FIXED_NOW: time.time(),
+    datetime imported at module level by allium.lib modules, and datetime
+    imported inside functions. Forked render workers inherit the patches.
+    """
+    with ExitStack() as stack:
+        stack.enter_context(patch('time.time', return_value=FIXED_NOW.timestamp()))
+        stack.enter_context(patch.object(datetime_module, 'datetime', FixedDatetime))
+        for name, module in list(sys.modules.items()):
+            if name.startswith('allium.lib.') and getattr(module, 'datetime', None) is datetime:
+                stack.enter_context(patch.object(module, 'datetime', FixedDatetime))
+        yield
+
+
+def read_tree(root):
+    """Relative path -> bytes of every file under root."""
+    pages = {}
+    for directory, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as f:
+                pages[os.path.relpath(path, root)] = f.read()
+    return pages
+
+
+def render_site(relay_set, output_dir, mp_workers):
+    """Run generate_site() for relay_set into output_dir with the clock pinned and no network."""
+    relay_set.output_dir = str(output_dir)
+    relay_set.mp_workers = mp_workers
+    args = SimpleNamespace(output_dir=str(output_dir), mp_workers=mp_workers, incremental=False,
+                           inline_critical_css=False, profile_render=None)
+    with patch('builtins.print'), fixed_clock(), \
+            patch('allium.lib.consensus.AuthorityMonitor.check_all_authorities', return_value={}):
+        generate_site(relay_set, args, ProgressLogger(progress_enabled=False))
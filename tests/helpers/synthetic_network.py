@@ -0,0 +1,532 @@
+"""
+Synthetic Tor network documents for offline benchmarks and tests.
+
+Generates every API document the Relays processing pipeline consumes, with the
+shapes and rough distributions of the live network, from a seed (same seed and
+sizes -> same documents):
+
+  - Onionoo details, uptime and bandwidth documents (full 1 month .. 5 year
+    histories, per-flag uptime)
+  - AROI validation results
+  - raw CollecTor votes of the 9 voting authorities, a bandwidth file and a
+    server-descriptors file (with family-certs), as the CollecTor parsers read them
+
+Operators own relays with a long-tailed distribution (a few run hundreds of
+relays, most run one), about 40% of them publish an AROI contact, and operators
+with several relays usually declare them as a family.
+
+History value lists are taken from a shared pool, so relays older than a
+period reference the same list objects. The pipeline only reads them, so stage
+timings and peak memory are unaffected, but generating a 5x network stays cheap.
+
+replicate_network() scales up recorded documents instead (used by
+benchmark_pipeline.py --replay).
+"""
+
+import base64
+import copy
+import hashlib
+import random
+import re
+from datetime import datetime, timedelta
+
+from allium.lib.consensus.collector_fetcher import _FALLBACK_SIGNING_KEY_TO_NAME
+
+ONIONOO_TIME = '%Y-%m-%d %H:%M:%S'
+HISTORY_POINTS = 180
+UPTIME_INTERVALS = {'1_month': 14400, '6_months': 86400, '1_year': 172800, '5_years': 864000}
+BANDWIDTH_INTERVALS = {'1_month': 14400, '6_months': 86400, '1_year': 172800, '5_years': 864000}
+SERIES_POOL_SIZE = 64
+
+AUTHORITY_NAMES = tuple(_FALLBACK_SIGNING_KEY_TO_NAME.values()) + ('Serge',)
+BANDWIDTH_AUTHORITIES = ('bastet', 'gabelmoo', 'longclaw', 'maatuska', 'moria1', 'tor26')
+
+_COUNTRIES = (('de', 30), ('us', 18), ('nl', 8), ('fr', 8), ('ch', 3), ('se', 3), ('gb', 3), ('fi', 2),
+              ('ca', 2), ('at', 2), ('pl', 2), ('ro', 2), ('lu', 2), ('no', 1), ('cz', 1), ('ru', 2),
+              ('ua', 1), ('jp', 1), ('sg', 1), ('au', 1), ('br', 1), ('in', 1), ('is', 1), ('md', 1),
+              ('bg', 1), ('es', 1), ('it', 1), ('dk', 1), ('hk', 1), ('za', 1), ('ar', 1), ('kr', 1))
+_PLATFORMS = (('Linux', 85), ('FreeBSD', 8), ('OpenBSD', 2), ('Windows', 2), ('Darwin', 1), ('NetBSD', 1))
+_VERSIONS = ('0.4.8.12', '0.4.8.13', '0.4.8.14', '0.4.8.10', '0.4.7.16', '0.4.9.1-alpha')
+_FLAG_ORDER = ('Authority', 'BadExit', 'Exit', 'Fast', 'Guard', 'HSDir', 'MiddleOnly', 'Running',
+               'Stable', 'StaleDesc', 'V2Dir', 'Valid')
+
+
+def _weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _fingerprint(rng):
+    return f"{rng.getrandbits(160):040X}"
+
+
+def _history(first, interval, factor, values):
+    return {
+        'first': (first - timedelta(seconds=interval * (len(values) - 1))).strftime(ONIONOO_TIME),
+        'last': first.strftime(ONIONOO_TIME),
+        'interval': interval,
+        'factor': factor,
+        'count': len(values),
+        'values': values,
+    }
+
+
+def _series_pool(rng, low, high, gaps):
+    """Value lists (0..999 scale) ranging from steady to flaky, with occasional null gaps."""
+    pool = []
+    for index in range(SERIES_POOL_SIZE):
+        level = low + (high - low) * index / (SERIES_POOL_SIZE - 1)
+        values = [max(0, min(999, int(rng.gauss(level, 60)))) for _ in range(HISTORY_POINTS)]
+        if gaps and index % 7 == 0:
+            start = rng.randrange(HISTORY_POINTS - 10)
+            for point in range(start, start + rng.randint(2, 10)):
+                values[point] = None
+        pool.append(values)
+    return pool
+
+
+class _HistoryPools:
+    """Shared history value lists for one generated network."""
+
+    def __init__(self, rng):
+        self.uptime = _series_pool(rng, 700, 999, gaps=True)
+        self.bandwidth = _series_pool(rng, 50, 950, gaps=False)
+
+    def values(self, pool, rng, age_seconds, interval):
+        values = rng.choice(pool)
+        points = min(HISTORY_POINTS, int(age_seconds // interval) + 1)
+        return values if points == HISTORY_POINTS else values[-points:]
+
+
+# ---------------------------------------------------------------------------
+# Onionoo details
+# ---------------------------------------------------------------------------
+
+def _operators(rng, relay_count, contact_count):
+    """Contact index per relay (None = no contact): every contact gets one, the rest is long-tailed."""
+    unattached = relay_count // 10
+    owners = list(range(contact_count))
+    weights = [1.0 / (index + 4) ** 1.2 for index in range(contact_count)]
+    owners += rng.choices(range(contact_count), weights=weights,
+                          k=max(0, relay_count - contact_count - unattached))
+    owners += [None] * (relay_count - len(owners))
+    rng.shuffle(owners)
+    return owners[:relay_count]
+
+
+def _contact(index):
+    if index % 5 < 2:
+        return (f"email:ops{index}[]example{index % 97}.net url:https://op{index}.example.org "
+                f"proof:uri-rsa ciissversion:2")
+    return f"Operator {index} <ops{index} AT example{index % 97} dot net>"
+
+
+def _relay_flags(rng, exit_relay):
+    flags = {'Running', 'Valid', 'V2Dir'}
+    if rng.random() < 0.92:
+        flags.add('Fast')
+    if rng.random() < 0.75:
+        flags.add('Stable')
+        if 'Fast' in flags and rng.random() < 0.5:
+            flags.add('Guard')
+        if rng.random() < 0.7:
+            flags.add('HSDir')
+    if exit_relay:
+        flags.add('Exit')
+        if rng.random() < 0.01:
+            flags.add('BadExit')
+    elif rng.random() < 0.005:
+        flags.add('MiddleOnly')
+    if rng.random() < 0.01:
+        flags.add('StaleDesc')
+    return [flag for flag in _FLAG_ORDER if flag in flags]
+
+
+def generate_details(rng, relay_count, contact_count, now):
+    """Onionoo details document ({'relays': [...], 'relays_published': ..., 'version': ...})."""
+    owners = _operators(rng, relay_count, contact_count)
+    as_count = max(50, relay_count // 8)
+    as_weights = [1.0 / (index + 1) ** 0.9 for index in range(as_count)]
+    operator_home = {}
+    relays = []
+    for index, owner in enumerate(owners):
+        if owner is not None and owner not in operator_home:
+            operator_home[owner] = (_weighted(rng, _COUNTRIES),
+                                    rng.choices(range(as_count), weights=as_weights)[0],
+                                    _weighted(rng, _PLATFORMS))
+        country, as_index, os_name = operator_home.get(owner) or (
+            _weighted(rng, _COUNTRIES), rng.choices(range(as_count), weights=as_weights)[0],
+            _weighted(rng, _PLATFORMS))
+        if rng.random() < 0.2:
+            country = _weighted(rng, _COUNTRIES)
+        exit_relay = rng.random() < (0.35 if owner is not None and owner % 11 == 0 else 0.12)
+        observed = int(rng.lognormvariate(15.5, 1.3))
+        first_seen = now - timedelta(days=rng.expovariate(1 / 700), hours=rng.random() * 24)
+        running = rng.random() > 0.03
+        last_seen = now if running else now - timedelta(days=rng.choice((1, 3, 6, 9, 30)))
+        version = rng.choice(_VERSIONS)
+        address = f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+        or_addresses = [f"{address}:{rng.choice((443, 9001, 9001, 8443, 9100))}"]
+        if rng.random() < 0.45:
+            or_addresses.append(f"[2001:db8:{index // 65536:x}:{index % 65536:x}::1]:9001")
+        relay = {
+            'nickname': f"relay{index}",
+            'fingerprint': _fingerprint(rng),
+            'or_addresses': or_addresses,
+            'last_seen': last_seen.strftime(ONIONOO_TIME),
+            'last_changed_address_or_port': first_seen.strftime(ONIONOO_TIME),
+            'first_seen': first_seen.strftime(ONIONOO_TIME),
+            'running': running,
+            'flags': _relay_flags(rng, exit_relay),
+            'country': country,
+            'country_name': country.upper(),
+            'as': f"AS{64512 + as_index}",
+            'as_name': f"Hosting Provider {as_index}",
+            'consensus_weight': max(1, int(observed / 1000 * rng.uniform(0.5, 1.6))),
+            'verified_host_names': [f"host{index}.example.net"],
+            'last_restarted': (now - timedelta(days=rng.expovariate(1 / 20))).strftime(ONIONOO_TIME),
+            'bandwidth_rate': max(observed, 1073741824),
+            'bandwidth_burst': max(observed, 1073741824),
+            'observed_bandwidth': observed,
+            'advertised_bandwidth': int(observed * rng.uniform(0.8, 1.0)),
+            'exit_policy': ['accept *:80', 'accept *:443', 'reject *:*'] if exit_relay else ['reject *:*'],
+            'exit_policy_summary': {'accept': ['80', '443']} if exit_relay else {'reject': ['1-65535']},
+            'platform': f"Tor {version} on {os_name}",
+            'version': version,
+            'recommended_version': not version.endswith('alpha') and not version.startswith('0.4.7'),
+            'version_status': 'recommended' if not version.startswith('0.4.7') else 'obsolete',
+            'effective_family': [],
+            'measured': rng.random() < 0.96,
+        }
+        if exit_relay:
+            relay['exit_addresses'] = [address]
+        if owner is not None:
+            relay['contact'] = _contact(owner)
+        if rng.random() < 0.02:
+            relay['overload_general_timestamp'] = int((now - timedelta(hours=rng.randint(1, 60))).timestamp() * 1000)
+        relay['_owner'] = owner
+        relays.append(relay)
+
+    # The ten directory authorities run on well-connected relays of their own
+    for relay, name in zip(sorted(relays, key=lambda r: -r['observed_bandwidth'])[:len(AUTHORITY_NAMES)],
+                           AUTHORITY_NAMES):
+        relay['nickname'] = name
+        relay['running'] = True
+        relay['last_seen'] = now.strftime(ONIONOO_TIME)
+        relay['flags'] = [flag for flag in _FLAG_ORDER
+                          if flag in {'Authority', 'Running', 'Valid', 'V2Dir', 'Fast', 'Stable'}]
+
+    # Operators with several relays mostly declare them as one family
+    by_owner = {}
+    for relay in relays:
+        if relay['_owner'] is not None:
+            by_owner.setdefault(relay['_owner'], []).append(relay)
+    for owner, members in by_owner.items():
+        family = sorted(relay['fingerprint'] for relay in members) if owner % 10 < 7 else None
+        for relay in members:
+            relay['effective_family'] = family or [relay['fingerprint']]
+    for relay in relays:
+        if not relay['effective_family']:
+            relay['effective_family'] = [relay['fingerprint']]
+
+    total_weight = sum(relay['consensus_weight'] for relay in relays)
+    for relay in relays:
+        fraction = relay['consensus_weight'] / total_weight
+        relay['consensus_weight_fraction'] = fraction
+        relay['guard_probability'] = fraction * 1.1 if 'Guard' in relay['flags'] else 0.0
+        relay['middle_probability'] = fraction * 0.9
+        relay['exit_probability'] = fraction * 2.5 if 'Exit' in relay['flags'] else 0.0
+    return {'version': '8.0', 'build_revision': 'synthetic',
+            'relays_published': now.strftime(ONIONOO_TIME), 'relays': relays}
+
+
+# ---------------------------------------------------------------------------
+# Onionoo uptime / bandwidth
+# ---------------------------------------------------------------------------
+
+def _age_seconds(relay, now):
+    return (now - datetime.strptime(relay['first_seen'], ONIONOO_TIME)).total_seconds()
+
+
+def generate_uptime(rng, details, pools, now):
+    """Onionoo uptime document: 'uptime' and per-flag histories for every period."""
+    relays = []
+    for relay in details['relays']:
+        age = _age_seconds(relay, now)
+        uptime = {period: _history(now, interval, 0.001001001001001001,
+                                   pools.values(pools.uptime, rng, age, interval))
+                  for period, interval in UPTIME_INTERVALS.items()}
+        flags = {flag: {period: _history(now, interval, 0.001001001001001001,
+                                         pools.values(pools.uptime, rng, age, interval))
+                        for period, interval in UPTIME_INTERVALS.items()}
+                 for flag in relay['flags'] if flag not in ('Authority', 'StaleDesc')}
+        relays.append({'fingerprint': relay['fingerprint'], 'uptime': uptime, 'flags': flags})
+    return {'version': '8.0', 'relays_published': details['relays_published'], 'relays': relays}
+
+
+def generate_bandwidth(rng, details, pools, now):
+    """Onionoo bandwidth document: read/write histories (bytes/s) plus overload fields."""
+    relays = []
+    for relay in details['relays']:
+        age = _age_seconds(relay, now)
+        factor = max(relay['observed_bandwidth'], 1) / 500
+        entry = {'fingerprint': relay['fingerprint']}
+        for section in ('read_history', 'write_history'):
+            entry[section] = {period: _history(now, interval, factor,
+                                               pools.values(pools.bandwidth, rng, age, interval))
+                              for period, interval in BANDWIDTH_INTERVALS.items()}
+        if rng.random() < 0.03:
+            entry['overload_ratelimits'] = {'rate-limit': 1073741824, 'burst-limit': 1073741824,
+                                            'write-count': rng.randint(1, 50), 'read-count': rng.randint(1, 50)}
+        if rng.random() < 0.01:
+            entry['overload_fd_exhausted'] = {'timestamp': int(now.timestamp() * 1000)}
+        relays.append(entry)
+    return {'version': '8.0', 'relays_published': details['relays_published'], 'relays': relays}
+
+
+# ---------------------------------------------------------------------------
+# AROI validation
+# ---------------------------------------------------------------------------
+
+def generate_aroi_validation(rng, details, now):
+    """AROI validator output for every relay with an AROI contact (~85% valid)."""
+    results = []
+    for relay in details['relays']:
+        contact = relay.get('contact', '')
+        if 'ciissversion:2' not in contact:
+            continue
+        domain = contact.split('url:https://', 1)[1].split()[0]
+        valid = rng.random() < 0.85
+        results.append({
+            'fingerprint': relay['fingerprint'],
+            'domain': domain,
+            'proof_type': 'uri_rsa',
+            'valid': valid,
+            'error': None if valid else rng.choice(('URI-RSA: fingerprint not found in proof file',
+                                                   'DNS lookup failed', 'SSL certificate error')),
+        })
+    valid_count = sum(result['valid'] for result in results)
+    rate = round(valid_count / len(results) * 100, 1) if results else 0.0
+    return {
+        'metadata': {'timestamp': now.isoformat(), 'total_relays': len(details['relays'])},
+        'statistics': {
+            'total_relays': len(results), 'valid_relays': valid_count, 'invalid_relays': len(results) - valid_count,
+            'success_rate': rate,
+            'proof_types': {'dns_rsa': {'total': 0, 'valid': 0, 'success_rate': 0.0},
+                            'uri_rsa': {'total': len(results), 'valid': valid_count, 'success_rate': rate}},
+        },
+        'results': results,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Raw CollecTor documents
+# ---------------------------------------------------------------------------
+
+def _identity(fingerprint):
+    return base64.b64encode(bytes.fromhex(fingerprint)).decode().rstrip('=')
+
+
+def generate_votes(rng, details, now):
+    """Raw vote documents of the 9 voting authorities, keyed by authority signing-key fingerprint."""
+    published = now.strftime(ONIONOO_TIME)
+    relays = [relay for relay in details['relays'] if relay.get('running') and relay.get('or_addresses')]
+    votes = {}
+    for signing_key, name in _FALLBACK_SIGNING_KEY_TO_NAME.items():
+        measures = name in BANDWIDTH_AUTHORITIES
+        lines = [
+            'network-status-version 3',
+            'vote-status vote',
+            'consensus-methods 28 29 30 31 32 33 34' + (' 35' if name != 'dizum' else ''),
+            f"published {published}",
+            f"valid-after {published}",
+            'known-flags Authority BadExit Exit Fast Guard HSDir MiddleOnly Running Stable StaleDesc V2Dir Valid',
+            'params CircuitPriorityHalflifeMsec=30000 DoSCircuitCreationEnabled=1 use-family-ids=1',
+            f"flag-thresholds stable-uptime={rng.randint(1200000, 1900000)} stable-mtbf={rng.randint(2000000, 4000000)} "
+            f"fast-speed={rng.choice((100000, 102000, 110000))} guard-wfu=98.000% guard-tk=691200 "
+            f"guard-bw-inc-exits={rng.randint(9000000, 13000000)} guard-bw-exc-exits={rng.randint(8000000, 11000000)} "
+            'enough-mtbf=1 ignoring-advertised-bws=1',
+        ]
+        if measures:
+            lines.append(f"bandwidth-file-headers timestamp={int(now.timestamp())} version=1.4.0 software=sbws")
+        lines.append(f"dir-source {name} {signing_key} {name}.example.org 198.51.100.1 80 443")
+        digest = base64.b64encode(hashlib.sha1(name.encode()).digest()).decode().rstrip('=')
+        for relay in relays:
+            if rng.random() < 0.03:
+                continue  # Not every authority reaches every relay
+            address, port = relay['or_addresses'][0].rsplit(':', 1)
+            flags = [flag for flag in relay.get('flags', [])
+                     if not (flag in ('Guard', 'HSDir') and rng.random() < 0.04)]
+            bandwidth = max(1, (relay.get('observed_bandwidth') or 0) // 1000)
+            lines.append(f"r {relay.get('nickname', 'Unnamed')} {_identity(relay['fingerprint'])} {digest} "
+                         f"{relay.get('last_restarted') or published} {address} {port} 0")
+            if len(relay['or_addresses']) > 1:
+                lines.append(f"a {relay['or_addresses'][1]}")
+            lines.append(f"s {' '.join(flags)}")
+            lines.append(f"v Tor {relay.get('version', '0.4.8.12')}")
+            lines.append('pr Conflux=1 Cons=1-2 Desc=1-2 DirCache=2 FlowCtrl=1-2 HSDir=2 HSIntro=4-5 '
+                         'HSRend=1-2 Link=1-5 LinkAuth=1,3 Microdesc=1-2 Padding=2 Relay=1-4')
+            if measures:
+                lines.append(f"w Bandwidth={bandwidth} Measured={max(1, int(bandwidth * rng.uniform(0.6, 1.4)))}")
+            else:
+                lines.append(f"w Bandwidth={bandwidth}")
+            lines.append('p accept 80,443' if 'Exit' in flags else 'p reject 1-65535')
+            lines.append(f"stats wfu={rng.uniform(0.9, 1.0):.6f} tk={rng.randint(3600, 90000000)} "
+                         f"mtbf={rng.randint(3600, 30000000)}")
+        lines.append('directory-footer')
+        votes[signing_key] = '\n'.join(lines) + '\n'
+    return votes
+
+
+def generate_bandwidth_file(rng, details, now):
+    """Raw sbws bandwidth file measuring ~95% of the running relays."""
+    lines = [str(int(now.timestamp())), 'version=1.4.0', 'software=sbws', '=====']
+    for relay in details['relays']:
+        if relay.get('running') and rng.random() < 0.95:
+            lines.append(f"bw={max(1, (relay.get('observed_bandwidth') or 0) // 1000)} "
+                         f"node_id=${relay['fingerprint']} nick={relay.get('nickname', 'Unnamed')} success=10 error_circ=0 error_stream=0 "
+                         f"rtt={rng.randint(100, 900)} time={now.strftime('%Y-%m-%dT%H:%M:%S')}")
+    return '\n'.join(lines) + '\n'
+
+
+def _family_cert(fingerprint, family_key):
+    """Ed25519 family-cert: certified key plus a signing-key extension (type 0x04) holding the family key."""
+    certified = hashlib.sha256(fingerprint.encode()).digest()
+    cert = (bytes([1, 0x0c]) + (500000).to_bytes(4, 'big') + b'\x01' + certified + b'\x01'
+            + (32).to_bytes(2, 'big') + b'\x04\x00' + family_key + bytes(64))
+    encoded = base64.b64encode(cert).decode()
+    return [encoded[i:i + 64] for i in range(0, len(encoded), 64)]
+
+
+def generate_server_descriptors(rng, details, now):
+    """Raw server-descriptors file; ~30% of declared families publish family-certs."""
+    published = now.strftime(ONIONOO_TIME)
+    lines = []
+    for relay in details['relays']:
+        if not relay.get('or_addresses'):
+            continue
+        fingerprint = relay['fingerprint']
+        address, port = relay['or_addresses'][0].rsplit(':', 1)
+        observed = relay.get('observed_bandwidth') or 0
+        lines += [
+            '@type server-descriptor 1.0',
+            f"router {relay.get('nickname', 'Unnamed')} {address} {port} 0 0",
+            f"platform {relay.get('platform', 'Tor 0.4.8.12 on Linux')}",
+            'proto Conflux=1 Cons=1-2 Desc=1-2 DirCache=2 FlowCtrl=1-2 HSDir=2 Link=1-5 Relay=1-4',
+            f"published {published}",
+            f"fingerprint {' '.join(fingerprint[i:i + 4] for i in range(0, 40, 4))}",
+            f"uptime {rng.randint(3600, 9000000)}",
+            f"bandwidth {relay.get('bandwidth_rate', observed)} {relay.get('bandwidth_burst', observed)} {observed}",
+        ]
+        family = relay.get('effective_family') or []
+        if len(family) > 1 and int(family[0][:2], 16) % 10 < 3:
+            family_key = hashlib.sha256(family[0].encode()).digest()
+            lines += ['family-cert', '-----BEGIN FAMILY CERT-----', *_family_cert(fingerprint, family_key),
+                      '-----END FAMILY CERT-----']
+        if relay.get('contact'):
+            lines.append(f"contact {relay['contact']}")
+        lines += ['reject *:*', 'router-signature', '-----BEGIN SIGNATURE-----',
+                  base64.b64encode(hashlib.sha512(fingerprint.encode()).digest()).decode(),
+                  '-----END SIGNATURE-----']
+    return ('\n'.join(lines) + '\n').encode()
+
+
+# ---------------------------------------------------------------------------
+# Whole network
+# ---------------------------------------------------------------------------
+
+def _strip_private(details):
+    for relay in details['relays']:
+        relay.pop('_owner', None)
+    return details
+
+
+def collector_documents(rng, details, now):
+    """Raw CollecTor documents for a details document."""
+    return {
+        'votes': generate_votes(rng, details, now),
+        'bandwidth_file': generate_bandwidth_file(rng, details, now),
+        'server_descriptors': generate_server_descriptors(rng, details, now),
+    }
+
+
+def generate_network(relays=10000, contacts=3000, seed=0, now=None):
+    """
+    Every input document of a synthetic network.
+
+    Args:
+        relays: Number of relays in the details document
+        contacts: Number of distinct operator contacts
+        seed: Random seed (same seed and sizes -> same documents)
+        now: Reference time (default: the current hour, so nothing is filtered as stale)
+
+    Returns:
+        dict: 'details', 'uptime', 'bandwidth', 'aroi_validation' documents and the
+        raw CollecTor 'votes' (signing key -> text), 'bandwidth_file' (text) and
+        'server_descriptors' (bytes)
+    """
+    rng = random.Random(seed)
+    now = now or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    pools = _HistoryPools(rng)
+    details = generate_details(rng, relays, min(contacts, relays), now)
+    network = {
+        'uptime': generate_uptime(rng, details, pools, now),
+        'bandwidth': generate_bandwidth(rng, details, pools, now),
+        'aroi_validation': generate_aroi_validation(rng, details, now),
+        **collector_documents(rng, details, now),
+    }
+    network['details'] = _strip_private(details)
+    return network
+
+
+def _copy_fingerprint(fingerprint, copy_index):
+    if not copy_index:
+        return fingerprint
+    return hashlib.sha1(f"{fingerprint}:{copy_index}".encode()).hexdigest().upper()
+
+
+def _copy_contact(contact, copy_index):
+    # A distinct AROI domain (url:) and a distinct contact string per copy
+    contact = re.sub(r'url:(https?://)?', lambda match: f"url:{match.group(1) or ''}copy{copy_index}.", contact)
+    return f"{contact} copy{copy_index}"
+
+
+def replicate_network(documents, factor, seed=0, now=None):
+    """
+    Scale recorded Onionoo/AROI documents up by an integer factor.
+
+    Copy N of every relay gets a fingerprint derived from the original and N
+    (family and validation entries follow) and a contact with its own AROI
+    domain, so the copies form distinct operators and families. Raw CollecTor documents are
+    synthesized for the replicated relays.
+
+    Args:
+        documents: {'details': ..., 'uptime': ..., 'bandwidth': ..., 'aroi_validation': ...}
+            (all but details may be None)
+        factor: Number of copies (1 = as recorded)
+    """
+    rng = random.Random(seed)
+    now = now or datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+    scaled = {}
+    for name in ('details', 'uptime', 'bandwidth', 'aroi_validation'):
+        document = documents.get(name)
+        if document is None:
+            scaled[name] = None
+            continue
+        key = 'results' if name == 'aroi_validation' else 'relays'
+        entries = []
+        for copy_index in range(factor):
+            for entry in document.get(key, []):
+                entry = copy.deepcopy(entry)
+                entry['fingerprint'] = _copy_fingerprint(entry['fingerprint'], copy_index)
+                if copy_index and entry.get('contact'):
+                    entry['contact'] = _copy_contact(entry['contact'], copy_index)
+                if copy_index and entry.get('domain'):
+                    entry['domain'] = f"copy{copy_index}.{entry['domain']}"
+                if entry.get('effective_family'):
+                    entry['effective_family'] = [_copy_fingerprint(member, copy_index)
+                                                 for member in entry['effective_family']]
+                entries.append(entry)
+        scaled[name] = {**document, key: entries}
+    scaled.update(collector_documents(rng, scaled['details'], now))
+    return scaled
@@ -269,9 +269,9 @@ class TestAROIPaginationSystem(unittest.TestCase):
         self.assertIn('Operator (AROI)', rendered)  # Standard header from macro
 
     def test_skeleton_css_integration(self):
-        """Test that pagination system integrates with skeleton.html CSS."""
-        # Read skeleton.html to verify CSS classes are defined
-        skeleton_path = os.path.join(os.path.dirname(__file__), '..', '..', 'allium', 'templates', 'skeleton.html')
+        """Test that pagination system integrates with the site stylesheet."""
+        # Read the stylesheet linked by skeleton.html to verify CSS classes are defined
+        skeleton_path = os.path.join(os.path.dirname(__file__), '..', '..', 'allium', 'static', 'css', 'allium.css')
         with open(skeleton_path, 'r') as f:
             skeleton_content = f.read()
         
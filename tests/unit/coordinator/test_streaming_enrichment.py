@@ -0,0 +1,148 @@
+"""
+Unit tests for overlapping relay processing with secondary API downloads
+(Coordinator.get_relay_set feeding Relays.attach_api_data as workers finish).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib.coordinator import Coordinator
+from allium.lib.memory_lifecycle import document_header
+
+from tests.helpers.relay_documents import relay_document
+
+
+def _uptime_document(details):
+    return {'relays': [{'fingerprint': relay['fingerprint'],
+                        'uptime': {period: {'values': [999] * 40, 'factor': 0.001001001001001}
+                                   for period in ('1_month', '6_months', '1_year', '5_years')}}
+                       for relay in details['relays']]}
+
+
+def _coordinator(workers):
+    """Coordinator whose API workers are replaced by (name, callable) pairs."""
+    coordinator = Coordinator(output_dir='/tmp/test', enabled_apis='all', mp_workers=0)
+    coordinator.api_workers = [(name, lambda logger, fn=fn: fn(), [None]) for name, fn in workers]
+    return coordinator
+
+
+class TestStreamingEnrichment:
+    """Relays processing starts before the secondary workers finish."""
+
+    def test_relay_processing_overlaps_slow_downloads(self):
+        details = relay_document(40)
+        relays_ready = threading.Event()
+        seen_by_worker = []
+
+        def slow_uptime():
+            # Only finishes once the relay set exists (or times out and records it)
+            seen_by_worker.append(relays_ready.wait(timeout=10))
+            return _uptime_document(details)
+
+        coordinator = _coordinator([('onionoo_details', lambda: details),
+                                    ('onionoo_uptime', slow_uptime),
+                                    ('aroi_validation', lambda: None)])
+        original_wait = coordinator.wait_for_api_workers
+
+        def wait_for_api_workers(on_complete=None):
+            relays_ready.set()
+            return original_wait(on_complete)
+
+        with patch.object(coordinator, 'wait_for_api_workers', side_effect=wait_for_api_workers), \
+                patch('builtins.print'):
+            relay_set = coordinator.get_relay_set()
+
+        assert seen_by_worker == [True]
+        counts = relay_set.pipeline.run_counts
+        assert counts['uptime'] == 1
+        assert counts['network_health'] == 1
+        assert counts['aroi_leaderboards'] == 1
+        # The coordinator hands the documents over; processing keeps only their headers
+        assert 'onionoo_uptime' not in coordinator.worker_data
+        assert relay_set.uptime_data == document_header(_uptime_document(details))
+        assert relay_set.aroi_validation_data is None
+        assert coordinator.worker_futures and coordinator._executor is None
+
+    def test_results_are_handed_over_in_completion_order(self):
+        release = threading.Event()
+
+        def late():
+            release.wait(timeout=10)
+            return {'late': True}
+
+        coordinator = _coordinator([('onionoo_details', lambda: {'relays': []}),
+                                    ('onionoo_bandwidth', late),
+                                    ('aroi_validation', lambda: {'early': True})])
+        with patch('builtins.print'):
+            data = coordinator.fetch_all_apis_threaded(wait_for=('onionoo_details',))
+            assert data['onionoo_details'] == {'relays': []}
+            delivered = []
+
+            def on_complete(api_name, result):
+                delivered.append((api_name, result))
+                if api_name == 'aroi_validation':
+                    release.set()
+
+            coordinator.wait_for_api_workers(on_complete=on_complete)
+
+        assert delivered == [('aroi_validation', {'early': True}), ('onionoo_bandwidth', {'late': True})]
+        assert coordinator.get_bandwidth_data() == {'late': True}
+
+    def test_failed_details_still_drains_workers(self):
+        coordinator = _coordinator([('onionoo_details', lambda: None),
+                                    ('onionoo_uptime', lambda: {'relays': []})])
+        with patch('builtins.print'):
+            assert coordinator.get_relay_set() is None
+        assert coordinator.get_uptime_data() == {'relays': []}
+        assert coordinator._executor is None
+
+    def test_fetch_complete_is_signalled_once_the_workers_are_joined(self):
+        details = relay_document(20)
+        worker_threads = []
+
+        def slow_uptime():
+            time.sleep(0.2)
+            return _uptime_document(details)
+
+        def fetch_complete():
+            worker_threads.append([thread.name for thread in threading.enumerate()
+                                   if thread.name.startswith('Worker')])
+
+        coordinator = _coordinator([('onionoo_details', lambda: details),
+                                    ('onionoo_uptime', slow_uptime)])
+        coordinator.on_fetch_complete = fetch_complete
+        with patch('builtins.print'):
+            assert coordinator.get_relay_set() is not None
+        # Called once, with no API worker thread left to hold a lock across fork()
+        assert worker_threads == [[]]
+
+    def test_failed_processing_shuts_the_workers_down(self):
+        release = threading.Event()
+        queued = []
+
+        def slow():
+            release.wait(timeout=10)
+            return {'relays': []}
+
+        coordinator = _coordinator([('onionoo_details', lambda: relay_document(5)),
+                                    ('onionoo_uptime', slow),
+                                    ('onionoo_bandwidth', slow),
+                                    ('aroi_validation', lambda: queued.append(True))])
+        # Two threads for four workers, so the AROI validation has not started yet
+        two_threads = lambda max_workers, thread_name_prefix: ThreadPoolExecutor(2, thread_name_prefix)
+        try:
+            with patch('allium.lib.coordinator.ThreadPoolExecutor', side_effect=two_threads), \
+                    patch('allium.lib.coordinator.Relays', side_effect=RuntimeError('processing failed')), \
+                    patch('builtins.print'), pytest.raises(RuntimeError, match='processing failed'):
+                coordinator.get_relay_set()
+            futures = coordinator.worker_futures
+            assert coordinator._executor is None
+            assert futures['aroi_validation'].cancelled()
+            assert not futures['onionoo_uptime'].done()
+        finally:
+            release.set()
+        assert futures['onionoo_uptime'].result(timeout=10) is None
+        assert queued == []
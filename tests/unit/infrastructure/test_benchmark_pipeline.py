@@ -0,0 +1,107 @@
+"""
+Smoke tests for the pipeline benchmark (benchmark_pipeline.py) and the synthetic
+network it processes (tests/helpers/synthetic_network.py), at a tiny scale.
+"""
+
+import tracemalloc
+from unittest.mock import patch
+
+import benchmark_pipeline
+from allium.lib.processing_pipeline import ProcessingPipeline, Stage
+from allium.lib.relays import PROCESSING_STAGES
+
+from tests.helpers.synthetic_network import generate_network, replicate_network
+
+OPTIONS = {'relays': 60, 'contacts': 20, 'seed': 1, 'replay': None, 'workers': 0, 'runs': 1, 'memory': True}
+
+
+class TestSyntheticNetwork:
+
+    def test_same_seed_same_documents(self):
+        first = generate_network(relays=60, contacts=20, seed=3)
+        second = generate_network(relays=60, contacts=20, seed=3)
+        assert first['details']['relays'][5]['fingerprint'] == second['details']['relays'][5]['fingerprint']
+        assert first['votes'] == second['votes']
+
+    def test_documents_cover_every_relay(self):
+        network = generate_network(relays=80, contacts=30, seed=2)
+        fingerprints = {relay['fingerprint'] for relay in network['details']['relays']}
+        assert len(fingerprints) == 80
+        assert {relay['fingerprint'] for relay in network['uptime']['relays']} == fingerprints
+        assert {relay['fingerprint'] for relay in network['bandwidth']['relays']} == fingerprints
+        assert len({relay.get('contact') for relay in network['details']['relays']} - {None}) == 30
+        assert len(network['votes']) == 9
+        assert sum('Authority' in relay['flags'] for relay in network['details']['relays']) == 10
+
+    def test_replicated_copies_are_distinct_operators(self):
+        network = generate_network(relays=40, contacts=10, seed=4)
+        recorded = {name: network[name] for name in ('details', 'uptime', 'bandwidth', 'aroi_validation')}
+        scaled = replicate_network(recorded, 3)
+        relays = scaled['details']['relays']
+        assert len(relays) == 120 and len({relay['fingerprint'] for relay in relays}) == 120
+        contacts = {relay.get('contact') for relay in relays} - {None}
+        assert len(contacts) == 30
+        assert len(scaled['aroi_validation']['results']) == 3 * len(network['aroi_validation']['results'])
+
+
+class TestBenchmarkPipeline:
+
+    def test_benchmark_scale_reports_every_step(self):
+        result = benchmark_pipeline.benchmark_scale(OPTIONS, 2)
+        assert result['relays'] == 120 and result['contacts'] == 40 and result['votes'] == 9
+        assert 0 < result['indexed_relays'] <= 120
+        assert set(result['steps']) == {
+            'parse_votes', 'parse_bandwidth_file', 'build_relay_index', 'consensus_method_info',
+            'parse_server_descriptors', 'relays_init', 'enrich_with_api_data', 'collect_operator_metrics'}
+        assert set(result['pipeline']) == {stage.name for stage in PROCESSING_STAGES}
+        for row in list(result['steps'].values()) + list(result['pipeline'].values()):
+            assert row['seconds'] >= 0 and row['peak_mb'] >= 0
+
+    def test_compare_flags_regressions(self, capsys):
+        row = {'relays': 10, 'contacts': 5, 'votes': 9, 'vote_bytes': 1, 'total_s': 1.0, 'max_rss_mb': 1.0,
+               'pipeline': {'categorize': {'seconds': 1.0, 'peak_mb': 10.0}}}
+        baseline = {'scales': {'1': {**row, 'steps': {'relays_init': {'seconds': 1.0, 'peak_mb': 10.0}}}}}
+        results = {'scales': {'1': {**row, 'steps': {'relays_init': {'seconds': 1.5, 'peak_mb': 10.0}}}}}
+        assert benchmark_pipeline.compare(results, baseline, 10) == ['x1 relays_init']
+        assert 'SLOWER' in capsys.readouterr().out
+        assert benchmark_pipeline.compare(results, baseline, 60) == []
+
+
+class TestPipelineMemoryPeaks:
+
+    def test_peaks_recorded_only_while_tracing(self):
+        class Owner:
+            def allocate(self):
+                self.data = bytearray(4 * 1048576)
+
+        untraced = ProcessingPipeline(Owner(), [Stage('allocate', 'allocate', requires=('source',))], ['source'])
+        untraced.provide('source', True)
+        untraced.run()
+        assert untraced.memory_peaks == {}
+
+        traced = ProcessingPipeline(Owner(), [Stage('allocate', 'allocate', requires=('source',))], ['source'])
+        traced.provide('source', True)
+        tracemalloc.start()
+        try:
+            traced.run()
+        finally:
+            tracemalloc.stop()
+        assert traced.memory_peaks['allocate'] >= 4 * 1048576
+
+    def test_no_peaks_without_reset_peak(self):
+        """Python 3.8 has no tracemalloc.reset_peak(): stages still run, without peaks."""
+        class Owner:
+            def allocate(self):
+                self.data = bytearray(1048576)
+
+        pipeline = ProcessingPipeline(Owner(), [Stage('allocate', 'allocate', requires=('source',))], ['source'])
+        pipeline.provide('source', True)
+        tracemalloc.start()
+        try:
+            with patch.object(tracemalloc, 'reset_peak'):
+                del tracemalloc.reset_peak
+                assert pipeline.run() == ['allocate']
+        finally:
+            tracemalloc.stop()
+        assert pipeline.memory_peaks == {}
+        assert pipeline.timings['allocate'] >= 0
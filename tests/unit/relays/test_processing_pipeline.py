@@ -0,0 +1,170 @@
+"""
+Unit tests for the dependency-aware processing pipeline (allium/lib/processing_pipeline.py)
+and the Relays stage graph built on it.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib.aroileaders import count_aroi_operators
+from allium.lib.processing_pipeline import DONE, FAILED, SKIPPED, ProcessingPipeline, Stage
+from allium.lib.relays import Relays
+
+from tests.helpers.relay_documents import relay_document
+
+
+class _Recorder:
+    """Pipeline owner whose stage methods record the call order."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return lambda: self.calls.append(name)
+
+
+def _pipeline(owner, stages, sources=('base', 'extra')):
+    return ProcessingPipeline(owner, stages, sources)
+
+
+class TestProcessingPipeline:
+    """Stages run once, in order, when their inputs are settled."""
+
+    STAGES = (
+        Stage('core', 'core', requires=('base',)),
+        Stage('enriched', 'enriched', requires=('core', 'extra')),
+        Stage('summary', 'summary', requires=('core',), after=('enriched',)),
+    )
+
+    def test_waits_for_pending_sources_then_runs_once(self):
+        owner = _Recorder()
+        pipeline = _pipeline(owner, self.STAGES)
+        pipeline.provide('base', True)
+        assert pipeline.run() == ['core']
+        pipeline.provide('extra', True)
+        assert pipeline.run() == ['enriched', 'summary']
+        assert pipeline.run() == []
+        assert owner.calls == ['core', 'enriched', 'summary']
+        assert set(pipeline.timings) == {'core', 'enriched', 'summary'}
+
+    def test_absent_required_source_skips_stage(self):
+        owner = _Recorder()
+        pipeline = _pipeline(owner, self.STAGES)
+        pipeline.provide('base', True)
+        pipeline.provide('extra', False)
+        pipeline.run()
+        assert owner.calls == ['core', 'summary']
+        assert pipeline.state['enriched'] == SKIPPED
+
+    def test_late_source_reruns_only_stale_stages(self):
+        owner = _Recorder()
+        pipeline = _pipeline(owner, self.STAGES)
+        pipeline.provide('base', True)
+        pipeline.provide('extra', False)
+        pipeline.run()
+        pipeline.provide('extra', True)
+        pipeline.run()
+        assert owner.calls == ['core', 'summary', 'enriched', 'summary']
+        assert pipeline.run_counts == {'core': 1, 'enriched': 1, 'summary': 2}
+        assert 'summary' in pipeline.summary() and 'x2' in pipeline.summary()
+
+    def test_guarded_stage_failure_is_a_warning(self):
+        class Owner(_Recorder):
+            def enriched(self):
+                raise RuntimeError("boom")
+
+        owner = Owner()
+        stages = self.STAGES[:1] + (Stage('enriched', 'enriched', requires=('core', 'extra'),
+                                          warning="Enrichment failed ({error})"),) + self.STAGES[2:]
+        pipeline = _pipeline(owner, stages)
+        pipeline.provide('base', True)
+        pipeline.provide('extra', True)
+        with patch('builtins.print') as mock_print:
+            pipeline.run()
+        mock_print.assert_called_once_with("Warning: Enrichment failed (boom)")
+        assert pipeline.state['enriched'] == FAILED
+        assert pipeline.state['summary'] == DONE
+
+    def test_unguarded_failure_propagates(self):
+        class Owner(_Recorder):
+            def core(self):
+                raise RuntimeError("boom")
+
+        pipeline = _pipeline(Owner(), self.STAGES)
+        pipeline.provide('base', True)
+        with pytest.raises(RuntimeError):
+            pipeline.run()
+
+    def test_when_settled_fires_before_later_stages(self):
+        owner = _Recorder()
+        pipeline = _pipeline(owner, self.STAGES)
+        pipeline.when_settled(('core',), lambda: owner.calls.append('core settled'))
+        pipeline.provide('base', True)
+        pipeline.provide('extra', True)
+        pipeline.run()
+        assert owner.calls == ['core', 'core settled', 'enriched', 'summary']
+        fired = []
+        pipeline.when_settled(('summary',), lambda: fired.append(True))
+        assert fired == [True]
+
+    def test_rejects_unknown_or_out_of_order_inputs(self):
+        with pytest.raises(ValueError):
+            _pipeline(_Recorder(), (Stage('a', 'a', requires=('b',)), Stage('b', 'b')))
+        with pytest.raises(KeyError):
+            _pipeline(_Recorder(), self.STAGES).provide('core', True)
+
+
+class TestRelaysStages:
+    """Leaderboards and health metrics are built once per relay set."""
+
+    def _relays(self, **kwargs):
+        with patch('builtins.print'):
+            return Relays(output_dir='/tmp/test', onionoo_url='https://test.example.com',
+                          relay_data=relay_document(40), mp_workers=0, **kwargs)
+
+    def _uptime(self, relay_set):
+        return {'relays': [{'fingerprint': relay['fingerprint'],
+                            'uptime': {period: {'values': [999] * 40, 'factor': 0.001001001001001}
+                                       for period in ('1_month', '6_months', '1_year', '5_years')}}
+                           for relay in relay_set.json['relays']]}
+
+    def test_deferred_enrichment_builds_derived_products_once(self):
+        relay_set = self._relays(defer_enrichment=True)
+        assert 'network_health' not in relay_set.json
+        assert 'aroi_leaderboards' not in relay_set.json
+        with patch('builtins.print'):
+            relay_set.enrich_with_api_data(uptime_data=self._uptime(relay_set))
+        counts = relay_set.pipeline.run_counts
+        assert counts['network_health'] == 1
+        assert counts['aroi_leaderboards'] == 1
+        assert counts['uptime'] == 1
+        assert 'bandwidth' not in counts
+        assert relay_set.json['aroi_operator_count'] == \
+            relay_set.json['aroi_leaderboards']['summary']['total_operators']
+
+    def test_attached_source_is_processed_before_enrichment(self):
+        relay_set = self._relays(defer_enrichment=True)
+        uptime = self._uptime(relay_set)
+        with patch('builtins.print'):
+            assert relay_set.attach_api_data('uptime_data', uptime) == ['uptime']
+            assert relay_set.attach_api_data('bandwidth_data', None) == []
+            relay_set.enrich_with_api_data(uptime_data=uptime)
+        counts = relay_set.pipeline.run_counts
+        assert counts['uptime'] == 1
+        assert counts['network_health'] == 1
+        with pytest.raises(KeyError):
+            relay_set.attach_api_data('enrichment', True)
+
+    def test_direct_construction_still_builds_everything(self):
+        relay_set = self._relays()
+        assert 'network_health' in relay_set.json
+        assert 'aroi_leaderboards' in relay_set.json
+        assert 'contact_pages' not in relay_set.pipeline.run_counts
+
+    def test_operator_count_matches_leaderboards(self):
+        relay_set = self._relays()
+        summary = relay_set.json['aroi_leaderboards'].get('summary', {})
+        assert count_aroi_operators(relay_set) == summary.get('total_operators', 0)
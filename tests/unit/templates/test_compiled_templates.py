@@ -0,0 +1,126 @@
+"""
+Unit tests for ahead-of-time compiled templates (allium/lib/compiled_templates.py):
+the build step compiles every template into a module, the site rendered from
+the modules is identical to the site rendered from source, and edited templates
+fall back to source until the next build.
+"""
+
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+from jinja2 import Environment, FileSystemLoader
+
+from allium.lib import page_writer
+from allium.lib.compiled_templates import (
+    MANIFEST_FILE,
+    TEMPLATES_DIR,
+    CompiledTemplateLoader,
+    compile_templates,
+    fresh_templates,
+    template_loader,
+)
+
+from tests.helpers.relay_documents import build_relay_set
+from tests.helpers.site_rendering import FixedDatetime, read_tree, render_site
+
+
+def _env(templates_dir):
+    return Environment(loader=FileSystemLoader(str(templates_dir)), trim_blocks=True, lstrip_blocks=True,
+                       autoescape=True, auto_reload=False)
+
+
+@pytest.fixture
+def templates(tmp_path):
+    """A base template, a page extending it and a macro file in tmp_path/templates."""
+    source = tmp_path / 'templates'
+    source.mkdir()
+    (source / 'base.html').write_text('<title>{% block title %}{% endblock %}</title>\n')
+    (source / 'macros.html').write_text('{% macro bold(text) %}<b>{{ text }}</b>{% endmacro %}')
+    (source / 'page.html').write_text(
+        '{% extends "base.html" %}{% import "macros.html" as m %}'
+        '{% block title %}{{ m.bold(name) }}{% endblock %}')
+    return source
+
+
+class TestCompiledTemplates:
+
+    def test_templates_load_from_the_compiled_modules(self, templates, tmp_path):
+        env = _env(templates)
+        stats = compile_templates(env, str(tmp_path / 'compiled'))
+        assert stats['template_count'] == 3
+        loader = template_loader(env, str(tmp_path / 'compiled'))
+        assert isinstance(loader, CompiledTemplateLoader)
+        assert loader.fresh == {'base.html', 'macros.html', 'page.html'}
+
+        compiled_env = env.overlay(loader=loader)
+        template = compiled_env.get_template('page.html')
+        assert template.filename.startswith(str(tmp_path / 'compiled'))
+        assert template.render(name='<relay>') == '<title><b>&lt;relay&gt;</b></title>'
+        # Byte-compiled by the build step
+        assert os.listdir(tmp_path / 'compiled' / '__pycache__')
+
+    def test_edited_templates_fall_back_to_source(self, templates, tmp_path):
+        env = _env(templates)
+        compile_templates(env, str(tmp_path / 'compiled'))
+        (templates / 'page.html').write_text('{% extends "base.html" %}{% block title %}v2 {{ name }}{% endblock %}')
+        (templates / 'new.html').write_text('new')
+
+        loader = template_loader(env, str(tmp_path / 'compiled'))
+        assert loader.fresh == {'base.html', 'macros.html'}
+        compiled_env = env.overlay(loader=loader)
+        page = compiled_env.get_template('page.html')
+        assert page.filename == str(templates / 'page.html')
+        assert page.render(name='relay') == '<title>v2 relay</title>'
+        assert compiled_env.get_template('new.html').render() == 'new'
+
+        # The next build picks the edits up
+        compile_templates(compiled_env, str(tmp_path / 'compiled'))
+        assert template_loader(env, str(tmp_path / 'compiled')).fresh == {'base.html', 'macros.html',
+                                                                           'new.html', 'page.html'}
+        assert sorted(os.listdir(tmp_path)) == ['compiled', 'templates']
+
+    def test_builds_of_other_versions_or_options_are_not_used(self, templates, tmp_path):
+        env = _env(templates)
+        compiled_dir = str(tmp_path / 'compiled')
+        assert template_loader(env, compiled_dir) is env.loader
+        compile_templates(env, compiled_dir)
+        assert template_loader(env, '') is env.loader
+
+        other = Environment(loader=FileSystemLoader(str(templates)), autoescape=False)
+        assert fresh_templates(other, other.loader, compiled_dir) == set()
+
+        manifest_path = os.path.join(compiled_dir, MANIFEST_FILE)
+        with open(manifest_path, encoding='utf8') as f:
+            manifest = json.load(f)
+        manifest['jinja2'] = '0.1'
+        with open(manifest_path, 'w', encoding='utf8') as f:
+            json.dump(manifest, f)
+        assert template_loader(env, compiled_dir) is env.loader
+
+
+def _pinned_relay_set():
+    # Processing stamps the relay set and the AROI leaderboards with the current time
+    with patch('allium.lib.time_utils.datetime', FixedDatetime), \
+            patch('allium.lib.relays.format_timestamp_gmt', return_value="Sat, 17 Oct 2026 00:00:00 GMT"):
+        return build_relay_set()
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="fork-based pool is POSIX only")
+def test_compiled_site_is_identical_to_the_source_site(tmp_path):
+    source_loader = FileSystemLoader(TEMPLATES_DIR)
+    with patch.object(page_writer.ENV, 'loader', source_loader):
+        stats = compile_templates(page_writer.ENV, str(tmp_path / 'compiled'))
+        compiled_loader = template_loader(page_writer.ENV, str(tmp_path / 'compiled'))
+        render_site(_pinned_relay_set(), tmp_path / 'source', mp_workers=2)
+    # Every template, macro files and the skeleton included
+    assert stats['template_count'] == len(os.listdir(TEMPLATES_DIR))
+    assert {'aroi_macros.html', 'skeleton.html'} <= compiled_loader.fresh
+    assert compiled_loader.fresh == set(source_loader.list_templates())
+
+    with patch.object(page_writer.ENV, 'loader', compiled_loader), \
+            patch.object(compiled_loader.source_loader, 'load', side_effect=AssertionError('loaded from source')):
+        render_site(_pinned_relay_set(), tmp_path / 'compiled_site', mp_workers=2)
+    assert read_tree(tmp_path / 'compiled_site') == read_tree(tmp_path / 'source')
@@ -0,0 +1,110 @@
+"""
+Unit tests for early page rendering (allium/lib/page_scheduler.py): page types
+whose pipeline inputs are final are written by a forked child while the rest of
+relay processing runs, with the same output as the normal generation loop.
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib.progress_logger import ProgressLogger
+from allium.lib.relays import Relays
+from allium.lib.site_generator import EARLY_PAGE_DEPENDENCIES, create_early_page_renderer
+
+from tests.helpers.relay_documents import relay_document
+from tests.helpers.site_rendering import read_tree
+
+
+def _deferred_relay_set(output_dir):
+    with patch('builtins.print'):
+        return Relays(output_dir=str(output_dir), onionoo_url='https://test.example.com',
+                      relay_data=relay_document(120), mp_workers=2, defer_enrichment=True)
+
+
+def _renderer(output_dir, incremental=False):
+    args = SimpleNamespace(mp_workers=2, output_dir=str(output_dir), incremental=incremental)
+    return create_early_page_renderer(args, ProgressLogger(progress_enabled=False))
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="early rendering forks")
+class TestEarlyPageRendering:
+    """Early-rendered page types match the pages written after processing."""
+
+    def test_pages_start_before_processing_finishes(self, tmp_path):
+        relay_set = _deferred_relay_set(tmp_path / 'early')
+        renderer = _renderer(tmp_path / 'early')
+        states = []
+        original_start = renderer._start
+
+        def start(relay_set, keys):
+            states.append(dict(relay_set.pipeline.state))
+            original_start(relay_set, keys)
+
+        with patch.object(renderer, '_start', side_effect=start), patch('builtins.print'):
+            renderer.attach(relay_set)
+            assert not renderer.jobs
+            relay_set.enrich_with_api_data()
+            rendered = renderer.collect(relay_set)
+
+        assert rendered == set(EARLY_PAGE_DEPENDENCIES)
+        assert len(states) == 1
+        assert states[0]['group_total_data'] == 'skipped'
+        assert states[0]['aroi_leaderboards'] == 'pending'
+        assert states[0]['contact_pages'] == 'pending'
+
+        relay_set.output_dir = str(tmp_path / 'normal')
+        with patch('builtins.print'):
+            for key in EARLY_PAGE_DEPENDENCIES:
+                relay_set.write_pages_by_key(key)
+        early = read_tree(tmp_path / 'early')
+        assert early and early == read_tree(tmp_path / 'normal')
+
+    def test_incremental_records_are_merged(self, tmp_path):
+        relay_set = _deferred_relay_set(tmp_path)
+        renderer = _renderer(tmp_path, incremental=True)
+        renderer.attach(relay_set)
+        with patch('builtins.print'):
+            relay_set.enrich_with_api_data()
+            renderer.collect(relay_set)
+        manifest = relay_set.output_manifest
+        page_count = sum(len(files) for _, _, files in os.walk(tmp_path))
+        assert manifest.written == len(manifest.current) == page_count > 0
+
+    def test_failed_child_leaves_page_types_to_the_normal_loop(self, tmp_path):
+        relay_set = _deferred_relay_set(tmp_path)
+        renderer = _renderer(tmp_path)
+        renderer.attach(relay_set)
+        with patch.object(relay_set, 'write_pages_by_key', side_effect=RuntimeError("boom")), \
+                patch('builtins.print'):
+            relay_set.enrich_with_api_data()
+            assert renderer.collect(relay_set) == set()
+
+    def test_held_renders_fork_on_release(self, tmp_path):
+        relay_set = _deferred_relay_set(tmp_path)
+        renderer = _renderer(tmp_path)
+        renderer.hold()
+        renderer.attach(relay_set)
+        with patch('builtins.print'):
+            relay_set.enrich_with_api_data()
+            assert not renderer.jobs and len(renderer.held) == 1
+            renderer.release()
+            assert len(renderer.jobs) == 1 and renderer.held is None
+            assert renderer.collect(relay_set) == set(EARLY_PAGE_DEPENDENCIES)
+
+    def test_renders_never_released_are_left_to_the_normal_loop(self, tmp_path):
+        relay_set = _deferred_relay_set(tmp_path)
+        renderer = _renderer(tmp_path)
+        renderer.hold()
+        renderer.attach(relay_set)
+        with patch('builtins.print'):
+            relay_set.enrich_with_api_data()
+            assert renderer.collect(relay_set) == set()
+        assert not renderer.jobs and not os.listdir(tmp_path)
+
+    def test_disabled_without_workers(self, tmp_path):
+        args = SimpleNamespace(mp_workers=0, output_dir=str(tmp_path), incremental=False)
+        assert create_early_page_renderer(args, ProgressLogger(progress_enabled=False)) is None
@@ -0,0 +1,79 @@
+"""
+Unit tests for fused contact pages (--fuse-contact-pages): contact page data
+computed by the workers that render the contact pages gives the same site as
+data precomputed during processing, and only the fields other pages read
+reach the parent.
+"""
+
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib.page_writer import CONTACT_SHARED_FIELDS, settle_deferred_contact_data
+from allium.lib.relays import Relays
+
+from benchmark_pipeline import parse_collector_documents
+from tests.helpers.site_rendering import fixed_clock, read_tree, render_site
+from tests.helpers.synthetic_network import generate_network
+
+
+def _relay_set():
+    """A relay set processed with --fuse-contact-pages (contact page data deferred)."""
+    network = generate_network(relays=200, contacts=110, seed=11)
+    collector_data, descriptors_data = parse_collector_documents(network, {})
+    with patch('builtins.print'):
+        relay_set = Relays(output_dir='', onionoo_url='https://test.example.com', relay_data=network['details'],
+                           base_url='https://metrics.example.org', mp_workers=2, fuse_contact_pages=True,
+                           defer_enrichment=True)
+        relay_set.enrich_with_api_data(
+            uptime_data=network['uptime'], bandwidth_data=network['bandwidth'],
+            aroi_validation_data=network['aroi_validation'], collector_consensus_data=collector_data,
+            collector_descriptors_data=descriptors_data)
+    return relay_set
+
+
+@pytest.fixture(scope='module')
+def precomputed_site(tmp_path_factory):
+    """The site rendered from its own deferred relay set, with the contact data precomputed first."""
+    output_dir = tmp_path_factory.mktemp('precomputed')
+    with fixed_clock():
+        relay_set = _relay_set()
+        with patch('builtins.print'):
+            settle_deferred_contact_data(relay_set)
+        render_site(relay_set, output_dir, mp_workers=2)
+    return read_tree(output_dir)
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="fork-based pool is POSIX only")
+class TestFusedContactPages:
+
+    def test_fused_site_matches_precomputed_site(self, tmp_path, precomputed_site):
+        with fixed_clock():
+            relay_set = _relay_set()
+        contacts = relay_set.json['sorted']['contact']
+        assert relay_set.contact_pages_deferred
+        assert not any('contact_rankings' in contact for contact in contacts.values())
+        # Operator reliability reads the per-relay bandwidth entries while rendering
+        assert relay_set.history_summary.bandwidth_map
+        series_reused = relay_set.history_summary.stats()['series_reused']
+
+        render_site(relay_set, tmp_path, mp_workers=2)
+        # Workers computing the contact data report their history summary counters
+        assert relay_set.history_summary.stats()['series_reused'] > series_reused
+        assert not relay_set.contact_pages_deferred
+        assert relay_set.history_summary.bandwidth_map == {}
+        for contact in contacts.values():
+            assert 'contact_rankings' not in contact and 'operator_reliability' not in contact
+            assert set(CONTACT_SHARED_FIELDS) <= contact.keys()
+            assert contact['contact_display_data'].keys() == {'outliers'}
+        assert any(contact['is_validated_aroi'] for contact in contacts.values())
+        assert read_tree(tmp_path) == precomputed_site
+
+    def test_sequential_rendering_precomputes_deferred_data(self, tmp_path, precomputed_site):
+        with fixed_clock():
+            relay_set = _relay_set()
+        render_site(relay_set, tmp_path, mp_workers=0)
+        assert not relay_set.contact_pages_deferred
+        assert all('contact_rankings' in contact for contact in relay_set.json['sorted']['contact'].values())
+        assert read_tree(tmp_path) == precomputed_site
@@ -0,0 +1,84 @@
+"""
+Unit tests for the misc sorted listing pages (page_writer.write_misc_pages):
+group orderings are computed in Python with the same result as the templates'
+former Jinja sort, and the worker-pool path writes the same files as write_misc.
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib import page_writer
+from allium.lib.site_generator import MISC_SORTED_PAGE_TYPES, SORTED_BY_VARIANTS
+
+from tests.helpers.relay_documents import build_relay_set
+
+
+def _misc_pages():
+    return [
+        {"template": f"misc-{page_type}.html", "path": f"misc/{page_type}-{suffix}.html",
+         "sorted_by": sorted_by}
+        for suffix, sorted_by in SORTED_BY_VARIANTS.items()
+        for page_type, _ in MISC_SORTED_PAGE_TYPES
+    ]
+
+
+def _read_misc(output_dir):
+    misc_dir = os.path.join(str(output_dir), 'misc')
+    pages = {}
+    for name in os.listdir(misc_dir):
+        with open(os.path.join(misc_dir, name), 'rb') as f:
+            pages[name] = f.read()
+    return pages
+
+
+class TestSortedGroupItems:
+    """Python group orderings match Jinja's items()|sort(attribute=..., reverse=True)."""
+
+    @pytest.mark.parametrize("category", sorted(set(page_writer.MISC_GROUP_CATEGORIES.values())))
+    def test_matches_jinja_sort(self, category):
+        relay_set = build_relay_set()
+        jinja_sort = page_writer.ENV.from_string(
+            "{% for k, v in groups.items()|sort(attribute=sorted_by, reverse=True) %}{{ k }}|{% endfor %}")
+        for sorted_by in set(SORTED_BY_VARIANTS.values()):
+            ordered = page_writer.sorted_group_items(relay_set, category, sorted_by)
+            expected = jinja_sort.render(groups=relay_set.json['sorted'][category], sorted_by=sorted_by)
+            assert ''.join(f"{k}|" for k, _ in ordered) == expected
+
+    def test_orderings_are_cached(self):
+        relay_set = build_relay_set()
+        first = page_writer.sorted_group_items(relay_set, 'as', '1.bandwidth')
+        assert page_writer.sorted_group_items(relay_set, 'as', '1.bandwidth') is first
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="fork-based pool is POSIX only")
+class TestMiscPagesRendering:
+    """Parallel misc page rendering writes the same files as sequential write_misc."""
+
+    def test_parallel_output_matches_write_misc(self, tmp_path):
+        relay_set = build_relay_set()
+        relay_set.output_dir = str(tmp_path / 'sequential')
+        with patch('builtins.print'):
+            for page in _misc_pages():
+                relay_set.write_misc(**page)
+        relay_set.output_dir = str(tmp_path / 'parallel')
+        relay_set.mp_workers = 2
+        with patch('builtins.print'):
+            relay_set.write_misc_pages(_misc_pages())
+        sequential = _read_misc(tmp_path / 'sequential')
+        assert len(sequential) == len(SORTED_BY_VARIANTS) * len(MISC_SORTED_PAGE_TYPES)
+        assert _read_misc(tmp_path / 'parallel') == sequential
+
+    def test_pool_failure_falls_back_to_sequential(self, tmp_path):
+        relay_set = build_relay_set()
+        relay_set.output_dir = str(tmp_path / 'sequential')
+        with patch('builtins.print'):
+            relay_set.write_misc_pages(_misc_pages())
+        relay_set.output_dir = str(tmp_path / 'fallback')
+        relay_set.mp_workers = 2
+        with patch.object(page_writer.mp, 'get_context', side_effect=OSError("no fork")), \
+                patch('builtins.print'):
+            relay_set.write_misc_pages(_misc_pages())
+        assert _read_misc(tmp_path / 'fallback') == _read_misc(tmp_path / 'sequential')
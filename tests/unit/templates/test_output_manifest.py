@@ -0,0 +1,106 @@
+"""
+Unit tests for incremental site output (allium/lib/output_manifest.py) and its use
+by page_writer when a Relays instance carries an output manifest.
+"""
+
+import os
+from unittest.mock import patch
+
+from allium.lib.output_manifest import MANIFEST_FILENAME, OutputManifest
+from allium.lib.relays import Relays
+
+from tests.helpers.relay_documents import relay_document
+
+
+def _read(path):
+    with open(path, encoding='utf8') as f:
+        return f.read()
+
+
+class TestOutputManifest:
+    """Hash bookkeeping, stale-page removal and persistence."""
+
+    def test_first_run_writes_everything(self, tmp_path):
+        manifest = OutputManifest.load(str(tmp_path))
+        assert not manifest.has_previous
+        assert manifest.write(str(tmp_path / 'a' / 'index.html'), 'alpha')
+        assert manifest.write(str(tmp_path / 'b.html'), 'beta')
+        manifest.remove_stale()
+        manifest.save()
+        assert (manifest.written, manifest.unchanged, manifest.removed) == (2, 0, 0)
+        assert (tmp_path / MANIFEST_FILENAME).exists()
+
+    def test_second_run_skips_unchanged_and_removes_stale(self, tmp_path):
+        first = OutputManifest.load(str(tmp_path))
+        first.write(str(tmp_path / 'keep.html'), 'same')
+        first.write(str(tmp_path / 'change.html'), 'old')
+        first.write(str(tmp_path / 'gone' / 'deep' / 'index.html'), 'bye')
+        first.save()
+        keep_mtime = os.stat(tmp_path / 'keep.html').st_mtime_ns
+
+        second = OutputManifest.load(str(tmp_path))
+        assert second.has_previous
+        assert not second.write(str(tmp_path / 'keep.html'), 'same')
+        assert second.write(str(tmp_path / 'change.html'), 'new')
+        assert second.remove_stale() == 1
+        second.save()
+
+        assert os.stat(tmp_path / 'keep.html').st_mtime_ns == keep_mtime
+        assert _read(tmp_path / 'change.html') == 'new'
+        assert not (tmp_path / 'gone').exists()
+        assert 'written' in second.summary()
+        assert set(OutputManifest.load(str(tmp_path)).previous) == {'keep.html', 'change.html'}
+
+    def test_missing_file_is_rewritten_even_if_hash_matches(self, tmp_path):
+        first = OutputManifest.load(str(tmp_path))
+        first.write(str(tmp_path / 'page.html'), 'content')
+        first.save()
+        os.remove(tmp_path / 'page.html')
+        assert OutputManifest.load(str(tmp_path)).write(str(tmp_path / 'page.html'), 'content')
+
+    def test_volatile_strings_are_ignored(self, tmp_path):
+        first = OutputManifest.load(str(tmp_path), volatile=['12:00'])
+        first.write(str(tmp_path / 'page.html'), 'generated at 12:00')
+        first.save()
+        second = OutputManifest.load(str(tmp_path), volatile=['13:00'])
+        assert not second.write(str(tmp_path / 'page.html'), 'generated at 13:00')
+        assert _read(tmp_path / 'page.html') == 'generated at 12:00'
+
+    def test_corrupt_manifest_means_full_run(self, tmp_path):
+        (tmp_path / MANIFEST_FILENAME).write_text('{not json')
+        assert not OutputManifest.load(str(tmp_path)).has_previous
+        OutputManifest.discard(str(tmp_path))
+        assert not (tmp_path / MANIFEST_FILENAME).exists()
+
+
+class TestIncrementalRelayPages:
+    """write_relay_info updates the relay/ tree in place when a manifest is attached."""
+
+    def _run(self, output_dir, relay_count, mp_workers):
+        document = relay_document(120)
+        document['relays'] = document['relays'][:relay_count]
+        with patch('builtins.print'):
+            relay_set = Relays(output_dir=str(output_dir), onionoo_url='https://test.example.com',
+                               relay_data=document, mp_workers=mp_workers)
+            # Each run has its own generation timestamp, which must not count as a change
+            relay_set.timestamp = f"Run {relay_count}/{mp_workers}"
+            relay_set.output_manifest = OutputManifest.load(str(output_dir), volatile=[relay_set.timestamp])
+            relay_set.write_relay_info()
+        manifest = relay_set.output_manifest
+        manifest.remove_stale()
+        manifest.save()
+        return manifest
+
+    def test_rerun_writes_nothing_and_prunes_vanished_relays(self, tmp_path):
+        first = self._run(tmp_path, 120, mp_workers=2)
+        assert (first.written, first.unchanged) == (120, 0)
+        page = tmp_path / 'relay' / ('0' * 40) / 'index.html'
+        page_mtime = os.stat(page).st_mtime_ns
+
+        second = self._run(tmp_path, 120, mp_workers=3)
+        assert (second.written, second.unchanged, second.removed) == (0, 120, 0)
+        assert os.stat(page).st_mtime_ns == page_mtime
+
+        third = self._run(tmp_path, 110, mp_workers=0)
+        assert third.removed == 10
+        assert len(os.listdir(tmp_path / 'relay')) == 110
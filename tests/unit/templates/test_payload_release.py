@@ -0,0 +1,81 @@
+"""
+Unit tests for releasing the raw API documents after processing
+(allium/lib/memory_lifecycle.py): the site rendered from a relay set whose
+documents were released is identical to one rendered with them.
+"""
+
+import copy
+import gc
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from allium.lib.memory_lifecycle import distill_collector_consensus, document_header
+from allium.lib.progress_logger import ProgressLogger
+from allium.lib.relays import Relays
+from allium.lib.site_generator import generate_site
+
+from benchmark_pipeline import parse_collector_documents
+from tests.helpers.site_rendering import FixedDatetime, read_tree
+from tests.helpers.synthetic_network import generate_network
+
+
+def _processed_relay_set(network, output_dir):
+    """Relay set processed with every document, before the documents are released."""
+    collector_data, descriptors_data = parse_collector_documents(network, {})
+    with patch('builtins.print'), patch.object(Relays, '_release_api_payloads'):
+        relay_set = Relays(output_dir=str(output_dir), onionoo_url='https://test.example.com',
+                           relay_data=network['details'], mp_workers=0, defer_enrichment=True)
+        relay_set.enrich_with_api_data(
+            uptime_data=network['uptime'], bandwidth_data=network['bandwidth'],
+            aroi_validation_data=network['aroi_validation'], collector_consensus_data=collector_data,
+            collector_descriptors_data=descriptors_data)
+    return relay_set
+
+
+def _render(relay_set):
+    args = SimpleNamespace(output_dir=relay_set.output_dir, mp_workers=0, incremental=False,
+                           inline_critical_css=False, profile_render=None)
+    with patch('builtins.print'), patch('allium.lib.time_utils.datetime', FixedDatetime), \
+            patch('allium.lib.consensus.AuthorityMonitor.check_all_authorities', return_value={}):
+        generate_site(relay_set, args, ProgressLogger(progress_enabled=False))
+
+
+class TestPayloadRelease:
+
+    def test_distilled_documents_keep_what_pages_read(self):
+        assert document_header({'version': '8.0', 'relays_published': 'x', 'relays': [{}], 'n': None}) == \
+            {'version': '8.0', 'relays_published': 'x', 'n': None}
+        collector = {
+            'fetched_at': 'now', 'flag_thresholds': {'moria1': {'guard-wfu': '98%'}}, 'relay_index': {'A': {}},
+            'votes': {'moria1': {'relays': {'A': {}, 'B': {}}, 'has_bandwidth_file_headers': True}},
+        }
+        assert distill_collector_consensus(collector) == {
+            'fetched_at': 'now', 'flag_thresholds': {'moria1': {'guard-wfu': '98%'}},
+            'votes': {'moria1': {'has_bandwidth_file_headers': True, 'relay_count': 2}},
+        }
+        assert distill_collector_consensus(None) is None
+
+    def test_site_matches_the_site_rendered_with_raw_documents(self, tmp_path):
+        network = generate_network(relays=80, contacts=20, seed=7)
+        kept = _processed_relay_set(network, tmp_path / 'kept')
+        released = copy.deepcopy(kept)
+        released.output_dir = str(tmp_path / 'released')
+        released.progress_logger = kept.progress_logger
+        # Forked workers would render released's pages, so its heap gets frozen
+        released.mp_workers = 2
+        try:
+            with patch('builtins.print'):
+                released._release_api_payloads()
+            released.mp_workers = 0
+            assert kept.uptime_data['relays'] and kept.collector_consensus_data['relay_index']
+            assert released.uptime_data == document_header(network['uptime'])
+            assert 'relays' not in released.bandwidth_data
+            assert 'relay_index' not in released.collector_consensus_data
+            assert released.history_summary.bandwidth_map == {}
+            assert gc.get_freeze_count() > 0
+
+            _render(kept)
+            _render(released)
+        finally:
+            gc.unfreeze()
+        assert read_tree(tmp_path / 'released') == read_tree(tmp_path / 'kept')
@@ -0,0 +1,150 @@
+"""
+Unit tests for precompressed page siblings (allium/lib/precompress.py): every page
+written by the parent, pool workers or early-render children gets matching
+.gz/.br files, only changed pages are compressed again with --incremental, and
+the workers' byte counts reach the parent.
+"""
+
+import gzip
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib import precompress
+from allium.lib.output_manifest import OutputManifest
+from allium.lib.precompress import PageCompressor, parse_formats
+from allium.lib.progress_logger import ProgressLogger
+from allium.lib.relays import Relays
+from allium.lib.site_generator import generate_site
+
+from tests.helpers.relay_documents import build_relay_set, relay_document
+from tests.helpers.site_rendering import FixedDatetime
+
+
+def _gunzip(path):
+    with open(path, 'rb') as f:
+        return gzip.decompress(f.read()).decode('utf8')
+
+
+def _pages(output_dir):
+    return [os.path.join(dirpath, name) for dirpath, _, names in os.walk(output_dir)
+            for name in names if name.endswith('.html')]
+
+
+class TestPageCompressor:
+
+    def test_siblings_decompress_to_the_page(self, tmp_path):
+        compressor = PageCompressor(('gz',), level=6)
+        page = str(tmp_path / 'index.html')
+        content = '<html>' + 'relay ' * 1000 + '</html>'
+        assert compressor.write(page, content)
+        assert _gunzip(page + '.gz') == content
+        assert (compressor.pages, compressor.raw_bytes) == (1, len(content))
+        assert compressor.compressed_bytes['gz'] == os.path.getsize(page + '.gz') < len(content) / 10
+        # Reproducible: no timestamp in the gzip header
+        first = (tmp_path / 'index.html.gz').read_bytes()
+        compressor.write(page, content)
+        assert (tmp_path / 'index.html.gz').read_bytes() == first
+
+    def test_unchanged_pages_keep_their_siblings(self, tmp_path):
+        compressor = PageCompressor(('gz',))
+        page = tmp_path / 'index.html'
+        page.write_text('on disk, generated at 12:00')
+        assert compressor.write(str(page), 'generated at 13:00', changed=False)
+        # A missing sibling is written from the page file that was kept
+        assert _gunzip(str(page) + '.gz') == 'on disk, generated at 12:00'
+        assert not compressor.write(str(page), 'generated at 14:00', changed=False)
+        assert (compressor.pages, compressor.skipped) == (1, 1)
+
+    def test_stats_are_taken_and_added(self, tmp_path):
+        worker = PageCompressor(('gz',))
+        assert worker.take_stats() is None
+        worker.write(str(tmp_path / 'a.html'), 'a' * 500)
+        stats = worker.take_stats()
+        assert (worker.pages, worker.raw_bytes) == (0, 0)
+
+        parent = PageCompressor(('gz',), level=4)
+        parent.add_stats(stats)
+        parent.add_stats(None)
+        assert (parent.pages, parent.raw_bytes) == (1, 500)
+        summary = parent.describe()
+        assert 'Precompressed 1 pages (level 4)' in summary and '.gz' in summary
+        assert 'none changed' in PageCompressor(('gz',)).describe()
+
+    def test_format_parsing(self):
+        assert parse_formats('gz') == ('gz',)
+        assert parse_formats(' GZ,gz ') == ('gz',)
+        for text in ('', 'zip', 'gz,zstd'):
+            with pytest.raises(ValueError):
+                parse_formats(text)
+        with patch.object(precompress, 'brotli', None), pytest.raises(ValueError, match='brotli'):
+            parse_formats('gz,br')
+
+    def test_brotli_siblings(self, tmp_path):
+        brotli = pytest.importorskip('brotli')
+        compressor = PageCompressor(parse_formats('gz,br'), level=5)
+        page = str(tmp_path / 'index.html')
+        compressor.write(page, 'relay ' * 200)
+        with open(page + '.br', 'rb') as f:
+            assert brotli.decompress(f.read()).decode('utf8') == 'relay ' * 200
+        assert set(compressor.compressed_bytes) == {'gz', 'br'}
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="fork-based pool is POSIX only")
+class TestPrecompressedSite:
+
+    def _generate(self, relay_set, output_dir, precompress_formats, incremental=False):
+        relay_set.output_dir = str(output_dir)
+        relay_set.mp_workers = 2
+        args = SimpleNamespace(output_dir=str(output_dir), mp_workers=2, incremental=incremental,
+                               inline_critical_css=False, profile_render=None,
+                               precompress=precompress_formats, precompress_level=6)
+        with patch('builtins.print'), patch('allium.lib.time_utils.datetime', FixedDatetime), \
+                patch('allium.lib.consensus.AuthorityMonitor.check_all_authorities', return_value={}):
+            generate_site(relay_set, args, ProgressLogger(progress_enabled=False))
+
+    def test_every_page_gets_a_sibling_counted_by_the_parent(self, tmp_path):
+        relay_set = build_relay_set()
+        self._generate(relay_set, tmp_path, ('gz',))
+        pages = _pages(tmp_path)
+        for page in pages:
+            with open(page, encoding='utf8') as f:
+                assert _gunzip(page + '.gz') == f.read(), page
+        compressor = relay_set.page_compressor
+        # Parent, pool workers and vanity pages alike
+        assert compressor.pages == len(pages)
+        assert compressor.raw_bytes == sum(os.path.getsize(page) for page in pages)
+        assert compressor.compressed_bytes['gz'] == sum(os.path.getsize(page + '.gz') for page in pages)
+
+        # A run without --precompress drops the siblings it would leave stale
+        self._generate(build_relay_set(), tmp_path, None)
+        assert not any(name.endswith('.gz') for _, _, names in os.walk(tmp_path) for name in names)
+
+    def test_incremental_runs_compress_changed_pages_only(self, tmp_path):
+        def run(relay_count):
+            document = relay_document(120)
+            document['relays'] = document['relays'][:relay_count]
+            with patch('builtins.print'):
+                relay_set = Relays(output_dir=str(tmp_path), onionoo_url='https://test.example.com',
+                                   relay_data=document, mp_workers=2)
+                relay_set.timestamp = f"Run {relay_count}"
+                relay_set.output_manifest = OutputManifest.load(str(tmp_path), volatile=[relay_set.timestamp])
+                relay_set.page_compressor = PageCompressor(('gz',))
+                relay_set.write_relay_info()
+            relay_set.output_manifest.remove_stale()
+            relay_set.output_manifest.save()
+            return relay_set.page_compressor
+
+        first = run(120)
+        assert (first.pages, first.skipped) == (120, 0)
+        second = run(120)
+        assert (second.pages, second.skipped, second.raw_bytes) == (0, 120, 0)
+        run(110)
+        relay_dirs = os.listdir(tmp_path / 'relay')
+        assert len(relay_dirs) == 110
+        assert all(os.listdir(tmp_path / 'relay' / name) == ['index.html.gz'] or
+                   sorted(os.listdir(tmp_path / 'relay' / name)) == ['index.html', 'index.html.gz']
+                   for name in relay_dirs)
@@ -0,0 +1,47 @@
+"""
+Unit tests for relay-info page rendering (page_writer.write_relay_info):
+the worker-pool path must write exactly the same files as the sequential path.
+"""
+
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib import page_writer
+
+from tests.helpers.relay_documents import build_relay_set
+
+
+def _render(relay_set, output_dir, mp_workers):
+    """Render relay pages into output_dir and return {fingerprint: page bytes}."""
+    relay_set.output_dir = str(output_dir)
+    relay_set.mp_workers = mp_workers
+    with patch('builtins.print'):
+        relay_set.write_relay_info()
+    pages = {}
+    relay_dir = os.path.join(str(output_dir), 'relay')
+    for fingerprint in os.listdir(relay_dir):
+        with open(os.path.join(relay_dir, fingerprint, 'index.html'), 'rb') as f:
+            pages[fingerprint] = f.read()
+    return pages
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="fork-based pool is POSIX only")
+class TestRelayInfoRendering:
+    """Parallel and sequential relay-info rendering produce identical output."""
+
+    def test_parallel_output_matches_sequential(self, tmp_path):
+        relay_set = build_relay_set()
+        sequential = _render(relay_set, tmp_path / 'sequential', mp_workers=0)
+        parallel = _render(relay_set, tmp_path / 'parallel', mp_workers=2)
+        assert len(sequential) == 120
+        assert parallel == sequential
+
+    def test_pool_failure_falls_back_to_sequential(self, tmp_path):
+        relay_set = build_relay_set()
+        sequential = _render(relay_set, tmp_path / 'sequential', mp_workers=0)
+        with patch.object(page_writer.mp, 'get_context', side_effect=OSError("no fork")):
+            fallback = _render(relay_set, tmp_path / 'fallback', mp_workers=2)
+        assert fallback == sequential
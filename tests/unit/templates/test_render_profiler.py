@@ -0,0 +1,77 @@
+"""
+Unit tests for per-page render profiling (allium/lib/render_profiler.py) as used
+by the page writers with --profile-render.
+"""
+
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib import render_profiler
+from allium.lib.render_profiler import PROFILE_REPORT
+
+from tests.helpers.relay_documents import build_relay_set
+
+
+@pytest.fixture
+def profiled(tmp_path):
+    """Profile pages written under tmp_path/www; yields the report directory."""
+    render_profiler.enable(str(tmp_path / 'profile'), str(tmp_path / 'www'), slowest=3)
+    yield tmp_path / 'profile'
+    render_profiler._profiler = None
+
+
+def _write_relay_pages(tmp_path, mp_workers):
+    relay_set = build_relay_set()
+    relay_set.output_dir = str(tmp_path / 'www')
+    relay_set.mp_workers = mp_workers
+    with patch('builtins.print'):
+        relay_set.write_relay_info()
+        relay_set.write_misc(template='misc-authorities.html', path='misc/authorities.html')
+
+
+class TestRenderProfiler:
+
+    def test_disabled_profiler_is_a_no_op(self):
+        assert render_profiler.active() is None
+        page = render_profiler.start_page('relay')
+        page.lap('render')
+        page.finish('unused.html', 'x')
+        assert render_profiler.finish() is None
+
+    def test_sequential_pages_are_reported_per_type(self, tmp_path, profiled):
+        _write_relay_pages(tmp_path, mp_workers=0)
+        report = render_profiler.finish()
+        assert report['pages'] == 121
+        relay = report['page_types']['relay']
+        assert relay['pages'] == 120
+        assert relay['bytes'] == sum(os.path.getsize(tmp_path / 'www' / 'relay' / fingerprint / 'index.html')
+                                     for fingerprint in os.listdir(tmp_path / 'www' / 'relay'))
+        for phase in ('context', 'render', 'write', 'total'):
+            assert relay[phase]['p50_ms'] <= relay[phase]['p95_ms'] <= relay[phase]['max_ms']
+        assert relay['slowest_page'].startswith('relay/')
+        assert report['page_types']['misc-authorities']['pages'] == 1
+        with open(profiled / PROFILE_REPORT, encoding='utf8') as f:
+            assert json.load(f) == report
+        assert render_profiler.active() is None
+
+    def test_slowest_pages_keep_cprofile_stats(self, tmp_path, profiled):
+        _write_relay_pages(tmp_path, mp_workers=0)
+        report = render_profiler.finish()
+        assert len(report['slowest']) == 3
+        assert [entry['ms'] for entry in report['slowest']] == sorted(
+            (entry['ms'] for entry in report['slowest']), reverse=True)
+        for entry in report['slowest']:
+            assert (profiled / entry['profile']).exists()
+        assert not (profiled / 'spool').exists()
+
+    @pytest.mark.skipif(sys.platform == 'win32', reason="fork-based pool is POSIX only")
+    def test_worker_pages_are_merged(self, tmp_path, profiled):
+        _write_relay_pages(tmp_path, mp_workers=2)
+        report = render_profiler.finish()
+        assert report['page_types']['relay']['pages'] == 120
+        assert len(report['slowest']) == 3
+        assert render_profiler.format_report(report)[0].startswith("Render profile: 121 pages")
@@ -0,0 +1,141 @@
+"""
+Unit tests for relay snapshots (allium/lib/relay_snapshot.py) and sharded
+rendering (allium/lib/render_shards.py): shards rendered from one snapshot and
+merged produce the same site as a single full render.
+"""
+
+import json
+import os
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib.output_manifest import MANIFEST_FILENAME
+from allium.lib.progress_logger import ProgressLogger
+from allium.lib.relay_snapshot import (
+    DETACHED_ATTRIBUTES, SnapshotError, load_snapshot, read_snapshot_metadata, save_snapshot,
+)
+from allium.lib.relays import Relays
+from allium.lib.render_shards import ShardError, in_shard, page_shard, parse_shard
+from allium.lib.site_generator import generate_site, merge_site
+
+from tests.helpers.relay_documents import build_relay_set
+from tests.helpers.site_rendering import read_tree
+from tests.helpers.synthetic_network import generate_network
+
+
+# History summary counters of each saved snapshot's relay set
+snapshot_stats = {}
+
+
+@pytest.fixture(scope='module')
+def snapshot(tmp_path_factory):
+    relay_set = build_relay_set()
+    with patch('builtins.print'):
+        relay_set.enrich_with_api_data()
+    relay_set.history_summary.count(scans=3, series=2)
+    path = str(tmp_path_factory.mktemp('snapshot') / 'relays.snapshot')
+    save_snapshot(relay_set, path)
+    snapshot_stats[path] = relay_set.history_summary.stats()
+    return path
+
+
+def _args(output_dir):
+    return SimpleNamespace(output_dir=str(output_dir), mp_workers=0, incremental=False,
+                           inline_critical_css=False, profile_render=None)
+
+
+def _render(snapshot, output_dir, shard=None, merge=None):
+    progress_logger = ProgressLogger(progress_enabled=False)
+    relay_set = load_snapshot(snapshot, progress_logger)
+    relay_set.output_dir = str(output_dir)
+    relay_set.mp_workers = 0
+    with patch('builtins.print'):
+        if merge is not None:
+            merge_site(relay_set, _args(output_dir), progress_logger, merge)
+        else:
+            generate_site(relay_set, _args(output_dir), progress_logger, shard=shard)
+
+
+class TestShardSelection:
+
+    def test_parse_shard(self):
+        assert parse_shard('1/4') == (1, 4)
+        assert parse_shard('4/4') == (4, 4)
+        for text in ('0/4', '5/4', '4', 'a/b', '-1/4'):
+            with pytest.raises(ValueError):
+                parse_shard(text)
+
+    def test_every_page_belongs_to_exactly_one_shard(self):
+        paths = [f"relay/{index:040X}/index.html" for index in range(200)] + ['index.html']
+        for path in paths:
+            assert [index for index in range(1, 4) if in_shard((index, 3), path)] == [page_shard(path, 3)]
+            assert in_shard(None, path)
+        assert {page_shard(path, 3) for path in paths} == {1, 2, 3}
+
+
+class TestRelaySnapshot:
+
+    def test_round_trip(self, snapshot):
+        metadata = read_snapshot_metadata(snapshot)
+        assert metadata['relays'] == 120
+        relay_set = load_snapshot(snapshot, ProgressLogger(progress_enabled=False))
+        assert len(relay_set.json['relays']) == 120
+        assert relay_set.timestamp == metadata['timestamp']
+        assert relay_set.output_manifest is None
+        assert relay_set.history_summary.stats() == snapshot_stats[snapshot]
+
+    def test_rejects_other_files(self, tmp_path, snapshot):
+        other = tmp_path / 'other'
+        other.write_bytes(b'{"relays": []}\n')
+        with pytest.raises(SnapshotError):
+            load_snapshot(str(other), None)
+        with open(snapshot, 'rb') as f:
+            truncated = f.read(4096)
+        (tmp_path / 'truncated').write_bytes(truncated)
+        with pytest.raises(SnapshotError):
+            load_snapshot(str(tmp_path / 'truncated'), None)
+
+
+    def test_history_stores_are_decoded_on_first_access(self, tmp_path):
+        network = generate_network(relays=40, contacts=10, seed=3)
+        with patch('builtins.print'):
+            relay_set = Relays(output_dir=str(tmp_path), onionoo_url='https://test.example.com',
+                               relay_data=network['details'], mp_workers=0, defer_enrichment=True)
+            relay_set.enrich_with_api_data(uptime_data=network['uptime'], bandwidth_data=network['bandwidth'])
+        save_snapshot(relay_set, str(tmp_path / 'snapshot'))
+        assert all(name in vars(relay_set) for name in DETACHED_ATTRIBUTES)
+
+        loaded = load_snapshot(str(tmp_path / 'snapshot'), None)
+        assert not any(name in vars(loaded) for name in DETACHED_ATTRIBUTES)
+        assert loaded.json['relays'] == relay_set.json['relays']
+        assert loaded.uptime_history.fingerprints == relay_set.uptime_history.fingerprints
+        assert 'uptime_history' in vars(loaded) and 'bandwidth_history' not in vars(loaded)
+        assert not hasattr(loaded, 'no_such_attribute')
+
+        # Saving a loaded relay set keeps the sections that were never decoded
+        save_snapshot(loaded, str(tmp_path / 'again'))
+        again = load_snapshot(str(tmp_path / 'again'), None)
+        assert again.bandwidth_history.fingerprints == relay_set.bandwidth_history.fingerprints
+
+
+class TestShardedRendering:
+
+    def test_merged_shards_match_full_render(self, tmp_path, snapshot):
+        _render(snapshot, tmp_path / 'full')
+        for index in range(1, 4):
+            _render(snapshot, tmp_path / 'sharded', shard=(index, 3))
+        _render(snapshot, tmp_path / 'sharded', merge=3)
+
+        full = read_tree(tmp_path / 'full')
+        sharded = read_tree(tmp_path / 'sharded')
+        manifest = json.loads(sharded.pop(MANIFEST_FILENAME))
+        assert sharded == full
+        pages = {path.replace(os.sep, '/') for path in full if path.endswith('.html')}
+        assert set(manifest['files']) == pages
+
+    def test_merge_needs_every_shard(self, tmp_path, snapshot):
+        _render(snapshot, tmp_path, shard=(1, 2))
+        with pytest.raises(ShardError, match='shard\\(s\\) 2 of 2'):
+            _render(snapshot, tmp_path, merge=2)
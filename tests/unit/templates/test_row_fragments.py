@@ -0,0 +1,77 @@
+"""
+Unit tests for relay row fragments (allium/lib/row_fragments.py): rows reused
+from the cache, with a page type's own cells spliced in, match rows rendered
+directly, and worker processes report their counts to the parent.
+"""
+
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib.page_writer import ENV, write_pages_parallel
+from allium.lib.row_fragments import SELF_LINK_CELLS, RowFragmentCache
+
+from tests.helpers.relay_documents import build_relay_set
+
+ROWS = ENV.from_string("{% for relay in relay_subset %}{{ relay_row(relay) }}|{% endfor %}")
+
+
+def _rows(relay_set, **page):
+    return ROWS.render(relays=relay_set, relay_subset=relay_set.json['relays'],
+                       base_url='https://metrics.example.org',
+                       validated_aroi_domains=relay_set.validated_aroi_domains, **page).split('|')
+
+
+class TestRowFragments:
+
+    @pytest.mark.parametrize('key', [None, 'flag', *SELF_LINK_CELLS])
+    @pytest.mark.parametrize('path_prefix,is_index', [('../../', False), ('../', False), ('', True)])
+    def test_reused_rows_match_direct_renders(self, key, path_prefix, is_index):
+        relay_set = build_relay_set()
+        relay_set.validated_aroi_domains = {relay_set.json['relays'][0]['aroi_domain']}
+        page = {'key': key, 'is_index': is_index, 'page_ctx': {'path_prefix': path_prefix}}
+        direct = _rows(relay_set, **page)
+
+        relay_set.row_fragments = cache = RowFragmentCache()
+        # Other page types of the variant first, so rows of this page type come from the cache
+        # (pages without a key, e.g. misc/all.html, have no detail columns: their own variant)
+        for other in (('flag', 'as', 'country') if key else (None,)):
+            _rows(relay_set, **{**page, 'key': other})
+        renders = cache.renders
+        assert _rows(relay_set, **page) == direct
+        assert cache.renders == renders and cache.hits > 0
+
+    def test_rows_render_once_per_variant(self):
+        relay_set = build_relay_set()
+        relay_set.row_fragments = cache = RowFragmentCache()
+        relays = len(relay_set.json['relays'])
+        for key in ('flag', 'flag', 'as', 'country', 'platform', 'first_seen'):
+            _rows(relay_set, key=key, is_index=False, page_ctx={'path_prefix': '../../'})
+        # One linked and one unlinked row per relay, however many listings show it
+        assert (cache.renders, cache.hits) == (2 * relays, 4 * relays)
+        assert '66.7% hit rate' in cache.describe()
+
+        assert cache.take_stats()[:2] == (4 * relays, 2 * relays)
+        assert (cache.hits, cache.renders) == (0, 0)
+        cache.add_stats((3, 1, 0.5))
+        cache.add_stats(None)
+        assert (cache.hits, cache.renders, cache.render_seconds) == (3, 1, 0.5)
+        cache.clear()
+        assert cache.rows == {} and cache.hits == 3
+
+    @pytest.mark.skipif(sys.platform == 'win32', reason="fork-based pool is POSIX only")
+    def test_worker_counts_reach_the_parent(self, tmp_path):
+        relay_set = build_relay_set()
+        relay_set.output_dir = str(tmp_path)
+        relay_set.mp_workers = 2
+        relay_set.row_fragments = RowFragmentCache()
+        values = list(relay_set.json['sorted']['as'])
+        with patch('builtins.print'):
+            write_pages_parallel(relay_set, 'as', values, os.path.join(str(tmp_path), 'as'), time.time())
+        listed = sum(len(relay_set.json['sorted']['as'][value]['relays']) for value in values)
+        # Each relay is on one AS page: its linked and unlinked rows were rendered by a worker
+        assert (relay_set.row_fragments.renders, relay_set.row_fragments.hits) == (2 * listed, 0)
+        assert relay_set.row_fragments.rows == {}
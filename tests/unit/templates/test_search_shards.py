@@ -0,0 +1,130 @@
+"""
+Unit tests for the sharded v2 search index (allium/lib/search_shards.py): queries
+answered from the manifest and a few shards return what the v1 search returns
+on search-index.json, while reading a small part of the index.
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib.relays import Relays
+from allium.lib.search_index import build_search_index, generate_search_index
+from allium.lib.search_shards import ShardedSearchIndex, term_shard, token_prefixes, write_sharded_index
+
+from tests.helpers.synthetic_network import generate_network
+from tests.unit.templates.test_search_index import search as search_v1
+
+
+@pytest.fixture(scope='module')
+def indexes(tmp_path_factory):
+    """The v1 index and the directories of search-index.json and the v2 layout."""
+    network = generate_network(relays=600, contacts=200, seed=5)
+    with patch('builtins.print'):
+        relay_set = Relays(output_dir='', onionoo_url='https://test.example.com', relay_data=network['details'],
+                           mp_workers=0)
+    output_dir = tmp_path_factory.mktemp('search')
+    v1_path = os.path.join(str(output_dir), 'search-index.json')
+    validated = {relay_set.json['relays'][0]['aroi_domain']}
+    # Shards of a few KB, so the small network is split like a full one
+    with patch('allium.lib.search_shards.TARGET_SHARD_BYTES', 2048):
+        stats = generate_search_index(relay_set.json, v1_path, validated_aroi_domains=validated,
+                                      sharded_output_dir=os.path.join(str(output_dir), 'search'))
+    with open(v1_path, encoding='utf-8') as f:
+        index = json.load(f)
+    return index, v1_path, os.path.join(str(output_dir), 'search'), stats
+
+
+def _queries(index):
+    relays, families, lookups = index['relays'], index['families'], index['lookups']
+    queries = ['xyznonexistent12345', 'linux', 'exit', 'guard', 'AS1', '  ']
+    for relay in relays[:150]:
+        queries += [relay['f'], relay['f'].lower(), relay['f'][:8], relay['n'], relay['n'][:3],
+                    relay.get('a', ''), relay.get('as', '')[2:]] + relay.get('ip', [])
+    for family in families[:100]:
+        queries += [family['id'], family['id'][:7], family.get('px', ''), family.get('a', '')] + list(family['nn'])[:2]
+    # (not country names: v1 finds synthetic codes like "DE" inside AS names, "Hosting Provider")
+    queries += list(lookups['as_names'])
+    return [query for query in queries if query]
+
+
+class TestShardedSearchIndex:
+
+    def test_results_match_the_v1_search(self, indexes):
+        index, _, v2_dir, _ = indexes
+        reader = ShardedSearchIndex(v2_dir)
+        for query in _queries(index):
+            assert reader.search(query) == search_v1(query, index), query
+
+    def test_queries_read_a_few_small_files(self, indexes):
+        index, v1_path, v2_dir, stats = indexes
+        v1_bytes = os.path.getsize(v1_path)
+        for query in _queries(index):
+            reader = ShardedSearchIndex(v2_dir)
+            reader.search(query)
+            # Manifest plus at most one shard per search step that can answer the query
+            assert reader.files_loaded <= 8
+            assert reader.bytes_loaded < v1_bytes / 10
+        assert stats['relay_count'] == index['meta']['relay_count']
+        assert stats['manifest_size_bytes'] < 4096
+
+    def test_manifest_describes_the_layout(self, indexes):
+        index, _, v2_dir, stats = indexes
+        with open(os.path.join(v2_dir, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        assert manifest['meta']['version'] == '2.0'
+        assert manifest['meta']['relay_count'] == index['meta']['relay_count']
+        assert manifest['queries']['fingerprint'] == ['relays', 'families']
+        files = sum(len(files) for _, _, files in os.walk(v2_dir))
+        assert files == stats['shard_file_count']
+
+        prefix_length = manifest['relays']['prefix_length']
+        sharded = []
+        for name in os.listdir(os.path.join(v2_dir, 'relays')):
+            with open(os.path.join(v2_dir, 'relays', name), encoding='utf-8') as f:
+                entries = json.load(f)
+            assert {entry['f'][:prefix_length] for entry in entries} == {name[:-len('.json')]}
+            sharded += entries
+        assert sorted(sharded, key=lambda r: r['f']) == sorted(index['relays'], key=lambda r: r['f'])
+
+    def test_fuzzy_queries_match_at_token_boundaries(self, tmp_path):
+        relay = {'fingerprint': 'A' * 40, 'nickname': 'MyTorRelay01', 'or_addresses': ['10.0.0.1:9001']}
+        index = build_search_index({'relays': [relay], 'sorted': {}})
+        write_sharded_index(index, str(tmp_path / 'search'))
+        reader = ShardedSearchIndex(str(tmp_path / 'search'))
+        for query in ('torrel', 'relay0', 'MYTOR', '01'):
+            assert reader.search(query)['hint'] == 'fuzzy'
+            assert search_v1(query, index)['hint'] == 'fuzzy'
+        # v1 also matches inside a token
+        assert reader.search('yTor')['type'] == 'not_found'
+        assert search_v1('yTor', index)['type'] == 'relay'
+
+    def test_rewrite_replaces_the_previous_index(self, indexes, tmp_path):
+        index = indexes[0]
+        output_dir = str(tmp_path / 'search')
+        write_sharded_index(index, output_dir)
+        stale = os.path.join(output_dir, 'relays', 'stale.json')
+        with open(stale, 'w', encoding='utf-8') as f:
+            f.write('[]')
+        write_sharded_index(index, output_dir)
+        assert not os.path.exists(stale)
+        assert sorted(os.listdir(str(tmp_path))) == ['search']
+
+
+def test_term_shard_is_fnv1a32():
+    # Reference values of 32-bit FNV-1a (the search function hashes terms the same way)
+    assert term_shard('', 1 << 32) == 0x811c9dc5
+    assert term_shard('a', 1 << 32) == 0xe40c292c
+    assert term_shard('foobar', 1 << 32) == 0xbf9cf968
+    assert term_shard('foobar', 16) == 0x8
+
+
+def test_token_prefixes():
+    terms = token_prefixes('MyTorRelay01')
+    assert terms[:3] == ['m', 'my', 'myt']
+    # Suffixes start at a token boundary
+    assert {term for term in terms if 'mytorrelay01'.endswith(term)} == {'01', 'relay01', 'torrelay01', 'mytorrelay01'}
+    assert 'tor' in token_prefixes('TORRelay') and 'relay' in token_prefixes('TORRelay')
+    assert 'online gmbh' in token_prefixes('Hetzner Online GmbH')
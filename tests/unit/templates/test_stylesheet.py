@@ -0,0 +1,76 @@
+"""
+Unit tests for the hashed site stylesheet (allium/lib/stylesheet.py) and how
+skeleton.html links or inlines it.
+"""
+
+import os
+from unittest.mock import patch
+
+from allium.lib import page_writer
+from allium.lib.stylesheet import Stylesheet, extract_critical_css, load_stylesheet, output_size_report
+
+from tests.helpers.relay_documents import build_relay_set
+
+
+def _relay_page(tmp_path):
+    relay_set = build_relay_set(relay_count=3)
+    relay_set.output_dir = str(tmp_path)
+    with patch('builtins.print'):
+        relay_set.write_relay_info()
+    with open(tmp_path / 'relay' / f"{0:040X}" / 'index.html', encoding='utf8') as f:
+        return f.read()
+
+
+class TestStylesheet:
+
+    def test_filename_follows_content(self):
+        first = Stylesheet("body { color: red; }\n")
+        assert first.filename == f"allium.{first.digest}.css" and len(first.digest) == 12
+        assert Stylesheet("body { color: red; }\n").filename == first.filename
+        assert Stylesheet("body { color: blue; }\n").filename != first.filename
+
+    def test_critical_sections(self):
+        css = ("a { x: 1; }\n/* @critical */\n.nav { y: 2; }\n/* @end-critical */\n"
+               "p { z: 3; }\n/* @critical */\n.search { w: 4; }\n/* @end-critical */\n")
+        assert extract_critical_css(css) == ".nav { y: 2; }\n.search { w: 4; }\n"
+        assert Stylesheet(css).critical_css == ""
+        assert Stylesheet(css, inline_critical=True).critical_css == extract_critical_css(css)
+
+    def test_site_stylesheet_has_critical_sections(self):
+        critical = load_stylesheet(inline_critical=True).critical_css
+        assert '.aeo-cross-nav' in critical and '.navbar-collapse' in critical
+
+    def test_write_replaces_previous_build(self, tmp_path):
+        old = Stylesheet("p { a: 1; }\n").write(str(tmp_path))
+        (tmp_path / 'static' / 'css' / 'bootstrap.min.css').write_text('keep')
+        new = Stylesheet("p { a: 2; }\n").write(str(tmp_path))
+        assert not os.path.exists(old)
+        assert sorted(os.listdir(tmp_path / 'static' / 'css')) == sorted(
+            ['bootstrap.min.css', os.path.basename(new)])
+
+    def test_size_report(self, tmp_path):
+        stylesheet = Stylesheet("p { a: 1; }\n" * 100)
+        for name in ('a.html', 'b.html'):
+            (tmp_path / name).write_text('x' * 1000)
+        assert output_size_report(str(tmp_path), stylesheet).startswith("2 HTML pages")
+
+
+class TestSkeletonStylesheet:
+
+    def test_pages_link_hashed_stylesheet(self, tmp_path):
+        page = _relay_page(tmp_path)
+        stylesheet = page_writer.ENV.globals['stylesheet']
+        assert f'href="../../static/css/{stylesheet.filename}"' in page
+        assert '.aeo-cross-nav {' not in page
+
+    def test_inline_critical_css(self, tmp_path):
+        default = page_writer.ENV.globals['stylesheet']
+        stylesheet = load_stylesheet(inline_critical=True)
+        try:
+            page_writer.ENV.globals['stylesheet'] = stylesheet
+            page = _relay_page(tmp_path)
+        finally:
+            page_writer.ENV.globals['stylesheet'] = default
+        assert f"<style>{stylesheet.critical_css}</style>" in page
+        # The full stylesheet is linked after the page content
+        assert page.index(stylesheet.filename) > page.index('<div class="container">')
@@ -0,0 +1,103 @@
+"""
+Unit tests for the shared render worker pool (allium/lib/worker_pool.py):
+workers are forked once and reused, and generate_site() renders every
+parallel page batch with one pool and the same output as sequential rendering.
+"""
+
+import gc
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from allium.lib import site_generator
+from allium.lib.progress import get_uss_mb
+from allium.lib.worker_pool import WorkerPool
+
+from tests.helpers.relay_documents import build_relay_set
+from tests.helpers.site_rendering import read_tree, render_site
+
+
+def _offset(value):
+    return value + _offset_by
+
+
+_offset_by = 0
+
+
+def _init_offset(offset):
+    global _offset_by
+    _offset_by = offset
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="fork-based pool is POSIX only")
+class TestWorkerPool:
+
+    def test_workers_are_forked_once_and_reused(self):
+        pool = WorkerPool(2, _init_offset, (10,))
+        assert not pool.started
+        try:
+            assert pool.map(_offset, [1, 2, 3]) == [11, 12, 13]
+            assert gc.get_freeze_count() > 0
+            assert sorted(pool.imap_unordered(_offset, [4, 5])) == [14, 15]
+            assert pool.forks == 1
+            if os.path.exists('/proc/self/smaps_rollup'):
+                assert len(pool.worker_uss_mb()) == 2
+
+            # A failed batch stops the workers; the next one forks new ones
+            pool.terminate()
+            assert not pool.started and gc.get_freeze_count() == 0
+            assert pool.map(_offset, [6]) == [16]
+            assert pool.forks == 2
+        finally:
+            pool.close()
+        assert not pool.started and gc.get_freeze_count() == 0
+
+    @pytest.mark.skipif(not os.path.exists('/proc/self/smaps_rollup'), reason="needs /proc smaps_rollup")
+    def test_uss(self):
+        assert get_uss_mb(os.getpid()) > 0
+        assert get_uss_mb(2 ** 22 + 1) is None
+
+    def test_site_renders_with_one_pool(self, tmp_path):
+        relay_set = build_relay_set()
+        with patch('builtins.print'):
+            relay_set.enrich_with_api_data()
+        render_site(relay_set, tmp_path / 'sequential', mp_workers=0)
+
+        pools, batches = [], []
+        create_render_pool = site_generator.create_render_pool
+
+        def create(relay_set):
+            pools.append(create_render_pool(relay_set))
+            return pools[-1]
+
+        with patch.object(site_generator, 'create_render_pool', side_effect=create), \
+                patch.object(WorkerPool, 'log_worker_memory', autospec=True,
+                             side_effect=lambda pool, label: batches.append((id(pool), label))):
+            render_site(relay_set, tmp_path / 'parallel', mp_workers=2)
+
+        # Misc listings and relay pages are parallel batches (the 120-relay network has
+        # fewer than 100 groups of every detail page type, which render sequentially)
+        assert [label for _, label in batches] == ['misc pages', 'relay pages']
+        assert {pool_id for pool_id, _ in batches} == {id(pools[0])}
+        assert pools[0].forks == 1 and not pools[0].started
+        assert relay_set.render_pool is None
+        assert gc.get_freeze_count() == 0
+        assert read_tree(tmp_path / 'parallel') == read_tree(tmp_path / 'sequential')
+
+    def test_workers_see_contact_data_stored_while_rendering(self, tmp_path):
+        # Without precomputed contact data the contact pages store it as they render;
+        # relay pages then need workers forked after that
+        relay_set = build_relay_set()
+        render_site(relay_set, tmp_path / 'sequential', mp_workers=0)
+        for contact in relay_set.json['sorted']['contact'].values():
+            del contact['contact_display_data']
+
+        pools = []
+        create_render_pool = site_generator.create_render_pool
+        with patch.object(site_generator, 'create_render_pool',
+                          side_effect=lambda relay_set: pools.append(create_render_pool(relay_set)) or pools[-1]):
+            render_site(relay_set, tmp_path / 'parallel', mp_workers=2)
+        assert pools[0].forks == 2
+        assert read_tree(tmp_path / 'parallel') == read_tree(tmp_path / 'sequential')
@@ -0,0 +1,176 @@
+"""
+Unit tests for the columnar uptime/bandwidth history store (allium/lib/history_store.py)
+and its use by the consolidated uptime and bandwidth processing functions.
+"""
+
+import statistics
+
+import pytest
+
+from allium.lib.history_store import (
+    build_bandwidth_history_store,
+    build_uptime_history_store,
+    describe_history_store,
+)
+from allium.lib.uptime_utils import (
+    _compute_uptime_percentage_and_datapoints,
+    calculate_network_uptime_percentiles,
+    calculate_relay_uptime_average,
+    process_all_uptime_data_consolidated,
+)
+from allium.lib.statistical_utils import StatisticalUtils
+from allium.lib.bandwidth_utils import (
+    calculate_relay_bandwidth_average,
+    calculate_total_data_from_history,
+    process_all_bandwidth_data_consolidated,
+)
+
+from tests.helpers.relay_documents import PERIODS, bandwidth_document, uptime_document
+
+
+def _reference_network_percentiles(document, period):
+    """Per-relay network percentile calculation on the raw document, without the store."""
+    values = []
+    excluded = {'no_uptime_data': 0, 'insufficient_data': 0, 'low_uptime': 0, 'invalid_data': 0}
+    for relay in document['relays']:
+        period_values = (relay.get('uptime') or {}).get(period, {}).get('values')
+        if not period_values:
+            excluded['no_uptime_data'] += 1
+            continue
+        avg_uptime = calculate_relay_uptime_average(period_values)
+        if avg_uptime > 0:
+            values.append(avg_uptime)
+            continue
+        valid = [v for v in period_values if isinstance(v, (int, float)) and 0 <= v <= 999]
+        if not valid:
+            excluded['invalid_data'] += 1
+        elif len(valid) < 30:
+            excluded['insufficient_data'] += 1
+        else:
+            excluded['low_uptime'] += 1
+    values.sort()
+    percentiles = StatisticalUtils.calculate_percentiles(values, [5, 25, 50, 75, 90, 95, 99])
+    return {
+        'percentiles': percentiles,
+        'average': percentiles['50th'],
+        'median': percentiles['50th'],
+        'arithmetic_mean': statistics.mean(values),
+        'total_relays': len(values),
+        'time_period': period,
+        'filtering_stats': {
+            'total_processed': len(document['relays']),
+            'included': len(values),
+            'excluded': excluded,
+        },
+    }
+
+
+class TestUptimeSeries:
+    """Batched uptime reductions must match the per-list reference calculation."""
+
+    def test_uptime_averages_match_reference(self):
+        document = uptime_document()
+        store = build_uptime_history_store(document)
+        for period in PERIODS:
+            series = store.get('uptime', period)
+            percentages, datapoints = series.uptime_averages()
+            for row, relay in enumerate(document['relays']):
+                values = relay['uptime'].get(period, {}).get('values')
+                expected = _compute_uptime_percentage_and_datapoints(values)
+                assert (percentages[row], datapoints[row]) == expected
+
+    def test_out_of_range_values_widen_series_without_changing_results(self):
+        values = [999] * 30 + [None, 1200, -5, 70000, 500.5, 0xFFFF]
+        document = {'relays': [{'fingerprint': 'A', 'uptime': {'1_month': {'values': [999] * 40}}},
+                               {'fingerprint': 'B', 'uptime': {'1_month': {'values': values}}}]}
+        series = build_uptime_history_store(document).get('uptime', '1_month')
+        assert series.typecode == 'd'
+        percentages, datapoints = series.uptime_averages()
+        assert (percentages[1], datapoints[1]) == _compute_uptime_percentage_and_datapoints(values)
+        assert (percentages[0], datapoints[0]) == (100.0, 40)
+        assert series.row_values(1)[30] is None
+
+    def test_store_index_and_flags(self):
+        document = uptime_document()
+        store = build_uptime_history_store(document)
+        assert len(store) == len(document['relays'])
+        assert store.row_of('0' * 40) == 0
+        assert None not in store.index
+        first_flag_order = []
+        for relay in document['relays']:
+            for flag in relay.get('flags', {}):
+                if flag not in first_flag_order:
+                    first_flag_order.append(flag)
+        assert [key.split('/', 1)[1] for key in store.series_keys('flags/')] == first_flag_order
+        assert 'relays' in describe_history_store(store)
+
+
+class TestConsolidatedProcessing:
+    """The store-backed consolidated functions keep their documented outputs."""
+
+    def test_uptime_consolidated_matches_reference(self):
+        document = uptime_document()
+        relays = [{'fingerprint': r['fingerprint'], 'nickname': f"n{i}", 'flags': ['Running']}
+                  for i, r in enumerate(document['relays']) if 'fingerprint' in r]
+        result = process_all_uptime_data_consolidated(relays, document)
+        for relay in document['relays']:
+            if 'fingerprint' not in relay:
+                continue
+            data = result['relay_uptime_data'][relay['fingerprint']]
+            for period in PERIODS:
+                values = relay['uptime'].get(period, {}).get('values')
+                pct, points = _compute_uptime_percentage_and_datapoints(values)
+                assert data['uptime_percentages'][period] == pct
+                assert data['uptime_datapoints'][period] == (points if values else 0)
+            assert list(data['flag_data']) == list(relay.get('flags', {}))
+            for flag, periods in relay.get('flags', {}).items():
+                for period, period_data in periods.items():
+                    pct, points = _compute_uptime_percentage_and_datapoints(period_data['values'])
+                    if pct > 0:
+                        assert data['flag_data'][flag][period]['uptime'] == pct
+                        assert data['flag_data'][flag][period]['data_points'] == points
+                    else:
+                        assert period not in data['flag_data'][flag]
+        assert result['processing_summary']['total_relays_processed'] == len(relays)
+
+    @pytest.mark.parametrize('period', PERIODS)
+    def test_percentiles_match_reference(self, period):
+        document = uptime_document(relay_count=120)
+        expected = _reference_network_percentiles(document, period)
+        store = build_uptime_history_store(document)
+        assert calculate_network_uptime_percentiles(document, period, history_store=store) == expected
+        assert calculate_network_uptime_percentiles(document, period) == expected
+        stats = expected['filtering_stats']
+        assert stats['included'] >= 10
+        assert stats['included'] + sum(stats['excluded'].values()) == stats['total_processed']
+
+    def test_bandwidth_consolidated_matches_reference(self):
+        document = bandwidth_document()
+        relays = [{'fingerprint': r['fingerprint'], 'flags': ['Fast', 'Guard']} for r in document['relays']]
+        result = process_all_bandwidth_data_consolidated(relays, document)
+        for relay in document['relays']:
+            data = result['relay_bandwidth_data'][relay['fingerprint']]
+            for period in ('6_months', '1_year', '5_years'):
+                period_data = relay['read_history'].get(period, {})
+                expected = 0.0
+                if period_data.get('values') and period_data.get('factor'):
+                    factor = period_data['factor']
+                    expected = calculate_relay_bandwidth_average(
+                        [v * factor for v in period_data['values'] if v is not None])
+                assert data['bandwidth_averages'][period] == pytest.approx(expected, rel=1e-12)
+            read_total = calculate_total_data_from_history(relay['read_history'])
+            write_total = calculate_total_data_from_history(relay['write_history'])
+            for period in PERIODS:
+                assert data['total_data'][period] == pytest.approx(read_total[period] + write_total[period],
+                                                                   rel=1e-12)
+            assert data['overload_ratelimits'] == relay.get('overload_ratelimits')
+            if any(v > 0 for v in data['bandwidth_averages'].values()):
+                assert data['flag_data']['Guard'] is data['bandwidth_averages']
+
+    def test_bandwidth_store_attributes(self):
+        document = bandwidth_document()
+        store = build_bandwidth_history_store(document)
+        assert store.attributes['overload_ratelimits'][0] == {'rate-limit': 1, 'burst-limit': 2}
+        series = store.get('read_history', '6_months')
+        row = next(r for r in range(len(store)) if series.has(r))
+        assert series.row_values(row) == document['relays'][row]['read_history']['6_months']['values']
@@ -0,0 +1,133 @@
+"""
+Unit tests for the shared per-relay history summary (allium/lib/history_summary.py):
+operator reliability, leaderboard and percentile extractions must give the same
+results from the summary table as from the raw Onionoo documents.
+"""
+
+import pickle
+import random
+
+from allium.lib.history_store import build_bandwidth_history_store, build_uptime_history_store
+from allium.lib.history_summary import RelayHistorySummary, add_stats, get_history_summary, take_stats
+from allium.lib.uptime_utils import extract_relay_uptime_for_period
+from allium.lib.bandwidth_utils import (
+    calculate_bandwidth_reliability_metrics,
+    extract_operator_daily_bandwidth_totals,
+    extract_relay_bandwidth_for_period,
+)
+
+from tests.helpers.relay_documents import bandwidth_document, uptime_document
+
+PERIODS = ('1_month', '3_months', '6_months', '1_year', '5_years')
+
+
+def _summary(uptime_data, bandwidth_data):
+    summary = RelayHistorySummary()
+    summary.add_uptime(build_uptime_history_store(uptime_data))
+    summary.add_bandwidth(build_bandwidth_history_store(bandwidth_data), bandwidth_data)
+    return summary
+
+
+def _operators(relay_count, seed=3):
+    """Random operators (relay lists in shuffled order, some unknown fingerprints)."""
+    rng = random.Random(seed)
+    operators = []
+    for _ in range(25):
+        relays = [{'fingerprint': f"{i:040X}", 'nickname': f"relay{i}"}
+                  for i in rng.sample(range(relay_count + 5), rng.randint(1, 8))]
+        if rng.random() < 0.2:
+            relays.append({'nickname': 'nofingerprint'})
+        operators.append(relays)
+    return operators
+
+
+def _long_bandwidth_document(seed=5, relay_count=12):
+    """Bandwidth document with 6-month series long enough for the growth trend."""
+    rng = random.Random(seed)
+    relays = []
+    for i in range(relay_count):
+        history = {period: {'factor': rng.uniform(1, 5000), 'last': '2026-10-01 00:00:00',
+                            'values': [None if rng.random() < 0.1 else rng.randint(0, 999)
+                                       for _ in range(rng.choice([90, 180]))]}
+                   for period in ('6_months', '1_year', '5_years')}
+        relays.append({'fingerprint': f"{i:040X}", 'read_history': history})
+    return {'relays': relays}
+
+
+class TestSummaryMatchesDocuments:
+    """Every extraction reads the same numbers from the table as from the documents."""
+
+    def test_uptime_extraction(self):
+        uptime_data = uptime_document()
+        summary = _summary(uptime_data, None)
+        for relays in _operators(60):
+            for period in PERIODS:
+                assert (extract_relay_uptime_for_period(relays, uptime_data, period, summary=summary)
+                        == extract_relay_uptime_for_period(relays, uptime_data, period))
+
+    def test_bandwidth_extraction_and_daily_totals(self):
+        bandwidth_data = bandwidth_document()
+        summary = _summary(None, bandwidth_data)
+        for relays in _operators(40):
+            for period in PERIODS:
+                assert (extract_relay_bandwidth_for_period(relays, bandwidth_data, period, summary=summary)
+                        == extract_relay_bandwidth_for_period(relays, bandwidth_data, period))
+                assert (extract_operator_daily_bandwidth_totals(relays, bandwidth_data, period, summary=summary)
+                        == extract_operator_daily_bandwidth_totals(relays, bandwidth_data, period))
+
+    def test_bandwidth_reliability_metrics(self):
+        bandwidth_data = _long_bandwidth_document()
+        summary = _summary(None, bandwidth_data)
+        relays = [{'fingerprint': f"{i:040X}"} for i in (3, 0, 7, 11)]
+        for period in ('6_months', '1_year', '5_years'):
+            expected = calculate_bandwidth_reliability_metrics(relays, bandwidth_data, period, 1000.0, 50.0)
+            assert calculate_bandwidth_reliability_metrics(
+                relays, bandwidth_data, period, 1000.0, 50.0, summary=summary) == expected
+        assert expected['peak_performance'] is not None
+
+
+class TestSummaryBookkeeping:
+
+    def test_daily_totals_are_cached_per_operator_and_period(self):
+        bandwidth_data = bandwidth_document()
+        summary = _summary(None, bandwidth_data)
+        relays = [{'fingerprint': f"{i:040X}"} for i in range(5)]
+        first = extract_operator_daily_bandwidth_totals(relays, None, '6_months', summary=summary)
+        assert extract_operator_daily_bandwidth_totals(relays, None, '6_months', summary=summary) is first
+        # Relay order changes the summation order, so it is part of the key
+        assert extract_operator_daily_bandwidth_totals(relays[::-1], None, '6_months', summary=summary) is not first
+        assert summary.stats()['series_reused'] == len(relays)
+
+    def test_counters(self):
+        summary = RelayHistorySummary()
+        summary.count(scans=3)
+        summary.count(scans=1, series=10)
+        assert summary.stats() == {'scans_avoided': 4, 'series_reused': 10}
+        assert summary.describe() == "4 full history scans avoided, 10 per-relay period summaries reused"
+
+    def test_worker_counters_are_added_by_the_parent(self):
+        class RelaySet:
+            history_summary = RelayHistorySummary()
+
+        parent, worker = RelaySet(), pickle.loads(pickle.dumps(RelaySet.history_summary))
+        worker.count(scans=2, series=5)
+        assert worker.take_stats() == (2, 5)
+        assert worker.stats() == {'scans_avoided': 0, 'series_reused': 0}
+        worker.count(series=3)
+        add_stats(parent, worker.take_stats())
+        add_stats(parent, (1, 0))
+        add_stats(parent, None)
+        assert parent.history_summary.stats() == {'scans_avoided': 1, 'series_reused': 3}
+        assert take_stats(parent) == (1, 3)
+        assert take_stats(object()) is None
+
+    def test_get_history_summary_requires_loaded_section(self):
+        class RelaySet:
+            history_summary = RelayHistorySummary()
+
+        relay_set = RelaySet()
+        assert get_history_summary(relay_set, 'uptime') is None
+        relay_set.history_summary.add_uptime(build_uptime_history_store(uptime_document()))
+        assert get_history_summary(relay_set, 'uptime') is relay_set.history_summary
+        assert get_history_summary(relay_set, 'bandwidth') is None
+        assert get_history_summary(object(), 'uptime') is None
@@ -0,0 +1,208 @@
+"""
+Unit tests for pluggable API cache codecs (allium/lib/cache_codecs.py) and
+their integration into CacheManager (allium/lib/file_io_utils.py).
+"""
+
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+
+from allium.lib.cache_codecs import (
+    CACHE_CODECS,
+    CacheFormatError,
+    PickleCodec,
+    benchmark_cache_codecs,
+    get_cache_codec,
+)
+from allium.lib.file_io_utils import CacheManager
+from allium.lib.json_stream import LazyJSONArray
+from allium.lib.workers import CACHE_CODEC_BY_KEY, DETAILS_CONFIG, UPTIME_CONFIG, BANDWIDTH_CONFIG, AROI_CONFIG
+
+
+SAMPLE = {
+    "version": "8.0",
+    "relays": [
+        {"fingerprint": "A" * 40, "uptime": {"1_month": {"factor": 0.001, "values": [999, None, 0]}}},
+        {"fingerprint": "B" * 40, "nickname": "snow☃man"},
+    ],
+}
+
+
+class TestCodecRoundTrip:
+    """Every registered codec must return exactly what was saved."""
+
+    @pytest.mark.parametrize("codec_name", sorted(CACHE_CODECS))
+    def test_round_trip(self, codec_name):
+        codec = get_cache_codec(codec_name)
+        buf = io.BytesIO()
+        codec.dump(SAMPLE, buf)
+        buf.seek(0)
+        assert codec.load(buf) == SAMPLE
+
+    def test_json_codec_matches_legacy_indented_format(self):
+        buf = io.BytesIO()
+        get_cache_codec('json').dump(SAMPLE, buf)
+        assert buf.getvalue().decode('utf-8') == json.dumps(SAMPLE, indent=2)
+
+    def test_unknown_codec_raises(self):
+        with pytest.raises(ValueError):
+            get_cache_codec('yaml')
+
+
+class TestPickleCodecIntegrity:
+    """The binary format must reject damaged or foreign files."""
+
+    def _encoded(self):
+        buf = io.BytesIO()
+        PickleCodec().dump(SAMPLE, buf)
+        return bytearray(buf.getvalue())
+
+    def test_corrupted_payload_fails_checksum(self):
+        data = self._encoded()
+        data[-5] ^= 0xFF
+        with pytest.raises(Exception):
+            PickleCodec().load(io.BytesIO(bytes(data)))
+
+    def test_bad_magic_rejected(self):
+        data = self._encoded()
+        data[0:4] = b'XXXX'
+        with pytest.raises(CacheFormatError):
+            PickleCodec().load(io.BytesIO(bytes(data)))
+
+    def test_future_format_version_rejected(self):
+        data = self._encoded()
+        data[4] = PickleCodec.FORMAT_VERSION + 1
+        with pytest.raises(CacheFormatError):
+            PickleCodec().load(io.BytesIO(bytes(data)))
+
+    def test_trailing_garbage_rejected(self):
+        with pytest.raises(CacheFormatError):
+            PickleCodec().load(io.BytesIO(bytes(self._encoded()) + b'extra'))
+
+
+ALLIUM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'allium')
+
+
+class TestPickleCodecImportRoots:
+    """allium.py imports the package as "lib", tests and benchmarks as "allium.lib"."""
+
+    def _run_as_lib(self, code, path):
+        subprocess.run([sys.executable, '-c', code, path], cwd=ALLIUM_DIR, check=True)
+
+    def test_cache_written_by_allium_py_loads_under_allium_lib(self, tmp_path):
+        path = str(tmp_path / 'uptime.pickle')
+        self._run_as_lib(
+            "import sys\n"
+            "from lib.cache_codecs import PickleCodec\n"
+            "from lib.json_stream import LazyJSONArray\n"
+            "with open(sys.argv[1], 'wb') as f:\n"
+            "    PickleCodec().dump({'relays': LazyJSONArray.from_items([{'fingerprint': 'A'}], 'fingerprint')}, f)\n",
+            path)
+        with open(path, 'rb') as f:
+            relays = PickleCodec().load(f)['relays']
+        assert isinstance(relays, LazyJSONArray)
+        assert relays.by_key()['A'] == {'fingerprint': 'A'}
+
+    def test_cache_written_under_allium_lib_loads_in_allium_py(self, tmp_path):
+        path = str(tmp_path / 'uptime.pickle')
+        with open(path, 'wb') as f:
+            PickleCodec().dump({'relays': LazyJSONArray.from_items([{'fingerprint': 'A'}], 'fingerprint')}, f)
+        self._run_as_lib(
+            "import sys\n"
+            "from lib.cache_codecs import PickleCodec\n"
+            "from lib.json_stream import LazyJSONArray\n"
+            "with open(sys.argv[1], 'rb') as f:\n"
+            "    relays = PickleCodec().load(f)['relays']\n"
+            "assert type(relays) is LazyJSONArray and list(relays) == [{'fingerprint': 'A'}]\n",
+            path)
+
+
+class TestCacheManagerCodecs:
+    """CacheManager selects codecs per key and migrates legacy JSON caches."""
+
+    def test_codec_file_extension_and_round_trip(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = CacheManager(temp_dir, {'onionoo_uptime': 'pickle', 'aroi': 'json-gz'})
+            assert manager.save_cache('onionoo_uptime', SAMPLE)
+            assert manager.save_cache('aroi', SAMPLE)
+            assert manager.save_cache('plain', SAMPLE)
+            assert sorted(os.listdir(temp_dir)) == ['aroi.json.gz', 'onionoo_uptime.pickle', 'plain.json']
+            for key in ('onionoo_uptime', 'aroi', 'plain'):
+                assert manager.load_cache(key) == SAMPLE
+                assert manager.cache_exists(key)
+                assert manager.get_cache_age(key) is not None
+
+    def test_legacy_json_is_migrated_with_original_mtime(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            CacheManager(temp_dir).save_cache('onionoo_uptime', SAMPLE)
+            legacy_path = os.path.join(temp_dir, 'onionoo_uptime.json')
+            old_mtime = time.time() - 5 * 3600
+            os.utime(legacy_path, (old_mtime, old_mtime))
+
+            manager = CacheManager(temp_dir, {'onionoo_uptime': 'pickle'})
+            assert manager.get_cache_age('onionoo_uptime') >= 5 * 3600 - 60
+            assert manager.load_cache('onionoo_uptime') == SAMPLE
+
+            assert os.listdir(temp_dir) == ['onionoo_uptime.pickle']
+            assert manager.get_cache_age('onionoo_uptime') >= 5 * 3600 - 60
+            assert manager.load_cache('onionoo_uptime') == SAMPLE
+
+    def test_corrupt_binary_cache_loads_as_none(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = CacheManager(temp_dir, {'onionoo_uptime': 'pickle'})
+            with open(os.path.join(temp_dir, 'onionoo_uptime.pickle'), 'wb') as f:
+                f.write(b'not a cache file')
+            assert manager.load_cache('onionoo_uptime') is None
+
+    def test_replace_cache_file_only_for_json_codecs(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = CacheManager(temp_dir, {'binary': 'pickle', 'minified': 'json-min'})
+            source = os.path.join(temp_dir, 'download.part')
+            with open(source, 'w') as f:
+                json.dump(SAMPLE, f)
+            assert manager.replace_cache_file('binary', source) is False
+            # A cache left in a former codec's format is dropped
+            with open(os.path.join(temp_dir, 'minified.pickle'), 'wb') as f:
+                PickleCodec().dump(SAMPLE, f)
+            assert manager.replace_cache_file('minified', source) is True
+            assert manager.load_cache('minified') == SAMPLE
+            assert sorted(os.listdir(temp_dir)) == ['minified.json']
+
+    def test_delete_cache_removes_both_formats(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            CacheManager(temp_dir).save_cache('k', SAMPLE)
+            manager = CacheManager(temp_dir, {'k': 'pickle'})
+            manager.save_cache('k', SAMPLE)
+            with open(os.path.join(temp_dir, 'k.json'), 'w') as f:
+                json.dump(SAMPLE, f)
+            manager.delete_cache('k')
+            assert os.listdir(temp_dir) == []
+
+    def test_benchmark_reports_every_codec(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            manager = CacheManager(temp_dir)
+            manager.save_cache('onionoo_uptime', SAMPLE)
+            rows = benchmark_cache_codecs(manager, ['onionoo_uptime', 'missing'])
+            assert [row['codec'] for row in rows] == list(CACHE_CODECS)
+            assert all(row['size_bytes'] > 0 for row in rows)
+            # Scratch files are written elsewhere; the cache dir is unchanged
+            assert os.listdir(temp_dir) == ['onionoo_uptime.json']
+
+
+class TestWorkerCodecSelection:
+    """Lazily kept uptime/bandwidth histories are pickled; the streamed details body is kept as JSON."""
+
+    def test_codecs_selected_per_api_config(self):
+        for config in (UPTIME_CONFIG, BANDWIDTH_CONFIG):
+            assert config.cache_codec == 'pickle'
+            assert CACHE_CODEC_BY_KEY[config.api_name] == 'pickle'
+        # A JSON codec, so the streamed response is promoted instead of serialized again
+        assert DETAILS_CONFIG.stream_to_file and DETAILS_CONFIG.cache_codec == 'json-min'
+        assert get_cache_codec(CACHE_CODEC_BY_KEY['onionoo_details']).extension == '.json'
+        assert AROI_CONFIG.cache_codec == 'json'
@@ -0,0 +1,85 @@
+"""
+Unit tests for the shared keep-alive HTTP client (allium/lib/http_client.py)
+used by every API worker through urllib.request.urlopen().
+"""
+
+import gzip
+import http.server
+import socketserver
+import threading
+
+import pytest
+
+from allium.lib.http_client import get_connection_stats
+from allium.lib.workers import _fetch_url_with_total_timeout
+
+BODY = b'{"relays": [{"fingerprint": "' + b'A' * 40 + b'"}], "version": "test"}'
+
+
+class _KeepAliveHandler(http.server.BaseHTTPRequestHandler):
+    """HTTP/1.1 handler with Content-Length, so connections stay open between requests."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = BODY
+        self.send_response(200)
+        if self.path == '/gzip' and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(BODY)
+            self.send_header('Content-Encoding', 'gzip')
+        if self.path == '/close':
+            self.send_header('Connection', 'close')
+        if self.path == '/drop':
+            # Close after responding without telling the client (idle timeout)
+            self.close_connection = True
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _Server(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture
+def server():
+    httpd = _Server(('127.0.0.1', 0), _KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _host_stats(httpd):
+    return get_connection_stats().get(f"127.0.0.1:{httpd.server_address[1]}")
+
+
+class TestPooledConnections:
+    """Requests to one host share a connection while responses are read fully."""
+
+    def test_sequential_requests_reuse_one_connection(self, server):
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        for _ in range(3):
+            assert _fetch_url_with_total_timeout(f"{base}/fast", timeout=10) == BODY
+        assert _host_stats(server) == {'requests': 3, 'opened': 1, 'reused': 2}
+
+    def test_gzip_bodies_are_decompressed(self, server):
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        assert _fetch_url_with_total_timeout(f"{base}/gzip", timeout=10) == BODY
+
+    def test_connection_close_is_not_reused(self, server):
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        _fetch_url_with_total_timeout(f"{base}/close", timeout=10)
+        _fetch_url_with_total_timeout(f"{base}/fast", timeout=10)
+        assert _host_stats(server) == {'requests': 2, 'opened': 2, 'reused': 0}
+
+    def test_server_closed_idle_connection_is_replaced(self, server):
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        _fetch_url_with_total_timeout(f"{base}/drop", timeout=10)
+        assert _fetch_url_with_total_timeout(f"{base}/fast", timeout=10) == BODY
+        assert _host_stats(server) == {'requests': 2, 'opened': 2, 'reused': 0}
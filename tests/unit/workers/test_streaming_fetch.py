@@ -0,0 +1,253 @@
+"""
+Unit tests for streaming Onionoo ingest in allium/lib/workers.py and
+the incremental JSON loader in allium/lib/json_stream.py.
+"""
+
+import io
+import json
+import os
+import pickle
+import tempfile
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from allium.lib.bandwidth_utils import build_bandwidth_map
+from allium.lib.cache_codecs import get_cache_codec
+from allium.lib.json_stream import (
+    LazyJSONArray, iter_json_array, lazy_json_document, load_json_document, load_json_file,
+)
+from allium.lib.uptime_utils import build_uptime_map
+from allium.lib.workers import (
+    _fetch_url_to_file_with_total_timeout,
+    _fetch_with_cache_fallback,
+    _load_cache,
+    APIConfig,
+    UPTIME_CONFIG,
+    BANDWIDTH_CONFIG,
+)
+from allium.lib.file_io_utils import CacheManager
+
+
+SAMPLE_DOCUMENT = {
+    "version": "8.0",
+    "relays_published": "2026-10-16 12:00:00",
+    "relays": [
+        {
+            "fingerprint": "A" * 40,
+            "uptime": {"1_month": {"first": "2026-09-16 12:00:00", "interval": 14400,
+                                   "factor": 0.001, "count": 3, "values": [999, None, 1000]}},
+            "flags": {"Running": {"1_month": {"values": [999, 999]}}},
+        },
+        {"fingerprint": "B" * 40, "nickname": "snow☃man \"quoted\"", "ratio": -1.5e-3},
+    ],
+    "bridges_published": "2026-10-16 12:00:00",
+    "bridges": [],
+    "flag": True,
+    "nothing": None,
+}
+
+
+class TestIncrementalJsonLoader:
+    """The incremental loader must produce exactly what json.load produces."""
+
+    @pytest.mark.parametrize("read_size", [1, 3, 7, 64, 65536])
+    def test_matches_json_load_for_any_buffer_size(self, read_size):
+        text = json.dumps(SAMPLE_DOCUMENT, indent=2)
+        assert load_json_document(io.StringIO(text), read_size=read_size) == SAMPLE_DOCUMENT
+
+    @pytest.mark.parametrize("read_size", [1, 2, 5])
+    def test_numbers_split_across_buffer_boundaries(self, read_size):
+        doc = {"relays": [12345, 1.25, -7e10, 0], "count": 123456789}
+        text = json.dumps(doc, separators=(',', ':'))
+        assert load_json_document(io.StringIO(text), read_size=read_size) == doc
+
+    def test_on_item_called_once_per_streamed_relay(self):
+        seen = []
+        load_json_document(io.StringIO(json.dumps(SAMPLE_DOCUMENT)),
+                           on_item=lambda key, item: seen.append((key, item.get("fingerprint"))))
+        assert seen == [("relays", "A" * 40), ("relays", "B" * 40)]
+
+    def test_empty_object_and_array(self):
+        assert load_json_document(io.StringIO("{}")) == {}
+        assert load_json_document(io.StringIO('{"relays": []}')) == {"relays": []}
+        assert list(iter_json_array(io.StringIO(" [ ] "))) == []
+
+    def test_iter_json_array_yields_elements(self):
+        assert list(iter_json_array(io.StringIO('[{"a": 1}, 2, "x"]'), read_size=2)) == [{"a": 1}, 2, "x"]
+
+    @pytest.mark.parametrize("text", [
+        '{"relays": [1, 2',
+        '{"relays": [1 2]}',
+        '{"a": 1} trailing',
+        '[1, 2]',
+        '{"a" 1}',
+        '',
+    ])
+    def test_malformed_documents_raise_value_error(self, text):
+        with pytest.raises(ValueError):
+            load_json_document(io.StringIO(text), read_size=4)
+
+    def test_load_json_file_counts_streamed_items(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "doc.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(SAMPLE_DOCUMENT, f)
+            document, count = load_json_file(path)
+        assert document == SAMPLE_DOCUMENT
+        assert count == 2
+
+
+class TestLazyJsonArrays:
+    """Arrays under lazy_keys keep per-element JSON text and decode it on access."""
+
+    @pytest.mark.parametrize("read_size", [1, 7, 65536])
+    def test_lazy_document_equals_json_load(self, read_size):
+        text = json.dumps(SAMPLE_DOCUMENT, indent=2)
+        document = load_json_document(io.StringIO(text), read_size=read_size, lazy_keys=('relays',))
+        assert isinstance(document['relays'], LazyJSONArray)
+        assert isinstance(document['bridges'], list)
+        assert document == SAMPLE_DOCUMENT
+        relays = document.get('relays')
+        assert len(relays) == 2
+        assert list(relays) == SAMPLE_DOCUMENT['relays']
+        assert relays[-1] == SAMPLE_DOCUMENT['relays'][1]
+        assert relays[:1] == SAMPLE_DOCUMENT['relays'][:1]
+        assert relays.keys == ["A" * 40, "B" * 40]
+        # Every access decodes a fresh object
+        relays[0]['fingerprint'] = 'changed'
+        assert relays[0]['fingerprint'] == "A" * 40
+
+    def test_by_key_decodes_on_lookup(self):
+        items = [{"fingerprint": "A", "v": 1}, {"nickname": "no fingerprint"}, {"fingerprint": "A", "v": 2}, 3]
+        index = LazyJSONArray.from_items(items, 'fingerprint').by_key()
+        assert dict(index) == {"A": {"fingerprint": "A", "v": 2}}
+        assert index.get("A") is index.get("A")
+        assert index.get("missing") is None
+        with pytest.raises(ValueError):
+            LazyJSONArray.from_items(items).by_key()
+
+    def test_history_maps_use_the_lazy_index(self):
+        lazy = lazy_json_document(SAMPLE_DOCUMENT, ('relays',))
+        assert lazy == SAMPLE_DOCUMENT and isinstance(lazy['relays'], LazyJSONArray)
+        assert isinstance(SAMPLE_DOCUMENT['relays'], list)
+        assert lazy_json_document(lazy, ('relays',)) is lazy
+        for build_map in (build_uptime_map, build_bandwidth_map):
+            assert dict(build_map(lazy)) == build_map(SAMPLE_DOCUMENT)
+
+    @pytest.mark.parametrize("codec", ['json', 'json-gz', 'pickle'])
+    def test_cache_codecs_round_trip(self, codec):
+        lazy = lazy_json_document(SAMPLE_DOCUMENT, ('relays',))
+        codec = get_cache_codec(codec)
+        buffer = io.BytesIO()
+        codec.dump(lazy, buffer)
+        buffer.seek(0)
+        assert codec.load(buffer) == SAMPLE_DOCUMENT
+        assert pickle.loads(pickle.dumps(lazy))['relays'].keys == ["A" * 40, "B" * 40]
+
+    def test_cached_uptime_document_is_loaded_lazily(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_manager = CacheManager(temp_dir)
+            cache_manager.save_cache(UPTIME_CONFIG.api_name, SAMPLE_DOCUMENT)
+            with patch('allium.lib.workers._cache_manager', cache_manager):
+                cached = _load_cache(UPTIME_CONFIG.api_name)
+        assert isinstance(cached['relays'], LazyJSONArray)
+        assert cached == SAMPLE_DOCUMENT
+
+
+def _mock_response(body, chunk_size=5):
+    """Build a urlopen() response mock that returns body in small chunks."""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] + [b'']
+    response = MagicMock()
+    response.read.side_effect = chunks
+    del response.fp  # Skip per-read socket timeout adjustment
+    return response
+
+
+class TestStreamingFetch:
+    """Tests for the stream-to-file fetch path."""
+
+    def test_fetch_to_file_writes_full_body(self):
+        body = json.dumps(SAMPLE_DOCUMENT).encode("utf-8")
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dest = os.path.join(temp_dir, "out.part")
+            with patch("urllib.request.urlopen", return_value=_mock_response(body)):
+                written = _fetch_url_to_file_with_total_timeout("http://example.com/uptime", 30, dest)
+            with open(dest, "rb") as f:
+                assert f.read() == body
+        assert written == len(body)
+
+    def test_large_onionoo_configs_stream(self):
+        assert UPTIME_CONFIG.stream_to_file is True
+        assert BANDWIDTH_CONFIG.stream_to_file is True
+        assert APIConfig('x', 'x', 1, 1, 1).stream_to_file is False
+        assert UPTIME_CONFIG.lazy_keys == BANDWIDTH_CONFIG.lazy_keys == ('relays',)
+
+    @patch('allium.lib.workers._mark_ready')
+    @patch('allium.lib.workers._mark_stale')
+    @patch('allium.lib.workers._save_cache')
+    def test_streamed_response_is_parsed_and_promoted_to_cache(self, mock_save, mock_stale, mock_ready):
+        body = json.dumps(SAMPLE_DOCUMENT).encode("utf-8")
+        config = APIConfig(
+            api_name='stream_test', display_name='stream test', cache_max_age_hours=1,
+            timeout_fresh_cache=5, timeout_stale_cache=10, use_conditional_requests=False,
+            retry_count=0, stream_to_file=True, lazy_keys=('relays',),
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_manager = CacheManager(temp_dir)
+            messages = []
+            with patch('allium.lib.workers._cache_manager', cache_manager), \
+                    patch("urllib.request.urlopen", return_value=_mock_response(body, 4096)):
+                result = _fetch_with_cache_fallback("http://example.com/uptime", config,
+                                                    progress_logger=messages.append)
+            assert result == SAMPLE_DOCUMENT
+            assert isinstance(result['relays'], LazyJSONArray)
+            # The downloaded file became the cache; no re-serialization, no leftover temp file
+            mock_save.assert_not_called()
+            assert cache_manager.load_cache('stream_test') == SAMPLE_DOCUMENT
+            assert os.listdir(temp_dir) == ['stream_test.json']
+        assert any("before fetch" in m for m in messages)
+        assert any("2 streamed items" in m and "kept as JSON text" in m for m in messages)
+        mock_ready.assert_called_once_with('stream_test')
+
+    @patch('allium.lib.workers._mark_ready')
+    @patch('allium.lib.workers._mark_stale')
+    @patch('allium.lib.workers._save_cache')
+    def test_truncated_stream_falls_back_to_cache_and_cleans_up(self, mock_save, mock_stale, mock_ready):
+        cached = {"relays": [{"fingerprint": "cached"}]}
+        config = APIConfig(
+            api_name='stream_test', display_name='stream test', cache_max_age_hours=1,
+            timeout_fresh_cache=5, timeout_stale_cache=10, use_conditional_requests=False,
+            retry_count=0, stream_to_file=True,
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_manager = CacheManager(temp_dir)
+            cache_manager.save_cache('stream_test', cached)
+            with patch('allium.lib.workers._cache_manager', cache_manager), \
+                    patch("urllib.request.urlopen", return_value=_mock_response(b'{"relays": [{"fin')):
+                result = _fetch_with_cache_fallback("http://example.com/uptime", config)
+            assert result == cached
+            assert os.listdir(temp_dir) == ['stream_test.json']
+        mock_save.assert_not_called()
+
+    def test_failed_download_removes_partial_file(self, tmp_path):
+        response = _mock_response(b'{"relays": [')
+        response.read.side_effect = [b'{"relays": [', ConnectionResetError('reset by peer')]
+        dest = tmp_path / "out.part"
+        with patch("urllib.request.urlopen", return_value=response), pytest.raises(ConnectionResetError):
+            _fetch_url_to_file_with_total_timeout("http://example.com/uptime", 30, str(dest))
+        assert not dest.exists()
+
+    @patch('allium.lib.workers._mark_stale')
+    def test_failed_stream_leaves_nothing_in_the_cache_directory(self, mock_stale, isolated_worker_data):
+        config = APIConfig(
+            api_name='stream_test', display_name='stream test', cache_max_age_hours=1,
+            timeout_fresh_cache=5, timeout_stale_cache=10, use_conditional_requests=False,
+            retry_count=0, stream_to_file=True,
+        )
+        response = _mock_response(b'')
+        response.read.side_effect = [b'{"relays": [', ConnectionResetError('reset by peer')]
+        with patch("urllib.request.urlopen", return_value=response):
+            assert _fetch_with_cache_fallback("http://example.com/uptime", config) is None
+        assert os.listdir(isolated_worker_data / 'cache') == []
+        mock_stale.assert_called_once()
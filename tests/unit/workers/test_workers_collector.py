@@ -2,13 +2,20 @@
 Tests for lib/workers.py collector-related functions.
 """
 
+import base64
+import threading
+import time
+
 import pytest
 from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
 
 from allium.lib.workers import (
     fetch_collector_consensus_data,
+    fetch_collector_descriptors,
     fetch_consensus_health,
+    _fetch_descriptor_files,
+    _parse_server_descriptors,
     _validate_collector_cache,
 )
 
@@ -257,3 +264,102 @@ class TestErrorHandling:
                 assert result == cached_health
                 # Should still mark as stale
                 mock_mark_stale.assert_called()
+
+
+def _descriptor(fingerprint, family_key=None):
+    """One server descriptor; with family_key, a family-cert whose signing-key extension holds it."""
+    lines = [f"router relay{fingerprint[:4]} 192.0.2.1 9001 0 0",
+             "fingerprint " + " ".join(fingerprint[i:i + 4] for i in range(0, 40, 4))]
+    if family_key is not None:
+        cert = bytes(39) + bytes([1]) + (32).to_bytes(2, 'big') + bytes([0x04, 0]) + family_key + bytes(64)
+        lines += ["family-cert", "-----BEGIN ED25519 CERT-----",
+                  base64.b64encode(cert).decode(), "-----END ED25519 CERT-----"]
+    return "\n".join(lines + ["router-signature"])
+
+
+class TestFetchCollectorDescriptors:
+    """Tests for fetch_collector_descriptors() download/parse stages and merge."""
+
+    def test_parse_server_descriptors(self):
+        key = bytes(range(32))
+        content = "\n".join([_descriptor('A' * 40, key), _descriptor('B' * 40)]).encode()
+        result = _parse_server_descriptors(content)
+        assert result == {'cert': ['A' * 40], 'no_cert': ['B' * 40], 'cert_keys': {'A' * 40: key.hex().upper()}}
+
+    @pytest.mark.parametrize("cpu_count", [1, 4], ids=["inline-parse", "process-pool-parse"])
+    def test_concurrent_downloads_keep_latest_file_wins(self, cpu_count):
+        now = datetime.utcnow()
+        names = [(now - timedelta(hours=h)).strftime('%Y-%m-%d-%H-%M-%S') + '-server-descriptors'
+                 for h in (4, 3, 2, 1)]
+        key_a, key_c = bytes([1]) * 32, bytes([2]) * 32
+        files = {
+            # names[0] comes from the per-file cache: A had a family-cert back then
+            names[1]: _descriptor('B' * 40),
+            names[2]: _descriptor('C' * 40, key_c),
+            names[3]: _descriptor('A' * 40),  # newest file: A no longer has one
+        }
+        listing = "".join(f'<a href="{name}">{name}</a>' for name in names).encode()
+        in_flight, peak = [0], [0]
+        lock = threading.Lock()
+
+        def fake_fetch(url, timeout, headers=None):
+            if url.endswith('/server-descriptors/'):
+                return listing
+            with lock:
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+            time.sleep(0.2)
+            with lock:
+                in_flight[0] -= 1
+            return files[url.rsplit('/', 1)[-1]].encode()
+
+        file_cache = {names[0]: {'cert': ['A' * 40], 'no_cert': [], 'cert_keys': {'A' * 40: key_a.hex().upper()}},
+                      'old-file': {'cert': [], 'no_cert': ['D' * 40], 'cert_keys': {}}}
+        saved = {}
+        with patch('allium.lib.consensus.is_consensus_evaluation_enabled', return_value=True), \
+                patch('allium.lib.workers._fetch_url_with_total_timeout', side_effect=fake_fetch), \
+                patch('allium.lib.workers._load_cache',
+                      side_effect=lambda name: file_cache if name == 'collector_descriptors_files' else None), \
+                patch('allium.lib.workers._save_cache', side_effect=saved.__setitem__), \
+                patch('allium.lib.workers._cache_manager') as cache_manager, \
+                patch('allium.lib.workers._mark_ready'), \
+                patch('allium.lib.workers.os.cpu_count', return_value=cpu_count):
+            cache_manager.get_cache_age.return_value = None
+            result = fetch_collector_descriptors(progress_logger=lambda msg: None, max_downloads=3)
+
+        assert peak[0] == 3
+        assert sorted(result['all_seen_fingerprints']) == ['A' * 40, 'B' * 40, 'C' * 40]
+        assert result['family_cert_fingerprints'] == ['C' * 40]
+        assert result['family_cert_groups'] == {key_c.hex().upper(): ['C' * 40]}
+        # Per-file cache keeps one entry per file in the window
+        assert sorted(saved['collector_descriptors_files']) == sorted(names)
+
+    def test_parse_pool_shutdown_cancels_pending_parses(self):
+        """The pool is shut down with the Python 3.8 API when a download fails midway."""
+        from concurrent.futures import Future
+
+        class Py38Pool:
+            def __init__(self):
+                self.futures, self.shutdowns = [], []
+
+            def submit(self, fn, *args):
+                future = Future()  # never started: cancellable
+                self.futures.append(future)
+                return future
+
+            def shutdown(self, wait=True):  # no cancel_futures before 3.9
+                self.shutdowns.append(wait)
+
+        def fake_download(url, timeout):
+            if url == 'bad':
+                time.sleep(0.1)
+                raise KeyboardInterrupt
+            return b''
+
+        pool = Py38Pool()
+        with patch('allium.lib.workers._create_parse_pool', return_value=pool), \
+                patch('allium.lib.workers._download_descriptor_file', side_effect=fake_download), \
+                pytest.raises(KeyboardInterrupt):
+            _fetch_descriptor_files([('a', 'a'), ('bad', 'bad')], {}, 10, 1, lambda msg: None)
+        assert pool.shutdowns == [True]
+        assert pool.futures and all(future.cancelled() for future in pool.futures)